@@ -5,10 +5,13 @@ import numpy as np
 import pandas as pd
 
 from qlib.data import D
-from qlib.model.riskmodel import StructuredCovEstimator
+from qlib.model.riskmodel import RiskModelStoreWriter, StructuredCovEstimator
 
 
-def prepare_data(riskdata_root="./riskdata", T=240, start_time="2016-01-01"):
+def prepare_data(riskdata_root="./riskdata", T=240, start_time="2016-01-01", pack=True):
+    """
+    pack: pack the risk data of all the dates into a `RiskModelStore` instead of saving the files of each date
+    """
     universe = D.features(D.instruments("csi300"), ["$close"], start_time=start_time).swaplevel().sort_index()
 
     price_all = (
@@ -18,6 +21,8 @@ def prepare_data(riskdata_root="./riskdata", T=240, start_time="2016-01-01"):
     # StructuredCovEstimator is a statistical risk model
     riskmodel = StructuredCovEstimator()
 
+    writer = RiskModelStoreWriter(riskdata_root) if pack else None
+
     for i in range(T - 1, len(price_all)):
         date = price_all.index[i]
         ref_date = price_all.index[i - T + 1]
@@ -35,6 +40,11 @@ def prepare_data(riskdata_root="./riskdata", T=240, start_time="2016-01-01"):
         F, cov_b, var_u = riskmodel.predict(ret, is_price=False, return_decomposed_components=True)
 
         # save risk data
+        if writer is not None:
+            # for specific_risk we follow the convention to save volatility
+            writer.add(date, pd.DataFrame(F, index=codes), cov_b, pd.Series(np.sqrt(var_u), index=codes))
+            continue
+
         root = riskdata_root + "/" + date.strftime("%Y%m%d")
         os.makedirs(root, exist_ok=True)
 
@@ -43,6 +53,9 @@ def prepare_data(riskdata_root="./riskdata", T=240, start_time="2016-01-01"):
         # for specific_risk we follow the convention to save volatility
         pd.Series(np.sqrt(var_u), index=codes).to_pickle(root + "/specific_risk.pkl")
 
+    if writer is not None:
+        writer.close()
+
 
 if __name__ == "__main__":
     import qlib
@@ -3,9 +3,10 @@
 
 from __future__ import annotations
 
+import concurrent.futures
 import copy
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Generator, List, Optional, Tuple, Union
+from typing import TYPE_CHECKING, Any, Dict, Generator, List, Optional, Tuple, Union
 
 import pandas as pd
 
@@ -19,6 +20,7 @@ if TYPE_CHECKING:
 from ..config import C
 from ..log import get_module_logger
 from ..utils import init_instance_by_config
+from ..utils.paral import dumps_to_arena, loads_from_arena
 from .backtest import INDICATOR_METRIC, PORT_METRIC, backtest_loop, collect_data_loop
 from .decision import Order
 from .exchange import Exchange
@@ -116,6 +118,7 @@ def create_account_instance(
     benchmark: Optional[str],
     account: Union[float, int, dict],
     pos_type: str = "Position",
+    report_flush_dir: Optional[str] = None,
 ) -> Account:
     """
     # TODO: is very strange pass benchmark_config in the account (maybe for report)
@@ -148,6 +151,8 @@ def create_account_instance(
             ...
     pos_type: str
         Postion type.
+    report_flush_dir: Optional[str]
+        the directory to flush the portfolio metrics and the indicators during the backtest, please refer to `Account`
     """
     if isinstance(account, (int, float)):
         init_cash = account
@@ -162,6 +167,7 @@ def create_account_instance(
         init_cash=init_cash,
         position_dict=position_dict,
         pos_type=pos_type,
+        report_flush_dir=report_flush_dir,
         benchmark_config=(
             {}
             if benchmark is None
@@ -183,6 +189,7 @@ def get_strategy_executor(
     account: Union[float, int, dict] = 1e9,
     exchange_kwargs: dict = {},
     pos_type: str = "Position",
+    report_flush_dir: Optional[str] = None,
 ) -> Tuple[BaseStrategy, BaseExecutor]:
     # NOTE:
     # - for avoiding recursive import
@@ -196,6 +203,7 @@ def get_strategy_executor(
         benchmark=benchmark,
         account=account,
         pos_type=pos_type,
+        report_flush_dir=report_flush_dir,
     )
 
     exchange_kwargs = copy.copy(exchange_kwargs)
@@ -223,6 +231,7 @@ def backtest(
     account: Union[float, int, dict] = 1e9,
     exchange_kwargs: dict = {},
     pos_type: str = "Position",
+    report_flush_dir: Optional[str] = None,
 ) -> Tuple[PORT_METRIC, INDICATOR_METRIC]:
     """initialize the strategy and executor, then backtest function for the interaction of the outermost strategy and
     executor in the nested decision execution
@@ -253,6 +262,9 @@ def backtest(
         the kwargs for initializing Exchange
     pos_type : str
         the type of Position.
+    report_flush_dir : Optional[str]
+        the directory to flush the portfolio metrics and the indicators during the backtest to keep the memory
+        bounded (e.g. in long high frequency backtests). They are kept in memory by default.
 
     Returns
     -------
@@ -272,6 +284,7 @@ def backtest(
         account,
         exchange_kwargs,
         pos_type=pos_type,
+        report_flush_dir=report_flush_dir,
     )
     return backtest_loop(start_time, end_time, trade_strategy, trade_executor)
 
@@ -286,6 +299,7 @@ def collect_data(
     exchange_kwargs: dict = {},
     pos_type: str = "Position",
     return_value: dict | None = None,
+    report_flush_dir: Optional[str] = None,
 ) -> Generator[object, None, None]:
     """initialize the strategy and executor, then collect the trade decision data for rl training
 
@@ -305,10 +319,116 @@ def collect_data(
         account,
         exchange_kwargs,
         pos_type=pos_type,
+        report_flush_dir=report_flush_dir,
     )
     yield from collect_data_loop(start_time, end_time, trade_strategy, trade_executor, return_value=return_value)
 
 
+# the state shared by the runs of `backtest_sweep` in a worker process
+_SWEEP_STATE: dict = {}
+
+
+def _init_sweep_worker(qlib_config: Any, arena_name: str, data: bytes) -> None:
+    C.register_from_C(qlib_config)
+    _SWEEP_STATE.update(loads_from_arena(data, arena_name))
+
+
+def _sweep_one(
+    start_time: Union[pd.Timestamp, str], end_time: Union[pd.Timestamp, str], config: dict, trade_exchange: Exchange
+) -> Tuple[Dict[str, pd.DataFrame], Dict[str, pd.DataFrame]]:
+    config = copy.copy(config)
+    if isinstance(config.get("account"), dict):
+        # `create_account_instance` pops the cash from the dict
+        config["account"] = copy.deepcopy(config["account"])
+    portfolio_dict, indicator_dict = backtest(
+        start_time, end_time, exchange_kwargs={"exchange": trade_exchange}, **config
+    )
+    # the positions and the indicator objects are not collected, they are large to be sent back
+    return (
+        {freq: report for freq, (report, _) in portfolio_dict.items()},
+        {freq: indicator for freq, (indicator, _) in indicator_dict.items()},
+    )
+
+
+def _sweep_one_in_worker(idx: int) -> Tuple[Dict[str, pd.DataFrame], Dict[str, pd.DataFrame]]:
+    return _sweep_one(
+        _SWEEP_STATE["start_time"], _SWEEP_STATE["end_time"], _SWEEP_STATE["configs"][idx], _SWEEP_STATE["exchange"]
+    )
+
+
+def backtest_sweep(
+    start_time: Union[pd.Timestamp, str],
+    end_time: Union[pd.Timestamp, str],
+    configs: List[dict],
+    exchange_kwargs: dict = {},
+    n_jobs: Optional[int] = None,
+    **kwargs: Any,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """backtest a list of configs (e.g. a grid of strategy parameters) with the same exchange
+
+    The exchange is created only once. When the backtests run in multiple processes, the exchange and the configs are
+    handed over to the workers by shared memory (please refer to `dumps_to_arena`), so the quote is neither loaded
+    nor copied per run.
+
+    Parameters
+    ----------
+    start_time : Union[pd.Timestamp, str]
+        closed start time for backtest
+    end_time : Union[pd.Timestamp, str]
+        closed end time for backtest
+    configs : List[dict]
+        the arguments of `backtest` for each run, e.g. `{"strategy": ..., "executor": ...}`.
+        The strategies and executors should be given by configs rather than instances, so each run creates its own.
+    exchange_kwargs : dict
+        the kwargs for initializing the Exchange shared by the runs
+    n_jobs : Optional[int]
+        the number of the worker processes, `C.kernels` by default. The runs are done in the current process if it
+        is 1.
+    kwargs :
+        the arguments of `backtest` shared by the runs (e.g. `executor`, `benchmark`, `account`, `pos_type`);
+        they are overridden by `configs`
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, pd.DataFrame]:
+        the portfolio metrics and the indicators of all the runs, indexed by <run (the index in `configs`), freq,
+        datetime>
+    """
+    configs = [{**kwargs, **config} for config in configs]
+    exchange_kwargs = copy.copy(exchange_kwargs)
+    exchange_kwargs.setdefault("start_time", start_time)
+    exchange_kwargs.setdefault("end_time", end_time)
+    trade_exchange = get_exchange(**exchange_kwargs)
+
+    if n_jobs is None:
+        n_jobs = C.get_kernels(trade_exchange.freq)
+    n_jobs = min(n_jobs, len(configs))
+    if n_jobs <= 1:
+        results = [_sweep_one(start_time, end_time, config, trade_exchange) for config in configs]
+    else:
+        arena, data = dumps_to_arena(
+            {"start_time": start_time, "end_time": end_time, "configs": configs, "exchange": trade_exchange}
+        )
+        logger.info(f"{arena.size} bytes of the exchange and the configs are shared by {n_jobs} workers")
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=n_jobs, initializer=_init_sweep_worker, initargs=(C, arena.name, data)
+            ) as executor:
+                results = list(executor.map(_sweep_one_in_worker, range(len(configs))))
+        finally:
+            arena.unlink()
+
+    portfolio_df = pd.concat(
+        {(i, freq): report for i, (reports, _) in enumerate(results) for freq, report in reports.items()},
+        names=["run", "freq"],
+    )
+    indicator_df = pd.concat(
+        {(i, freq): indicator for i, (_, indicators) in enumerate(results) for freq, indicator in indicators.items()},
+        names=["run", "freq"],
+    )
+    return portfolio_df, indicator_df
+
+
 def format_decisions(
     decisions: List[BaseTradeDecision],
 ) -> Optional[Tuple[str, List[Tuple[BaseTradeDecision, Union[Tuple, None]]]]]:
@@ -346,4 +466,4 @@ def format_decisions(
     return res
 
 
-__all__ = ["Order", "backtest", "get_strategy_executor"]
+__all__ = ["Order", "backtest", "backtest_sweep", "get_strategy_executor"]
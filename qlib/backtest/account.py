@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import copy
+from pathlib import Path
 from typing import Dict, List, Optional, Tuple, cast
 
 import pandas as pd
@@ -84,6 +85,7 @@ class Account:
         benchmark_config: dict = {},
         pos_type: str = "Position",
         port_metr_enabled: bool = True,
+        report_flush_dir: Optional[str] = None,
     ) -> None:
         """the trade account of backtest.
 
@@ -101,9 +103,13 @@ class Account:
             initial stocks with parameters amount and price,
             if there is no price key in the dict of stocks, it will be filled by _fill_stock_value.
             by default {}.
+        report_flush_dir : Optional[str]
+            the portfolio metrics and the trade indicators of each level are flushed to the disk in it during the
+            backtest to keep the memory bounded (e.g. in long high frequency backtests)
         """
 
         self._pos_type = pos_type
+        self._report_flush_dir = report_flush_dir
         self._port_metr_enabled = port_metr_enabled
         self.benchmark_config: dict = {}  # avoid no attribute error
         self.init_vars(init_cash, position_dict, freq, benchmark_config)
@@ -140,7 +146,9 @@ class Account:
         if self.is_port_metr_enabled():
             # NOTE:
             # `accum_info` and `current_position` are shared here
-            self.portfolio_metrics = PortfolioMetrics(freq, benchmark_config)
+            self.portfolio_metrics = PortfolioMetrics(
+                freq, benchmark_config, flush_dir=self._get_report_flush_dir(freq, "portfolio_metrics")
+            )
             self.hist_positions = {}
 
             # fill stock value
@@ -150,7 +158,12 @@ class Account:
                 self.current_position.fill_stock_value(self.benchmark_config["start_time"], self.freq)
 
         # trading related metrics(e.g. high-frequency trading)
-        self.indicator = Indicator()
+        self.indicator = Indicator(flush_dir=self._get_report_flush_dir(freq, "indicator"))
+
+    def _get_report_flush_dir(self, freq: str, name: str) -> Optional[str]:
+        if self._report_flush_dir is None:
+            return None
+        return str(Path(self._report_flush_dir) / freq / name)
 
     def reset(
         self, freq: str | None = None, benchmark_config: dict | None = None, port_metr_enabled: bool | None = None
@@ -279,7 +292,7 @@ class Account:
             trade_start_time=trade_start_time,
             trade_end_time=trade_end_time,
             account_value=now_account_value,
-            cash=self.current_position.position["cash"],
+            cash=self.current_position.get_cash(),
             return_rate=(now_earning + now_cost) / last_account_value,
             # here use earning to calculate return, position's view, earning consider cost, true return
             # in order to make same definition with original backtest in evaluate.py
@@ -294,10 +307,10 @@ class Account:
         """update history position"""
         now_account_value = self.current_position.calculate_value()
         # set now_account_value to position
-        self.current_position.position["now_account_value"] = now_account_value
+        self.current_position.update_account_value(now_account_value)
         self.current_position.update_weight_all()
         # update hist_positions
-        # note use deepcopy
+        # note use deepcopy (`ArrayPosition` only copies its arrays)
         self.hist_positions[trade_start_time] = copy.deepcopy(self.current_position)
 
     def update_indicator(
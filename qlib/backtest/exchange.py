@@ -22,7 +22,7 @@ from ..constant import REG_CN, REG_TW
 from ..data.data import D
 from ..log import get_module_logger
 from .decision import Order, OrderDir, OrderHelper
-from .high_performance_ds import BaseQuote, NumpyQuote
+from .high_performance_ds import BaseQuote, NumpyQuote, TradableBitmap
 
 
 class Exchange:
@@ -127,6 +127,9 @@ class Exchange:
                                                 limit_buy will be set to False by default (False indicates we can buy
                                                 this target on this day).
                                     index: MultipleIndex(instrument, pd.Datetime)
+        :param quote_cls:       the class maintaining the quote for retrieving the data, default `NumpyQuote`.
+                                `CubeQuote` is much faster for the daily backtest of a large universe, at the cost of
+                                keeping the dense (field, time, stock) array in memory.
         """
         self.freq = freq
         self.start_time = start_time
@@ -197,6 +200,7 @@ class Exchange:
         # init quote by quote_df
         self.quote_cls = quote_cls
         self.quote: BaseQuote = self.quote_cls(self.quote_df, freq)
+        self._tradable_bitmap: Optional[TradableBitmap] = None
 
     def get_quote_from_qlib(self) -> None:
         # get stock data from qlib
@@ -414,6 +418,52 @@ class Exchange:
             or self.check_stock_limit(stock_id, start_time, end_time, direction)
         )
 
+    @property
+    def tradable_bitmap(self) -> TradableBitmap:
+        """the bitmaps of the suspension and the trading limitations, which are built at the first access"""
+        if self._tradable_bitmap is None:
+            self._tradable_bitmap = TradableBitmap(self.quote_df, self.freq)
+        return self._tradable_bitmap
+
+    def is_suspended(self, stock_ids: List[str], start_time: pd.Timestamp, end_time: pd.Timestamp) -> np.ndarray:
+        """
+        It is the same as calling `check_stock_suspended` on each stock, but the stocks are checked at once by the
+        precomputed `tradable_bitmap`.
+
+        Returns
+        -------
+        np.ndarray:
+            the bool array in the order of `stock_ids`
+        """
+        return self.tradable_bitmap.get_flags(stock_ids, start_time, end_time, ["suspended"])
+
+    def is_tradable(
+        self,
+        stock_ids: List[str],
+        start_time: pd.Timestamp,
+        end_time: pd.Timestamp,
+        direction: int | None = None,
+    ) -> np.ndarray:
+        """
+        It is the same as calling `is_stock_tradable` on each stock, but the stocks are checked at once by the
+        precomputed `tradable_bitmap`.
+
+        Returns
+        -------
+        np.ndarray:
+            the bool array in the order of `stock_ids`
+        """
+        if direction is None:
+            limit_fields = ["limit_buy", "limit_sell"]
+        elif direction == Order.BUY:
+            limit_fields = ["limit_buy"]
+        elif direction == Order.SELL:
+            limit_fields = ["limit_sell"]
+        else:
+            raise ValueError(f"direction {direction} is not supported!")
+        # please refer to `check_stock_suspended` and `check_stock_limit`
+        return ~self.tradable_bitmap.get_flags(stock_ids, start_time, end_time, ["suspended", *limit_fields])
+
     def check_order(self, order: Order) -> bool:
         # check limit and suspended
         return self.is_stock_tradable(order.stock_id, order.start_time, order.end_time, order.direction)
@@ -462,6 +512,122 @@ class Exchange:
 
         return trade_val, trade_cost, trade_price
 
+    def deal_orders(
+        self,
+        orders: List[Order],
+        trade_account: Account | None = None,
+        position: BasePosition | None = None,
+        dealt_order_amount: Dict[str, float] | None = None,
+    ) -> List[Tuple[float, float, float]]:
+        """
+        Deal a batch of orders. The results are the same as calling `deal_order` on the orders one by one.
+
+        The quote of the orders (the tradability, deal price, volume, factor and volume limits) is retrieved by
+        `BaseQuote.get_data_batch` at once. Then the orders are dealt one by one in the given order with the retrieved
+        quote, because the cash constraint is sequential (e.g. the cash from selling can be used by the following
+        buying orders).
+
+        NOTE: unlike `deal_order`, the deal amount of each order is added to `dealt_order_amount` after dealing it.
+
+        :param orders: the orders to be dealt; the results section in `Order` will be changed.
+        :param trade_account: Trade account to be updated after dealing the orders.
+        :param position: position to be updated after dealing the orders.
+        :param dealt_order_amount: the dealt order amount dict with the format of {stock_id: float}
+        :return: the list of (trade_val, trade_cost, trade_price) of each order
+        """
+        if trade_account is not None and position is not None:
+            raise ValueError("trade_account and position can only choose one")
+        if dealt_order_amount is None:
+            dealt_order_amount = defaultdict(float)
+
+        tradable, trade_price, volume, factor, vol_limit_values = self._get_orders_quote_info(orders)
+        results = []
+        for i, order in enumerate(orders):
+            if not tradable[i]:
+                order.deal_amount = 0.0
+                self.logger.debug(f"Order failed due to trading limitation: {order}")
+                results.append((0.0, 0.0, np.nan))
+            else:
+                order.factor = None if np.isnan(factor[i]) else factor[i]
+                _, trade_val, trade_cost = self._calc_trade_info(
+                    order,
+                    trade_account.current_position if trade_account else position,
+                    dealt_order_amount,
+                    trade_price[i],
+                    volume[i],
+                    vol_limit_values[i],
+                )
+                if trade_val > 1e-5:
+                    if trade_account:
+                        trade_account.update_order(
+                            order=order, trade_val=trade_val, cost=trade_cost, trade_price=trade_price[i]
+                        )
+                    elif position:
+                        position.update_order(
+                            order=order, trade_val=trade_val, cost=trade_cost, trade_price=trade_price[i]
+                        )
+                results.append((trade_val, trade_cost, trade_price[i]))
+            dealt_order_amount[order.stock_id] += order.deal_amount
+        return results
+
+    def _get_orders_quote_info(self, orders: List[Order]) -> tuple:
+        """
+        retrieve the quote of the orders for dealing them in batch
+
+        Returns
+        -------
+        tuple:
+            (tradable, trade_price, volume, factor, vol_limit_values); the quote of the untradable orders is NaN
+        """
+        n_orders = len(orders)
+        tradable = np.zeros(n_orders, dtype=bool)
+        trade_price, volume, factor = np.full((3, n_orders), np.nan)
+        vol_limit_values: List[Optional[List[float]]] = [None] * n_orders
+
+        groups = defaultdict(list)
+        for i, order in enumerate(orders):
+            groups[(order.start_time, order.end_time, order.direction)].append(i)
+        for (start_time, end_time, direction), idx in groups.items():
+            idx = np.array(idx)
+            stock_ids = [orders[i].stock_id for i in idx]
+
+            def get_data(field, method, stock_ids=stock_ids):
+                return self.quote.get_data_batch(stock_ids, start_time, end_time, field, method)
+
+            if direction == Order.BUY:
+                pstr, vol_limit = self.buy_price, self.buy_vol_limit
+            elif direction == Order.SELL:
+                pstr, vol_limit = self.sell_price, self.sell_vol_limit
+            else:
+                raise ValueError(f"direction {direction} is not supported!")
+            ok = self.is_tradable(stock_ids, start_time, end_time, direction)
+            tradable[idx] = ok
+            idx, stock_ids = idx[ok], [stock_ids[j] for j in np.flatnonzero(ok)]
+            if len(idx) == 0:
+                continue
+
+            # please refer to `get_deal_price`
+            price = get_data(pstr, "ts_data_last", stock_ids)
+            invalid = np.flatnonzero(np.isnan(price) | (price <= 1e-08))
+            for j in invalid:
+                self.logger.warning(
+                    f"(stock_id:{stock_ids[j]}, trade_time:{(start_time, end_time)}, {pstr}): {price[j]}!!!"
+                )
+                self.logger.warning(f"setting deal_price to close price")
+            if len(invalid) > 0:
+                price[invalid] = get_data("$close", "ts_data_last", [stock_ids[j] for j in invalid])
+            trade_price[idx] = price
+            volume[idx] = get_data("$volume", "sum", stock_ids)
+            factor[idx] = get_data("$factor", "ts_data_last", stock_ids)
+            if vol_limit is not None:
+                limit_values = [
+                    get_data(limit[1], "sum" if limit[0] == "current" else "ts_data_last", stock_ids)
+                    for limit in vol_limit
+                ]
+                for j, i in enumerate(idx):
+                    vol_limit_values[i] = [values[j] for values in limit_values]
+        return tradable, trade_price, volume, factor, vol_limit_values
+
     def get_quote_info(
         self,
         stock_id: str,
@@ -783,7 +949,30 @@ class Exchange:
             return (deal_amount * factor + 0.1) // self.trade_unit * self.trade_unit / factor
         return deal_amount
 
-    def _clip_amount_by_volume(self, order: Order, dealt_order_amount: dict) -> Optional[float]:
+    def _get_vol_limit_values(self, order: Order) -> Optional[List[float]]:
+        """get the values of the volume limits of the order (the dealt amount is not subtracted yet)"""
+        vol_limit = self.buy_vol_limit if order.direction == Order.BUY else self.sell_vol_limit
+        if vol_limit is None:
+            return None
+        vol_limit_values: List[float] = []
+        for limit in vol_limit:
+            assert isinstance(limit, tuple)
+            if limit[0] == "current":
+                method = "sum"
+            elif limit[0] == "cum":
+                method = "ts_data_last"
+            else:
+                raise ValueError(f"{limit[0]} is not supported")
+            limit_value = self.quote.get_data(order.stock_id, order.start_time, order.end_time, limit[1], method)
+            vol_limit_values.append(cast(float, limit_value))
+        return vol_limit_values
+
+    def _clip_amount_by_volume(
+        self,
+        order: Order,
+        dealt_order_amount: dict,
+        vol_limit_values: Optional[List[float]] = None,
+    ) -> Optional[float]:
         """parse the capacity limit string and return the actual amount of orders that can be executed.
         NOTE:
             this function will change the order.deal_amount **inplace**
@@ -794,35 +983,22 @@ class Exchange:
             the order to be executed.
         dealt_order_amount : dict
             :param dealt_order_amount: the dealt order amount dict with the format of {stock_id: float}
+        vol_limit_values : Optional[List[float]]
+            the values of the volume limits returned by `_get_vol_limit_values`; they are retrieved if not given
         """
         vol_limit = self.buy_vol_limit if order.direction == Order.BUY else self.sell_vol_limit
 
         if vol_limit is None:
             return order.deal_amount
 
+        if vol_limit_values is None:
+            vol_limit_values = cast(List[float], self._get_vol_limit_values(order))
         vol_limit_num: List[float] = []
-        for limit in vol_limit:
-            assert isinstance(limit, tuple)
+        for limit, limit_value in zip(vol_limit, vol_limit_values):
             if limit[0] == "current":
-                limit_value = self.quote.get_data(
-                    order.stock_id,
-                    order.start_time,
-                    order.end_time,
-                    field=limit[1],
-                    method="sum",
-                )
-                vol_limit_num.append(cast(float, limit_value))
-            elif limit[0] == "cum":
-                limit_value = self.quote.get_data(
-                    order.stock_id,
-                    order.start_time,
-                    order.end_time,
-                    field=limit[1],
-                    method="ts_data_last",
-                )
-                vol_limit_num.append(limit_value - dealt_order_amount[order.stock_id])
+                vol_limit_num.append(limit_value)
             else:
-                raise ValueError(f"{limit[0]} is not supported")
+                vol_limit_num.append(limit_value - dealt_order_amount[order.stock_id])
         vol_limit_min = min(vol_limit_num)
         orig_deal_amount = order.deal_amount
         order.deal_amount = max(min(vol_limit_min, orig_deal_amount), 0)
@@ -874,14 +1050,33 @@ class Exchange:
             float,
             self.get_deal_price(order.stock_id, order.start_time, order.end_time, direction=order.direction),
         )
-        total_trade_val = cast(float, self.get_volume(order.stock_id, order.start_time, order.end_time)) * trade_price
+        volume = cast(float, self.get_volume(order.stock_id, order.start_time, order.end_time))
         order.factor = self.get_factor(order.stock_id, order.start_time, order.end_time)
+        return self._calc_trade_info(
+            order, position, dealt_order_amount, trade_price, volume, self._get_vol_limit_values(order)
+        )
+
+    def _calc_trade_info(
+        self,
+        order: Order,
+        position: Optional[BasePosition],
+        dealt_order_amount: dict,
+        trade_price: float,
+        volume: float,
+        vol_limit_values: Optional[List[float]],
+    ) -> Tuple[float, float, float]:
+        """
+        Calculation of trade info with the quote of the order retrieved in advance (`order.factor` must be set)
+        **NOTE**: Order will be changed in this function
+        :return: trade_price, trade_val, trade_cost
+        """
+        total_trade_val = volume * trade_price
         order.deal_amount = order.amount  # set to full amount and clip it step by step
         # Clipping amount first
         # - It simulates that the order is rejected directly by the exchange due to large order
         # Another choice is placing it after rounding the order
         # - It simulates that the large order is submitted, but partial is dealt regardless of rounding by trading unit.
-        self._clip_amount_by_volume(order, dealt_order_amount)
+        self._clip_amount_by_volume(order, dealt_order_amount, vol_limit_values)
 
         # TODO: the adjusted cost ratio can be overestimated as deal_amount will be clipped in the next steps
         trade_val = order.deal_amount * trade_price
@@ -4,8 +4,9 @@ import copy
 from abc import abstractmethod
 from collections import defaultdict
 from types import GeneratorType
-from typing import Any, Dict, Generator, List, Tuple, Union, cast
+from typing import Any, Dict, Generator, List, Optional, Tuple, Union, cast
 
+import numpy as np
 import pandas as pd
 
 from qlib.backtest.account import Account
@@ -14,7 +15,7 @@ from qlib.log import get_module_logger
 
 from ..strategy.base import BaseStrategy
 from ..utils import init_instance_by_config
-from .decision import BaseTradeDecision, Order
+from .decision import BaseTradeDecision, Order, TradeDecisionWO
 from .exchange import Exchange
 from .utils import CommonInfrastructure, LevelInfrastructure, TradeCalendarManager, get_start_end_idx
 
@@ -327,6 +328,7 @@ class NestedExecutor(BaseExecutor):
         track_data: bool = False,
         skip_empty_decision: bool = True,
         align_range_limit: bool = True,
+        fast_schedule: bool = False,
         common_infra: CommonInfrastructure | None = None,
         **kwargs: Any,
     ) -> None:
@@ -345,6 +347,17 @@ class NestedExecutor(BaseExecutor):
         align_range_limit: bool
             force to align the trade_range decision
             It is only for nested executor, because range_limit is given by outer strategy
+        fast_schedule: bool
+            follow the schedule of the inner strategy if it provides one (please refer to
+            `BaseStrategy.generate_trade_schedule`, e.g. TWAPStrategy).
+            The inner orders of each step are generated in a vectorized way and dealt by the inner executor directly
+            instead of running the generators of the inner strategy and executor step by step, and the inner steps
+            are aggregated before updating the indicators of this level. The trading results are the same, but the
+            inner executor won't update its account at the end of its steps (i.e. no inner level indicators and
+            hold bar counts).
+            It only works when the inner executor is a `SimulatorExecutor` without `generate_portfolio_metrics`,
+            `verbose`, `track_data` and settlement, and the outer strategy doesn't update its decision in the inner
+            steps. Otherwise the inner steps are run one by one.
         """
         self.inner_executor: BaseExecutor = init_instance_by_config(
             inner_executor,
@@ -359,6 +372,7 @@ class NestedExecutor(BaseExecutor):
 
         self._skip_empty_decision = skip_empty_decision
         self._align_range_limit = align_range_limit
+        self._fast_schedule = fast_schedule
 
         super(NestedExecutor, self).__init__(
             time_per_step=time_per_step,
@@ -416,6 +430,11 @@ class NestedExecutor(BaseExecutor):
         # - more detailed information will be set into trade decision
         self._init_sub_trading(trade_decision)
 
+        if self._can_follow_schedule(trade_decision):
+            schedule = self.inner_strategy.generate_trade_schedule()
+            if schedule is not None:
+                return self._collect_data_by_schedule(trade_decision, schedule, level=level)
+
         _inner_execute_result = None
         while not self.inner_executor.finished():
             trade_decision = self._update_trade_decision(trade_decision)
@@ -482,6 +501,132 @@ class NestedExecutor(BaseExecutor):
 
         return execute_result, {"inner_order_indicators": inner_order_indicators, "decision_list": decision_list}
 
+    def _can_follow_schedule(self, trade_decision: BaseTradeDecision) -> bool:
+        """please refer to the docs of `fast_schedule`"""
+        inner_executor = self.inner_executor
+        return (
+            self._fast_schedule
+            and isinstance(inner_executor, SimulatorExecutor)
+            and not inner_executor.generate_portfolio_metrics
+            and not inner_executor.verbose
+            and not inner_executor.track_data
+            and inner_executor._settle_type == BasePosition.ST_NO
+            and trade_decision.strategy.update_trade_decision is BaseStrategy.update_trade_decision
+        )
+
+    def _collect_data_by_schedule(
+        self,
+        trade_decision: BaseTradeDecision,
+        schedule: np.ndarray,
+        level: int = 0,
+    ) -> Tuple[List[object], dict]:
+        """
+        the fast path of `_collect_data` following the schedule of the inner strategy
+        (please refer to `BaseStrategy.generate_trade_schedule`)
+        """
+        inner_executor = cast(SimulatorExecutor, self.inner_executor)
+        sub_cal: TradeCalendarManager = inner_executor.trade_calendar
+        trade_exchange = inner_executor.trade_exchange
+        execute_result: list = []
+
+        # the outer strategy doesn't update the decision, please refer to `_can_follow_schedule`
+        trade_decision.update(sub_cal)
+        if trade_decision.empty() and self._skip_empty_decision:
+            self.inner_strategy.post_upper_level_exe_step()
+            return execute_result, {"inner_order_indicators": [], "decision_list": []}
+
+        outer_orders = _retrieve_orders_from_decision(trade_decision)
+        stock_ids = [order.stock_id for order in outer_orders]
+        amount = np.array([order.amount for order in outer_orders], dtype=np.float64)
+        remain = amount.copy()
+        # the trade units are retrieved lazily because there is no factor for the stocks suspended in the whole range
+        trade_unit = np.full(len(outer_orders), np.nan)
+        trade_unit_known = np.zeros(len(outer_orders), dtype=bool)
+        scheduled = ~np.isnan(schedule).all(axis=1)
+        last_step = np.flatnonzero(scheduled)[-1] if scheduled.any() else -1
+
+        # the inner trading info aggregated by the outer orders
+        inner_amount, deal_amount, trade_price, trade_value, trade_cost = np.zeros((5, len(outer_orders)))
+        has_inner_order = np.zeros(len(outer_orders), dtype=bool)
+        executed_range = None
+        start_idx, end_idx = get_start_end_idx(sub_cal, trade_decision)
+        while not inner_executor.finished():
+            step = sub_cal.get_trade_step()
+            if self._align_range_limit and not start_idx <= step <= end_idx:
+                sub_cal.step()
+                continue
+            trade_start_time, trade_end_time = sub_cal.get_step_time()
+            executed_range = (trade_start_time if executed_range is None else executed_range[0], trade_end_time)
+
+            inner_orders, idx = [], np.array([], dtype=np.int64)
+            if scheduled[step]:
+                idx = np.flatnonzero(~trade_exchange.is_suspended(stock_ids, trade_start_time, trade_end_time))
+                for i in idx[~trade_unit_known[idx]]:
+                    order = outer_orders[i]
+                    _amount_trade_unit = trade_exchange.get_amount_of_trade_unit(
+                        stock_id=order.stock_id, start_time=order.start_time, end_time=order.end_time
+                    )
+                    trade_unit[i] = np.nan if _amount_trade_unit is None else _amount_trade_unit
+                    trade_unit_known[i] = True
+                if step == last_step:
+                    target = remain[idx]
+                else:
+                    delta = schedule[step, idx] - (amount[idx] - remain[idx])
+                    target = np.where(
+                        np.isnan(trade_unit[idx]),
+                        delta,
+                        np.minimum(np.round(delta / trade_unit[idx]) * trade_unit[idx], remain[idx]),
+                    )
+                idx, target = idx[target > 1e-5], target[target > 1e-5]
+                inner_orders = [
+                    Order(
+                        stock_id=stock_ids[i],
+                        amount=amt,
+                        start_time=trade_start_time,
+                        end_time=trade_end_time,
+                        direction=outer_orders[i].direction,
+                    )
+                    for i, amt in zip(idx, target)
+                ]
+            # NOTE: the inner executor deals the orders without stepping forward
+            _inner_execute_result, _ = inner_executor._collect_data(TradeDecisionWO(inner_orders, self.inner_strategy))
+            sub_cal.step()
+            self.post_inner_exe_step(_inner_execute_result)
+            execute_result.extend(_inner_execute_result)
+
+            for i, (order, trade_val, cost, price) in zip(idx, _inner_execute_result):
+                remain[i] -= order.deal_amount
+                has_inner_order[i] = True
+                inner_amount[i] += order.amount_delta
+                deal_amount[i] += order.deal_amount_delta
+                # it is divided by the aggregated deal amount when aggregating the indicators
+                trade_price[i] += order.deal_amount_delta * price
+                trade_value[i] += trade_val * order.sign
+                trade_cost[i] += cost
+
+        self.inner_strategy.post_upper_level_exe_step()
+        if executed_range is None:
+            return execute_result, {"inner_order_indicators": [], "decision_list": []}
+
+        # the aggregated inner steps are regarded as a single step
+        indicator = inner_executor.trade_account.indicator.order_indicator_cls()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            trade_price = trade_price / deal_amount
+        for name, values in [
+            ("amount", inner_amount),
+            ("inner_amount", inner_amount),
+            ("deal_amount", deal_amount),
+            ("trade_price", trade_price),
+            ("trade_value", trade_value),
+            ("trade_cost", trade_cost),
+            ("trade_dir", np.array([order.direction for order in outer_orders])),
+        ]:
+            indicator.assign(name, {stock_ids[i]: values[i] for i in np.flatnonzero(has_inner_order)})
+        # the base price of the whole executed range is calculated when aggregating the indicators
+        decision = TradeDecisionWO([], self.inner_strategy)
+        trade_decision.mod_inner_decision(decision)
+        return execute_result, {"inner_order_indicators": [indicator], "decision_list": [(decision, *executed_range)]}
+
     def post_inner_exe_step(self, inner_exe_res: List[object]) -> None:
         """
         A hook for doing sth after each step of inner strategy
@@ -536,6 +681,7 @@ class SimulatorExecutor(BaseExecutor):
         track_data: bool = False,
         common_infra: CommonInfrastructure | None = None,
         trade_type: str = TT_SERIAL,
+        batch_deal_threshold: Optional[int] = 100,
         **kwargs: Any,
     ) -> None:
         """
@@ -543,6 +689,10 @@ class SimulatorExecutor(BaseExecutor):
         ----------
         trade_type: str
             please refer to the doc of `TT_SERIAL` & `TT_PARAL`
+        batch_deal_threshold: Optional[int]
+            the orders of a step are dealt in a batch by `Exchange.deal_orders` if there are at least
+            `batch_deal_threshold` orders (the results are the same as dealing them one by one).
+            `None` disables it. The orders are always dealt one by one in the verbose mode.
         """
         super(SimulatorExecutor, self).__init__(
             time_per_step=time_per_step,
@@ -557,6 +707,7 @@ class SimulatorExecutor(BaseExecutor):
         )
 
         self.trade_type = trade_type
+        self.batch_deal_threshold = batch_deal_threshold
 
     def _get_order_iterator(self, trade_decision: BaseTradeDecision) -> List[Order]:
         """
@@ -591,7 +742,25 @@ class SimulatorExecutor(BaseExecutor):
         trade_start_time, _ = self.trade_calendar.get_step_time()
         execute_result: list = []
 
-        for order in self._get_order_iterator(trade_decision):
+        orders = self._get_order_iterator(trade_decision)
+        if not self.verbose and self.batch_deal_threshold is not None and len(orders) >= self.batch_deal_threshold:
+            # Each time we move into a new date, clear `self.dealt_order_amount` since it only maintains intraday
+            # information.
+            now_deal_day = self.trade_calendar.get_step_time()[0].floor(freq="D")
+            if self.deal_day is None or now_deal_day > self.deal_day:
+                self.dealt_order_amount = defaultdict(float)
+                self.deal_day = now_deal_day
+
+            # NOTE: The trade_account and `self.dealt_order_amount` will be changed in this function
+            results = self.trade_exchange.deal_orders(
+                orders,
+                trade_account=self.trade_account,
+                dealt_order_amount=self.dealt_order_amount,
+            )
+            execute_result = [(order, *res) for order, res in zip(orders, results)]
+            return execute_result, {"trade_info": execute_result}
+
+        for order in orders:
             # Each time we move into a new date, clear `self.dealt_order_amount` since it only maintains intraday
             # information.
             now_deal_day = self.trade_calendar.get_step_time()[0].floor(freq="D")
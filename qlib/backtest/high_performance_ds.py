@@ -87,7 +87,7 @@ class BaseQuote:
             the columns of data to fetch
         method : Union[str, None]
             the method apply to data.
-            e.g [None, "last", "all", "sum", "mean", "ts_data_last"]
+            e.g [None, "last", "all", "any", "sum", "mean", "ts_data_last"]
 
         Return
         ----------
@@ -99,6 +99,38 @@ class BaseQuote:
 
         raise NotImplementedError(f"Please implement the `get_data` method")
 
+    def get_data_batch(
+        self,
+        stock_ids: List[str],
+        start_time: Union[pd.Timestamp, str],
+        end_time: Union[pd.Timestamp, str],
+        field: str,
+        method: str,
+    ) -> np.ndarray:
+        """get the specific field of multiple stocks during the same time range, and apply method to the data.
+
+        It is the same as calling `get_data` on each stock, but the subclass could retrieve the data at once.
+
+        Parameters
+        ----------
+        stock_ids : List[str]
+        start_time : Union[pd.Timestamp, str]
+            closed start time for backtest
+        end_time : Union[pd.Timestamp, str]
+            closed end time for backtest
+        field : str
+            the columns of data to fetch
+        method : str
+            the method apply to data, which must not be None. Please refer to `get_data`
+
+        Return
+        ----------
+        np.ndarray
+            the float values in the order of `stock_ids`; None is converted to NaN and bool is converted to 1.0/0.0
+        """
+        values = [self.get_data(stock_id, start_time, end_time, field, method) for stock_id in stock_ids]
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
 
 class PandasQuote(BaseQuote):
     def __init__(self, quote_df: pd.DataFrame, freq: str) -> None:
@@ -194,6 +226,8 @@ class NumpyQuote(BaseQuote):
             return data[-1]
         elif method == "all":
             return data.all()
+        elif method == "any":
+            return data.any()
         elif method == "ts_data_last":
             valid_data = data.loc[~data.isna().data.astype(bool)]
             if len(valid_data) == 0:
@@ -204,6 +238,275 @@ class NumpyQuote(BaseQuote):
             raise ValueError(f"{method} is not supported")
 
 
+class CubeQuote(BaseQuote):
+    """
+    The quote stored as a dense (field, time, instrument) cube.
+
+    Compared with `NumpyQuote`, which keeps a data frame per stock and slices it by the labels of the timestamps,
+    the timestamps and the stock codes are mapped to the integer positions of the cube. The aggregations of the
+    time ranges are O(1) lookups of the prefix sums which are built lazily for each field and method. It is much
+    faster when the universe is large (e.g. the daily backtest of thousands of stocks over many years).
+
+    NOTE:
+    - It is designed for daily data only. The cube takes `n_fields * n_timestamps * n_stocks * itemsize` bytes of
+      memory (the missing data is filled with NaN), and each cached prefix array takes about as much as a field of
+      the cube, so the minute-level data of a large universe (e.g. csi800) does not fit in memory.
+    - The range sums are the differences of the prefix sums, so they may differ from `np.nansum` by the rounding error.
+    """
+
+    def __init__(
+        self, quote_df: pd.DataFrame, freq: str, region: str = "cn", dtype="float64", agg_cache_size: int = 8
+    ) -> None:
+        """
+        Parameters
+        ----------
+        quote_df : pd.DataFrame
+            the init dataframe from qlib, indexed by <instrument, datetime>.
+        dtype :
+            the dtype of the cube; `float32` halves the memory (the sums are still accumulated in float64).
+        agg_cache_size : int
+            the maximum number of the prefix arrays (one for each field and kind of aggregation) kept in memory;
+            the least recently used one is dropped when it is exceeded.
+        """
+        super().__init__(quote_df=quote_df, freq=freq)
+        inst_codes, insts = pd.factorize(quote_df.index.get_level_values("instrument"), sort=True)
+        time_codes, times = pd.factorize(quote_df.index.get_level_values("datetime"), sort=True)
+        self.codes = {code: i for i, code in enumerate(insts)}
+        self.fields = {field: i for i, field in enumerate(quote_df.columns)}
+        self.times = pd.DatetimeIndex(times)
+        self._time_values = self.times.values
+
+        self.cube = np.full((len(self.fields), len(self.times), len(self.codes)), np.nan, dtype=dtype)
+        for field, i in self.fields.items():
+            self.cube[i, time_codes, inst_codes] = quote_df[field].to_numpy(dtype=self.cube.dtype, na_value=np.nan)
+        # the last row of each stock until the time, -1 if there is no data of the stock yet
+        exists = np.zeros(self.cube.shape[1:], dtype=bool)
+        exists[time_codes, inst_codes] = True
+        self._last_row = self._last_true(exists)
+        self._agg_cache: Dict[tuple, np.ndarray] = OrderedDict()
+        self.agg_cache_size = max(int(agg_cache_size), 1)
+
+        n, unit = Freq.parse(freq)
+        if unit in Freq.SUPPORT_CAL_LIST:
+            self.freq = Freq.get_timedelta(1, unit)
+        else:
+            raise ValueError(f"{freq} is not supported in CubeQuote")
+        self.region = region
+
+    @staticmethod
+    def _last_true(mask: np.ndarray) -> np.ndarray:
+        """the last row which is True until each row (-1 if none) for each column"""
+        rows = np.where(mask, np.arange(mask.shape[0])[:, None], -1)
+        return np.maximum.accumulate(rows, axis=0).astype(np.int32)
+
+    @staticmethod
+    def _prefix(values: np.ndarray, dtype=np.float64) -> np.ndarray:
+        """the prefix sums along the time axis with a leading row of zeros"""
+        prefix = np.zeros((values.shape[0] + 1,) + values.shape[1:], dtype=dtype)
+        np.cumsum(values, axis=0, dtype=dtype, out=prefix[1:])
+        return prefix
+
+    def _get_agg(self, field_idx: int, kind: str) -> np.ndarray:
+        key = (field_idx, kind)
+        agg = self._agg_cache.get(key)
+        if agg is not None:
+            self._agg_cache.move_to_end(key)
+            return agg
+        values = self.cube[field_idx]
+        if kind == "sum":
+            agg = self._prefix(np.nan_to_num(values))
+        elif kind == "count":
+            # the counts are not larger than the number of timestamps
+            agg = self._prefix(~np.isnan(values), dtype=np.int32)
+        elif kind == "zeros":
+            # NaN is regarded as True like `np.array([np.nan]).all()`
+            agg = self._prefix(values == 0, dtype=np.int32)
+        elif kind == "nonzeros":
+            # the missing data is filled with NaN, which should not be regarded as True
+            exists = self._last_row == np.arange(len(self.times))[:, None]
+            agg = self._prefix((values != 0) & exists, dtype=np.int32)
+        elif kind == "last_valid":
+            agg = self._last_true(~np.isnan(values))
+        else:
+            raise ValueError(f"{kind} is not supported")
+        self._agg_cache[key] = agg
+        while len(self._agg_cache) > self.agg_cache_size:
+            self._agg_cache.popitem(last=False)
+        return agg
+
+    def _get_row(self, time: Union[pd.Timestamp, str], side: str) -> int:
+        return int(np.searchsorted(self._time_values, pd.Timestamp(time).to_datetime64(), side=side))
+
+    def get_all_stock(self):
+        return self.codes.keys()
+
+    def get_data(self, stock_id, start_time, end_time, field, method=None):
+        col = self.codes.get(stock_id)
+        if col is None:
+            return None
+        field_idx = self.fields[field]
+
+        # single data
+        # keep the same behavior as `NumpyQuote`: skip the aggregating function
+        if is_single_value(start_time, end_time, self.freq, self.region):
+            row = self._get_row(start_time, "left")
+            if row >= len(self.times) or self._time_values[row] != pd.Timestamp(start_time).to_datetime64():
+                return None
+            if self._last_row[row, col] != row:
+                return None
+            return self.cube[field_idx, row, col]
+
+        start, end = self._get_row(start_time, "left"), self._get_row(end_time, "right")
+        # the last row of the stock in [start, end)
+        last = self._last_row[end - 1, col] if end > 0 else -1
+        if last < start:
+            return None
+        if method is None:
+            rows = np.arange(start, end)
+            rows = rows[self._last_row[start:end, col] == rows]
+            return idd.SingleData(self.cube[field_idx, rows, col], self.times[rows])
+        value = self._agg_data(field_idx, col, start, end, last, method)
+        if method == "ts_data_last":
+            return None if np.isnan(value) else value[()]
+        return value
+
+    def get_data_batch(self, stock_ids, start_time, end_time, field, method):
+        cols = np.array([self.codes.get(stock_id, -1) for stock_id in stock_ids], dtype=np.int64)
+        known = np.flatnonzero(cols >= 0)
+        cols = cols[known]
+        values = np.full(len(stock_ids), np.nan)
+        field_idx = self.fields[field]
+
+        if is_single_value(start_time, end_time, self.freq, self.region):
+            row = self._get_row(start_time, "left")
+            if row >= len(self.times) or self._time_values[row] != pd.Timestamp(start_time).to_datetime64():
+                return values
+            exists = self._last_row[row, cols] == row
+            values[known[exists]] = self.cube[field_idx, row, cols[exists]]
+            return values
+
+        start, end = self._get_row(start_time, "left"), self._get_row(end_time, "right")
+        if end == 0:
+            return values
+        last = self._last_row[end - 1, cols]
+        exists = last >= start
+        values[known[exists]] = self._agg_data(field_idx, cols[exists], start, end, last[exists], method)
+        return values
+
+    def _agg_data(self, field_idx: int, cols, start: int, end: int, last, method: str):
+        """Agg the data of the rows [start, end) of the columns `cols` (int or np.ndarray) by specific method."""
+
+        def _range(kind):
+            prefix = self._get_agg(field_idx, kind)
+            return prefix[end, cols] - prefix[start, cols]
+
+        if method == "sum":
+            return _range("sum")
+        elif method == "mean":
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return _range("sum") / _range("count")
+        elif method == "last":
+            return self.cube[field_idx, last, cols]
+        elif method == "all":
+            return _range("zeros") == 0
+        elif method == "any":
+            return _range("nonzeros") > 0
+        elif method == "ts_data_last":
+            # NaN if there is no valid data in the range
+            rows = self._get_agg(field_idx, "last_valid")[end - 1, cols]
+            return np.where(rows >= start, self.cube[field_idx, rows, cols], np.nan)
+        else:
+            raise ValueError(f"{method} is not supported")
+
+
+class TradableBitmap:
+    """
+    The suspension and the trading limitations of the stocks as packed bitmaps.
+
+    Each bitmap is a (time, ceil(n_stocks / 8)) uint8 array packed by `np.packbits` along the stocks, so the flags of
+    a time range are reduced by a bitwise AND over the rows and the flags of a whole universe are checked at once.
+    The results are the same as the checks of `Exchange` on the quote (e.g. `Exchange.is_stock_tradable`):
+    - a stock is suspended in a time range if all its `$close` are NaN (the missing data is regarded as NaN)
+    - a stock is limited in a time range if all its `limit_buy` (or `limit_sell`) are True
+    """
+
+    NAMES = ("suspended", "limit_buy", "limit_sell")
+
+    def __init__(self, quote_df: pd.DataFrame, freq: str, region: str = "cn") -> None:
+        """
+        Parameters
+        ----------
+        quote_df : pd.DataFrame
+            the quote with `$close`, `limit_buy` and `limit_sell`, indexed by <instrument, datetime>.
+        """
+        inst_codes, insts = pd.factorize(quote_df.index.get_level_values("instrument"), sort=True)
+        time_codes, times = pd.factorize(quote_df.index.get_level_values("datetime"), sort=True)
+        self.codes = {code: i for i, code in enumerate(insts)}
+        self._time_values = pd.DatetimeIndex(times).values
+
+        self.bitmaps: Dict[str, np.ndarray] = {}
+        for name, flags in zip(self.NAMES, [quote_df["$close"].isna(), quote_df["limit_buy"], quote_df["limit_sell"]]):
+            # the missing data is regarded as suspended and limited; it makes no difference to `all` of the range
+            dense = np.ones((len(times), len(insts)), dtype=bool)
+            dense[time_codes, inst_codes] = flags.to_numpy(dtype=bool, na_value=True)
+            self.bitmaps[name] = np.packbits(dense, axis=1)
+
+        n, unit = Freq.parse(freq)
+        if unit in Freq.SUPPORT_CAL_LIST:
+            self.freq = Freq.get_timedelta(1, unit)
+        else:
+            raise ValueError(f"{freq} is not supported in TradableBitmap")
+        self.region = region
+
+    def _get_rows(self, start_time: Union[pd.Timestamp, str], end_time: Union[pd.Timestamp, str]) -> slice:
+        start_time, end_time = pd.Timestamp(start_time), pd.Timestamp(end_time)
+        start = int(np.searchsorted(self._time_values, start_time.to_datetime64(), side="left"))
+        # keep the same behavior as the quote: only the data at `start_time` is used for a single value
+        if is_single_value(start_time, end_time, self.freq, self.region):
+            if start < len(self._time_values) and self._time_values[start] == start_time.to_datetime64():
+                return slice(start, start + 1)
+            return slice(start, start)
+        return slice(start, int(np.searchsorted(self._time_values, end_time.to_datetime64(), side="right")))
+
+    def get_flags(
+        self,
+        stock_ids: List[str],
+        start_time: Union[pd.Timestamp, str],
+        end_time: Union[pd.Timestamp, str],
+        names: Iterable[str],
+    ) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        names : Iterable[str]
+            the names of the bitmaps in `NAMES`
+
+        Returns
+        -------
+        np.ndarray
+            the bool array in the order of `stock_ids`, True if any of the flags is set in the whole time range;
+            the flags of the unknown stocks are always set
+        """
+        rows = self._get_rows(start_time, end_time)
+        packed = None
+        for name in names:
+            bitmap = self.bitmaps[name][rows]
+            # the flags of an empty range are all set like the missing data
+            flags = (
+                np.bitwise_and.reduce(bitmap, axis=0) if len(bitmap) > 0 else np.full(bitmap.shape[1], 0xFF, np.uint8)
+            )
+            packed = flags if packed is None else packed | flags
+        cols = np.fromiter(
+            (self.codes.get(stock_id, -1) for stock_id in stock_ids), dtype=np.int64, count=len(stock_ids)
+        )
+        known = cols >= 0
+        res = ~known
+        if packed is not None:
+            cols = cols[known]
+            res[known] = (packed[cols >> 3] >> (7 - (cols & 7))) & 1
+        return res
+
+
 class BaseSingleMetric:
     """
     The data structure of the single metric.
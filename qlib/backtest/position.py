@@ -13,12 +13,39 @@ from ..data.data import D
 from .decision import Order
 
 
+def _get_latest_close(
+    stock_list: List[str], start_time: Union[str, pd.Timestamp], freq: str, last_days: int
+) -> Dict[str, float]:
+    """get the close price of the stocks in the latest `last_days` days before `start_time`"""
+    start_time = pd.Timestamp(start_time)
+    # note that start time is 2020-01-01 00:00:00 if raw start time is "2020-01-01"
+    price_end_time = start_time
+    price_start_time = start_time - timedelta(days=last_days)
+    price_df = D.features(
+        stock_list,
+        ["$close"],
+        price_start_time,
+        price_end_time,
+        freq=freq,
+        disk_cache=True,
+    ).dropna()
+    price_dict = price_df.groupby(level="instrument")["$close"].last().to_dict()
+
+    if len(price_dict) < len(stock_list):
+        lack_stock = set(stock_list) - set(price_dict)
+        raise ValueError(f"{lack_stock} doesn't have close price in qlib in the latest {last_days} days")
+    return price_dict
+
+
 class BasePosition:
     """
     The Position wants to maintain the position like a dictionary
     Please refer to the `Position` class for the position
     """
 
+    # the subclasses without `__slots__` (e.g. `Position`) still have `__dict__`
+    __slots__ = ()
+
     def __init__(self, *args: Any, cash: float = 0.0, **kwargs: Any) -> None:
         self._settle_type = self.ST_NO
         self.position: dict = {}
@@ -97,6 +124,17 @@ class BasePosition:
     def calculate_value(self) -> float:
         raise NotImplementedError(f"Please implement the `calculate_value` method")
 
+    def update_account_value(self, value: float) -> None:
+        """
+        Save the value of the account (e.g. at the end of each step) in the position
+
+        Parameters
+        ----------
+        value : float
+            the value(money) of the account
+        """
+        self.position["now_account_value"] = value
+
     def get_stock_list(self) -> List[str]:
         """
         Get the list of stocks in the position.
@@ -299,24 +337,7 @@ class Position(BasePosition):
         if len(stock_list) == 0:
             return
 
-        start_time = pd.Timestamp(start_time)
-        # note that start time is 2020-01-01 00:00:00 if raw start time is "2020-01-01"
-        price_end_time = start_time
-        price_start_time = start_time - timedelta(days=last_days)
-        price_df = D.features(
-            stock_list,
-            ["$close"],
-            price_start_time,
-            price_end_time,
-            freq=freq,
-            disk_cache=True,
-        ).dropna()
-        price_dict = price_df.groupby(["instrument"], group_keys=False).tail(1)["$close"].to_dict()
-
-        if len(price_dict) < len(stock_list):
-            lack_stock = set(stock_list) - set(price_dict)
-            raise ValueError(f"{lack_stock} doesn't have close price in qlib in the latest {last_days} days")
-
+        price_dict = _get_latest_close(stock_list, start_time, freq, last_days)
         for stock in stock_list:
             self.position[stock]["price"] = price_dict[stock]
         self.position["now_account_value"] = self.calculate_value()
@@ -500,6 +521,314 @@ class Position(BasePosition):
             self._settle_type = self.ST_NO
 
 
+class ArrayPosition(BasePosition):
+    """Position keeping the holdings in NumPy arrays
+
+    It behaves the same as `Position`, but
+
+    - the amount, price, weight and counts of the stocks are kept in parallel arrays indexed by the id of the stock.
+      So valuing the position and updating the weights and counts are vectorized.
+    - the map from the stock to its id is append-only and shared by the copies of the position. So copying the
+      position (e.g. the historical positions saved by `Account` and the temporary positions copied by the strategies)
+      only copies the arrays.
+
+    The stocks not held keep their ids with zero amount, so the arrays grow with the stocks ever held rather than the
+    stocks currently held.
+
+    `position` is a dict materialized from the arrays in the same format as `Position.position`. Only the writes to the
+    cash related keys (e.g. "now_account_value") are written back.
+    """
+
+    __slots__ = (
+        "_settle_type",
+        "init_cash",
+        "_codes",
+        "_ids",
+        "_n",
+        "_held",
+        "_amount",
+        "_price",
+        "_weight",
+        "_counts",
+        "_info",
+    )
+
+    INFO_KEYS = ("cash", "now_account_value", "cash_delay")
+
+    def __init__(self, cash: float = 0, position_dict: Dict[str, Union[Dict[str, float], float]] = {}) -> None:
+        """
+        Parameters
+        ----------
+        cash : float, optional
+            initial cash in account, by default 0
+        position_dict :
+            initial stocks, please refer to `Position`
+        """
+        # `position` is a property, so `BasePosition.__init__` is not called
+        self._settle_type = self.ST_NO
+        self.init_cash = cash
+        self._codes: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._n = 0
+        self._held = np.zeros(0, dtype=bool)
+        self._amount = np.zeros(0)
+        self._price = np.zeros(0)
+        self._weight = np.zeros(0)
+        self._counts: Dict[str, np.ndarray] = {}
+        self._info: Dict[str, float] = {"cash": cash}
+        for stock, value in position_dict.items():
+            if isinstance(value, dict):
+                self._init_stock(stock, value["amount"], value.get("price", None))
+                if "weight" in value:
+                    self._weight[self._ids[stock]] = value["weight"]
+            else:
+                self._init_stock(stock, value)
+
+        # If the stock price information is missing, the account value will not be calculated temporarily
+        if not np.isnan(self._price[self._held]).any():
+            self._info["now_account_value"] = self.calculate_value()
+
+    def copy(self) -> ArrayPosition:
+        """copy the position; the map of the stock ids is shared"""
+        new = ArrayPosition.__new__(ArrayPosition)
+        new._settle_type = self._settle_type
+        new.init_cash = self.init_cash
+        new._codes = self._codes
+        new._ids = self._ids
+        new._n = self._n
+        new._held = self._held[: self._n].copy()
+        new._amount = self._amount[: self._n].copy()
+        new._price = self._price[: self._n].copy()
+        new._weight = self._weight[: self._n].copy()
+        new._counts = {bar: count[: self._n].copy() for bar, count in self._counts.items()}
+        new._info = self._info.copy()
+        return new
+
+    def __deepcopy__(self, memo: dict) -> ArrayPosition:
+        # the map of the stock ids is append-only, so sharing it is safe
+        return self.copy()
+
+    @property
+    def position(self) -> dict:
+        position = _ArrayPositionDict(self)
+        idx = np.flatnonzero(self._held[: self._n])
+        for i, amount, price, weight in zip(
+            idx.tolist(), self._amount[idx].tolist(), self._price[idx].tolist(), self._weight[idx].tolist()
+        ):
+            position.fill(
+                self._codes[i], {"amount": amount, "price": None if np.isnan(price) else price, "weight": weight}
+            )
+        for bar, count in self._counts.items():
+            for i, c in zip(idx.tolist(), count[idx].tolist()):
+                if c != 0:
+                    position.get(self._codes[i])[f"count_{bar}"] = c
+        for key, value in self._info.items():
+            position.fill(key, value)
+        return position
+
+    def _get_id(self, stock_id: str) -> int:
+        """get the id of the stock held in the position; raise KeyError if the stock is not held"""
+        i = self._ids.get(stock_id, self._n)
+        if i >= self._n or not self._held[i]:
+            raise KeyError(f"{stock_id} not in current position")
+        return i
+
+    def _get_count(self, bar: str) -> np.ndarray:
+        count = self._counts.get(bar)
+        if count is None:
+            count = self._counts[bar] = np.zeros(len(self._amount))
+        return count
+
+    def _reserve(self, n: int) -> None:
+        """make the arrays have room for `n` stocks"""
+        if n <= len(self._amount):
+            self._n = max(self._n, n)
+            return
+        size = max(n, 2 * len(self._amount))
+
+        def _grow(arr: np.ndarray) -> np.ndarray:
+            new = np.zeros(size, dtype=arr.dtype)
+            new[: self._n] = arr[: self._n]
+            return new
+
+        self._held = _grow(self._held)
+        self._amount = _grow(self._amount)
+        self._price = _grow(self._price)
+        self._weight = _grow(self._weight)
+        self._counts = {bar: _grow(count) for bar, count in self._counts.items()}
+        self._n = n
+
+    def fill_stock_value(self, start_time: Union[str, pd.Timestamp], freq: str, last_days: int = 30) -> None:
+        """fill the stock value by the close price of latest last_days from qlib, please refer to `Position`"""
+        idx = np.flatnonzero(self._held[: self._n] & np.isnan(self._price[: self._n]))
+        if len(idx) == 0:
+            return
+        stock_list = [self._codes[i] for i in idx]
+        price_dict = _get_latest_close(stock_list, start_time, freq, last_days)
+        self._price[idx] = [price_dict[stock] for stock in stock_list]
+        self._info["now_account_value"] = self.calculate_value()
+
+    def _init_stock(self, stock_id: str, amount: float, price: float | None = None) -> None:
+        i = self._ids.get(stock_id)
+        if i is None:
+            # the map is shared by the copies, so the stock may have been added by other copies
+            i = self._ids[stock_id] = len(self._codes)
+            self._codes.append(stock_id)
+        self._reserve(max(i + 1, len(self._codes)))
+        self._held[i] = True
+        self._amount[i] = amount
+        self._price[i] = np.nan if price is None else price
+        self._weight[i] = 0  # update the weight in the end of the trade date
+
+    def _buy_stock(self, stock_id: str, trade_val: float, cost: float, trade_price: float) -> None:
+        trade_amount = trade_val / trade_price
+        if self.check_stock(stock_id):
+            self._amount[self._ids[stock_id]] += trade_amount
+        else:
+            self._init_stock(stock_id=stock_id, amount=trade_amount, price=trade_price)
+
+        self._info["cash"] -= trade_val + cost
+
+    def _sell_stock(self, stock_id: str, trade_val: float, cost: float, trade_price: float) -> None:
+        trade_amount = trade_val / trade_price
+        i = self._get_id(stock_id)
+        amount = self._amount[i]
+        if np.isclose(amount, trade_amount):
+            # Selling all the stocks, please refer to `Position._sell_stock`
+            self._del_stock(stock_id)
+        else:
+            self._amount[i] = amount - trade_amount
+            if amount - trade_amount < -1e-5:
+                raise ValueError("only have {} {}, require {}".format(amount, stock_id, trade_amount))
+
+        new_cash = trade_val - cost
+        if self._settle_type == self.ST_CASH:
+            self._info["cash_delay"] += new_cash
+        elif self._settle_type == self.ST_NO:
+            self._info["cash"] += new_cash
+        else:
+            raise NotImplementedError(f"This type of input is not supported")
+
+    def _del_stock(self, stock_id: str) -> None:
+        i = self._get_id(stock_id)
+        self._held[i] = False
+        self._amount[i] = self._price[i] = self._weight[i] = 0
+        for count in self._counts.values():
+            count[i] = 0
+
+    def check_stock(self, stock_id: str) -> bool:
+        i = self._ids.get(stock_id, self._n)
+        return i < self._n and bool(self._held[i])
+
+    def update_order(self, order: Order, trade_val: float, cost: float, trade_price: float) -> None:
+        if order.direction == Order.BUY:
+            self._buy_stock(order.stock_id, trade_val, cost, trade_price)
+        elif order.direction == Order.SELL:
+            self._sell_stock(order.stock_id, trade_val, cost, trade_price)
+        else:
+            raise NotImplementedError("do not support order direction {}".format(order.direction))
+
+    def update_stock_price(self, stock_id: str, price: float) -> None:
+        self._price[self._get_id(stock_id)] = price
+
+    def update_stock_count(self, stock_id: str, bar: str, count: float) -> None:
+        self._get_count(bar)[self._get_id(stock_id)] = count
+
+    def update_stock_weight(self, stock_id: str, weight: float) -> None:
+        self._weight[self._get_id(stock_id)] = weight
+
+    def calculate_stock_value(self) -> float:
+        # the stocks not held have zero amount and price
+        return float(np.dot(self._amount[: self._n], self._price[: self._n]))
+
+    def calculate_value(self) -> float:
+        return self.calculate_stock_value() + self._info["cash"] + self._info.get("cash_delay", 0.0)
+
+    def update_account_value(self, value: float) -> None:
+        self._info["now_account_value"] = value
+
+    def get_stock_list(self) -> List[str]:
+        return [self._codes[i] for i in np.flatnonzero(self._held[: self._n])]
+
+    def get_stock_price(self, code: str) -> float:
+        price = float(self._price[self._get_id(code)])
+        return None if np.isnan(price) else price
+
+    def get_stock_amount(self, code: str) -> float:
+        return float(self._amount[self._ids[code]]) if self.check_stock(code) else 0
+
+    def get_stock_count(self, code: str, bar: str) -> float:
+        """the days the account has been hold, it may be used in some special strategies"""
+        i = self._get_id(code)
+        return float(self._counts[bar][i]) if bar in self._counts else 0
+
+    def get_stock_weight(self, code: str) -> float:
+        return float(self._weight[self._get_id(code)])
+
+    def get_cash(self, include_settle: bool = False) -> float:
+        cash = self._info["cash"]
+        if include_settle:
+            cash += self._info.get("cash_delay", 0.0)
+        return cash
+
+    def _get_stock_dict(self, values: np.ndarray) -> dict:
+        idx = np.flatnonzero(self._held[: self._n])
+        return dict(zip([self._codes[i] for i in idx], values[idx].tolist()))
+
+    def get_stock_amount_dict(self) -> dict:
+        """generate stock amount dict {stock_id : amount of stock}"""
+        return self._get_stock_dict(self._amount)
+
+    def get_stock_weight_dict(self, only_stock: bool = False) -> dict:
+        """generate stock weight dict {stock_id : value weight of stock in the position}, please refer to `Position`"""
+        position_value = self.calculate_stock_value() if only_stock else self.calculate_value()
+        return self._get_stock_dict(self._amount[: self._n] * self._price[: self._n] / position_value)
+
+    def add_count_all(self, bar: str) -> None:
+        count = self._get_count(bar)
+        count[: self._n] += self._held[: self._n]
+
+    def update_weight_all(self) -> None:
+        position_value = self.calculate_value()
+        self._weight[: self._n] = self._amount[: self._n] * self._price[: self._n] / position_value
+
+    def settle_start(self, settle_type: str) -> None:
+        assert self._settle_type == self.ST_NO, "Currently, settlement can't be nested!!!!!"
+        self._settle_type = settle_type
+        if settle_type == self.ST_CASH:
+            self._info["cash_delay"] = 0.0
+
+    def settle_commit(self) -> None:
+        if self._settle_type != self.ST_NO:
+            if self._settle_type == self.ST_CASH:
+                self._info["cash"] += self._info.pop("cash_delay")
+            else:
+                raise NotImplementedError(f"This type of input is not supported")
+            self._settle_type = self.ST_NO
+
+    def __str__(self) -> str:
+        return {"position": self.position, "_settle_type": self._settle_type, "init_cash": self.init_cash}.__str__()
+
+    def __repr__(self) -> str:
+        return {"position": self.position, "_settle_type": self._settle_type, "init_cash": self.init_cash}.__repr__()
+
+
+class _ArrayPositionDict(dict):
+    """`ArrayPosition.position`, writing the cash related keys back to the position"""
+
+    def __init__(self, owner: ArrayPosition) -> None:
+        super().__init__()
+        self._owner = owner
+
+    def fill(self, key: str, value: Any) -> None:
+        super().__setitem__(key, value)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        super().__setitem__(key, value)
+        if key in ArrayPosition.INFO_KEYS:
+            self._owner._info[key] = value
+
+
 class InfPosition(BasePosition):
     """
     Position with infinite cash and amount.
@@ -4,6 +4,9 @@
 from __future__ import annotations
 
 import pathlib
+import shutil
+import tempfile
+import weakref
 from collections import OrderedDict
 from typing import Any, Dict, List, Optional, Text, Tuple, Type, Union, cast
 
@@ -19,6 +22,167 @@ from ..utils.resam import get_higher_eq_freq_feature, resam_ts_data
 from .high_performance_ds import BaseOrderIndicator, BaseSingleMetric, NumpyOrderIndicator
 
 
+class ColumnarRecorder:
+    """
+    Record the metrics of each step in typed arrays, one array per column.
+
+    The arrays are preallocated and grow geometrically, so recording a step does not create any container and
+    generating the dataframe is a few array copies.
+    The rows can be flushed to the disk every `flush_size` steps to keep the memory bounded in long backtests; they are
+    loaded back when generating the dataframe. The flushed rows are saved in a new directory `records_*` in
+    `flush_dir`, which is owned by the recorder: it is removed when the recorder is garbage collected (or when the
+    interpreter exits), so the dataframe must be generated before dropping the recorder.
+
+    The dtypes of the columns follow the inference of pandas (e.g. the integers become floats when NaN occurs and the
+    column of `None` is kept as `object`), so the dataframe is the same as the one built from the dicts of the steps,
+    except that the missing values of the `object` columns are always `None`.
+    """
+
+    def __init__(
+        self, columns: List[str] = [], flush_dir: Union[str, pathlib.Path, None] = None, flush_size: int = 100000
+    ) -> None:
+        """
+        Parameters
+        ----------
+        columns : List[str]
+            the known columns; the other columns are added when they appear
+        flush_dir : Union[str, pathlib.Path, None]
+            the rows are flushed to a new directory in it if given
+        flush_size : int
+            flush the rows every `flush_size` steps
+        """
+        self.flush_dir = None
+        if flush_dir is not None:
+            pathlib.Path(flush_dir).mkdir(parents=True, exist_ok=True)
+            self.flush_dir = pathlib.Path(tempfile.mkdtemp(dir=flush_dir, prefix="records_"))
+            weakref.finalize(self, shutil.rmtree, str(self.flush_dir), ignore_errors=True)
+        self.flush_size = flush_size
+        self._chunks: List[pathlib.Path] = []
+        self._n_flushed = 0
+        self._n = 0
+        self._capacity = 64
+        self._times: List[Any] = []
+        # the column is None before its first value which is not None
+        self._data: Dict[str, Optional[np.ndarray]] = OrderedDict((col, None) for col in columns)
+        self._direct_types: Dict[str, Optional[type]] = {}
+        self._latest: Dict[str, Any] = {}
+        self.latest_time: Any = None
+
+    def __len__(self) -> int:
+        return self._n_flushed + self._n
+
+    def get_latest(self, col: str) -> Any:
+        """get the value of `col` in the latest step"""
+        return self._latest[col]
+
+    @staticmethod
+    def _get_dtype(value: Any) -> np.dtype:
+        if isinstance(value, np.generic) and value.dtype.kind in "biuf":
+            return value.dtype
+        if isinstance(value, bool):
+            return np.dtype(bool)
+        if isinstance(value, int):
+            return np.dtype(np.int64)
+        if isinstance(value, float):
+            return np.dtype(np.float64)
+        return np.dtype(object)
+
+    @staticmethod
+    def _get_nullable_dtype(dtype: np.dtype) -> np.dtype:
+        """the dtype of the column holding `dtype` and the missing values"""
+        if dtype.kind in "iuf":
+            return np.dtype(np.float64)
+        return np.dtype(object)
+
+    def _set(self, col: str, row: int, value: Any) -> None:
+        arr = self._data.setdefault(col, None)
+        if value is None:
+            if arr is not None:
+                nullable_dtype = self._get_nullable_dtype(arr.dtype)
+                if arr.dtype != nullable_dtype:
+                    arr = self._data[col] = arr.astype(nullable_dtype)
+                    self._direct_types[col] = None
+                arr[row] = np.nan if arr.dtype.kind == "f" else None
+            return
+        dtype = self._get_dtype(value)
+        if arr is None:
+            if row > 0:
+                # the rows before are missing
+                dtype = self._get_nullable_dtype(dtype)
+            if dtype.kind in "iub":
+                arr = self._data[col] = np.empty(self._capacity, dtype=dtype)
+            else:
+                arr = self._data[col] = np.full(self._capacity, np.nan if dtype.kind == "f" else None, dtype=dtype)
+        elif arr.dtype != dtype and arr.dtype != object:
+            if arr.dtype.kind in "iuf" and dtype.kind in "iuf":
+                arr = self._data[col] = arr.astype(np.result_type(arr.dtype, dtype))
+            else:
+                arr = self._data[col] = arr.astype(object)
+        arr[row] = value
+        # the values of the same type are written directly later
+        self._direct_types[col] = type(value) if arr.dtype == dtype else None
+
+    def append(self, time: Any, values: Dict[str, Any]) -> None:
+        """record the values of the step at `time`; it overwrites the latest step if `time` is the same"""
+        if self._n > 0 and self._times[-1] == time:
+            row = self._n - 1
+        else:
+            row = self._n
+            if row == self._capacity:
+                self._capacity *= 2
+                for col, arr in self._data.items():
+                    if arr is not None:
+                        new = np.empty(self._capacity, dtype=arr.dtype)
+                        new[:row] = arr[:row]
+                        self._data[col] = new
+            self._times.append(time)
+            self._n += 1
+        data, direct_types = self._data, self._direct_types
+        for col, value in values.items():
+            if direct_types.get(col) is type(value):
+                data[col][row] = value
+            else:
+                self._set(col, row, value)
+        if len(data) != len(values):
+            for col in data:
+                if col not in values:
+                    self._set(col, row, None)
+        self._latest = dict(values)
+        self.latest_time = time
+        if self.flush_dir is not None and self._n >= self.flush_size:
+            self.flush()
+
+    def _to_dataframe(self) -> pd.DataFrame:
+        data = OrderedDict()
+        for col, arr in self._data.items():
+            data[col] = np.full(self._n, None, dtype=object) if arr is None else arr[: self._n].copy()
+        return pd.DataFrame(data, index=pd.Index(self._times))
+
+    def flush(self) -> None:
+        """flush the rows in memory to the disk"""
+        if self.flush_dir is None or self._n == 0:
+            return
+        path = self.flush_dir / f"{len(self._chunks):06d}.pkl"
+        self._to_dataframe().to_pickle(path)
+        self._chunks.append(path)
+        self._n_flushed += self._n
+        self._n = 0
+        self._times = []
+        # the new rows start from the head of the arrays, the missing values must be filled again
+        self._data = OrderedDict((col, None) for col in self._data)
+        self._direct_types = {}
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """generate the dataframe of all the steps, indexed by the time of the steps"""
+        if len(self) == 0:
+            return pd.DataFrame(columns=list(self._data))
+        dfs = [pd.read_pickle(path) for path in self._chunks] + [self._to_dataframe()]
+        if len(dfs) == 1:
+            return dfs[0]
+        # the dtypes of the chunks may differ (e.g. the missing values of a whole chunk)
+        return pd.concat(dfs, axis=0, sort=False).reindex(columns=list(self._data)).infer_objects()
+
+
 class PortfolioMetrics:
     """
     Motivation:
@@ -39,7 +203,9 @@ class PortfolioMetrics:
         update report
     """
 
-    def __init__(self, freq: str = "day", benchmark_config: dict = {}) -> None:
+    COLUMNS = ["account", "return", "total_turnover", "turnover", "total_cost", "cost", "value", "cash", "bench"]
+
+    def __init__(self, freq: str = "day", benchmark_config: dict = {}, flush_dir: Optional[str] = None) -> None:
         """
         Parameters
         ----------
@@ -69,22 +235,18 @@ class PortfolioMetrics:
             - end_time : Union[str, pd.Timestamp], optional
                 - If `benchmark` is pd.Series, it will be ignored
                 - Else, it represent end time of benchmark, by default None
+        flush_dir : Optional[str]
+            the records are flushed to the disk in it to keep the memory bounded, please refer to `ColumnarRecorder`
 
         """
 
+        self.flush_dir = flush_dir
         self.init_vars()
         self.init_bench(freq=freq, benchmark_config=benchmark_config)
 
     def init_vars(self) -> None:
-        self.accounts: dict = OrderedDict()  # account position value for each trade time
-        self.returns: dict = OrderedDict()  # daily return rate for each trade time
-        self.total_turnovers: dict = OrderedDict()  # total turnover for each trade time
-        self.turnovers: dict = OrderedDict()  # turnover for each trade time
-        self.total_costs: dict = OrderedDict()  # total trade cost for each trade time
-        self.costs: dict = OrderedDict()  # trade cost rate for each trade time
-        self.values: dict = OrderedDict()  # value for each trade time
-        self.cashes: dict = OrderedDict()
-        self.benches: dict = OrderedDict()
+        # the metrics for each trade time
+        self.records = ColumnarRecorder(self.COLUMNS, flush_dir=self.flush_dir)
         self.latest_pm_time: Optional[pd.TimeStamp] = None
 
     def init_bench(self, freq: str | None = None, benchmark_config: dict | None = None) -> None:
@@ -136,19 +298,19 @@ class PortfolioMetrics:
         return 0.0 if _ret is None else _ret - 1
 
     def is_empty(self) -> bool:
-        return len(self.accounts) == 0
+        return len(self.records) == 0
 
     def get_latest_date(self) -> pd.Timestamp:
         return self.latest_pm_time
 
     def get_latest_account_value(self) -> float:
-        return self.accounts[self.latest_pm_time]
+        return self.records.get_latest("account")
 
     def get_latest_total_cost(self) -> Any:
-        return self.total_costs[self.latest_pm_time]
+        return self.records.get_latest("total_cost")
 
     def get_latest_total_turnover(self) -> Any:
-        return self.total_turnovers[self.latest_pm_time]
+        return self.records.get_latest("total_turnover")
 
     def update_portfolio_metrics_record(
         self,
@@ -187,30 +349,26 @@ class PortfolioMetrics:
             bench_value = self._sample_benchmark(self.bench, trade_start_time, trade_end_time)
 
         # update pm data
-        self.accounts[trade_start_time] = account_value
-        self.returns[trade_start_time] = return_rate
-        self.total_turnovers[trade_start_time] = total_turnover
-        self.turnovers[trade_start_time] = turnover_rate
-        self.total_costs[trade_start_time] = total_cost
-        self.costs[trade_start_time] = cost_rate
-        self.values[trade_start_time] = stock_value
-        self.cashes[trade_start_time] = cash
-        self.benches[trade_start_time] = bench_value
+        self.records.append(
+            trade_start_time,
+            {
+                "account": account_value,
+                "return": return_rate,
+                "total_turnover": total_turnover,
+                "turnover": turnover_rate,
+                "total_cost": total_cost,
+                "cost": cost_rate,
+                "value": stock_value,
+                "cash": cash,
+                "bench": bench_value,
+            },
+        )
         # update pm
         self.latest_pm_time = trade_start_time
         # finish pm update in each step
 
     def generate_portfolio_metrics_dataframe(self) -> pd.DataFrame:
-        pm = pd.DataFrame()
-        pm["account"] = pd.Series(self.accounts)
-        pm["return"] = pd.Series(self.returns)
-        pm["total_turnover"] = pd.Series(self.total_turnovers)
-        pm["turnover"] = pd.Series(self.turnovers)
-        pm["total_cost"] = pd.Series(self.total_costs)
-        pm["cost"] = pd.Series(self.costs)
-        pm["value"] = pd.Series(self.values)
-        pm["cash"] = pd.Series(self.cashes)
-        pm["bench"] = pd.Series(self.benches)
+        pm = self.records.to_dataframe()
         pm.index.name = "datetime"
         return pm
 
@@ -275,19 +433,42 @@ class Indicator:
 
     """
 
-    def __init__(self, order_indicator_cls: Type[BaseOrderIndicator] = NumpyOrderIndicator) -> None:
+    # the number of steps of the order indicators kept in memory when flushing them to the disk
+    ORDER_FLUSH_SIZE = 1000
+
+    def __init__(
+        self, order_indicator_cls: Type[BaseOrderIndicator] = NumpyOrderIndicator, flush_dir: Optional[str] = None
+    ) -> None:
+        """
+        Parameters
+        ----------
+        order_indicator_cls : Type[BaseOrderIndicator]
+            the class of the order indicators
+        flush_dir : Optional[str]
+            the order indicators and the trade indicators are flushed to the disk in it to keep the memory bounded,
+            please refer to `ColumnarRecorder`.
+        """
         self.order_indicator_cls = order_indicator_cls
 
         # order indicator is metrics for a single order for a specific step
-        self.order_indicator_his: dict = OrderedDict()
+        # the order indicators are much larger than the trade indicators, so they are flushed more frequently
+        self.order_indicator_records = ColumnarRecorder(
+            ["order_indicator"], flush_dir=flush_dir, flush_size=self.ORDER_FLUSH_SIZE
+        )
         self.order_indicator: BaseOrderIndicator = self.order_indicator_cls()
 
         # trade indicator is metrics for all orders for a specific step
-        self.trade_indicator_his: dict = OrderedDict()
+        self.trade_indicator_his = ColumnarRecorder(flush_dir=flush_dir)
         self.trade_indicator: Dict[str, Optional[BaseSingleMetric]] = OrderedDict()
 
         self._trade_calendar = None
 
+    @property
+    def order_indicator_his(self) -> Dict[Any, BaseOrderIndicator]:
+        """the order indicators of the steps indexed by the time of the steps; the flushed ones are loaded back"""
+        records = self.order_indicator_records.to_dataframe()
+        return OrderedDict(zip(records.index, records["order_indicator"]))
+
     # def reset(self, trade_calendar: TradeCalendarManager):
     def reset(self) -> None:
         self.order_indicator = self.order_indicator_cls()
@@ -295,8 +476,8 @@ class Indicator:
         # self._trade_calendar = trade_calendar
 
     def record(self, trade_start_time: Union[str, pd.Timestamp]) -> None:
-        self.order_indicator_his[trade_start_time] = self.get_order_indicator()
-        self.trade_indicator_his[trade_start_time] = self.get_trade_indicator()
+        self.order_indicator_records.append(trade_start_time, {"order_indicator": self.get_order_indicator()})
+        self.trade_indicator_his.append(trade_start_time, self.get_trade_indicator())
 
     def _update_order_trade_info(self, trade_info: List[Tuple[Order, float, float, float]]) -> None:
         amount = dict()
@@ -648,4 +829,4 @@ class Indicator:
         return self.trade_indicator
 
     def generate_trade_indicators_dataframe(self) -> pd.DataFrame:
-        return pd.DataFrame.from_dict(self.trade_indicator_his, orient="index")
+        return self.trade_indicator_his.to_dataframe()
@@ -10,6 +10,7 @@ Two modes are supported
 - server
 
 """
+
 from __future__ import annotations
 
 import os
@@ -164,6 +165,11 @@ _default_config = {
     "maxtasksperchild": None,
     # If joblib_backend is None, use loky
     "joblib_backend": "multiprocessing",
+    # How the workers hand the data of the instruments back when loading a dataset
+    # - "pickle": return the data frames by pickling
+    # - "shm": write the data into a shared memory arena, and the dataset is a view over the arena.
+    #   It saves memory and time for large datasets (e.g. high-frequency data)
+    "joblib_result_transport": "pickle",
     "default_disk_cache": 1,  # 0:skip/1:use
     "mem_cache_size_limit": 500,
     "mem_cache_limit_type": "length",
@@ -15,13 +15,12 @@ from ...log import get_module_logger
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import DataLoader
 
 from .pytorch_utils import count_parameters
 from ...model.base import Model
 from ...data.dataset import DatasetH
 from ...data.dataset.handler import DataHandlerLP
-from ...model.utils import ConcatDataset
+from ...model.utils import BatchDataLoader, ConcatDataset
 from ...data.dataset.weight import Reweighter
 
 
@@ -227,14 +226,14 @@ class ALSTM(Model):
         else:
             raise ValueError("Unsupported reweighter type.")
 
-        train_loader = DataLoader(
+        train_loader = BatchDataLoader(
             ConcatDataset(dl_train, wl_train),
             batch_size=self.batch_size,
             shuffle=True,
             num_workers=self.n_jobs,
             drop_last=True,
         )
-        valid_loader = DataLoader(
+        valid_loader = BatchDataLoader(
             ConcatDataset(dl_valid, wl_valid),
             batch_size=self.batch_size,
             shuffle=False,
@@ -290,7 +289,7 @@ class ALSTM(Model):
 
         dl_test = dataset.prepare(segment, col_set=["feature", "label"], data_key=DataHandlerLP.DK_I)
         dl_test.config(fillna_type="ffill+bfill")
-        test_loader = DataLoader(dl_test, batch_size=self.batch_size, num_workers=self.n_jobs)
+        test_loader = BatchDataLoader(dl_test, batch_size=self.batch_size, num_workers=self.n_jobs)
         self.ALSTM_model.eval()
         preds = []
 
@@ -14,11 +14,10 @@ from ...log import get_module_logger
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import DataLoader
 
 from ...model.base import Model
 from ...data.dataset.handler import DataHandlerLP
-from ...model.utils import ConcatDataset
+from ...model.utils import BatchDataLoader, ConcatDataset
 from ...data.dataset.weight import Reweighter
 
 
@@ -216,14 +215,14 @@ class LSTM(Model):
         else:
             raise ValueError("Unsupported reweighter type.")
 
-        train_loader = DataLoader(
+        train_loader = BatchDataLoader(
             ConcatDataset(dl_train, wl_train),
             batch_size=self.batch_size,
             shuffle=True,
             num_workers=self.n_jobs,
             drop_last=True,
         )
-        valid_loader = DataLoader(
+        valid_loader = BatchDataLoader(
             ConcatDataset(dl_valid, wl_valid),
             batch_size=self.batch_size,
             shuffle=False,
@@ -279,7 +278,7 @@ class LSTM(Model):
 
         dl_test = dataset.prepare("test", col_set=["feature", "label"], data_key=DataHandlerLP.DK_I)
         dl_test.config(fillna_type="ffill+bfill")
-        test_loader = DataLoader(dl_test, batch_size=self.batch_size, num_workers=self.n_jobs)
+        test_loader = BatchDataLoader(dl_test, batch_size=self.batch_size, num_workers=self.n_jobs)
         self.LSTM_model.eval()
         preds = []
 
@@ -15,9 +15,9 @@ from ...log import get_module_logger
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import DataLoader
 
 from ...model.base import Model
+from ...model.utils import BatchDataLoader
 from ...data.dataset import DatasetH
 from ...data.dataset.handler import DataHandlerLP
 
@@ -149,10 +149,10 @@ class TransformerModel(Model):
         dl_train.config(fillna_type="ffill+bfill")  # process nan brought by dataloader
         dl_valid.config(fillna_type="ffill+bfill")  # process nan brought by dataloader
 
-        train_loader = DataLoader(
+        train_loader = BatchDataLoader(
             dl_train, batch_size=self.batch_size, shuffle=True, num_workers=self.n_jobs, drop_last=True
         )
-        valid_loader = DataLoader(
+        valid_loader = BatchDataLoader(
             dl_valid, batch_size=self.batch_size, shuffle=False, num_workers=self.n_jobs, drop_last=True
         )
 
@@ -204,7 +204,7 @@ class TransformerModel(Model):
 
         dl_test = dataset.prepare("test", col_set=["feature", "label"], data_key=DataHandlerLP.DK_I)
         dl_test.config(fillna_type="ffill+bfill")
-        test_loader = DataLoader(dl_test, batch_size=self.batch_size, num_workers=self.n_jobs)
+        test_loader = BatchDataLoader(dl_test, batch_size=self.batch_size, num_workers=self.n_jobs)
         self.model.eval()
         preds = []
 
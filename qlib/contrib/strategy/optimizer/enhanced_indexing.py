@@ -4,7 +4,7 @@
 import numpy as np
 import cvxpy as cp
 
-from typing import Union, Optional, Dict, Any, List
+from typing import Union, Optional, Dict, Any, List, Tuple
 
 from qlib.log import get_module_logger
 from .base import BaseOptimizer
@@ -42,8 +42,22 @@ class EnhancedIndexingOptimizer(BaseOptimizer):
                d <= b_dev
                v >= -f_dev
                v <= f_dev
+
+    With `parametrize=True`, the problem is built with `cp.Parameter` and canonicalized only once for each universe
+    size (padded to a multiple of `pad_size` with the assets fixed to zero weight), and the following calls only
+    update the values of the parameters. The factor covariance is decomposed as `cov_b = L @ L.T` so the tracking
+    error is `sum((d @ F @ L)**2) + sum(var_u * d**2)`. The solution of the last call is used for warm start.
+
+    With `method="pgd"`, the problem is solved by projected gradient descent with NumPy instead of cvxpy, which only
+    supports the weight bounds and the budget constraint (i.e. `delta` and `f_dev` must be None). With
+    `pgd_fallback=True`, the cvxpy method also falls back to it (without the turnover constraint) when both of its
+    trials failed and there is no factor deviation limit. The current holding is returned if all the trials failed,
+    including the projected gradient descent which does not converge.
     """
 
+    METHOD_CVXPY = "cvxpy"
+    METHOD_PGD = "pgd"
+
     def __init__(
         self,
         lamb: float = 1,
@@ -53,6 +67,11 @@ class EnhancedIndexingOptimizer(BaseOptimizer):
         scale_return: bool = True,
         epsilon: float = 5e-5,
         solver_kwargs: Optional[Dict[str, Any]] = {},
+        parametrize: bool = False,
+        pad_size: int = 64,
+        method: str = "cvxpy",
+        pgd_kwargs: Optional[Dict[str, Any]] = {},
+        pgd_fallback: bool = False,
     ):
         """
         Args:
@@ -62,13 +81,18 @@ class EnhancedIndexingOptimizer(BaseOptimizer):
             f_dev (list): factor deviation limit
             scale_return (bool): whether scale return to match estimated volatility
             epsilon (float): minimum weight
-            solver_kwargs (dict): kwargs for cvxpy solver
+            solver_kwargs (dict): kwargs for cvxpy solver (the solver is `cp.ECOS` by default)
+            parametrize (bool): whether to reuse the parametrized cvxpy problems
+            pad_size (int): the universe size is padded to a multiple of `pad_size` when `parametrize` is True
+            method (str): the method to solve the problem (`cvxpy`/`pgd`)
+            pgd_kwargs (dict): kwargs for the projected gradient descent (`max_iter`, `tol`)
+            pgd_fallback (bool): whether to try projected gradient descent when the cvxpy method failed
         """
 
         assert lamb >= 0, "risk aversion parameter `lamb` should be positive"
         self.lamb = lamb
 
-        assert delta >= 0, "turnover limit `delta` should be positive"
+        assert delta is None or delta >= 0, "turnover limit `delta` should be positive"
         self.delta = delta
 
         assert b_dev is None or b_dev >= 0, "benchmark deviation limit `b_dev` should be positive"
@@ -83,7 +107,21 @@ class EnhancedIndexingOptimizer(BaseOptimizer):
 
         self.scale_return = scale_return
         self.epsilon = epsilon
-        self.solver_kwargs = solver_kwargs
+        self.solver_kwargs = {"solver": cp.ECOS, **solver_kwargs}
+
+        assert method in [self.METHOD_CVXPY, self.METHOD_PGD], f"method={method} is not supported"
+        assert method != self.METHOD_PGD or (
+            delta is None and f_dev is None
+        ), "`delta` and `f_dev` are not supported by projected gradient descent"
+        self.method = method
+        self.pgd_kwargs = pgd_kwargs
+        self.pgd_fallback = pgd_fallback
+
+        assert pad_size >= 1, "`pad_size` should be positive"
+        self.parametrize = parametrize
+        self.pad_size = pad_size
+        # <(padded universe size, with turnover constraint), problem>
+        self._problems: Dict[Tuple[int, bool], _ParametrizedProblem] = {}
 
     def __call__(
         self,
@@ -115,19 +153,6 @@ class EnhancedIndexingOptimizer(BaseOptimizer):
             r = r / r.std()
             r *= np.sqrt(np.mean(np.diag(F @ cov_b @ F.T) + var_u))
 
-        # target weight
-        w = cp.Variable(len(r), nonneg=True)
-        w.value = wb  # for warm start
-
-        # precompute exposure
-        d = w - wb  # benchmark exposure
-        v = d @ F  # factor exposure
-
-        # objective
-        ret = d @ r  # excess return
-        risk = cp.quad_form(v, cov_b) + var_u @ (d**2)  # tracking error
-        obj = cp.Maximize(ret - self.lamb * risk)
-
         # weight bounds
         lb = np.zeros_like(wb)
         ub = np.ones_like(wb)
@@ -148,55 +173,265 @@ class EnhancedIndexingOptimizer(BaseOptimizer):
             lb[mfs] = 0
             ub[mfs] = 0
 
-        # constraints
-        # TODO: currently we assume fullly invest in the stocks,
-        # in the future we should support holding cash as an asset
-        cons = [cp.sum(w) == 1, w >= lb, w <= ub]
+        # optimize
+        if self.method == self.METHOD_PGD:
+            w = self._solve_pgd(r, F, cov_b, var_u, wb, lb, ub)
+        else:
+            w = self._solve_cvxpy(r, F, cov_b, var_u, w0, wb, lb, ub)
+            # trial 3: projected gradient descent without turnover constraint
+            if w is None and self.pgd_fallback and self.f_dev is None:
+                logger.info("try projected gradient descent as the last optimization failed")
+                w = self._solve_pgd(r, F, cov_b, var_u, wb, lb, ub)
 
-        # factor deviation
-        if self.f_dev is not None:
-            cons.extend([v >= -self.f_dev, v <= self.f_dev])  # pylint: disable=E1130
+        # return current weight if not success
+        if w is None:
+            logger.warning("optimization failed, will return current holding weight")
+            return w0
 
+        # remove small weight
+        w[w < self.epsilon] = 0
+        w /= w.sum()
+
+        return w
+
+    def _solve_cvxpy(
+        self,
+        r: np.ndarray,
+        F: np.ndarray,
+        cov_b: np.ndarray,
+        var_u: np.ndarray,
+        w0: np.ndarray,
+        wb: np.ndarray,
+        lb: np.ndarray,
+        ub: np.ndarray,
+    ) -> Optional[np.ndarray]:
         # total turnover constraint
-        t_cons = []
-        if self.delta is not None:
-            if w0 is not None and w0.sum() > 0:
-                t_cons.extend([cp.norm(w - w0, 1) <= self.delta])
+        with_turnover = self.delta is not None and w0 is not None and w0.sum() > 0
 
-        # optimize
         # trial 1: use all constraints
-        success = False
-        try:
-            prob = cp.Problem(obj, cons + t_cons)
-            prob.solve(solver=cp.ECOS, warm_start=True, **self.solver_kwargs)
-            assert prob.status == "optimal"
-            success = True
-        except Exception as e:
-            logger.warning(f"trial 1 failed {e} (status: {prob.status})")
+        w = self._solve_problem(r, F, cov_b, var_u, w0, wb, lb, ub, with_turnover, trial=1)
 
         # trial 2: remove turnover constraint
-        if not success and len(t_cons):
+        if w is None and with_turnover:
             logger.info("try removing turnover constraint as the last optimization failed")
-            try:
-                w.value = wb
-                prob = cp.Problem(obj, cons)
-                prob.solve(solver=cp.ECOS, warm_start=True, **self.solver_kwargs)
-                assert prob.status in ["optimal", "optimal_inaccurate"]
-                success = True
-            except Exception as e:
-                logger.warning(f"trial 2 failed {e} (status: {prob.status})")
+            w = self._solve_problem(r, F, cov_b, var_u, w0, wb, lb, ub, False, trial=2)
+        return w
 
-        # return current weight if not success
-        if not success:
-            logger.warning("optimization failed, will return current holding weight")
-            return w0
+    def _solve_problem(
+        self,
+        r: np.ndarray,
+        F: np.ndarray,
+        cov_b: np.ndarray,
+        var_u: np.ndarray,
+        w0: np.ndarray,
+        wb: np.ndarray,
+        lb: np.ndarray,
+        ub: np.ndarray,
+        with_turnover: bool,
+        trial: int,
+    ) -> Optional[np.ndarray]:
+        if self.parametrize:
+            size = -(-len(r) // self.pad_size) * self.pad_size
+            key = (size, with_turnover)
+            if key not in self._problems:
+                self._problems[key] = _ParametrizedProblem(
+                    size, F.shape[1], self.lamb, self.delta, self.f_dev, with_turnover
+                )
+            problem = self._problems[key]
+            problem.update(r, F, cov_b, var_u, w0, wb, lb, ub)
+            w, prob = problem.w, problem.prob
+        else:
+            w, prob = self._build_problem(r, F, cov_b, var_u, w0, wb, lb, ub, with_turnover)
+
+        try:
+            prob.solve(warm_start=True, **self.solver_kwargs)
+            assert prob.status in (["optimal"] if trial == 1 else ["optimal", "optimal_inaccurate"])
+        except Exception as e:
+            logger.warning(f"trial {trial} failed {e} (status: {prob.status})")
+            return None
 
         if prob.status == "optimal_inaccurate":
             logger.warning(f"the optimization is inaccurate")
 
-        # remove small weight
-        w = np.asarray(w.value)
-        w[w < self.epsilon] = 0
-        w /= w.sum()
+        return np.array(w.value[: len(r)])
 
-        return w
+    def _build_problem(
+        self,
+        r: np.ndarray,
+        F: np.ndarray,
+        cov_b: np.ndarray,
+        var_u: np.ndarray,
+        w0: np.ndarray,
+        wb: np.ndarray,
+        lb: np.ndarray,
+        ub: np.ndarray,
+        with_turnover: bool,
+    ) -> Tuple[cp.Variable, cp.Problem]:
+        # target weight
+        w = cp.Variable(len(r), nonneg=True)
+        w.value = wb  # for warm start
+
+        # precompute exposure
+        d = w - wb  # benchmark exposure
+        v = d @ F  # factor exposure
+
+        # objective
+        ret = d @ r  # excess return
+        risk = cp.quad_form(v, cov_b) + var_u @ (d**2)  # tracking error
+        obj = cp.Maximize(ret - self.lamb * risk)
+
+        # constraints
+        # TODO: currently we assume fullly invest in the stocks,
+        # in the future we should support holding cash as an asset
+        cons = [cp.sum(w) == 1, w >= lb, w <= ub]
+
+        # factor deviation
+        if self.f_dev is not None:
+            cons.extend([v >= -self.f_dev, v <= self.f_dev])  # pylint: disable=E1130
+
+        if with_turnover:
+            cons.extend([cp.norm(w - w0, 1) <= self.delta])
+
+        return w, cp.Problem(obj, cons)
+
+    def _solve_pgd(
+        self,
+        r: np.ndarray,
+        F: np.ndarray,
+        cov_b: np.ndarray,
+        var_u: np.ndarray,
+        wb: np.ndarray,
+        lb: np.ndarray,
+        ub: np.ndarray,
+    ) -> Optional[np.ndarray]:
+        """
+        solve the problem without turnover constraint and factor deviation limit by accelerated projected gradient
+        descent, i.e. minimize `lamb * (|d @ F @ L|^2 + var_u @ d**2) - d @ r` with `cov_b = L @ L.T`
+        """
+        if lb.sum() > 1 + 1e-8 or ub.sum() < 1 - 1e-8:
+            logger.warning("projected gradient descent failed: the weight bounds are infeasible")
+            return None
+        max_iter = self.pgd_kwargs.get("max_iter", 10000)
+        tol = self.pgd_kwargs.get("tol", 1e-10)
+
+        G = F @ _decompose_cov(cov_b)
+        # the Lipschitz constant of the gradient
+        lipschitz = 2 * self.lamb * (np.linalg.norm(G, 2) ** 2 + np.max(var_u, initial=0))
+        step = 1 / lipschitz if lipschitz > 0 else 1.0
+
+        w = y = _project_capped_simplex(wb, lb, ub)
+        t = 1.0
+        for _ in range(max_iter):
+            d = y - wb
+            grad = 2 * self.lamb * (G @ (d @ G) + var_u * d) - r
+            w_next = _project_capped_simplex(y - step * grad, lb, ub)
+            if np.abs(w_next - w).max() < tol:
+                return w_next
+            if (y - w_next) @ (w_next - w) > 0:
+                # restart the momentum when it goes against the descent direction
+                t = 1.0
+            t_next = (1 + np.sqrt(1 + 4 * t**2)) / 2
+            y = w_next + (t - 1) / t_next * (w_next - w)
+            w, t = w_next, t_next
+        logger.warning(f"projected gradient descent failed: it doesn't converge in {max_iter} iterations")
+        return None
+
+
+class _ParametrizedProblem:
+    """
+    The problem of `EnhancedIndexingOptimizer` for a universe size with the data as `cp.Parameter`.
+    It follows DPP, so it is canonicalized at the first solve and reused afterwards.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        num_factors: int,
+        lamb: float,
+        delta: Optional[float],
+        f_dev: Optional[Union[float, np.ndarray]],
+        with_turnover: bool,
+    ):
+        self.w = cp.Variable(size, nonneg=True)
+        self.r = cp.Parameter(size)
+        self.G = cp.Parameter((size, num_factors))  # F @ L
+        self.bG = cp.Parameter(num_factors)  # wb @ F @ L
+        self.s = cp.Parameter(size, nonneg=True)  # sqrt(var_u)
+        self.sb = cp.Parameter(size)  # sqrt(var_u) * wb
+        self.lb = cp.Parameter(size)
+        self.ub = cp.Parameter(size)
+
+        # NOTE: the constant `wb @ r` of the excess return is omitted
+        risk = cp.sum_squares(self.w @ self.G - self.bG) + cp.sum_squares(cp.multiply(self.s, self.w) - self.sb)
+        obj = cp.Maximize(self.w @ self.r - lamb * risk)
+        cons = [cp.sum(self.w) == 1, self.w >= self.lb, self.w <= self.ub]
+
+        self.F, self.bF, self.w0 = None, None, None
+        if f_dev is not None:
+            self.F = cp.Parameter((size, num_factors))
+            self.bF = cp.Parameter(num_factors)  # wb @ F
+            v = self.w @ self.F - self.bF
+            cons.extend([v >= -f_dev, v <= f_dev])  # pylint: disable=E1130
+        if with_turnover:
+            self.w0 = cp.Parameter(size)
+            cons.append(cp.norm(self.w - self.w0, 1) <= delta)
+
+        self.prob = cp.Problem(obj, cons)
+
+    def update(
+        self,
+        r: np.ndarray,
+        F: np.ndarray,
+        cov_b: np.ndarray,
+        var_u: np.ndarray,
+        w0: np.ndarray,
+        wb: np.ndarray,
+        lb: np.ndarray,
+        ub: np.ndarray,
+    ) -> None:
+        """update the values of the parameters; the padded assets are fixed to zero weight"""
+        pad = self.w.shape[0] - len(r)
+        G = F @ _decompose_cov(cov_b)
+        s = np.sqrt(var_u)
+        self.r.value = np.pad(r, (0, pad))
+        self.G.value = np.pad(G, ((0, pad), (0, 0)))
+        self.bG.value = wb @ G
+        self.s.value = np.pad(s, (0, pad))
+        self.sb.value = np.pad(s * wb, (0, pad))
+        self.lb.value = np.pad(lb, (0, pad))
+        self.ub.value = np.pad(ub, (0, pad))
+        if self.F is not None:
+            self.F.value = np.pad(F, ((0, pad), (0, 0)))
+            self.bF.value = wb @ F
+        if self.w0 is not None:
+            self.w0.value = np.pad(w0, (0, pad))
+        if self.w.value is None:
+            self.w.value = np.pad(wb, (0, pad))  # for warm start
+
+
+def _decompose_cov(cov: np.ndarray) -> np.ndarray:
+    """decompose the covariance as `cov = L @ L.T`"""
+    eigval, eigvec = np.linalg.eigh(cov)
+    return eigvec * np.sqrt(np.clip(eigval, 0, None))
+
+
+def _project_capped_simplex(y: np.ndarray, lb: np.ndarray, ub: np.ndarray) -> np.ndarray:
+    """project `y` onto `{w | lb <= w <= ub, sum(w) == 1}`, i.e. `clip(y - tau, lb, ub)` with the sum of 1"""
+
+    def total(tau):
+        return np.clip(y - tau, lb, ub).sum()
+
+    # the total is piecewise linear and non-increasing in tau, so find the piece by the breakpoints
+    taus = np.sort(np.concatenate([y - ub, y - lb]))
+    lo, hi = 0, len(taus) - 1
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if total(taus[mid]) >= 1:
+            lo = mid
+        else:
+            hi = mid
+    total_lo, total_hi = total(taus[lo]), total(taus[hi])
+    tau = taus[lo]
+    if total_lo > total_hi:
+        tau += (total_lo - 1) * (taus[hi] - taus[lo]) / (total_lo - total_hi)
+    return np.clip(y - tau, lb, ub)
@@ -40,6 +40,15 @@ class TWAPStrategy(BaseStrategy):
             for order in outer_trade_decision.get_decision():
                 self.trade_amount_remain[order.stock_id] = order.amount
 
+    def generate_trade_schedule(self):
+        # the orders are evenly divided into the steps in the range limit, please refer to `generate_trade_decision`
+        start_idx, end_idx = get_start_end_idx(self.trade_calendar, self.outer_trade_decision)
+        trade_len = end_idx - start_idx + 1
+        amount = np.array([order.amount for order in self.outer_trade_decision.get_decision()], dtype=np.float64)
+        schedule = np.full((self.trade_calendar.get_trade_len(), len(amount)), np.nan)
+        schedule[start_idx : end_idx + 1] = amount / trade_len * np.arange(1, trade_len + 1)[:, None]
+        return schedule
+
     def generate_trade_decision(self, execute_result=None):
         # NOTE:  corner cases!!!
         # - If using upperbound round, please don't sell the amount which should in next step
@@ -6,15 +6,16 @@ import warnings
 import numpy as np
 import pandas as pd
 
-from typing import Dict, List, Text, Tuple, Union
+from typing import Dict, List, Optional, Text, Tuple, Union, cast
 from abc import ABC
 
 from qlib.data import D
+from qlib.data.cache import MemCacheLengthUnit
 from qlib.data.dataset import Dataset
 from qlib.model.base import BaseModel
 from qlib.strategy.base import BaseStrategy
-from qlib.backtest.position import Position
-from qlib.backtest.signal import Signal, create_signal_from
+from qlib.backtest.position import ArrayPosition, Position
+from qlib.backtest.signal import Signal, SignalWCache, create_signal_from
 from qlib.backtest.decision import Order, OrderDir, TradeDecisionWO
 from qlib.log import get_module_logger
 from qlib.utils import get_pre_trading_date, load_dataset
@@ -72,6 +73,68 @@ class BaseSignalStrategy(BaseStrategy, ABC):
         return self.risk_degree
 
 
+class _RankedSignal:
+    """
+    The scores of a cached signal ranked in one vectorized pass.
+
+    The signal is converted to a dense (datetime, instrument) matrix and each cross section is sorted at once, so the
+    stocks are represented by their column ids and the ranking of a step is a lookup.
+    """
+
+    def __init__(self, signal: Union[pd.Series, pd.DataFrame]) -> None:
+        if isinstance(signal, pd.DataFrame):
+            signal = signal.iloc[:, 0]
+        present = pd.Series(True, index=signal.index).unstack(level="instrument", fill_value=False).sort_index()
+        scores = signal.unstack(level="instrument").reindex(index=present.index, columns=present.columns)
+        self.dates = present.index
+        self.codes = np.asarray(present.columns, dtype=object)
+        self.code_ids = {code: i for i, code in enumerate(self.codes)}
+        self.scores = scores.to_numpy(dtype=np.float64)
+        self.present = present.to_numpy()
+        self.order, self.rank, self.n_present, self.n_valid = self._rank(self.scores, self.present)
+
+    @staticmethod
+    def _rank(scores: np.ndarray, present: np.ndarray) -> tuple:
+        """
+        sort the rows of `scores` like `pd.Series.sort_values(ascending=False)`: the stocks present in the signal go
+        first by descending score (the ties and NaN scores keep the order of the columns), the absent stocks go last
+
+        Returns
+        -------
+        tuple:
+            (order, rank, n_present, n_valid); `rank` is the inverse permutation of `order` and `n_valid` is the number
+            of the stocks with a valid score
+        """
+        isnan = np.isnan(scores)
+        order = np.lexsort((-np.where(isnan, 0.0, scores), isnan, ~present), axis=-1)
+        rank = np.empty_like(order)
+        np.put_along_axis(rank, order, np.arange(order.shape[-1])[None, :], axis=-1)
+        return order, rank, present.sum(axis=-1), (present & ~isnan).sum(axis=-1)
+
+    def get_cross_section(self, start_time: pd.Timestamp, end_time: pd.Timestamp) -> Optional[tuple]:
+        """
+        get the ranking of the signal in [start_time, end_time] like `SignalWCache.get_signal`, i.e. the last valid
+        score of each stock in the range
+
+        Returns
+        -------
+        Optional[tuple]:
+            (order, rank, n_present, n_valid) of the cross section; None if there is no signal in the range
+        """
+        start = self.dates.searchsorted(start_time, side="left")
+        end = self.dates.searchsorted(end_time, side="right")
+        if end <= start:
+            return None
+        if end - start == 1:
+            return self.order[start], self.rank[start], self.n_present[start], self.n_valid[start]
+        present = self.present[start:end]
+        valid = present & ~np.isnan(self.scores[start:end])
+        last = end - start - 1 - np.argmax(valid[::-1], axis=0)
+        scores = np.where(valid.any(axis=0), self.scores[start:end][last, np.arange(len(self.codes))], np.nan)
+        order, rank, n_present, n_valid = self._rank(scores[None, :], present.any(axis=0)[None, :])
+        return order[0], rank[0], n_present[0], n_valid[0]
+
+
 class TopkDropoutStrategy(BaseSignalStrategy):
     # TODO:
     # 1. Supporting leverage the get_range_limit result from the decision
@@ -88,6 +151,7 @@ class TopkDropoutStrategy(BaseSignalStrategy):
         hold_thresh=1,
         only_tradable=False,
         forbid_all_trade_at_limit=True,
+        precompute=False,
         **kwargs,
     ):
         """
@@ -125,6 +189,14 @@ class TopkDropoutStrategy(BaseSignalStrategy):
             else:
 
                 strategy will sell at limit up and buy ad limit down.
+        precompute : bool
+            if rank the scores of all the dates in one vectorized pass before the first step.
+
+            Each step then picks the stocks by the integer ids of the precomputed ranking instead of sorting the
+            scores with pandas, and the tradable state of the candidates is checked in batch by
+            `Exchange.is_tradable` (fast with `CubeQuote`). The decisions are the same as the ones without
+            precomputing. It only supports the signals cached in memory (`SignalWCache`, e.g. a pd.Series of
+            scores or a (model, dataset) pair).
         """
         super().__init__(**kwargs)
         self.topk = topk
@@ -134,19 +206,106 @@ class TopkDropoutStrategy(BaseSignalStrategy):
         self.hold_thresh = hold_thresh
         self.only_tradable = only_tradable
         self.forbid_all_trade_at_limit = forbid_all_trade_at_limit
+        self.precompute = precompute
+        self._ranked_signal: Optional[_RankedSignal] = None
+        if precompute and not isinstance(self.signal, SignalWCache):
+            raise ValueError(f"precompute does not support the signal of type {type(self.signal)}")
 
     def generate_trade_decision(self, execute_result=None):
         # get the number of trading step finished, trade_step can be [0, 1, 2, ..., trade_len - 1]
         trade_step = self.trade_calendar.get_trade_step()
         trade_start_time, trade_end_time = self.trade_calendar.get_step_time(trade_step)
         pred_start_time, pred_end_time = self.trade_calendar.get_step_time(trade_step, shift=1)
+        current_temp: Position = copy.deepcopy(self.trade_position)
+        pick_stocks = self._pick_stocks_precomputed if self.precompute else self._pick_stocks
+        picked = pick_stocks(current_temp, pred_start_time, pred_end_time, trade_start_time, trade_end_time)
+        if picked is None:
+            return TradeDecisionWO([], self)
+        sell, buy = picked
+
+        # generate order list for this adjust date
+        sell_order_list = []
+        buy_order_list = []
+        cash = current_temp.get_cash()
+        current_stock_list = current_temp.get_stock_list()
+        for code in current_stock_list:
+            if code not in sell or not self.trade_exchange.is_stock_tradable(
+                stock_id=code,
+                start_time=trade_start_time,
+                end_time=trade_end_time,
+                direction=None if self.forbid_all_trade_at_limit else OrderDir.SELL,
+            ):
+                continue
+            # check hold limit
+            time_per_step = self.trade_calendar.get_freq()
+            if current_temp.get_stock_count(code, bar=time_per_step) < self.hold_thresh:
+                continue
+            # sell order
+            sell_amount = current_temp.get_stock_amount(code=code)
+            # sell_amount = self.trade_exchange.round_amount_by_trade_unit(sell_amount, factor)
+            sell_order = Order(
+                stock_id=code,
+                amount=sell_amount,
+                start_time=trade_start_time,
+                end_time=trade_end_time,
+                direction=Order.SELL,  # 0 for sell, 1 for buy
+            )
+            # is order executable
+            if self.trade_exchange.check_order(sell_order):
+                sell_order_list.append(sell_order)
+                trade_val, trade_cost, trade_price = self.trade_exchange.deal_order(sell_order, position=current_temp)
+                # update cash
+                cash += trade_val - trade_cost
+        # buy new stock
+        # note the current has been changed
+        # current_stock_list = current_temp.get_stock_list()
+        value = cash * self.risk_degree / len(buy) if len(buy) > 0 else 0
+
+        # open_cost should be considered in the real trading environment, while the backtest in evaluate.py does not
+        # consider it as the aim of demo is to accomplish same strategy as evaluate.py, so comment out this line
+        # value = value / (1+self.trade_exchange.open_cost) # set open_cost limit
+        for code in buy:
+            # check is stock suspended
+            if not self.trade_exchange.is_stock_tradable(
+                stock_id=code,
+                start_time=trade_start_time,
+                end_time=trade_end_time,
+                direction=None if self.forbid_all_trade_at_limit else OrderDir.BUY,
+            ):
+                continue
+            # buy order
+            buy_price = self.trade_exchange.get_deal_price(
+                stock_id=code, start_time=trade_start_time, end_time=trade_end_time, direction=OrderDir.BUY
+            )
+            buy_amount = value / buy_price
+            factor = self.trade_exchange.get_factor(stock_id=code, start_time=trade_start_time, end_time=trade_end_time)
+            buy_amount = self.trade_exchange.round_amount_by_trade_unit(buy_amount, factor)
+            buy_order = Order(
+                stock_id=code,
+                amount=buy_amount,
+                start_time=trade_start_time,
+                end_time=trade_end_time,
+                direction=Order.BUY,  # 1 for buy
+            )
+            buy_order_list.append(buy_order)
+        return TradeDecisionWO(sell_order_list + buy_order_list, self)
+
+    def _pick_stocks(self, current_temp, pred_start_time, pred_end_time, trade_start_time, trade_end_time):
+        """
+        pick the stocks to sell and buy by the scores in [pred_start_time, pred_end_time]
+
+        Returns
+        -------
+        Optional[tuple]:
+            (sell, buy); None if there is no signal
+        """
         pred_score = self.signal.get_signal(start_time=pred_start_time, end_time=pred_end_time)
         # NOTE: the current version of topk dropout strategy can't handle pd.DataFrame(multiple signal)
         # So it only leverage the first col of signal
         if isinstance(pred_score, pd.DataFrame):
             pred_score = pred_score.iloc[:, 0]
         if pred_score is None:
-            return TradeDecisionWO([], self)
+            return None
         if self.only_tradable:
             # If The strategy only consider tradable stock when make decision
             # It needs following actions to filter stocks
@@ -186,12 +345,6 @@ class TopkDropoutStrategy(BaseSignalStrategy):
             def filter_stock(li):
                 return li
 
-        current_temp: Position = copy.deepcopy(self.trade_position)
-        # generate order list for this adjust date
-        sell_order_list = []
-        buy_order_list = []
-        # load score
-        cash = current_temp.get_cash()
         current_stock_list = current_temp.get_stock_list()
         # last position (sorted by score)
         last = pred_score.reindex(current_stock_list).sort_values(ascending=False).index
@@ -229,70 +382,111 @@ class TopkDropoutStrategy(BaseSignalStrategy):
 
         # Get the stock list we really want to buy
         buy = today[: len(sell) + self.topk - len(last)]
-        for code in current_stock_list:
-            if not self.trade_exchange.is_stock_tradable(
-                stock_id=code,
-                start_time=trade_start_time,
-                end_time=trade_end_time,
-                direction=None if self.forbid_all_trade_at_limit else OrderDir.SELL,
-            ):
-                continue
-            if code in sell:
-                # check hold limit
-                time_per_step = self.trade_calendar.get_freq()
-                if current_temp.get_stock_count(code, bar=time_per_step) < self.hold_thresh:
-                    continue
-                # sell order
-                sell_amount = current_temp.get_stock_amount(code=code)
-                # sell_amount = self.trade_exchange.round_amount_by_trade_unit(sell_amount, factor)
-                sell_order = Order(
-                    stock_id=code,
-                    amount=sell_amount,
-                    start_time=trade_start_time,
-                    end_time=trade_end_time,
-                    direction=Order.SELL,  # 0 for sell, 1 for buy
+        return sell, buy
+
+    def _pick_stocks_precomputed(self, current_temp, pred_start_time, pred_end_time, trade_start_time, trade_end_time):
+        """
+        It is the same as `_pick_stocks`, but the stocks are picked by their ids in the precomputed ranking
+        """
+        if self._ranked_signal is None:
+            self._ranked_signal = _RankedSignal(cast(SignalWCache, self.signal).signal_cache)
+        ranked = self._ranked_signal
+        cross_section = ranked.get_cross_section(pred_start_time, pred_end_time)
+        if cross_section is None:
+            return None
+        order, rank, n_present, n_valid = cross_section
+        n_codes = len(ranked.codes)
+
+        # the held stocks out of the signal get the ids after the ones in the signal
+        current_stock_list = current_temp.get_stock_list()
+        extra_codes = []
+        held = np.empty(len(current_stock_list), dtype=np.int64)
+        for i, code in enumerate(current_stock_list):
+            if code in ranked.code_ids:
+                held[i] = ranked.code_ids[code]
+            else:
+                held[i] = n_codes + len(extra_codes)
+                extra_codes.append(code)
+        held_mask = np.zeros(n_codes, dtype=bool)
+        held_mask[held[held < n_codes]] = True
+
+        def to_codes(ids):
+            return [ranked.codes[i] if i < n_codes else extra_codes[i - n_codes] for i in ids]
+
+        def sort_by_score(ids, nan_order):
+            # the stocks without valid scores go last in the order of `nan_order`
+            key = n_codes + nan_order
+            valid = ids < n_codes
+            valid[valid] = rank[ids[valid]] < n_valid
+            key[valid] = rank[ids[valid]]
+            return ids[np.argsort(key, kind="stable")]
+
+        # -1 for the stocks not checked yet
+        tradable_state = np.full(n_codes + len(extra_codes), -1, dtype=np.int8)
+
+        def is_tradable(ids):
+            unchecked = ids[tradable_state[ids] < 0]
+            if len(unchecked) > 0:
+                tradable_state[unchecked] = self.trade_exchange.is_tradable(
+                    to_codes(unchecked), trade_start_time, trade_end_time
                 )
-                # is order executable
-                if self.trade_exchange.check_order(sell_order):
-                    sell_order_list.append(sell_order)
-                    trade_val, trade_cost, trade_price = self.trade_exchange.deal_order(
-                        sell_order, position=current_temp
-                    )
-                    # update cash
-                    cash += trade_val - trade_cost
-        # buy new stock
-        # note the current has been changed
-        # current_stock_list = current_temp.get_stock_list()
-        value = cash * self.risk_degree / len(buy) if len(buy) > 0 else 0
+            return tradable_state[ids] == 1
+
+        def get_first_n(ids, n, reverse=False):
+            if not self.only_tradable:
+                return ids[-n:] if reverse else ids[:n]
+            # at least one stock is picked as `_pick_stocks` does; the candidates are checked in growing chunks
+            n = max(n, 1)
+            ids = ids[::-1] if reverse else ids
+            res, pos, size = [], 0, n
+            while pos < len(ids) and sum(len(chunk) for chunk in res) < n:
+                chunk = ids[pos : pos + size]
+                res.append(chunk[is_tradable(chunk)])
+                pos, size = pos + size, size * 2
+            res = np.concatenate(res)[:n] if res else ids[:0]
+            return res[::-1] if reverse else res
+
+        def filter_stock(ids):
+            return ids[is_tradable(ids)] if self.only_tradable else ids
 
-        # open_cost should be considered in the real trading environment, while the backtest in evaluate.py does not
-        # consider it as the aim of demo is to accomplish same strategy as evaluate.py, so comment out this line
-        # value = value / (1+self.trade_exchange.open_cost) # set open_cost limit
-        for code in buy:
-            # check is stock suspended
-            if not self.trade_exchange.is_stock_tradable(
-                stock_id=code,
-                start_time=trade_start_time,
-                end_time=trade_end_time,
-                direction=None if self.forbid_all_trade_at_limit else OrderDir.BUY,
-            ):
-                continue
-            # buy order
-            buy_price = self.trade_exchange.get_deal_price(
-                stock_id=code, start_time=trade_start_time, end_time=trade_end_time, direction=OrderDir.BUY
-            )
-            buy_amount = value / buy_price
-            factor = self.trade_exchange.get_factor(stock_id=code, start_time=trade_start_time, end_time=trade_end_time)
-            buy_amount = self.trade_exchange.round_amount_by_trade_unit(buy_amount, factor)
-            buy_order = Order(
-                stock_id=code,
-                amount=buy_amount,
-                start_time=trade_start_time,
-                end_time=trade_end_time,
-                direction=Order.BUY,  # 1 for buy
-            )
-            buy_order_list.append(buy_order)
-        return TradeDecisionWO(sell_order_list + buy_order_list, self)
+        # last position (sorted by score)
+        last = sort_by_score(held, np.arange(len(held)))
+        # The new stocks today want to buy **at most**
+        candidates = order[:n_present]
+        if self.method_buy == "top":
+            today = get_first_n(candidates[~held_mask[candidates]], self.n_drop + self.topk - len(last))
+        elif self.method_buy == "random":
+            topk_candi = get_first_n(candidates, self.topk)
+            candi = topk_candi[~held_mask[topk_candi]]
+            n = self.n_drop + self.topk - len(last)
+            try:
+                today = np.random.choice(candi, n, replace=False)
+            except ValueError:
+                today = candi
+        else:
+            raise NotImplementedError(f"This type of input is not supported")
+        # combine(new stocks + last stocks), like `pd.Index.union` the stocks are sorted by the codes if both are given
+        comb = np.concatenate([last, today]).astype(np.int64)
+        nan_order = np.arange(len(comb))
+        if len(last) > 0 and len(today) > 0:
+            nan_order = np.argsort(np.argsort(np.asarray(to_codes(comb), dtype=object)))
+        comb = sort_by_score(comb, nan_order)
+
+        # Get the stock list we really want to sell (After filtering the case that we sell high and buy low)
+        if self.method_sell == "bottom":
+            sell = last[np.isin(last, get_first_n(comb, self.n_drop, reverse=True))]
+        elif self.method_sell == "random":
+            candi = filter_stock(last)
+            try:
+                sell = np.random.choice(candi, self.n_drop, replace=False) if len(last) else last[:0]
+            except ValueError:  # No enough candidates
+                sell = candi
+        else:
+            raise NotImplementedError(f"This type of input is not supported")
+
+        # Get the stock list we really want to buy
+        buy = today[: len(sell) + self.topk - len(last)]
+        return set(to_codes(sell)), to_codes(buy)
 
 
 class WeightStrategyBase(BaseSignalStrategy):
@@ -354,7 +548,7 @@ class WeightStrategyBase(BaseSignalStrategy):
         if pred_score is None:
             return TradeDecisionWO([], self)
         current_temp = copy.deepcopy(self.trade_position)
-        assert isinstance(current_temp, Position)  # Avoid InfPosition
+        assert isinstance(current_temp, (Position, ArrayPosition))  # Avoid InfPosition
 
         target_weight_position = self.generate_target_weight_position(
             score=pred_score, current=current_temp, trade_start_time=trade_start_time, trade_end_time=trade_end_time
@@ -393,9 +587,14 @@ class EnhancedIndexingStrategy(WeightStrategyBase):
     The risk model data can be obtained from risk data provider. You can also use
     `qlib.model.riskmodel.structured.StructuredCovEstimator` to prepare these data.
 
+    The risk model data of all the dates can also be packed into a `qlib.model.riskmodel.RiskModelStore` (created by
+    `qlib.model.riskmodel.RiskModelStoreWriter`) in the risk model path, which is memory-mapped instead of loading the
+    files of each date.
+
     Args:
         riskmodel_path (str): risk model path
         name_mapping (dict): alternative file names
+        riskdata_cache_size (int): the max number of dates whose risk data are cached (0 for no limit)
     """
 
     FACTOR_EXP_NAME = "factor_exp.pkl"
@@ -412,6 +611,7 @@ class EnhancedIndexingStrategy(WeightStrategyBase):
         name_mapping={},
         optimizer_kwargs={},
         verbose=False,
+        riskdata_cache_size=32,
         **kwargs,
     ):
         super().__init__(**kwargs)
@@ -431,12 +631,21 @@ class EnhancedIndexingStrategy(WeightStrategyBase):
 
         self.verbose = verbose
 
-        self._riskdata_cache = {}
+        from qlib.model.riskmodel import RiskModelStore  # pylint: disable=C0415
+
+        self._riskdata_cache = MemCacheLengthUnit(size_limit=riskdata_cache_size)
+        self._riskdata_store = RiskModelStore(riskmodel_root) if RiskModelStore.exists(riskmodel_root) else None
 
     def get_risk_data(self, date):
         if date in self._riskdata_cache:
             return self._riskdata_cache[date]
 
+        if self._riskdata_store is not None:
+            outs = self._riskdata_store.get(date)
+            if outs is not None:
+                self._riskdata_cache[date] = outs
+            return outs
+
         root = self.riskmodel_root + "/" + date.strftime("%Y%m%d")
         if not os.path.exists(root):
             return None
@@ -30,6 +30,7 @@ from .cache import (
     ExpressionCache,
     DatasetCache,
     DiskExpressionCache,
+    LocalExpressionCache,
     DiskDatasetCache,
     SimpleDatasetCache,
     DatasetURICache,
@@ -59,6 +60,7 @@ __all__ = [
     "ExpressionCache",
     "DatasetCache",
     "DiskExpressionCache",
+    "LocalExpressionCache",
     "DiskDatasetCache",
     "SimpleDatasetCache",
     "DatasetURICache",
@@ -4,7 +4,7 @@ cimport cython
 cimport numpy as np
 import numpy as np
 
-from libc.math cimport sqrt, isnan, NAN
+from libc.math cimport sqrt, isnan, round, NAN, INFINITY
 from libcpp.deque cimport deque
 
 
@@ -185,9 +185,10 @@ cdef class Rsquare(Rolling):
 cdef np.ndarray[double, ndim=1] rolling(Rolling r, np.ndarray a):
     cdef int  i
     cdef int  N = len(a)
+    cdef double[:] x = np.asarray(a, dtype=np.float64)
     cdef np.ndarray[double, ndim=1] ret = np.empty(N)
     for i in range(N):
-        ret[i] = r.update(a[i])
+        ret[i] = r.update(x[i])
     return ret
 
 def rolling_mean(np.ndarray a, int window):
@@ -205,3 +206,448 @@ def rolling_rsquare(np.ndarray a, int window):
 def rolling_resi(np.ndarray a, int window):
     cdef Resi r = Resi(window)
     return rolling(r, a)
+
+
+# The kernels below follow the semantics of the pandas implementations used by the operators
+# (`min_periods=1`, NaN skipped unless noted). `window` is the rolling window size; a window not less
+# than the length of the array makes it an expanding window.
+
+cdef double _center(double[:] x):
+    """the shift applied before accumulating moments to reduce the floating error (the same as pandas)"""
+    cdef Py_ssize_t i, n = 0
+    cdef double s = 0, vmin = INFINITY
+    for i in range(x.shape[0]):
+        if not isnan(x[i]):
+            s += x[i]
+            n += 1
+            if x[i] < vmin:
+                vmin = x[i]
+    if n == 0:
+        return 0
+    s = s / n
+    if vmin - s > -1e5:
+        s = round(s)
+    return s
+
+
+cdef class Moments(Rolling):
+    """
+    The sums of the powers of the values in the window relative to `shift`, which are used by the rolling
+    skewness and kurtosis.
+
+    The sums are updated incrementally with Kahan compensation, and they are recomputed from the values in the
+    window (with `shift` reset to the mean of the window)
+
+    - every `window` updates, so that the error of the add/subtract updates does not accumulate;
+    - when the mean of the window drifts away from `shift` by more than a standard deviation, so that the
+      cancellation error of the central moments is bounded (e.g. the values trending over orders of magnitude).
+    """
+    cdef double shift
+    cdef double sums[4]
+    cdef double comps[4]
+    cdef int n_updates
+    cdef double prev
+    cdef int n_same
+    def __init__(self, int window, double shift):
+        super(Moments, self).__init__(window)
+        self.shift = shift
+        self.reset_sums()
+        self.n_updates = 0
+        self.prev = NAN
+        self.n_same = 0
+
+    cdef void reset_sums(self):
+        cdef int k
+        for k in range(4):
+            self.sums[k] = 0
+            self.comps[k] = 0
+
+    cdef void accumulate(self, double val, double sign):
+        cdef double p = sign, y, t
+        cdef int k
+        val = val - self.shift
+        for k in range(4):
+            p *= val
+            # Kahan summation
+            y = p - self.comps[k]
+            t = self.sums[k] + y
+            self.comps[k] = (t - self.sums[k]) - y
+            self.sums[k] = t
+
+    cdef void recompute(self):
+        cdef Py_ssize_t i
+        cdef double val, s = 0
+        cdef int n = 0
+        for i in range(<Py_ssize_t>self.barv.size()):
+            val = self.barv[i]
+            if not isnan(val):
+                s += val
+                n += 1
+        if n > 0:
+            self.shift = s / n
+        self.reset_sums()
+        for i in range(<Py_ssize_t>self.barv.size()):
+            val = self.barv[i]
+            if not isnan(val):
+                self.accumulate(val, 1)
+        self.n_updates = 0
+
+    cdef void push(self, double val):
+        self.barv.push_back(val)
+        if not isnan(self.barv.front()):
+            self.accumulate(self.barv.front(), -1)
+        else:
+            self.na_count -= 1
+        self.barv.pop_front()
+        if isnan(val):
+            self.na_count += 1
+        else:
+            # the count of the consecutive identical values, used to detect the uniform windows
+            if val == self.prev:
+                self.n_same += 1
+            else:
+                self.n_same = 1
+            self.prev = val
+            self.accumulate(val, 1)
+        self.n_updates += 1
+        if self.n_updates >= self.window:
+            self.recompute()
+
+    cdef void check_shift(self, double N):
+        cdef double A = self.sums[0] / N
+        if A * A > self.sums[1] / N - A * A:
+            self.recompute()
+
+
+cdef class Skew(Moments):
+    """1-D array rolling skewness"""
+    cdef double update(self, double val):
+        self.push(val)
+        cdef double N = self.window - self.na_count
+        if N < 3:
+            return NAN
+        if self.n_same >= N:
+            return 0
+        self.check_shift(N)
+        cdef double A = self.sums[0] / N
+        cdef double B = self.sums[1] / N - A * A
+        cdef double C = self.sums[2] / N - A * A * A - 3 * A * B
+        if B <= 1e-14:
+            return NAN
+        cdef double R = sqrt(B)
+        return sqrt(N * (N - 1)) * C / ((N - 2) * R * R * R)
+
+
+cdef class Kurt(Moments):
+    """1-D array rolling kurtosis"""
+    cdef double update(self, double val):
+        self.push(val)
+        cdef double N = self.window - self.na_count
+        if N < 4:
+            return NAN
+        if self.n_same >= N:
+            return -3
+        self.check_shift(N)
+        cdef double A = self.sums[0] / N
+        cdef double R = A * A
+        cdef double B = self.sums[1] / N - R
+        R = R * A
+        cdef double C = self.sums[2] / N - R - 3 * A * B
+        R = R * A
+        cdef double D = self.sums[3] / N - R - 6 * B * A * A - 4 * C * A
+        if B <= 1e-14:
+            return NAN
+        cdef double K = (N * N - 1) * D / (B * B) - 3 * ((N - 1) ** 2)
+        return K / ((N - 2) * (N - 3))
+
+
+cdef class WMA(Rolling):
+    """1-D array rolling weighted moving average (the same as `np.nanmean(w * x)` with linear weights)"""
+    cdef int length
+    cdef double x_sum
+    cdef double wx_sum
+    def __init__(self, int window):
+        super(WMA, self).__init__(window)
+        self.length = 0
+        self.x_sum = 0
+        self.wx_sum = 0
+
+    cdef double update(self, double val):
+        cdef double _val = self.barv.front()
+        cdef bint full = self.length == self.window
+        self.barv.push_back(val)
+        self.barv.pop_front()
+        if isnan(_val):
+            self.na_count -= 1
+        elif full:
+            self.x_sum -= _val
+            self.wx_sum -= _val
+        if full:
+            # the weights of the values in the window decrease by one after moving forward
+            self.wx_sum -= self.x_sum
+        else:
+            self.length += 1
+        if isnan(val):
+            self.na_count += 1
+        else:
+            self.x_sum += val
+            self.wx_sum += self.length * val
+        cdef int N = self.window - self.na_count
+        if N == 0:
+            return NAN
+        return self.wx_sum / (self.length * (self.length + 1) / 2.0) / N
+
+
+def rolling_skew(np.ndarray a, int window):
+    a = np.asarray(a, dtype=np.float64)
+    cdef Skew r = Skew(window, _center(a))
+    return rolling(r, a)
+
+def rolling_kurt(np.ndarray a, int window):
+    a = np.asarray(a, dtype=np.float64)
+    cdef Kurt r = Kurt(window, _center(a))
+    return rolling(r, a)
+
+def rolling_wma(np.ndarray a, int window):
+    cdef WMA r = WMA(window)
+    return rolling(r, a)
+
+
+cdef _arg_extreme(np.ndarray a, int window, bint is_max):
+    """
+    The position (starting from 1) of the max/min value in the window, which is the same as `x.argmax() + 1`:
+    the first one is taken for ties and the first NaN is taken if there is NaN in the window.
+    The result is NaN if all the values in the window are NaN.
+    A monotonic deque is maintained, so the complexity is O(n).
+    """
+    cdef double[:] x = np.asarray(a, dtype=np.float64)
+    cdef Py_ssize_t n = x.shape[0]
+    cdef np.ndarray[double, ndim=1] ret = np.empty(n)
+    cdef deque[Py_ssize_t] candidates
+    cdef deque[Py_ssize_t] nans
+    cdef Py_ssize_t i, start
+    cdef double val
+    for i in range(n):
+        start = i - window + 1
+        if start < 0:
+            start = 0
+        while not candidates.empty() and candidates.front() < start:
+            candidates.pop_front()
+        while not nans.empty() and nans.front() < start:
+            nans.pop_front()
+        val = x[i]
+        if isnan(val):
+            nans.push_back(i)
+        else:
+            if is_max:
+                while not candidates.empty() and x[candidates.back()] < val:
+                    candidates.pop_back()
+            else:
+                while not candidates.empty() and x[candidates.back()] > val:
+                    candidates.pop_back()
+            candidates.push_back(i)
+        if candidates.empty():
+            ret[i] = NAN
+        elif not nans.empty():
+            ret[i] = nans.front() - start + 1
+        else:
+            ret[i] = candidates.front() - start + 1
+    return ret
+
+def rolling_idxmax(np.ndarray a, int window):
+    return _arg_extreme(a, window, True)
+
+def rolling_idxmin(np.ndarray a, int window):
+    return _arg_extreme(a, window, False)
+
+
+cdef class OrderStatistics:
+    """
+    The multiset of the values in the window, which supports the order statistics in O(log n).
+    The values of the whole array are mapped into their ranks, and the counts (and sums) of the ranks
+    are stored in Fenwick trees.
+    """
+    cdef double[:] uniq
+    cdef long[:] rank
+    cdef long[:] count_tree
+    cdef double[:] sum_tree
+    cdef Py_ssize_t size
+    cdef int nobs
+    cdef double vsum
+    def __init__(self, double[:] x):
+        _x = np.asarray(x)
+        uniq = np.unique(_x[~np.isnan(_x)])
+        self.uniq = uniq
+        self.size = uniq.shape[0]
+        self.rank = np.searchsorted(uniq, _x).astype(np.int_)
+        self.count_tree = np.zeros(self.size + 1, dtype=np.int_)
+        self.sum_tree = np.zeros(self.size + 1)
+        self.nobs = 0
+        self.vsum = 0
+
+    cdef void add(self, Py_ssize_t i, double val, int sign):
+        cdef Py_ssize_t k = self.rank[i] + 1
+        self.nobs += sign
+        self.vsum += sign * val
+        while k <= self.size:
+            self.count_tree[k] += sign
+            self.sum_tree[k] += sign * val
+            k += k & (-k)
+
+    cdef long count(self, Py_ssize_t k):
+        """the count of the values with rank less than k"""
+        cdef long s = 0
+        while k > 0:
+            s += self.count_tree[k]
+            k -= k & (-k)
+        return s
+
+    cdef double total(self, Py_ssize_t k):
+        """the sum of the values with rank less than k"""
+        cdef double s = 0
+        while k > 0:
+            s += self.sum_tree[k]
+            k -= k & (-k)
+        return s
+
+    cdef Py_ssize_t upper(self, double val):
+        """the count of the distinct values not greater than val"""
+        cdef Py_ssize_t lo = 0, hi = self.size, mid
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.uniq[mid] <= val:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    cdef double kth(self, long k):
+        """the k-th (starting from 0) smallest value"""
+        cdef Py_ssize_t pos = 0, step = 1
+        while step * 2 <= self.size:
+            step *= 2
+        while step > 0:
+            if pos + step <= self.size and self.count_tree[pos + step] <= k:
+                pos += step
+                k -= self.count_tree[pos]
+            step //= 2
+        return self.uniq[pos]
+
+
+cdef _rolling_order_statistics(np.ndarray a, int window, int method, double qscore):
+    cdef double[:] x = np.asarray(a, dtype=np.float64)
+    cdef Py_ssize_t n = x.shape[0]
+    cdef np.ndarray[double, ndim=1] ret = np.empty(n)
+    cdef OrderStatistics s = OrderStatistics(x)
+    cdef Py_ssize_t i, k
+    cdef long lo, eq
+    cdef double idx, vlow, mean
+    for i in range(n):
+        if i >= window and not isnan(x[i - window]):
+            s.add(i - window, x[i - window], -1)
+        if not isnan(x[i]):
+            s.add(i, x[i], 1)
+        if s.nobs == 0:
+            ret[i] = NAN
+        elif method == 0:
+            # quantile with linear interpolation
+            idx = qscore * (s.nobs - 1)
+            lo = <long>idx
+            vlow = s.kth(lo)
+            if idx == lo:
+                ret[i] = vlow
+            else:
+                ret[i] = vlow + (s.kth(lo + 1) - vlow) * (idx - lo)
+        elif method == 1:
+            # median
+            if s.nobs % 2 == 1:
+                ret[i] = s.kth(s.nobs // 2)
+            else:
+                ret[i] = (s.kth(s.nobs // 2 - 1) + s.kth(s.nobs // 2)) / 2
+        elif method == 2:
+            # percentile rank of the latest value; the average rank is taken for ties
+            if isnan(x[i]):
+                ret[i] = NAN
+            else:
+                k = s.rank[i]
+                lo = s.count(k)
+                eq = s.count(k + 1) - lo
+                ret[i] = (lo + (eq + 1) / 2.0) / s.nobs
+        else:
+            # mean absolute deviation
+            mean = s.vsum / s.nobs
+            k = s.upper(mean)
+            lo = s.count(k)
+            vlow = s.total(k)
+            ret[i] = (mean * lo - vlow + (s.vsum - vlow) - mean * (s.nobs - lo)) / s.nobs
+    return ret
+
+def rolling_quantile(np.ndarray a, int window, double qscore):
+    return _rolling_order_statistics(a, window, 0, qscore)
+
+def rolling_median(np.ndarray a, int window):
+    return _rolling_order_statistics(a, window, 1, 0)
+
+def rolling_rank(np.ndarray a, int window):
+    return _rolling_order_statistics(a, window, 2, 0)
+
+def rolling_mad(np.ndarray a, int window):
+    return _rolling_order_statistics(a, window, 3, 0)
+
+
+cdef _rolling_pair(np.ndarray a, np.ndarray b, int window, bint is_corr):
+    """rolling covariance/correlation of the pairs where both values are not NaN"""
+    cdef double[:] x = np.asarray(a, dtype=np.float64)
+    cdef double[:] y = np.asarray(b, dtype=np.float64)
+    cdef Py_ssize_t n = x.shape[0]
+    cdef np.ndarray[double, ndim=1] ret = np.empty(n)
+    cdef double x_shift = _center(x), y_shift = _center(y)
+    cdef double x_sum = 0, y_sum = 0, x2_sum = 0, y2_sum = 0, xy_sum = 0
+    cdef double _x, _y, cov
+    cdef double x_prev = NAN, y_prev = NAN
+    cdef int nobs = 0, x_same = 0, y_same = 0
+    cdef Py_ssize_t i, j
+    for i in range(n):
+        j = i - window
+        if j >= 0 and not isnan(x[j]) and not isnan(y[j]):
+            _x = x[j] - x_shift
+            _y = y[j] - y_shift
+            nobs -= 1
+            x_sum -= _x
+            y_sum -= _y
+            x2_sum -= _x * _x
+            y2_sum -= _y * _y
+            xy_sum -= _x * _y
+        if not isnan(x[i]) and not isnan(y[i]):
+            # the counts of the consecutive identical values, used to detect the uniform windows
+            x_same = x_same + 1 if x[i] == x_prev else 1
+            y_same = y_same + 1 if y[i] == y_prev else 1
+            x_prev = x[i]
+            y_prev = y[i]
+            _x = x[i] - x_shift
+            _y = y[i] - y_shift
+            nobs += 1
+            x_sum += _x
+            y_sum += _y
+            x2_sum += _x * _x
+            y2_sum += _y * _y
+            xy_sum += _x * _y
+        if nobs < 2:
+            ret[i] = NAN
+        elif is_corr:
+            if x_same >= nobs or y_same >= nobs:
+                ret[i] = NAN
+            else:
+                cov = xy_sum - x_sum * y_sum / nobs
+                ret[i] = cov / sqrt((x2_sum - x_sum * x_sum / nobs) * (y2_sum - y_sum * y_sum / nobs))
+        elif x_same >= nobs or y_same >= nobs:
+            ret[i] = 0
+        else:
+            ret[i] = (xy_sum - x_sum * y_sum / nobs) / (nobs - 1)
+    return ret
+
+def rolling_cov(np.ndarray a, np.ndarray b, int window):
+    return _rolling_pair(a, b, window, False)
+
+def rolling_corr(np.ndarray a, np.ndarray b, int window):
+    return _rolling_pair(a, b, window, True)
@@ -6,10 +6,55 @@ from __future__ import division
 from __future__ import print_function
 
 import abc
+import contextvars
+import numpy as np
 import pandas as pd
 from ..log import get_module_logger
 
 
+# The memo of the `ExpressionDAG` being evaluated in the current context (please refer to `ExpressionDAG.evaluate`)
+_DAG_MEMO = contextvars.ContextVar("qlib_expression_dag_memo", default=None)
+
+
+class PanelCache(dict):
+    """The state shared by the nodes during one panel evaluation (see `Expression.load_panel`)
+
+    - It maps `(str(expression), start_index, end_index, freq)` to the evaluated panel, so each node is calculated once.
+    - It tracks the calendar index range covered by the data of each instrument.
+      The per-instrument engine only returns the rows where the underlying data exists; the range is used to
+      reproduce this when the panel is split into instruments.
+    """
+
+    def __init__(self, instruments):
+        super().__init__()
+        self.instruments = list(instruments)
+        # (str(feature), freq) -> (start_index, end_index, panel); raw features are kept until the evaluation ends
+        self.features = {}
+        self.first = np.full(len(self.instruments), np.iinfo(np.int64).max, dtype=np.int64)
+        self.last = np.full(len(self.instruments), np.iinfo(np.int64).min, dtype=np.int64)
+
+    def to_panel(self, series_d: dict, start_index: int, end_index: int) -> pd.DataFrame:
+        """assemble the per-instrument series (with calendar index) into a (time x instrument) panel"""
+        index = pd.RangeIndex(start_index, end_index + 1)
+        dtype = np.result_type(np.float32, *[s.dtype for s in series_d.values() if not s.empty])
+        values = np.full((len(index), len(self.instruments)), np.nan, dtype=dtype)
+        for i, inst in enumerate(self.instruments):
+            series = series_d.get(inst)
+            if series is None or series.empty:
+                continue
+            pos = series.index.values.astype(np.int64)
+            self.first[i] = min(self.first[i], pos[0])
+            self.last[i] = max(self.last[i], pos[-1])
+            pos = pos - start_index
+            mask = (pos >= 0) & (pos < len(index))
+            values[pos[mask], i] = series.values[mask]
+        return pd.DataFrame(values, index=index, columns=self.instruments)
+
+    def release(self):
+        """release the intermediate panels; the raw feature panels are kept"""
+        self.clear()
+
+
 class Expression(abc.ABC):
     """
     Expression base class
@@ -183,9 +228,18 @@ class Expression(abc.ABC):
         """
         from .cache import H  # pylint: disable=C0415
 
+        # the nodes of a compiled `ExpressionDAG` are evaluated only once during its evaluation
+        memo = _DAG_MEMO.get()
+        if memo is not None:
+            memo_key = id(self), instrument, start_index, end_index, *args
+            if memo_key in memo:
+                return memo[memo_key]
+
         # cache
         cache_key = str(self), instrument, start_index, end_index, *args
         if cache_key in H["f"]:
+            if memo is not None:
+                memo[memo_key] = H["f"][cache_key]
             return H["f"][cache_key]
         if start_index is not None and end_index is not None and start_index > end_index:
             raise ValueError("Invalid index range: {} {}".format(start_index, end_index))
@@ -200,12 +254,79 @@ class Expression(abc.ABC):
             raise
         series.name = str(self)
         H["f"][cache_key] = series
+        if memo is not None:
+            memo[memo_key] = series
         return series
 
     @abc.abstractmethod
     def _load_internal(self, instrument, start_index, end_index, *args) -> pd.Series:
         raise NotImplementedError("This function must be implemented in your newly defined feature")
 
+    def load_panel(self, instruments, start_index, end_index, freq, cache: PanelCache = None) -> pd.DataFrame:
+        """load the feature of a group of instruments at once
+
+        Unlike `load`, which is called once per instrument, every node of the expression is evaluated once on a
+        (time x instrument) panel for the whole group of instruments.
+
+        Parameters
+        ----------
+        instruments : list
+            instrument codes; they are the columns of the panel.
+        start_index : int
+            feature start index [in calendar].
+        end_index : int
+            feature end  index  [in calendar].
+        freq : str
+            feature frequency.
+        cache : PanelCache
+            the state shared by all the expressions evaluated on the same instruments.
+
+        Returns
+        ----------
+        pd.DataFrame
+            panel with the calendar index from `start_index` to `end_index` as index and the instruments as columns
+        """
+        cache = PanelCache(instruments) if cache is None else cache
+        cache_key = str(self), start_index, end_index, freq
+        if cache_key in cache:
+            return cache[cache_key]
+        if start_index > end_index:
+            raise ValueError("Invalid index range: {} {}".format(start_index, end_index))
+        try:
+            if self._panel_supported():
+                panel = self._load_panel_internal(instruments, start_index, end_index, freq, cache)
+            else:
+                panel = Expression._load_panel_internal(self, instruments, start_index, end_index, freq, cache)
+        except Exception as e:
+            get_module_logger("data").debug(
+                f"Loading panel error: expression={str(self)}, "
+                f"start_index={start_index}, end_index={end_index}, freq={freq}. "
+                f"error info: {str(e)}"
+            )
+            raise
+        cache[cache_key] = panel
+        return panel
+
+    def _panel_supported(self) -> bool:
+        """
+        The vectorized `_load_panel_internal` of a class is only valid if no subclass redefines `_load_internal`
+        (e.g. custom operators inherited from `Rolling`).
+        """
+        mro = type(self).__mro__
+
+        def _owner(name):
+            return next(i for i, klass in enumerate(mro) if name in klass.__dict__)
+
+        return _owner("_load_panel_internal") <= _owner("_load_internal")
+
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache: PanelCache) -> pd.DataFrame:
+        # The default implementation evaluates the expression instrument by instrument.
+        # Operators can override it with a vectorized version.
+        series_d = {}
+        for inst in instruments:
+            series_d[inst] = self.load(inst, start_index, end_index, freq)
+        return cache.to_panel(series_d, start_index, end_index)
+
     @abc.abstractmethod
     def get_longest_back_rolling(self):
         """Get the longest length of historical data the feature has accessed
@@ -256,6 +377,23 @@ class Feature(Expression):
 
         return FeatureD.feature(instrument, str(self), start_index, end_index, freq)
 
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        from .data import FeatureD  # pylint: disable=C0415
+
+        # expressions with different window sizes share the panel loaded with the widest range
+        feature_key = str(self), freq
+        if feature_key in cache.features:
+            _start_index, _end_index, panel = cache.features[feature_key]
+            if _start_index <= start_index and end_index <= _end_index:
+                return panel.loc[start_index:end_index]
+
+        series_d = {}
+        for inst in instruments:
+            series_d[inst] = FeatureD.feature(inst, str(self), start_index, end_index, freq)
+        panel = cache.to_panel(series_d, start_index, end_index)
+        cache.features[feature_key] = start_index, end_index, panel
+        return panel
+
     def get_longest_back_rolling(self):
         return 0
 
@@ -279,3 +417,119 @@ class ExpressionOps(Expression):
     This kind of feature will use operator for feature
     construction on the fly.
     """
+
+
+class ExpressionDAG:
+    """The expressions of a group of fields compiled into one DAG
+
+    The same sub-expression (e.g. `Mean($close, 20)` or `Ref($close, 1)`) often appears in many fields of a factor
+    library. When compiling, the identical nodes of all the fields are hash-consed into one shared node (nodes are
+    identified by `str`), so each unique node is evaluated only once per instrument in `evaluate`.
+
+    .. note:: The expressions are modified in place; please pass the instances which are not shared with others.
+    """
+
+    def __init__(self, expressions: dict):
+        """
+        Parameters
+        ----------
+        expressions : dict
+            field -> the expression instance of the field
+        """
+        # str(node) -> the unique node
+        self.nodes = {}
+        # the number of the nodes before compiling
+        self.n_nodes = 0
+        self.roots = {field: self._intern(expr) for field, expr in expressions.items()}
+        self._range_invariant = {}
+
+    @property
+    def n_unique(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def n_eliminated(self) -> int:
+        """the number of the nodes eliminated by compiling"""
+        return self.n_nodes - self.n_unique
+
+    def _intern(self, node: Expression) -> Expression:
+        self.n_nodes += 1
+        for attr, child in list(vars(node).items()):
+            if isinstance(child, Expression):
+                setattr(node, attr, self._intern(child))
+        return self.nodes.setdefault(str(node), node)
+
+    def is_range_invariant(self, node: Expression) -> bool:
+        """
+        Whether the values of the node in the target range keep the same if it is loaded with a range wider than
+        the range given by `get_extended_window_size`.
+        It is not the case for the nodes which depend on all the history, e.g. `EMA` and the rolling operators
+        with `N == 0` (expanding) or `0 < N < 1` (exponentially weighted).
+        """
+        from .ops import EMA, PairRolling, Rolling  # pylint: disable=C0415
+
+        key = id(node)
+        if key not in self._range_invariant:
+            if isinstance(node, EMA) or (isinstance(node, (Rolling, PairRolling)) and not node.N >= 1):
+                invariant = False
+            else:
+                invariant = all(
+                    self.is_range_invariant(child) for child in vars(node).values() if isinstance(child, Expression)
+                )
+            self._range_invariant[key] = invariant
+        return self._range_invariant[key]
+
+    def get_query_ranges(self, start_index: int, end_index: int) -> dict:
+        """get the calendar index range to load each field for the target range [start_index, end_index]
+
+        The range-invariant fields are loaded with the union of their ranges, so the nodes shared by them are
+        evaluated only once; the other fields are loaded with their own ranges.
+
+        Returns
+        ----------
+        dict
+            field -> (query_start, query_end)
+        """
+        ranges = {}
+        for field, root in self.roots.items():
+            lft_etd, rght_etd = root.get_extended_window_size()
+            ranges[field] = max(0, start_index - lft_etd), end_index + rght_etd
+        shared = [ranges[field] for field, root in self.roots.items() if self.is_range_invariant(root)]
+        if len(shared) > 0:
+            shared_range = min(r[0] for r in shared), max(r[1] for r in shared)
+            for field, root in self.roots.items():
+                if self.is_range_invariant(root):
+                    ranges[field] = shared_range
+        return ranges
+
+    def evaluate(self, instrument, ranges: dict, *args) -> dict:
+        """evaluate the fields of one instrument
+
+        Parameters
+        ----------
+        instrument : str
+            instrument code.
+        ranges : dict
+            field -> (start_index, end_index); the range of each field to be loaded.
+            The nodes shared by the fields loaded with the same range are evaluated only once.
+        *args :
+            the other arguments of `Expression.load` (e.g. freq).
+
+        Returns
+        ----------
+        dict
+            field -> feature series
+        """
+        token = _DAG_MEMO.set({})
+        try:
+            return {
+                field: self.roots[field].load(instrument, start_index, end_index, *args)
+                for field, (start_index, end_index) in ranges.items()
+            }
+        finally:
+            _DAG_MEMO.reset(token)
+
+    def __str__(self):
+        return "{}(fields={}, nodes={}, unique={}, eliminated={})".format(
+            type(self).__name__, len(self.roots), self.n_nodes, self.n_unique, self.n_eliminated
+        )
@@ -9,7 +9,11 @@ import os
 import sys
 import stat
 import time
+import mmap
+import uuid
+import struct
 import pickle
+import threading
 import traceback
 import redis_lock
 import contextlib
@@ -23,6 +27,7 @@ from collections import OrderedDict
 from ..config import C
 from ..utils import (
     hash_args,
+    code_to_fname,
     get_redis_connection,
     read_bin,
     parse_field,
@@ -32,7 +37,7 @@ from ..utils import (
 )
 
 from ..log import get_module_logger
-from .base import Feature
+from .base import Expression, Feature, PFeature
 from .ops import Operators  # pylint: disable=W0611  # noqa: F401
 
 
@@ -344,6 +349,13 @@ class ExpressionCache(BaseProviderCache):
         except NotImplementedError:
             return self.provider.expression(instrument, field, start_time, end_time, freq)
 
+    def expressions(self, instrument, fields, start_time, end_time, freq):
+        """Get the data of a group of expressions.
+
+        .. note:: Each expression is loaded from the cache separately, so the fields are not compiled together
+        """
+        return {field: self.expression(instrument, field, start_time, end_time, freq) for field in fields}
+
     def _uri(self, instrument, field, start_time, end_time, freq):
         """Get expression cache file uri.
 
@@ -643,6 +655,420 @@ class DiskExpressionCache(ExpressionCache):
         return 0
 
 
+class _ExpressionSegment:
+    """The records of a segment file of `LocalExpressionCache` scanned by the current process"""
+
+    def __init__(self, path: Path, st_ino: int):
+        self.path = path
+        self.st_ino = st_ino
+        self.buffer = None
+        # the size of the scanned part; the records after it are being written (or broken)
+        self.size = 0
+        # (expression hash, data version) -> (data time, start index, offset of the data, length)
+        self.records = {}
+        # expression hash -> the newest data time
+        self.newest = {}
+        # the bytes of the duplicated and the broken records
+        self.n_garbage = 0
+
+    def get(self, expression_hash: bytes, data_version: bytes):
+        """(start_index, data) of the record; None if it does not exist"""
+        record = self.records.get((expression_hash, data_version))
+        if record is None:
+            return None
+        _, start_index, offset, length = record
+        return start_index, np.frombuffer(self.buffer, dtype="<f", count=length, offset=offset)
+
+    def record_nbytes(self, length: int) -> int:
+        return LocalExpressionCache.RECORD_SIZE + 4 * length + len(LocalExpressionCache.RECORD_END)
+
+    def n_superseded(self) -> int:
+        """the bytes of the records which are duplicated or older than the newest data version of the expression"""
+        n_bytes = self.n_garbage
+        for (expression_hash, _), (data_time, _, _, length) in self.records.items():
+            if data_time < self.newest[expression_hash]:
+                n_bytes += self.record_nbytes(length)
+        return n_bytes
+
+
+class LocalExpressionCache(ExpressionCache):
+    """Local expression cache without Redis.
+
+    It is designed for the machines which calculate the same expressions again and again but can not run Redis.
+
+    - The expressions of an instrument are saved in an append-only segment file `<cache_dir>/<freq>/<instrument>.seg`
+      which is read with memory mapping. Each record in the segment holds the whole history of an expression, keyed by
+
+        - the expression hash: a stable hash of the normalized expression (i.e. `str` of the parsed expression);
+        - the data version: a hash of the modification time and size of the calendar and the feature files that the
+          expression depends on. So the records are invalidated automatically when the data is updated.
+
+      The record also keeps the data time (i.e. the latest modification time of the files) to order the data versions.
+
+    - No lock is needed: a record is appended by a single write and ends with a mark, so the readers skip the records
+      being written; the records are never modified. A broken record (e.g. left by a failed write) is skipped when
+      a valid record follows it, and it is removed by the compaction `BROKEN_TIMEOUT` seconds later if it is the last.
+    - When the duplicated or superseded records (i.e. the expression has a record of a newer data version) take more
+      than half of a segment, the segment is compacted into a temporary file which is renamed atomically. Only the
+      records older than the newest data version of their expressions are dropped. The records appended by the other
+      processes during the compaction may be lost, and they will be calculated again.
+    - When the cache grows larger than `size_limit`, the least recently used segments are removed.
+
+    The raw features (e.g. `$close`) and the point-in-time expressions are not cached.
+    """
+
+    MAGIC = b"QEXC"
+    VERSION = 2
+    # magic, format version
+    HEADER_FMT = "<4sI"
+    HEADER_SIZE = 16
+    # magic, expression hash, data version, data time, start index, length
+    RECORD_FMT = "<4s16s8sqqq"
+    RECORD_SIZE = 64
+    RECORD_MAGIC = b"QREC"
+    RECORD_END = b"QEND"
+    SUFFIX = ".seg"
+    # the unfinished record at the end of a segment older than this (seconds) is regarded as broken
+    BROKEN_TIMEOUT = 60
+    # the opened segments shared by all the instances in the process; path -> _ExpressionSegment
+    POOL_SIZE = 4096
+    _pool = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, provider, cache_dir: Union[str, Path] = None, size_limit: int = 10 * 1024**3, **kwargs):
+        """
+        Parameters
+        ----------
+        provider :
+            the expression provider.
+        cache_dir : Union[str, Path]
+            the directory to save the cache; `<provider_uri>/<C.features_cache_dir_name>_local` by default.
+        size_limit : int
+            the limit of the total size (bytes) of the cache directory; no limit if it is None.
+        """
+        super(LocalExpressionCache, self).__init__(provider)
+        self.cache_dir = cache_dir
+        self.size_limit = size_limit
+        # the bytes written since the last time the size of the cache is checked; None means never checked
+        self._written = None
+        self._dependencies = {}
+        self._cache_dirs = {}
+        self._data_uris = {}
+
+    def get_cache_dir(self, freq: str = None) -> Path:
+        if freq not in self._cache_dirs:
+            if self.cache_dir is None:
+                cache_dir = super(LocalExpressionCache, self).get_cache_dir(f"{C.features_cache_dir_name}_local", freq)
+            else:
+                cache_dir = Path(self.cache_dir).expanduser().joinpath(freq)
+                cache_dir.mkdir(parents=True, exist_ok=True)
+            self._cache_dirs[freq] = cache_dir
+        return self._cache_dirs[freq]
+
+    @staticmethod
+    def _get_features(expression: Expression):
+        """the raw features the expression depends on, [(instrument or None for the current one, field name)];
+        None if they are unknown (e.g. point-in-time data)"""
+        from .ops import ChangeInstrument  # pylint: disable=C0415
+
+        features = set()
+        nodes = [(None, expression)]
+        while nodes:
+            inst, node = nodes.pop()
+            if isinstance(node, PFeature):
+                return None
+            if isinstance(node, Feature):
+                features.add((inst, str(node)[1:].lower()))
+                continue
+            if isinstance(node, ChangeInstrument):
+                inst = node.instrument
+            nodes.extend((inst, child) for child in vars(node).values() if isinstance(child, Expression))
+        return sorted(features, key=str)
+
+    def _get_data_files(self, instrument, field, freq):
+        """(expression hash, data files) of the expression; None if the expression should not be cached"""
+        if (field, freq) not in self._dependencies:
+            expression = self.provider.get_expression_instance(field)
+            features = None if isinstance(expression, Feature) else self._get_features(expression)
+            self._dependencies[field, freq] = None if features is None else (hash_args(str(expression), freq), features)
+        dependency = self._dependencies[field, freq]
+        if dependency is None:
+            return None
+        expression_hash, features = dependency
+        if freq not in self._data_uris:
+            self._data_uris[freq] = str(C.dpm.get_data_uri(freq))
+        data_uri = self._data_uris[freq]
+        files = [os.path.join(data_uri, "calendars", f"{freq}.txt")]
+        for inst, name in features:
+            feature_dir = os.path.join(data_uri, "features", code_to_fname(inst or instrument).lower())
+            files.append(os.path.join(feature_dir, f"{name}.{freq.lower()}.bin"))
+            files.append(os.path.join(feature_dir, f"{freq.lower()}.bundle"))
+        return expression_hash, files
+
+    def _uri(self, instrument, field, start_time, end_time, freq, stat_cache: dict = None):
+        """(segment path, expression hash, data version, data time); None if the expression should not be cached
+
+        `stat_cache` saves the status of the data files, so they are not checked repeatedly for a group of fields.
+        """
+        dependency = self._get_data_files(instrument, field, freq)
+        if dependency is None:
+            return None
+        expression_hash, files = dependency
+        stat_cache = {} if stat_cache is None else stat_cache
+        stats = []
+        for file in files:
+            if file not in stat_cache:
+                try:
+                    stat_result = os.stat(file)
+                    stat_cache[file] = stat_result.st_mtime_ns, stat_result.st_size
+                except FileNotFoundError:
+                    stat_cache[file] = None, None
+            stats.append((file, *stat_cache[file]))
+        data_version = bytes.fromhex(hash_args(stats)[:16])
+        data_time = max(mtime or 0 for _, mtime, _ in stats)
+        cache_path = self.get_cache_dir(freq).joinpath(f"{code_to_fname(instrument).lower()}{self.SUFFIX}")
+        return cache_path, bytes.fromhex(expression_hash), data_version, data_time
+
+    @classmethod
+    def read_segment(cls, cache_path: Path) -> Union[_ExpressionSegment, None]:
+        """map the segment and scan the records appended since the last time; None if it does not exist"""
+        key = str(cache_path)
+        try:
+            stat_result = os.stat(key)
+        except FileNotFoundError:
+            with cls._lock:
+                cls._pool.pop(key, None)
+            return None
+        with cls._lock:
+            segment = cls._pool.get(key)
+            if segment is not None and segment.st_ino == stat_result.st_ino:
+                cls._pool.move_to_end(key)
+                if segment.size >= stat_result.st_size:
+                    return segment
+            else:
+                segment = None
+        try:
+            with open(key, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+        if segment is None:
+            magic, version = struct.unpack_from(cls.HEADER_FMT, buffer) if len(buffer) >= cls.HEADER_SIZE else (b"", 0)
+            if magic != cls.MAGIC or version != cls.VERSION:
+                return None
+            segment = _ExpressionSegment(cache_path, stat_result.st_ino)
+            segment.size = cls.HEADER_SIZE
+            # the modification time is used as the last visit time when removing the least recently used segments
+            os.utime(key)
+        cls._scan(segment, buffer)
+        if segment.size < len(buffer) and time.time() - stat_result.st_mtime > cls.BROKEN_TIMEOUT:
+            # the writer was killed when writing the record; the records after it can not be read
+            cls.compact(segment)
+            return cls.read_segment(cache_path)
+        with cls._lock:
+            cls._pool[key] = segment
+            if len(cls._pool) > cls.POOL_SIZE:
+                cls._pool.popitem(last=False)
+        return segment
+
+    @classmethod
+    def _read_record(cls, buffer: mmap.mmap, pos: int):
+        """(the header fields, the end position) of the record at `pos`; None if it is not complete"""
+        end_size = len(cls.RECORD_END)
+        if pos + cls.RECORD_SIZE + end_size > len(buffer):
+            return None
+        header = struct.unpack_from(cls.RECORD_FMT, buffer, pos)
+        end = pos + cls.RECORD_SIZE + 4 * header[-1]
+        if header[0] != cls.RECORD_MAGIC or header[-1] < 0 or buffer[end : end + end_size] != cls.RECORD_END:
+            return None
+        return header, end + end_size
+
+    @classmethod
+    def _scan(cls, segment: _ExpressionSegment, buffer: mmap.mmap):
+        pos = segment.size
+        while pos < len(buffer):
+            record = cls._read_record(buffer, pos)
+            if record is None:
+                # the record is being written, or it is broken if a complete record follows it
+                next_pos = buffer.find(cls.RECORD_MAGIC, pos + 1)
+                while next_pos >= 0 and cls._read_record(buffer, next_pos) is None:
+                    next_pos = buffer.find(cls.RECORD_MAGIC, next_pos + 1)
+                if next_pos < 0:
+                    break
+                segment.n_garbage += next_pos - pos
+                pos = next_pos
+                continue
+            (_, expression_hash, data_version, data_time, start_index, length), end = record
+            key = expression_hash, data_version
+            if key in segment.records:
+                segment.n_garbage += end - pos
+            else:
+                segment.records[key] = data_time, start_index, pos + cls.RECORD_SIZE, length
+                segment.newest[expression_hash] = max(segment.newest.get(expression_hash, data_time), data_time)
+            pos = end
+        segment.buffer = buffer
+        segment.size = pos
+
+    @classmethod
+    def _pack_record(cls, expression_hash: bytes, data_version: bytes, data_time: int, series: pd.Series) -> bytes:
+        start_index = int(series.index[0]) if len(series) > 0 else 0
+        header = struct.pack(
+            cls.RECORD_FMT, cls.RECORD_MAGIC, expression_hash, data_version, data_time, start_index, len(series)
+        )
+        return b"".join(
+            [header.ljust(cls.RECORD_SIZE, b"\0"), np.asarray(series.values, dtype="<f").tobytes(), cls.RECORD_END]
+        )
+
+    @classmethod
+    def _write_atomically(cls, cache_path: Path, chunks: Iterable[bytes], replace: bool = True):
+        """write the file to a temporary file and rename it; an existing file is kept if `replace` is False"""
+        tmp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+        try:
+            with tmp_path.open("wb") as f:
+                f.write(struct.pack(cls.HEADER_FMT, cls.MAGIC, cls.VERSION).ljust(cls.HEADER_SIZE, b"\0"))
+                for chunk in chunks:
+                    f.write(chunk)
+            if replace:
+                os.replace(tmp_path, cache_path)
+            else:
+                try:
+                    os.link(tmp_path, cache_path)
+                except FileExistsError:
+                    pass
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    @classmethod
+    def append_records(cls, cache_path: Path, records: list) -> int:
+        """
+        append the records [(expression hash, data version, data time, series)] to the segment by a single write
+
+        The segment is compacted if more than half of it is superseded.
+        If the write fails halfway, the written part is left as a broken record, which is skipped by the readers.
+        """
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        if not cache_path.exists():
+            cls._write_atomically(cache_path, [], replace=False)
+        payload = b"".join(cls._pack_record(*record) for record in records)
+        fd = os.open(cache_path, os.O_WRONLY | os.O_APPEND)
+        try:
+            view = memoryview(payload)
+            while len(view) > 0:
+                # the regular files are rarely written partially; if it happens, the other processes may append
+                # between the writes, and the split record is skipped as a broken one
+                view = view[os.write(fd, view) :]
+        finally:
+            os.close(fd)
+        segment = cls.read_segment(cache_path)
+        if segment is not None and segment.n_superseded() * 2 > segment.size:
+            cls.compact(segment)
+        return len(payload)
+
+    @classmethod
+    def compact(cls, segment: _ExpressionSegment):
+        """rewrite the segment without the superseded records (and the broken part at the end)"""
+        records = sorted(
+            (offset, length)
+            for (expression_hash, _), (data_time, _, offset, length) in segment.records.items()
+            if data_time >= segment.newest[expression_hash]
+        )
+        chunks = (
+            segment.buffer[offset - cls.RECORD_SIZE : offset + segment.record_nbytes(length) - cls.RECORD_SIZE]
+            for offset, length in records
+        )
+        cls._write_atomically(segment.path, chunks)
+        with cls._lock:
+            cls._pool.pop(str(segment.path), None)
+
+    def evict(self, freq: str = None):
+        """remove the least recently used segments if the cache is larger than `size_limit`"""
+        if self.size_limit is None:
+            return
+        segments = []
+        total = 0
+        for root, _, files in os.walk(self.get_cache_dir(freq)):
+            for name in files:
+                path = Path(root).joinpath(name)
+                try:
+                    stat_result = path.stat()
+                except FileNotFoundError:
+                    continue
+                if name.endswith(".tmp"):
+                    # the temporary files left by the killed processes
+                    if time.time() - stat_result.st_mtime > 3600:
+                        path.unlink(missing_ok=True)
+                    continue
+                total += stat_result.st_size
+                segments.append((stat_result.st_mtime, stat_result.st_size, path))
+        if total <= self.size_limit:
+            return
+        # remove the segments until the cache is smaller than 80% of the limit, so it is not checked too often
+        for _, size, path in sorted(segments, key=lambda x: x[0]):
+            if total <= self.size_limit * 0.8:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self.logger.debug(f"the size of the expression cache after removing the old segments: {total}")
+
+    def _save(self, cache_path, records, freq):
+        # only the data with the continuous calendar index can be cached
+        records = [r for r in records if len(r[-1]) == 0 or r[-1].index[-1] - r[-1].index[0] + 1 == len(r[-1])]
+        if len(records) == 0:
+            return
+        try:
+            size = self.append_records(cache_path, records)
+        except OSError:
+            self.logger.warning(f"writing expression cache {cache_path} error : {traceback.format_exc()}")
+            return
+        if self._written is None or self._written + size > (self.size_limit or 0) * 0.05:
+            self._written = 0
+            self.evict(freq)
+        else:
+            self._written += size
+
+    @staticmethod
+    def _slice(segment, start_index, end_index) -> pd.Series:
+        seg_start, data = segment
+        si, ei = max(seg_start, start_index), min(seg_start + len(data) - 1, end_index)
+        if si > ei:
+            return pd.Series(dtype=np.float32)
+        return pd.Series(data[si - seg_start : ei - seg_start + 1], index=pd.RangeIndex(si, ei + 1), copy=False)
+
+    def expressions(self, instrument, fields, start_time=None, end_time=None, freq="day"):
+        """
+        The fields missing in the cache are calculated together by the provider (please refer to
+        `ExpressionProvider.expressions`), so their common sub-expressions are shared.
+        """
+        from .data import Cal  # pylint: disable=C0415
+
+        _, _, start_index, end_index = Cal.locate_index(start_time, end_time, freq, future=False)
+        res, missing, stat_cache = {}, {}, {}
+        cache_path, segment = None, None
+        for field in fields:
+            uri = self._uri(instrument, field, None, None, freq, stat_cache=stat_cache)
+            if uri is None:
+                res[field] = self.provider.expression(instrument, field, start_time, end_time, freq)
+                continue
+            if cache_path is None:
+                cache_path = uri[0]
+                segment = self.read_segment(cache_path)
+            record = None if segment is None else segment.get(*uri[1:3])
+            if record is None:
+                missing[field] = uri[1:]
+            else:
+                res[field] = self._slice(record, start_index, end_index)
+        if len(missing) > 0:
+            _calendar = Cal.calendar(freq=freq)
+            data = self.provider.expressions(instrument, list(missing), _calendar[0], _calendar[-1], freq)
+            self._save(cache_path, [(*key, data[field]) for field, key in missing.items()], freq)
+            for field in missing:
+                res[field] = data[field].loc[start_index:end_index]
+        return {field: res[field] for field in fields}
+
+    def _expression(self, instrument, field, start_time=None, end_time=None, freq="day"):
+        return self.expressions(instrument, [field], start_time, end_time, freq)[field]
+
+
 class DiskDatasetCache(DatasetCache):
     """Prepared cache mechanism for server."""
 
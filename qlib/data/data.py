@@ -17,8 +17,9 @@ from typing import List, Union, Optional
 # For supporting multiprocessing in outer code, joblib is used
 from joblib import delayed
 
-from .cache import H
+from .cache import H, MemCacheLengthUnit
 from ..config import C
+from .base import ExpressionDAG, PanelCache
 from .inst_processor import InstProcessor
 
 from ..log import get_module_logger
@@ -31,12 +32,13 @@ from ..utils import (
     parse_field,
     hash_args,
     normalize_cache_fields,
+    remove_fields_space,
     code_to_fname,
     time_to_slc_point,
     read_period_data,
     get_period_list,
 )
-from ..utils.paral import ParallelExt
+from ..utils.paral import ParallelExt, SharedArena
 from .ops import Operators  # pylint: disable=W0611  # noqa: F401
 
 
@@ -386,8 +388,12 @@ class ExpressionProvider(abc.ABC):
     Provide Expression data.
     """
 
+    # the maximum number of the compiled expression DAGs kept in memory
+    DAG_CACHE_SIZE = 32
+
     def __init__(self):
         self.expression_instance_cache = {}
+        self.dag_cache = MemCacheLengthUnit(size_limit=self.DAG_CACHE_SIZE)
 
     def get_expression_instance(self, field):
         try:
@@ -406,6 +412,40 @@ class ExpressionProvider(abc.ABC):
             raise
         return expression
 
+    def compile(self, fields) -> ExpressionDAG:
+        """Compile the fields into one expression DAG whose identical sub-expressions are shared
+
+        Parameters
+        ----------
+        fields : list
+            list of fields.
+
+        Returns
+        -------
+        ExpressionDAG
+            The compiled DAG; its nodes must not be modified.
+        """
+        key = tuple(str(f) for f in fields)
+        if key in self.dag_cache:
+            return self.dag_cache[key]
+        # the cached instances are copied, because the nodes are replaced with the shared ones when compiling
+        dag = ExpressionDAG({f: copy.deepcopy(self.get_expression_instance(f)) for f in key})
+        get_module_logger("data").debug(f"compiled fields: {dag}")
+        self.dag_cache[key] = dag
+        return dag
+
+    def expressions(self, instrument, fields, start_time=None, end_time=None, freq="day") -> dict:
+        """Get the data of a group of expressions of one instrument.
+
+        Parameters are the same as `expression` except that `fields` is a list of fields.
+
+        Returns
+        -------
+        dict
+            field -> data of the expression
+        """
+        return {field: self.expression(instrument, field, start_time, end_time, freq) for field in fields}
+
     @abc.abstractmethod
     def expression(self, instrument, field, start_time=None, end_time=None, freq="day") -> pd.Series:
         """Get Expression data.
@@ -541,8 +581,9 @@ class DatasetProvider(abc.ABC):
 
     @staticmethod
     def parse_fields(fields):
-        # parse and check the input fields
-        return [ExpressionD.get_expression_instance(f) for f in fields]
+        # parse and check the input fields; the identical sub-expressions of the fields are shared
+        dag = ExpressionD.compile(fields)
+        return [dag.roots[str(f)] for f in fields]
 
     @staticmethod
     def dataset_processor(instruments_d, column_names, start_time, end_time, freq, inst_processors=[]):
@@ -552,6 +593,10 @@ class DatasetProvider(abc.ABC):
 
         """
         normalize_column_names = normalize_cache_fields(column_names)
+        dag = ExpressionD.compile(normalize_column_names)
+        get_module_logger("data").debug(
+            f"{dag.n_eliminated} of {dag.n_nodes} expression nodes are eliminated by sharing the common sub-expressions"
+        )
         # One process for one task, so that the memory will be freed quicker.
         workers = max(min(C.get_kernels(freq), len(instruments_d)), 1)
 
@@ -560,29 +605,60 @@ class DatasetProvider(abc.ABC):
             it = instruments_d.items()
         else:
             it = zip(instruments_d, [None] * len(instruments_d))
+        # NOTE: the instruments are sorted, so the data of the instruments is in the final order
+        it = sorted(dict(it).items(), key=lambda x: x[0])
+
+        if C.joblib_result_transport not in ("pickle", "shm"):
+            raise ValueError(
+                "joblib_result_transport must be pickle or shm, "
+                f"your joblib_result_transport is {C.joblib_result_transport}"
+            )
+        # The workers write the data into a shared memory arena instead of returning it by pickling.
+        # Each instrument has a slot large enough to hold the data of the calendar days in its spans.
+        arena = None
+        if C.joblib_result_transport == "shm" and workers > 1:
+            slot_rows = DatasetProvider._get_slot_rows(it, start_time, end_time, freq)
+            offsets = np.concatenate([[0], np.cumsum(slot_rows)[:-1]]) * len(column_names)
+            arena_size = int(np.sum(slot_rows)) * len(column_names) * np.dtype(np.float32).itemsize
+            if arena_size > 0:
+                arena = SharedArena(create=True, size=arena_size)
 
         inst_l = []
         task_l = []
         for inst, spans in it:
-            inst_l.append(inst)
-            task_l.append(
-                delayed(DatasetProvider.inst_calculator)(
-                    inst, start_time, end_time, freq, normalize_column_names, spans, C, inst_processors
+            args = (inst, start_time, end_time, freq, normalize_column_names, spans, C, inst_processors)
+            if arena is None:
+                task_l.append(delayed(DatasetProvider.inst_calculator)(*args))
+            else:
+                slot = len(inst_l)
+                task_l.append(
+                    delayed(DatasetProvider.inst_calculator_to_arena)(
+                        arena.name, int(offsets[slot]), (int(slot_rows[slot]), len(column_names)), column_names, *args
+                    )
                 )
-            )
+            inst_l.append(inst)
 
-        data = dict(
-            zip(
-                inst_l,
-                ParallelExt(n_jobs=workers, backend=C.joblib_backend, maxtasksperchild=C.maxtasksperchild)(task_l),
+        try:
+            result_l = ParallelExt(n_jobs=workers, backend=C.joblib_backend, maxtasksperchild=C.maxtasksperchild)(
+                task_l
             )
-        )
+            if arena is not None:
+                if all(isinstance(res, pd.Index) for res in result_l):
+                    return DatasetProvider._collect_from_arena(arena, inst_l, result_l, offsets, column_names)
+                # Some data does not fit the slots (e.g. changed by the `inst_processors`); concatenate them as usual
+                result_l = [
+                    DatasetProvider._read_from_arena(arena, offset, res, column_names)
+                    for offset, res in zip(offsets, result_l)
+                ]
+        finally:
+            if arena is not None:
+                arena.unlink()
 
         new_data = dict()
-        for inst in sorted(data.keys()):
-            if len(data[inst]) > 0:
+        for inst, inst_data in zip(inst_l, result_l):
+            if len(inst_data) > 0:
                 # NOTE: Python version >= 3.6; in versions after python3.6, dict will always guarantee the insertion order
-                new_data[inst] = data[inst]
+                new_data[inst] = inst_data
 
         if len(new_data) > 0:
             data = pd.concat(new_data, names=["instrument"], sort=False)
@@ -596,6 +672,61 @@ class DatasetProvider(abc.ABC):
 
         return data
 
+    @staticmethod
+    def _get_slot_rows(it, start_time, end_time, freq) -> np.ndarray:
+        """the max number of rows of each instrument, i.e. the number of the calendar days in its spans"""
+        calendar = pd.DatetimeIndex(Cal.calendar(start_time, end_time, freq=freq))
+        slot_rows = []
+        for _, spans in it:
+            if spans is None:
+                slot_rows.append(len(calendar))
+                continue
+            n_rows = 0
+            for begin, end in spans:
+                n_rows += calendar.searchsorted(pd.Timestamp(end), "right") - calendar.searchsorted(
+                    pd.Timestamp(begin), "left"
+                )
+            slot_rows.append(min(n_rows, len(calendar)))
+        return np.array(slot_rows, dtype=np.int64)
+
+    @staticmethod
+    def _collect_from_arena(arena, inst_l, result_l, offsets, column_names):
+        """
+        Build the data set over the shared memory arena written by `inst_calculator_to_arena`.
+
+        The data of the instruments is moved to the front of the arena one by one, so the data set is a view over the
+        arena and the data is not copied again. If most of the arena is left unused (e.g. the instruments have no data
+        in a large part of their spans), the data is copied out so that the arena is released.
+        """
+        n_cols = len(column_names)
+        values = arena.get_array((arena.size // (n_cols * 4), n_cols), np.float32)
+        insts, lengths, index_l = [], [], []
+        pos = 0
+        for offset, inst, index in zip(offsets, inst_l, result_l):
+            if len(index) == 0:
+                continue
+            start = offset // n_cols
+            if pos != start:
+                values[pos : pos + len(index)] = values[start : start + len(index)]
+            insts.append(inst)
+            lengths.append(len(index))
+            index_l.append(index.values)
+            pos += len(index)
+        values = values[:pos]
+        # a view over the arena keeps all of it mapped
+        if values.nbytes * 2 < arena.size:
+            values = values.copy()
+        get_module_logger("data").info(
+            f"{values.nbytes} bytes of data are handed over by shared memory instead of pickling"
+        )
+        if pos == 0:
+            index = pd.MultiIndex.from_arrays([[], []], names=("instrument", "datetime"))
+        else:
+            index = pd.MultiIndex.from_arrays(
+                [np.repeat(insts, lengths), np.concatenate(index_l)], names=("instrument", "datetime")
+            )
+        return pd.DataFrame(values, index=index, columns=[str(i) for i in column_names], copy=False)
+
     @staticmethod
     def inst_calculator(inst, start_time, end_time, freq, column_names, spans=None, g_config=None, inst_processors=[]):
         """
@@ -609,10 +740,8 @@ class DatasetProvider(abc.ABC):
         # NOTE: This place is compatible with windows, windows multi-process is spawn
         C.register_from_C(g_config)
 
-        obj = dict()
-        for field in column_names:
-            #  The client does not have expression provider, the data will be loaded from cache using static method.
-            obj[field] = ExpressionD.expression(inst, field, start_time, end_time, freq)
+        #  The client does not have expression provider, the data will be loaded from cache using static method.
+        obj = ExpressionD.expressions(inst, column_names, start_time, end_time, freq)
 
         data = pd.DataFrame(obj)
         if not data.empty and not np.issubdtype(data.index.dtype, np.dtype("M")):
@@ -633,6 +762,55 @@ class DatasetProvider(abc.ABC):
                 data = _processor_obj(data, instrument=inst)
         return data
 
+    @staticmethod
+    def _read_from_arena(arena, offset, res, column_names):
+        """Read the data of the slot starting from `offset` (in values) written by `inst_calculator_to_arena`"""
+        if isinstance(res, pd.DataFrame):
+            return res
+        values = arena.get_array((len(res), len(column_names)), np.float32, offset=offset * 4)
+        data = pd.DataFrame(values.copy(), index=res, columns=remove_fields_space(column_names))
+        return data.loc[:, ~data.columns.duplicated()]
+
+    @staticmethod
+    def inst_calculator_to_arena(
+        arena_name,
+        offset,
+        slot_shape,
+        fields,
+        inst,
+        start_time,
+        end_time,
+        freq,
+        column_names,
+        spans=None,
+        g_config=None,
+        inst_processors=[],
+    ):
+        """
+        Calculate the expressions for **one** instrument like `inst_calculator`, but write the data into the slot
+        starting from `offset` (in values) with `slot_shape` of the shared memory arena in the order of `fields`
+        instead of returning it.
+
+        return value: the datetime index of the data; or the data frame if it does not fit the slot.
+
+        """
+        data = DatasetProvider.inst_calculator(
+            inst, start_time, end_time, freq, column_names, spans, g_config, inst_processors
+        )
+        n_rows, n_cols = slot_shape
+        if list(data.columns) != list(column_names) or len(data) > n_rows or not (data.dtypes == np.float32).all():
+            return data
+        if len(data) == 0:
+            return data.index
+        arena = SharedArena(name=arena_name)
+        try:
+            block = arena.get_array((len(data), n_cols), np.float32, offset=offset * 4)
+            block[:] = data.loc[:, remove_fields_space(fields)].to_numpy()
+            del block
+        finally:
+            arena.close()
+        return data.index
+
 
 class LocalCalendarProvider(CalendarProvider, ProviderBackendMixin):
     """Local calendar data provider class
@@ -840,20 +1018,25 @@ class LocalExpressionProvider(ExpressionProvider):
         super().__init__()
         self.time2idx = time2idx
 
-    def expression(self, instrument, field, start_time=None, end_time=None, freq="day"):
-        expression = self.get_expression_instance(field)
-        start_time = time_to_slc_point(start_time)
-        end_time = time_to_slc_point(end_time)
-
+    def _get_index_range(self, start_time, end_time, freq):
         # Two kinds of queries are supported
         # - Index-based expression: this may save a lot of memory because the datetime index is not saved on the disk
         # - Data with datetime index expression: this will make it more convenient to integrating with some existing databases
+        start_time = time_to_slc_point(start_time)
+        end_time = time_to_slc_point(end_time)
         if self.time2idx:
             _, _, start_index, end_index = Cal.locate_index(start_time, end_time, freq=freq, future=False)
+            return start_index, end_index
+        return start_time, end_time
+
+    def expression(self, instrument, field, start_time=None, end_time=None, freq="day"):
+        expression = self.get_expression_instance(field)
+        start_index, end_index = self._get_index_range(start_time, end_time, freq)
+        if self.time2idx:
             lft_etd, rght_etd = expression.get_extended_window_size()
             query_start, query_end = max(0, start_index - lft_etd), end_index + rght_etd
         else:
-            start_index, end_index = query_start, query_end = start_time, end_time
+            query_start, query_end = start_index, end_index
 
         try:
             series = expression.load(instrument, query_start, query_end, freq)
@@ -864,6 +1047,34 @@ class LocalExpressionProvider(ExpressionProvider):
                 f"error info: {str(e)}"
             )
             raise
+        return self._format_series(series, start_index, end_index)
+
+    def expressions(self, instrument, fields, start_time=None, end_time=None, freq="day"):
+        """
+        The fields are compiled into one DAG (please refer to `compile`), so the sub-expressions shared by the fields
+        are evaluated only once.
+        The fields are loaded with the union of their query ranges (please refer to `ExpressionDAG.get_query_ranges`).
+        """
+        dag = self.compile(fields)
+        start_index, end_index = self._get_index_range(start_time, end_time, freq)
+        if self.time2idx:
+            ranges = dag.get_query_ranges(start_index, end_index)
+        else:
+            ranges = {field: (start_index, end_index) for field in dag.roots}
+
+        try:
+            series_d = dag.evaluate(instrument, ranges, freq)
+        except Exception as e:
+            get_module_logger("data").debug(
+                f"Loading expressions error: "
+                f"instrument={instrument}, fields={list(ranges)}, start_time={start_time}, end_time={end_time}, "
+                f"freq={freq}. error info: {str(e)}"
+            )
+            raise
+        return {field: self._format_series(series_d[str(field)], start_index, end_index) for field in fields}
+
+    @staticmethod
+    def _format_series(series, start_index, end_index):
         # Ensure that each column type is consistent
         # FIXME:
         # 1) The stock data is currently float. If there is other types of data, this part needs to be re-implemented.
@@ -885,7 +1096,7 @@ class LocalDatasetProvider(DatasetProvider):
     Provide dataset data from local data source.
     """
 
-    def __init__(self, align_time: bool = True):
+    def __init__(self, align_time: bool = True, panel: bool = False):
         """
         Parameters
         ----------
@@ -895,9 +1106,14 @@ class LocalDatasetProvider(DatasetProvider):
             For the data with fixed frequency with a shared calendar, the align data to the calendar will provides following benefits
 
             - Align queries to the same parameters, so the cache can be shared.
+        panel : bool
+            Evaluate each expression once for all the instruments on a (time x instrument) panel instead of
+            evaluating it instrument by instrument in parallel (please refer to `panel_processor`).
+            It requires an expression provider based on the calendar index (e.g. `LocalExpressionProvider(time2idx=True)`).
         """
         super().__init__()
         self.align_time = align_time
+        self.panel = panel
 
     def dataset(
         self,
@@ -920,12 +1136,106 @@ class LocalDatasetProvider(DatasetProvider):
                 )
             start_time = cal[0]
             end_time = cal[-1]
-        data = self.dataset_processor(
-            instruments_d, column_names, start_time, end_time, freq, inst_processors=inst_processors
-        )
+        if self.panel and getattr(ExpressionD, "time2idx", True):
+            data = self.panel_processor(
+                instruments_d, column_names, start_time, end_time, freq, inst_processors=inst_processors
+            )
+        else:
+            data = self.dataset_processor(
+                instruments_d, column_names, start_time, end_time, freq, inst_processors=inst_processors
+            )
 
         return data
 
+    @staticmethod
+    def panel_processor(instruments_d, column_names, start_time, end_time, freq, inst_processors=[]):
+        """
+        Load and process the data with the panel engine, return the data set.
+
+        - Each expression is evaluated once for all the instruments on a (time x instrument) panel
+          (please refer to `Expression.load_panel`), so there is no per-instrument overhead and no concatenation.
+        - The result is the same as `dataset_processor`; the expression cache is not used.
+        """
+        normalize_column_names = normalize_cache_fields(column_names)
+        empty_data = pd.DataFrame(
+            index=pd.MultiIndex.from_arrays([[], []], names=("instrument", "datetime")),
+            columns=column_names,
+            dtype=np.float32,
+        )
+        if isinstance(instruments_d, dict):
+            instruments = sorted(instruments_d.keys())
+        else:
+            instruments = sorted(set(instruments_d))
+
+        cal = Cal.calendar(start_time, end_time, freq)
+        if len(cal) == 0 or len(instruments) == 0:
+            return empty_data
+        _, _, start_index, end_index = Cal.locate_index(cal[0], cal[-1], freq=freq, future=False)
+
+        # the fields are loaded with the same ranges as `LocalExpressionProvider.expressions`
+        dag = ExpressionD.compile(normalize_column_names)
+        exprs = {
+            field: (dag.roots[field], *query_range)
+            for field, query_range in dag.get_query_ranges(start_index, end_index).items()
+        }
+
+        cache = PanelCache(instruments)
+        values = np.empty((end_index - start_index + 1, len(instruments), len(exprs)), dtype=np.float32)
+        # the fields with the widest range are loaded first, so that the raw feature panels can be shared
+        for field in sorted(exprs, key=lambda f: (exprs[f][1], -exprs[f][2])):
+            expression, query_start, query_end = exprs[field]
+            panel = expression.load_panel(instruments, query_start, query_end, freq, cache)
+            values[:, :, normalize_column_names.index(field)] = panel.iloc[
+                start_index - query_start : end_index - query_start + 1
+            ].values
+            cache.release()
+
+        # keep the rows where the data of the instrument exists (the same as `inst_calculator`)
+        # the range is clipped before shifting, the initial bounds of the instruments without data are int64 limits
+        first = np.clip(cache.first, start_index, end_index + 1) - start_index
+        last = np.clip(cache.last, start_index - 1, end_index) - start_index
+        inst_pos = np.flatnonzero(first <= last)
+        lengths = (last - first + 1)[inst_pos]
+        inst_idx = np.repeat(inst_pos, lengths)
+        offsets = np.repeat(np.cumsum(lengths) - lengths - first[inst_pos], lengths)
+        row_idx = np.arange(len(inst_idx)) - offsets
+
+        if isinstance(instruments_d, dict):
+            mask = np.zeros(len(inst_idx), dtype=bool)
+            seg_end = np.cumsum(lengths)
+            for i, pos in enumerate(inst_pos):
+                seg = slice(seg_end[i] - lengths[i], seg_end[i])
+                _dt = cal[row_idx[seg]]
+                for begin, end in instruments_d[instruments[pos]]:
+                    mask[seg] |= (_dt >= begin) & (_dt <= end)
+            inst_idx, row_idx = inst_idx[mask], row_idx[mask]
+
+        if len(inst_idx) == 0:
+            return empty_data
+
+        data = pd.DataFrame(
+            values[row_idx, inst_idx],
+            index=pd.MultiIndex.from_arrays(
+                [np.asarray(instruments, dtype=object)[inst_idx], pd.DatetimeIndex(cal)[row_idx]],
+                names=["instrument", "datetime"],
+            ),
+            columns=normalize_column_names,
+        )
+        if any(inst_processors):
+            new_data = {}
+            for inst, df in data.groupby(level="instrument", sort=False):
+                df = df.droplevel("instrument")
+                for _processor in inst_processors:
+                    if _processor:
+                        _processor_obj = init_instance_by_config(_processor, accept_types=InstProcessor)
+                        df = _processor_obj(df, instrument=inst)
+                if len(df) > 0:
+                    new_data[inst] = df
+            if len(new_data) == 0:
+                return empty_data
+            data = pd.concat(new_data, names=["instrument"], sort=False)
+        return DiskDatasetCache.cache_to_origin_data(data, column_names)
+
     @staticmethod
     def multi_cache_walker(instruments, fields, start_time=None, end_time=None, freq="day"):
         """
@@ -1,5 +1,5 @@
 from ...utils.serial import Serializable
-from typing import Callable, Union, List, Tuple, Dict, Text, Optional
+from typing import Callable, Iterator, Union, List, Tuple, Dict, Text, Optional
 from ...utils import init_instance_by_config, np_ffill, time_to_slc_point
 from ...log import get_module_logger
 from .handler import DataHandler, DataHandlerLP
@@ -8,6 +8,11 @@ from inspect import getfullargspec
 import pandas as pd
 import numpy as np
 import bisect
+import os
+import shutil
+import tempfile
+import weakref
+from pathlib import Path
 from ...utils import lazy_sort_index
 from .utils import get_level_index
 
@@ -246,6 +251,43 @@ class DatasetH(Dataset):
         # 2) Use pass it directly to prepare a single seg
         return self._prepare_seg(segments, **seg_kwargs)
 
+    def prepare_iter(
+        self,
+        segment: Union[Text, slice, Tuple],
+        col_set=DataHandler.CS_ALL,
+        data_key=DataHandlerLP.DK_I,
+        chunk_size: int = 250,
+        **kwargs,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Prepare the data of a segment chunk by chunk in time (i.e. the streaming mode).
+
+        It is designed for the data that is too large to be held in memory (e.g. the high-frequency data of many
+        years). If the handler is created with `init_data=False`, the data will be loaded and processed chunk by chunk
+        and the processors are fitted in a first pass over the data. Please refer to `DataHandler.fetch_iter` for
+        more details.
+
+        Parameters
+        ----------
+        segment : Union[Text, slice, Tuple]
+            the name of the segment (e.g. "train") or a time range.
+        chunk_size : int
+            the number of periods of the calendar in each chunk.
+
+        please refer to the doc of `prepare` for the other parameters.
+
+        Returns
+        -------
+        Iterator[pd.DataFrame]:
+            the chunks of the data in time order.
+        """
+        if isinstance(segment, str) and segment in self.segments:
+            segment = self.segments[segment]
+        fetch_kwargs = {"col_set": col_set, "data_key": data_key, "chunk_size": chunk_size}
+        fetch_kwargs.update(kwargs)
+        fetch_kwargs.update(getattr(self, "fetch_kwargs", {}))
+        return self.handler.fetch_iter(segment, **fetch_kwargs)
+
     # helper functions
     @staticmethod
     def get_min_time(segments):
@@ -269,6 +311,12 @@ class DatasetH(Dataset):
         return candidate
 
 
+def _remove_mmap_path(path: Path, pid: int):
+    # only the process creating the memory-mapped files removes them
+    if os.getpid() == pid:
+        shutil.rmtree(path, ignore_errors=True)
+
+
 class TSDataSampler:
     """
     (T)ime-(S)eries DataSampler
@@ -318,6 +366,7 @@ class TSDataSampler:
                 It list all indexable data(some data only used in historical time series data may not be indexabla), the values are the corresponding row and col in idx_df
             idx_df: pd.DataFrame
                 It aims to map the <datetime, instrument> key to the original position in data_arr
+                NOTE: only its values are kept (as `idx_arr`) with its index and columns; it is rebuilt when accessed
 
                 For example, it may look like (NOTE: the index for a instrument time-series is continoues in memory)
 
@@ -338,7 +387,9 @@ class TSDataSampler:
     data_arr: np.ndarray
     data_index: pd.MultiIndex
     idx_map: np.ndarray
-    idx_df: pd.DataFrame
+
+    # the arrays spilled to the memory-mapped files when `mmap_dir` is given
+    MMAP_ATTRS = ("data_arr", "idx_map", "idx_arr", "idx_arr_int", "data_index_codes")
 
     def __init__(
         self,
@@ -349,6 +400,7 @@ class TSDataSampler:
         fillna_type: str = "none",
         dtype=None,
         flt_data=None,
+        mmap_dir: Optional[str] = None,
     ):
         """
         Build a dataset which looks like torch.data.utils.Dataset.
@@ -377,6 +429,14 @@ class TSDataSampler:
             - We want some sample not included due to label-based filtering, but we can't filter them at the beginning due to the features is still important in the feature.
             None:
                 kepp all data
+        mmap_dir : Optional[str]
+            The directory to spill the data and the indices to as read-only memory-mapped files (e.g. "/dev/shm" for
+            shared memory). The processes (e.g. the workers of a DataLoader) share the pages of the files instead of
+            copying the arrays, and only the paths (and the small labels of the index) are pickled. The index of the
+            samples is rebuilt from the mapped codes when `get_index` is called. The files are removed with the
+            sampler.
+            None:
+                keep the arrays in memory
 
         """
         self.start = start
@@ -406,7 +466,7 @@ class TSDataSampler:
 
         # the data type will be changed
         # The index of usable data is between start_idx and end_idx
-        self.idx_df, self.idx_map = self.build_index(self.data)
+        idx_df, self.idx_map = self.build_index(self.data)
         self.data_index = deepcopy(self.data.index)
 
         if flt_data is not None:
@@ -422,12 +482,55 @@ class TSDataSampler:
             self.data_index = self.data_index[np.where(self.flt_data)[0]]
         self.idx_map = self.idx_map2arr(self.idx_map)
         self.idx_map, self.data_index = self.slice_idx_map_and_data_index(
-            self.idx_map, self.idx_df, self.data_index, start, end
+            self.idx_map, idx_df, self.data_index, start, end
         )
 
-        self.idx_arr = np.array(self.idx_df.values, dtype=np.float64)  # for better performance
+        self.idx_arr = np.array(idx_df.values, dtype=np.float64)  # for better performance
+        # `idx_df` is as large as `idx_arr`, only its labels are kept
+        self.idx_rows, self.idx_cols = idx_df.index, idx_df.columns
+        # the integer version of `idx_arr` for `get_batch`; -1 indicates the missing data
+        self.idx_arr_int = np.nan_to_num(self.idx_arr, nan=-1).astype(np.int64)
         del self.data  # save memory
 
+        self.mmap_path = None
+        if mmap_dir is not None:
+            self._spill_to_mmap(mmap_dir)
+
+    def _spill_to_mmap(self, mmap_dir: str):
+        os.makedirs(mmap_dir, exist_ok=True)
+        self.mmap_path = Path(tempfile.mkdtemp(prefix="tsds_", dir=mmap_dir))
+        self.data_index_codes = np.vstack([np.asarray(codes, dtype=np.int32) for codes in self.data_index.codes])
+        self._data_index_labels = (list(self.data_index.levels), list(self.data_index.names))
+        for name in self.MMAP_ATTRS:
+            np.save(self.mmap_path / f"{name}.npy", getattr(self, name))
+        self._load_mmap()
+        self._mmap_finalizer = weakref.finalize(self, _remove_mmap_path, self.mmap_path, os.getpid())
+
+    def _load_mmap(self):
+        for name in self.MMAP_ATTRS:
+            setattr(self, name, np.load(self.mmap_path / f"{name}.npy", mmap_mode="r"))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.mmap_path is not None:
+            # the memory-mapped files are opened again instead of pickling the arrays
+            for name in self.MMAP_ATTRS + ("_mmap_finalizer", "data_index"):
+                state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        idx_df = state.pop("idx_df", None)
+        self.__dict__.update(state)
+        self.__dict__.setdefault("mmap_path", None)
+        if idx_df is not None:
+            # the sampler is pickled by an older version
+            self.idx_rows, self.idx_cols = idx_df.index, idx_df.columns
+        if self.mmap_path is not None:
+            self._load_mmap()
+        elif "idx_arr_int" not in state:
+            # the sampler is pickled by an older version
+            self.idx_arr_int = np.nan_to_num(self.idx_arr, nan=-1).astype(np.int64)
+
     @staticmethod
     def slice_idx_map_and_data_index(
         idx_map,
@@ -474,11 +577,20 @@ class TSDataSampler:
                 idx += 1
         return new_idx_map
 
+    @property
+    def idx_df(self) -> pd.DataFrame:
+        """the <datetime, instrument> -> position in `data_arr` table (please refer to the docstring of the class)"""
+        return pd.DataFrame(self.idx_arr, index=self.idx_rows, columns=self.idx_cols)
+
     def get_index(self):
         """
         Get the pandas index of the data, it will be useful in following scenarios
         - Special sampler will be used (e.g. user want to sample day by day)
         """
+        if "data_index" not in self.__dict__:
+            # the sampler is unpickled from the memory-mapped files
+            levels, names = self._data_index_labels
+            self.data_index = pd.MultiIndex(levels=levels, codes=list(self.data_index_codes), names=names)
         return self.data_index.swaplevel()  # to align the order of multiple index of original data received by __init__
 
     def config(self, **kwargs):
@@ -562,6 +674,57 @@ class TSDataSampler:
             assert self.fillna_type == "none"
         return indices
 
+    @staticmethod
+    def _ffill_batch_indices(indices: np.ndarray) -> np.ndarray:
+        """forward fill the <batch, step_len> indices along the time steps; -1 indicates the missing data"""
+        pos = np.where(indices >= 0, np.arange(indices.shape[1]), 0)
+        np.maximum.accumulate(pos, axis=1, out=pos)
+        return np.take_along_axis(indices, pos, axis=1)
+
+    def get_batch(self, indices: Union[List[int], np.ndarray], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Get the time-series of a batch of samples.
+        It returns the same data as `self[indices]`, but the indices of the whole batch are built by one broadcasted
+        operation and the data are gathered by one `np.take`.
+
+        Parameters
+        ----------
+        indices : Union[List[int], np.ndarray]
+            the int indices of the samples
+        out : Optional[np.ndarray]
+            a preallocated C-contiguous buffer of shape <batch, step_len, feature> with the dtype of the data
+
+        Returns
+        -------
+        np.ndarray:
+            the data of shape <batch, step_len, feature>
+        """
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        if len(indices) > 0 and (indices.min() < 0 or indices.max() >= len(self.idx_map)):
+            raise KeyError(f"{indices} is out of [0, {len(self.idx_map)})")
+        rows, cols = self.idx_map[indices].T
+        # <batch, step_len>
+        rows = rows[:, None] + np.arange(1 - self.step_len, 1)
+        batch_indices = self.idx_arr_int[np.maximum(rows, 0), cols[:, None]]
+        batch_indices[rows < 0] = -1
+
+        if self.fillna_type == "ffill":
+            batch_indices = self._ffill_batch_indices(batch_indices)
+        elif self.fillna_type == "ffill+bfill":
+            batch_indices = self._ffill_batch_indices(self._ffill_batch_indices(batch_indices)[:, ::-1])[:, ::-1]
+        else:
+            assert self.fillna_type == "none"
+        # use the last nan line for padding the lost date
+        batch_indices = np.where(batch_indices < 0, self.nan_idx, batch_indices)
+
+        shape = (len(indices), self.step_len, self.data_arr.shape[1])
+        if out is None:
+            out = np.empty(shape, dtype=self.data_arr.dtype)
+        elif out.shape != shape or out.dtype != self.data_arr.dtype or not out.flags.c_contiguous:
+            raise ValueError(f"`out` should be a C-contiguous array of shape {shape} and dtype {self.data_arr.dtype}")
+        np.take(self.data_arr, batch_indices.reshape(-1), axis=0, out=out.reshape(-1, shape[-1]))
+        return out
+
     def _get_row_col(self, idx) -> Tuple[int]:
         """
         get the col index and row index of a given sample index in self.idx_df
@@ -587,9 +750,9 @@ class TSDataSampler:
             # <TSDataSampler object>["datetime", "instruments"]
             date, inst = idx
             date = pd.Timestamp(date)
-            i = bisect.bisect_right(self.idx_df.index, date) - 1
+            i = bisect.bisect_right(self.idx_rows, date) - 1
             # NOTE: This relies on the idx_df columns sorted in `__init__`
-            j = bisect.bisect_left(self.idx_df.columns, inst)
+            j = bisect.bisect_left(self.idx_cols, inst)
         else:
             raise NotImplementedError(f"This type of input is not supported")
         return i, j
@@ -614,6 +777,9 @@ class TSDataSampler:
         """
         # Multi-index type
         mtit = (list, np.ndarray)
+        if isinstance(idx, mtit) and np.asarray(idx).dtype.kind in "iu":
+            # a batch of int indices (e.g. from a `BatchSampler`) is gathered at once
+            return self.get_batch(idx)
         if isinstance(idx, mtit):
             indices = [self._get_indices(*self._get_row_col(i)) for i in idx]
             indices = np.concatenate(indices)
@@ -627,6 +793,9 @@ class TSDataSampler:
 
         if (np.diff(indices) == 1).all():  # slicing instead of indexing for speeding up.
             data = self.data_arr[indices[0] : indices[-1] + 1]
+            if self.mmap_path is not None:
+                # don't return the read-only view of the memory-mapped file
+                data = np.array(data)
         else:
             data = self.data_arr[indices]
         if isinstance(idx, mtit):
@@ -660,9 +829,23 @@ class TSDatasetH(DatasetH):
 
     DEFAULT_STEP_LEN = 30
 
-    def __init__(self, step_len=DEFAULT_STEP_LEN, flt_col: Optional[str] = None, **kwargs):
+    def __init__(
+        self, step_len=DEFAULT_STEP_LEN, flt_col: Optional[str] = None, mmap_dir: Optional[str] = None, **kwargs
+    ):
+        """
+        Parameters
+        ----------
+        step_len : int
+            The length of the time-series step
+        flt_col : Optional[str]
+            The column to filter the samples, please refer to `flt_data` of `TSDataSampler`
+        mmap_dir : Optional[str]
+            The directory to spill the data of the prepared `TSDataSampler` to memory-mapped files, so the memory usage
+            doesn't grow with the number of DataLoader workers. Please refer to `TSDataSampler` for more details.
+        """
         self.step_len = step_len
         self.flt_col = flt_col
+        self.mmap_dir = mmap_dir
         super().__init__(**kwargs)
 
     def config(self, **kwargs):
@@ -715,6 +898,7 @@ class TSDatasetH(DatasetH):
             step_len=self.step_len,
             dtype=dtype,
             flt_data=flt_data,
+            mmap_dir=self.mmap_dir,
         )
         return tsds
 
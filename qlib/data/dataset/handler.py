@@ -3,6 +3,7 @@
 
 # coding=utf-8
 from abc import abstractmethod
+import logging
 import warnings
 from typing import Callable, Union, Tuple, List, Iterator, Optional
 
@@ -12,14 +13,14 @@ from qlib.typehint import Literal
 from ...log import get_module_logger, TimeInspector
 from ...utils import init_instance_by_config
 from ...utils.serial import Serializable
-from .utils import fetch_df_by_index, fetch_df_by_col
+from .utils import fetch_df_by_index, fetch_df_by_col, get_df_buffers, is_copy_on_write_enabled
 from ...utils import lazy_sort_index
 from .loader import DataLoader
+from ...data import D
 
 from . import processor as processor_module
 from . import loader as data_loader_module
 
-
 DATA_KEY_TYPE = Literal["raw", "infer", "learn"]
 
 
@@ -379,6 +380,81 @@ class DataHandler(DataHandlerABC):
             selector = self.get_range_selector(cur_date, periods)
             yield cur_date, self.fetch(selector, **kwargs)
 
+    def _is_data_loaded(self) -> bool:
+        return "_data" in self.__dict__
+
+    def _get_chunk_ranges(self, start_time=None, end_time=None, chunk_size: int = 250) -> List[Tuple]:
+        """
+        split the time range into chunks of `chunk_size` periods of the calendar.
+        The time range is limited by the time range of the handler.
+        """
+        start_l = [pd.Timestamp(t) for t in (start_time, self.start_time) if t is not None]
+        end_l = [pd.Timestamp(t) for t in (end_time, self.end_time) if t is not None]
+        freq = getattr(self.data_loader, "freq", "day")
+        calendar = D.calendar(
+            start_time=max(start_l) if start_l else None,
+            end_time=min(end_l) if end_l else None,
+            freq=freq if isinstance(freq, str) else "day",
+        )
+        return [
+            (calendar[i], calendar[min(i + chunk_size, len(calendar)) - 1]) for i in range(0, len(calendar), chunk_size)
+        ]
+
+    def _load_chunk(self, start_time, end_time, data_key: DATA_KEY_TYPE = DataHandlerABC.DK_I) -> pd.DataFrame:
+        """load the data of a time range from the data loader"""
+        _ = data_key  # the raw data is the only data in DataHandler
+        return lazy_sort_index(self.data_loader.load(self.instruments, start_time, end_time))
+
+    def fetch_iter(
+        self,
+        selector: Union[slice, Tuple] = slice(None, None),
+        level: Union[str, int] = "datetime",
+        col_set: Union[str, List[str]] = DataHandlerABC.CS_ALL,
+        data_key: DATA_KEY_TYPE = DataHandlerABC.DK_I,
+        squeeze: bool = False,
+        proc_func: Callable = None,
+        chunk_size: int = 250,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        fetch the data of a time range chunk by chunk in time (i.e. the streaming mode)
+
+        - If the data has been set up (e.g. `init_data=True`), the data is simply split into chunks.
+        - Otherwise (e.g. `init_data=False`), each chunk is loaded from the data loader and processed when it is
+          fetched, so the whole data will never be held in memory.
+
+          .. note::
+
+            The expressions with infinite memory (e.g. `EMA`) depend on the start of the loaded data, so they may be
+            slightly different from the data loaded at once.
+
+        Parameters
+        ----------
+        selector : Union[slice, Tuple]
+            the time range of the data.
+        chunk_size : int
+            the number of periods of the calendar in each chunk.
+
+        please refer to the doc of `fetch` for the other parameters.
+
+        Returns
+        -------
+        Iterator[pd.DataFrame]:
+            the chunks of the data; the empty chunks are skipped.
+        """
+        if isinstance(selector, (tuple, list)):
+            selector = slice(*selector)
+        if level != "datetime" or not isinstance(selector, slice):
+            raise ValueError("Only the data of a time range can be fetched chunk by chunk")
+        is_loaded = self._is_data_loaded()
+        kwargs = {"level": level, "col_set": col_set, "squeeze": squeeze, "proc_func": proc_func}
+        for start_time, end_time in self._get_chunk_ranges(selector.start, selector.stop, chunk_size):
+            if is_loaded:
+                df = self.fetch(slice(start_time, end_time), data_key=data_key, **kwargs)
+            else:
+                df = self._fetch_data(self._load_chunk(start_time, end_time, data_key), **kwargs)
+            if len(df) > 0:
+                yield df
+
 
 class DataHandlerLP(DataHandler):
     """
@@ -445,6 +521,7 @@ class DataHandlerLP(DataHandler):
         shared_processors: List = [],
         process_type=PTYPE_A,
         drop_raw=False,
+        copy_on_write=True,
         **kwargs,
     ):
         """
@@ -488,6 +565,11 @@ class DataHandlerLP(DataHandler):
               - (e.g. self._infer processed by learn_processors )
         drop_raw: bool
             Whether to drop the raw data
+        copy_on_write: bool
+            Whether to share the unchanged columns between the raw, infer and learn data instead of copying the whole
+            data before the processors modify it. Only the columns modified by the processors will be copied
+            (e.g. the label modified by `CSZScoreNorm`). It depends on the Copy-on-Write mode of pandas (the default
+            behavior since pandas 3.0); the data is copied as usual if it is not enabled.
         """
 
         # Setup preprocessor
@@ -506,6 +588,7 @@ class DataHandlerLP(DataHandler):
 
         self.process_type = process_type
         self.drop_raw = drop_raw
+        self.copy_on_write = copy_on_write
         super().__init__(instruments, start_time, end_time, data_loader, **kwargs)
 
     def get_all_processors(self):
@@ -527,6 +610,22 @@ class DataHandlerLP(DataHandler):
         """
         self.process_data(with_fit=True)
 
+    def refit(self):
+        """
+        fit the processors again and process the data with them
+
+        It is used when the fitting time range of the processors is changed by `config` (e.g. the handler is reused by
+        the rolling tasks). The raw data is loaded again only if it has been dropped (i.e. `drop_raw=True`).
+        """
+        if not self._is_data_loaded():
+            # the streaming mode; the processors will be fitted before loading the next chunk
+            self._chunk_fitted = False
+        elif "_data" in self.__dict__:
+            with TimeInspector.logt("fit & process data"):
+                self.fit_process_data()
+        else:
+            self.setup_data(init_type=DataHandlerLP.IT_FIT_SEQ)
+
     @staticmethod
     def _run_proc_l(
         df: pd.DataFrame, proc_l: List[processor_module.Processor], with_fit: bool, check_for_infer: bool
@@ -579,7 +678,7 @@ class DataHandlerLP(DataHandler):
         # 1) assign
         _shared_df = self._data
         if not self._is_proc_readonly(self.shared_processors):  # avoid modifying the original data
-            _shared_df = _shared_df.copy()
+            _shared_df = self._copy_df(_shared_df)
         # 2) process
         _shared_df = self._run_proc_l(_shared_df, self.shared_processors, with_fit=with_fit, check_for_infer=True)
 
@@ -587,7 +686,7 @@ class DataHandlerLP(DataHandler):
         # 1) assign
         _infer_df = _shared_df
         if not self._is_proc_readonly(self.infer_processors):  # avoid modifying the original data
-            _infer_df = _infer_df.copy()
+            _infer_df = self._copy_df(_infer_df)
         # 2) process
         _infer_df = self._run_proc_l(_infer_df, self.infer_processors, with_fit=with_fit, check_for_infer=True)
 
@@ -603,7 +702,7 @@ class DataHandlerLP(DataHandler):
         else:
             raise NotImplementedError(f"This type of input is not supported")
         if not self._is_proc_readonly(self.learn_processors):  # avoid modifying the original  data
-            _learn_df = _learn_df.copy()
+            _learn_df = self._copy_df(_learn_df)
         # 2) process
         _learn_df = self._run_proc_l(_learn_df, self.learn_processors, with_fit=with_fit, check_for_infer=False)
 
@@ -611,6 +710,127 @@ class DataHandlerLP(DataHandler):
 
         if self.drop_raw:
             del self._data
+        logger = get_module_logger("DataHandlerLP")
+        if logger.isEnabledFor(logging.DEBUG):
+            # the report walks the buffers of all the data
+            logger.debug(f"memory usage of the data:\n{self.memory_report()}")
+
+    def _copy_df(self, df: pd.DataFrame) -> pd.DataFrame:
+        if getattr(self, "copy_on_write", False) and is_copy_on_write_enabled():
+            # the columns are copied lazily when they are modified
+            return df.copy(deep=False)
+        return df.copy()
+
+    def memory_report(self) -> pd.DataFrame:
+        """
+        Report the memory used by the data of the handler.
+
+        The data may share the memory with each other (e.g. the unchanged columns in the copy-on-write mode, or the
+        data not modified by any processor), so the memory is attributed to the first data using it in the order of
+        raw, infer and learn.
+
+        Returns
+        -------
+        pd.DataFrame:
+            indexed by the data key with columns
+
+            - `nbytes`: the bytes of the memory used by the data
+            - `own_nbytes`: the bytes of the memory which is not shared with the previous data
+
+            The last row `total` is the memory used by the handler.
+            Only the data stored as `pd.DataFrame` is reported.
+        """
+        seen = set()
+        report = {}
+        for data_key, attr in self.ATTR_MAP.items():
+            if not isinstance(self.__dict__.get(attr), pd.DataFrame):
+                # the data is not loaded or is kept in other storages (e.g. `HashingStockStorage`)
+                continue
+            buffers = get_df_buffers(getattr(self, attr))
+            report[data_key] = {
+                "nbytes": sum(buffers.values()),
+                "own_nbytes": sum(nbytes for key, nbytes in buffers.items() if key not in seen),
+            }
+            seen.update(buffers)
+        report = pd.DataFrame.from_dict(report, orient="index", columns=["nbytes", "own_nbytes"])
+        report.loc["total"] = [report["own_nbytes"].sum()] * 2
+        return report
+
+    def _get_proc_l(self, data_key: DATA_KEY_TYPE = DataHandlerABC.DK_I) -> List[processor_module.Processor]:
+        """get the processors to generate the data of `data_key` from the raw data (please refer to `process_data`)"""
+        if data_key == self.DK_R:
+            return []
+        if data_key == self.DK_I:
+            return self.shared_processors + self.infer_processors
+        if self.process_type == DataHandlerLP.PTYPE_I:
+            return self.shared_processors + self.learn_processors
+        elif self.process_type == DataHandlerLP.PTYPE_A:
+            return self.shared_processors + self.infer_processors + self.learn_processors
+        raise NotImplementedError(f"This type of input is not supported")
+
+    @staticmethod
+    def _apply_proc_l(df: pd.DataFrame, proc_l: List[processor_module.Processor]) -> pd.DataFrame:
+        for proc in proc_l:
+            df = proc(df)
+        return df
+
+    def fit_chunked(self, chunk_size: int = 250):
+        """
+        fit the processors with the data loaded chunk by chunk in time (the first pass of the streaming mode)
+
+        The processors are fitted one by one like `fit_process_data`: the input of a processor is the output of the
+        previous processors. Only the data in the fitting time range of the processor is loaded
+        (please refer to `Processor.fit_chunks`).
+
+        As the input of a processor depends on the fitted parameters of the previous ones, the data is loaded from
+        the data loader once for each learnable processor, i.e. the cost is one pass per learnable processor (the
+        processors which are not learnable are skipped).
+
+        Parameters
+        ----------
+        chunk_size : int
+            the number of periods of the calendar in each chunk.
+        """
+        learn_prev_l = (
+            self._get_proc_l(self.DK_I) if self.process_type == DataHandlerLP.PTYPE_A else self.shared_processors
+        )
+        flow = []
+        for proc_l, prev_l in [
+            (self.shared_processors, []),
+            (self.infer_processors, self.shared_processors),
+            (self.learn_processors, learn_prev_l),
+        ]:
+            flow.extend((proc, prev_l + proc_l[:i]) for i, proc in enumerate(proc_l))
+        for proc, prev_l in flow:
+            if not proc.is_learnable():
+                continue
+            chunks = (
+                self._apply_proc_l(df, prev_l)
+                for df in self._iter_raw_chunks(
+                    getattr(proc, "fit_start_time", None), getattr(proc, "fit_end_time", None), chunk_size
+                )
+            )
+            with TimeInspector.logt(f"{proc.__class__.__name__}"):
+                proc.fit_chunks(chunks)
+        self._chunk_fitted = True
+
+    def _iter_raw_chunks(self, start_time=None, end_time=None, chunk_size: int = 250) -> Iterator[pd.DataFrame]:
+        for chunk_start, chunk_end in self._get_chunk_ranges(start_time, end_time, chunk_size):
+            df = super()._load_chunk(chunk_start, chunk_end)
+            if len(df) > 0:
+                yield df
+
+    def _is_data_loaded(self) -> bool:
+        return "_infer" in self.__dict__
+
+    def _load_chunk(self, start_time, end_time, data_key: DATA_KEY_TYPE = DataHandlerABC.DK_I) -> pd.DataFrame:
+        if not getattr(self, "_chunk_fitted", False):
+            with TimeInspector.logt("fit processors chunk by chunk"):
+                self.fit_chunked()
+        df = super()._load_chunk(start_time, end_time, data_key)
+        if len(df) == 0:
+            return df
+        return self._apply_proc_l(df, self._get_proc_l(data_key))
 
     def config(self, processor_kwargs: dict = None, **kwargs):
         """
@@ -2,7 +2,10 @@
 # Licensed under the MIT License.
 
 import abc
-from typing import Union, Text, Optional
+import tempfile
+import warnings
+from functools import partial
+from typing import Iterable, Union, Text, Optional
 import numpy as np
 import pandas as pd
 
@@ -32,6 +35,132 @@ def get_group_columns(df: pd.DataFrame, group: Union[Text, None]):
         return df.columns[df.columns.get_loc(group)]
 
 
+class _DatetimeSegments:
+    """
+    The rows of a data frame grouped by `datetime` for the vectorized cross sectional processors.
+
+    The rows are sorted by `datetime` once, then the rows of each date are a contiguous segment and the cross sectional
+    statistics are computed by segment-wise reductions on the whole value array instead of calling a Python function
+    on each date. The order statistics (median and rank) sort the segments padded to the same length with NaN.
+    """
+
+    # the max number of values processed at once, to bound the memory of the float64 intermediate arrays
+    BLOCK_SIZE = 2**24
+
+    def __init__(self, codes: np.ndarray):
+        """
+        Parameters
+        ----------
+        codes : np.ndarray
+            the group codes of the rows
+        """
+        self.n_rows = len(codes)
+        if self.n_rows > 1 and np.any(codes[1:] < codes[:-1]):
+            self.order = np.argsort(codes, kind="stable")
+            codes = codes[self.order]
+        else:
+            self.order = None
+        self.starts = np.flatnonzero(np.diff(codes, prepend=codes[:1] - 1))
+        self.lens = np.diff(np.append(self.starts, self.n_rows))
+        self.seg_ids = np.repeat(np.arange(len(self.starts)), self.lens)
+        # the position of the rows in the segments
+        self.pos = np.arange(self.n_rows) - self.repeat(self.starts)
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame, cols) -> Optional["_DatetimeSegments"]:
+        """Return None if the vectorized cross sectional operations are not applicable to the data"""
+        if len(df) == 0 or "datetime" not in df.index.names:
+            return None
+        if not all(pd.api.types.is_float_dtype(dtype) for dtype in df[cols].dtypes):
+            return None
+        if isinstance(df.index, pd.MultiIndex):
+            codes = df.index.codes[df.index.names.index("datetime")]
+        else:
+            codes = pd.factorize(df.index)[0]
+        if np.any(codes < 0):
+            # the rows with NaN datetime are dropped by `groupby`
+            return None
+        return cls(np.asarray(codes))
+
+    def apply(self, values: np.ndarray, func, dtype=None) -> np.ndarray:
+        """
+        Apply `func` on the blocks of columns of `values`.
+
+        `func` takes the float64 values sorted by datetime with shape (n_rows, n_cols) and returns the transformed
+        values with the same shape. The result is in the original order of the rows.
+        """
+        out = np.empty(values.shape, dtype=values.dtype if dtype is None else dtype)
+        step = max(1, self.BLOCK_SIZE // max(1, self.n_rows))
+        for i in range(0, values.shape[1], step):
+            block = values[:, i : i + step]
+            if self.order is not None:
+                block = block[self.order]
+            res = func(block.astype(np.float64))
+            if self.order is None:
+                out[:, i : i + step] = res
+            else:
+                out[self.order, i : i + step] = res
+        return out
+
+    def repeat(self, stats: np.ndarray) -> np.ndarray:
+        """broadcast the statistics of the segments to the rows"""
+        return np.repeat(stats, self.lens, axis=0)
+
+    def pad(self, x: np.ndarray) -> np.ndarray:
+        """reshape the values of a column to (n_segments, max_len) padded with NaN"""
+        padded = np.full((len(self.starts), self.lens.max()), np.nan)
+        padded[self.seg_ids, self.pos] = x
+        return padded
+
+    def count(self, x: np.ndarray) -> np.ndarray:
+        return np.add.reduceat(~np.isnan(x), self.starts, axis=0)
+
+    def mean(self, x: np.ndarray) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.add.reduceat(np.nan_to_num(x), self.starts, axis=0) / self.count(x)
+
+    def std(self, x: np.ndarray, mean: np.ndarray) -> np.ndarray:
+        """the sample standard deviation (ddof=1) like `pandas.Series.std`"""
+        dev = np.nan_to_num(x - self.repeat(mean))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.sqrt(np.add.reduceat(dev * dev, self.starts, axis=0) / (self.count(x) - 1))
+
+    def median(self, x: np.ndarray) -> np.ndarray:
+        cnt = self.count(x)
+        # the segments without valid values get NaN, which is at the first position of their padded rows
+        lo, hi = np.maximum(cnt - 1, 0) // 2, cnt // 2
+        rows = np.arange(len(self.starts))
+        med = np.empty(cnt.shape)
+        for j in range(x.shape[1]):
+            sorted_x = np.sort(self.pad(x[:, j]), axis=1)  # NaN goes last
+            med[:, j] = (sorted_x[rows, lo[:, j]] + sorted_x[rows, hi[:, j]]) / 2
+        return med
+
+    def rank_pct(self, x: np.ndarray) -> np.ndarray:
+        """the percentile ranks (the ties get the average rank) like `groupby(...).rank(pct=True)`"""
+        cnt = self.count(x)
+        out = np.empty(x.shape)
+        for j in range(x.shape[1]):
+            padded = self.pad(x[:, j])
+            idx = np.argsort(padded, axis=1)
+            sorted_x = np.take_along_axis(padded, idx, axis=1)
+            cols = np.arange(sorted_x.shape[1])
+            # the runs of the tied values
+            new_run = np.ones(sorted_x.shape, dtype=bool)
+            new_run[:, 1:] = sorted_x[:, 1:] != sorted_x[:, :-1]
+            end_run = np.ones(sorted_x.shape, dtype=bool)
+            end_run[:, :-1] = new_run[:, 1:]
+            run_start = np.maximum.accumulate(np.where(new_run, cols, 0), axis=1)
+            run_end = np.minimum.accumulate(np.where(end_run, cols, len(cols))[:, ::-1], axis=1)[:, ::-1]
+            rank = (run_start + run_end) / 2 + 1
+            with np.errstate(invalid="ignore", divide="ignore"):
+                rank /= cnt[:, j : j + 1]
+            rank[np.isnan(sorted_x)] = np.nan
+            np.put_along_axis(padded, idx, rank, axis=1)
+            out[:, j] = padded[self.seg_ids, self.pos]
+        return out
+
+
 class Processor(Serializable):
     def fit(self, df: pd.DataFrame = None):
         """
@@ -79,6 +208,32 @@ class Processor(Serializable):
         """
         return False
 
+    def is_learnable(self) -> bool:
+        """
+        Does the processor learn parameters from the data (i.e. `fit` is implemented)
+
+        The handler skips fitting the processors which are not learnable in the streaming mode.
+        """
+        return type(self).fit is not Processor.fit
+
+    def fit_chunks(self, chunks: Iterable[pd.DataFrame]):
+        """
+        learn data processing parameters from the data split into chunks in time.
+        It is used in the streaming mode of `DataHandlerLP` (please refer to `DataHandlerLP.fit_chunked`).
+
+        By default, the chunks are concatenated and passed to `fit`. The processors which can learn the parameters
+        incrementally should override it, so the whole data is not held in memory.
+
+        Parameters
+        ----------
+        chunks : Iterable[pd.DataFrame]
+            the chunks in the fitting time range of the processor (if any) in time order.
+        """
+        chunks = list(chunks)
+        if len(chunks) == 0:
+            raise ValueError("No data to fit the processor")
+        self.fit(pd.concat(chunks))
+
     def config(self, **kwargs):
         attr_list = {"fit_start_time", "fit_end_time"}
         for k, v in kwargs.items():
@@ -204,8 +359,28 @@ class MinMaxNorm(Processor):
     def fit(self, df: pd.DataFrame = None):
         df = fetch_df_by_index(df, slice(self.fit_start_time, self.fit_end_time), level="datetime")
         cols = get_group_columns(df, self.fields_group)
-        self.min_val = np.nanmin(df[cols].values, axis=0)
-        self.max_val = np.nanmax(df[cols].values, axis=0)
+        self._set_params(cols, np.nanmin(df[cols].values, axis=0), np.nanmax(df[cols].values, axis=0))
+
+    def fit_chunks(self, chunks: Iterable[pd.DataFrame]):
+        cols, min_val, max_val = None, None, None
+        for df in chunks:
+            df = fetch_df_by_index(df, slice(self.fit_start_time, self.fit_end_time), level="datetime")
+            if len(df) == 0:
+                continue
+            cols = get_group_columns(df, self.fields_group)
+            with warnings.catch_warnings():
+                # the columns with all NaN values in a chunk
+                warnings.simplefilter("ignore", category=RuntimeWarning)
+                _min, _max = np.nanmin(df[cols].values, axis=0), np.nanmax(df[cols].values, axis=0)
+            min_val = _min if min_val is None else np.fmin(min_val, _min)
+            max_val = _max if max_val is None else np.fmax(max_val, _max)
+        if cols is None:
+            raise ValueError("No data to fit the processor")
+        self._set_params(cols, min_val, max_val)
+
+    def _set_params(self, cols, min_val, max_val):
+        self.min_val = min_val
+        self.max_val = max_val
         self.ignore = self.min_val == self.max_val
         # To improve the speed, we set the value of `min_val` to `0` for the columns that do not need to be processed,
         # and the value of `max_val` to `1`, when using `(x - min_val) / (max_val - min_val)` for uniform calculation,
@@ -238,8 +413,36 @@ class ZScoreNorm(Processor):
     def fit(self, df: pd.DataFrame = None):
         df = fetch_df_by_index(df, slice(self.fit_start_time, self.fit_end_time), level="datetime")
         cols = get_group_columns(df, self.fields_group)
-        self.mean_train = np.nanmean(df[cols].values, axis=0)
-        self.std_train = np.nanstd(df[cols].values, axis=0)
+        self._set_params(cols, np.nanmean(df[cols].values, axis=0), np.nanstd(df[cols].values, axis=0))
+
+    def fit_chunks(self, chunks: Iterable[pd.DataFrame]):
+        # the statistics of the chunks are combined by Chan's parallel algorithm
+        cols, count, mean, m2 = None, 0, 0.0, 0.0
+        for df in chunks:
+            df = fetch_df_by_index(df, slice(self.fit_start_time, self.fit_end_time), level="datetime")
+            if len(df) == 0:
+                continue
+            cols = get_group_columns(df, self.fields_group)
+            values = df[cols].values.astype(np.float64)
+            _count = np.sum(~np.isnan(values), axis=0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                _mean = np.nansum(values, axis=0) / _count
+                _m2 = np.nansum((values - _mean) ** 2, axis=0)
+                total = count + _count
+                delta = np.where(_count > 0, _mean - mean, 0.0)
+                mean = mean + np.where(_count > 0, delta * _count / total, 0.0)
+                m2 = m2 + np.where(_count > 0, _m2 + delta**2 * count * _count / total, 0.0)
+            count = total
+        if cols is None:
+            raise ValueError("No data to fit the processor")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, mean, np.nan)
+            std = np.sqrt(m2 / count)
+        self._set_params(cols, mean.astype(np.float32), std.astype(np.float32))
+
+    def _set_params(self, cols, mean_train, std_train):
+        self.mean_train = mean_train
+        self.std_train = std_train
         self.ignore = self.std_train == 0
         # To improve the speed, we set the value of `std_train` to `1` for the columns that do not need to be processed,
         # and the value of `mean_train` to `0`, when using `(x - mean_train) / std_train` for uniform calculation,
@@ -268,8 +471,14 @@ class RobustZScoreNorm(Processor):
 
     Reference:
         https://en.wikipedia.org/wiki/Median_absolute_deviation.
+
+    In the streaming mode (please refer to `fit_chunks`), the values are spilled to a temporary file, so only
+    `BLOCK_BYTES` of them are held in memory when calculating the medians.
     """
 
+    # the size limit of the block of columns read from the temporary file when fitting chunk by chunk
+    BLOCK_BYTES = 256 * 1024**2
+
     def __init__(self, fit_start_time, fit_end_time, fields_group=None, clip_outlier=True):
         # NOTE: correctly set the `fit_start_time` and `fit_end_time` is very important !!!
         # `fit_end_time` **must not** include any information from the test data!!!
@@ -287,6 +496,42 @@ class RobustZScoreNorm(Processor):
         self.std_train += EPS
         self.std_train *= 1.4826
 
+    def fit_chunks(self, chunks: Iterable[pd.DataFrame]):
+        # the medians can not be merged from the chunks, so each chunk is saved column by column and the statistics
+        # are calculated on blocks of columns; the result is the same as `fit`
+        cols, blocks = None, []
+        with tempfile.TemporaryFile() as f:
+            for df in chunks:
+                df = fetch_df_by_index(df, slice(self.fit_start_time, self.fit_end_time), level="datetime")
+                if len(df) == 0:
+                    continue
+                cols = get_group_columns(df, self.fields_group)
+                values = np.ascontiguousarray(df[cols].values.T)
+                blocks.append((f.tell(), values.shape[1], values.dtype))
+                f.write(values.tobytes())
+            if cols is None:
+                raise ValueError("No data to fit the processor")
+            dtype = np.result_type(*(b[2] for b in blocks))
+            n_rows = sum(b[1] for b in blocks)
+            step = max(self.BLOCK_BYTES // max(n_rows * dtype.itemsize, 1), 1)
+            mean_train, std_train = [], []
+            for start in range(0, len(cols), step):
+                n_cols = min(step, len(cols) - start)
+                X = np.empty((n_cols, n_rows), dtype=dtype)
+                pos = 0
+                for offset, rows, _dtype in blocks:
+                    f.seek(offset + start * rows * _dtype.itemsize)
+                    X[:, pos : pos + rows] = np.fromfile(f, dtype=_dtype, count=n_cols * rows).reshape(n_cols, rows)
+                    pos += rows
+                median = np.nanmedian(X, axis=1)
+                mean_train.append(median)
+                std_train.append(np.nanmedian(np.abs(X - median[:, None]), axis=1))
+        self.cols = cols
+        self.mean_train = np.concatenate(mean_train)
+        self.std_train = np.concatenate(std_train)
+        self.std_train += EPS
+        self.std_train *= 1.4826
+
     def __call__(self, df):
         X = df[self.cols]
         X -= self.mean_train
@@ -308,6 +553,16 @@ class CSZScoreNorm(Processor):
             self.zscore_func = robust_zscore
         else:
             raise NotImplementedError(f"This type of input is not supported")
+        self.method = method
+
+    def _vectorized_zscore(self, segs: _DatetimeSegments, x: np.ndarray) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if getattr(self, "method", "zscore") == "zscore":
+                mean = segs.mean(x)
+                return (x - segs.repeat(mean)) / segs.repeat(segs.std(x, mean))
+            x = x - segs.repeat(segs.median(x))
+            mad = segs.median(np.abs(x))
+            return np.clip(x / segs.repeat(mad) / 1.4826, -3, 3)
 
     def __call__(self, df):
         # try not modify original dataframe
@@ -319,7 +574,11 @@ class CSZScoreNorm(Processor):
         with pd.option_context("mode.chained_assignment", None):
             for g in self.fields_group:
                 cols = get_group_columns(df, g)
-                df[cols] = df[cols].groupby("datetime", group_keys=False).apply(self.zscore_func)
+                segs = _DatetimeSegments.from_df(df, cols)
+                if segs is None:
+                    df[cols] = df[cols].groupby("datetime", group_keys=False).apply(self.zscore_func)
+                else:
+                    df[cols] = segs.apply(df[cols].values, partial(self._vectorized_zscore, segs))
         return df
 
 
@@ -352,7 +611,12 @@ class CSRankNorm(Processor):
     def __call__(self, df):
         # try not modify original dataframe
         cols = get_group_columns(df, self.fields_group)
-        t = df[cols].groupby("datetime", group_keys=False).rank(pct=True)
+        segs = _DatetimeSegments.from_df(df, cols)
+        if segs is None:
+            t = df[cols].groupby("datetime", group_keys=False).rank(pct=True)
+        else:
+            # the ranks are float64 like `groupby(...).rank`
+            t = pd.DataFrame(segs.apply(df[cols].values, segs.rank_pct, dtype=np.float64), index=df.index, columns=cols)
         t -= 0.5
         t *= 3.46  # NOTE: towards unit std
         df[cols] = t
@@ -367,7 +631,11 @@ class CSZFillna(Processor):
 
     def __call__(self, df):
         cols = get_group_columns(df, self.fields_group)
-        df[cols] = df[cols].groupby("datetime", group_keys=False).apply(lambda x: x.fillna(x.mean()))
+        segs = _DatetimeSegments.from_df(df, cols)
+        if segs is None:
+            df[cols] = df[cols].groupby("datetime", group_keys=False).apply(lambda x: x.fillna(x.mean()))
+        else:
+            df[cols] = segs.apply(df[cols].values, lambda x: np.where(np.isnan(x), segs.repeat(segs.mean(x)), x))
         return df
 
 
@@ -1,12 +1,13 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 from __future__ import annotations
+import numpy as np
 import pandas as pd
-from typing import Union, List, TYPE_CHECKING
-from qlib.utils import init_instance_by_config
+from typing import Optional, Tuple, Union, List, TYPE_CHECKING
+from qlib.utils import get_callable_kwargs, hash_args, init_instance_by_config
 
 if TYPE_CHECKING:
-    from qlib.data.dataset import DataHandler
+    from qlib.data.dataset import DataHandler, Dataset
 
 
 def get_level_index(df: pd.DataFrame, level: Union[str, int]) -> int:
@@ -116,6 +117,37 @@ def convert_index_format(df: Union[pd.DataFrame, pd.Series], level: str = "datet
     return df
 
 
+def is_copy_on_write_enabled() -> bool:
+    """Is the Copy-on-Write mode of pandas enabled (it is always enabled since pandas 3.0)"""
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return getattr(pd.options.mode, "copy_on_write", False) is True
+
+
+def get_df_buffers(df: pd.DataFrame) -> dict:
+    """
+    Get the memory buffers used by the data frame (the arrays of the index and the values of the columns)
+
+    Returns
+    -------
+    dict:
+        the id of the buffer -> the bytes of the buffer.
+        The columns sharing the same buffer (e.g. the columns of the same block, or the columns shared with other
+        data frames) have the same id.
+    """
+    if isinstance(df.index, pd.MultiIndex):
+        arrays = list(df.index.codes) + [level.to_numpy() for level in df.index.levels]
+    else:
+        arrays = [df.index.to_numpy()]
+    arrays.extend(df.iloc[:, i].to_numpy() for i in range(df.shape[1]))
+    buffers = {}
+    for arr in arrays:
+        while isinstance(arr.base, np.ndarray):
+            arr = arr.base
+        buffers[id(arr)] = arr.nbytes
+    return buffers
+
+
 def init_task_handler(task: dict) -> DataHandler:
     """
     initialize the handler part of the task **inplace**
@@ -140,3 +172,116 @@ def init_task_handler(task: dict) -> DataHandler:
         return handler
     else:
         raise ValueError("The task does not contains a handler part.")
+
+
+class DatasetReuse:
+    """
+    Reuse the loaded and processed handler among the datasets of the tasks which differ only in time ranges (e.g. the
+    rolling tasks generated by `RollingGen`).
+
+    The datasets are grouped by their configs without `segments` and the time ranges of the handler (i.e.
+    `start_time`, `end_time`, `fit_start_time` and `fit_end_time`). The handler of a group is loaded and processed
+    only once over the time range covering all the given tasks of the group, then each dataset is created on it with
+    its own `segments`. The processors depending on `fit_start_time` and `fit_end_time` are fitted again only when the
+    fitting time range is different from the previous dataset's.
+
+    NOTE: only the handler given by config in `DatasetH` is reused. The time range of the reused handler is the one
+    of the whole group instead of the task's.
+    """
+
+    HANDLER_TIME_KEYS = ("start_time", "end_time")
+    HANDLER_FIT_KEYS = ("fit_start_time", "fit_end_time")
+
+    def __init__(self, tasks: Optional[List[dict]] = None):
+        """
+        Parameters
+        ----------
+        tasks : List[dict]
+            the tasks to be trained. The handler of a group will be loaded over the time range covering all of them.
+        """
+        self._time_range = {}  # key of the group -> the time range covering the tasks
+        self._cache = {}  # key of the group -> (handler, time range, fitting time range)
+        for task in tasks or []:
+            dataset_config = task.get("dataset")
+            key = self._get_key(dataset_config)
+            if key is not None:
+                h_kwargs = dataset_config["kwargs"]["handler"].get("kwargs", {})
+                self._time_range[key] = self._union_range(self._time_range.get(key), self._get_range(h_kwargs))
+
+    def _get_key(self, dataset_config) -> Optional[str]:
+        # avoid recursive import
+        from . import DatasetH  # pylint: disable=C0415
+
+        if not isinstance(dataset_config, dict) or not isinstance(dataset_config.get("kwargs"), dict):
+            return None
+        h_conf = dataset_config["kwargs"].get("handler")
+        if not isinstance(h_conf, dict) or not isinstance(h_conf.get("kwargs", {}), dict):
+            return None
+        klass, _ = get_callable_kwargs(dataset_config)
+        if not issubclass(klass, DatasetH):
+            return None
+        ignored = self.HANDLER_TIME_KEYS + self.HANDLER_FIT_KEYS
+        h_kwargs = {k: v for k, v in h_conf.get("kwargs", {}).items() if k not in ignored}
+        d_kwargs = {k: v for k, v in dataset_config["kwargs"].items() if k != "segments"}
+        d_kwargs["handler"] = {**h_conf, "kwargs": h_kwargs}
+        return hash_args({**dataset_config, "kwargs": d_kwargs})
+
+    @classmethod
+    def _get_range(cls, h_kwargs: dict) -> Tuple:
+        return tuple(h_kwargs.get(k) for k in cls.HANDLER_TIME_KEYS)
+
+    @staticmethod
+    def _union_range(rng: Optional[Tuple], other: Tuple) -> Tuple:
+        if rng is None:
+            return other
+        # None means unbounded
+        start = None if rng[0] is None or other[0] is None else min(rng[0], other[0], key=pd.Timestamp)
+        end = None if rng[1] is None or other[1] is None else max(rng[1], other[1], key=pd.Timestamp)
+        return start, end
+
+    @staticmethod
+    def _covers(rng: Tuple, other: Tuple) -> bool:
+        return (rng[0] is None or other[0] is not None and pd.Timestamp(rng[0]) <= pd.Timestamp(other[0])) and (
+            rng[1] is None or other[1] is not None and pd.Timestamp(rng[1]) >= pd.Timestamp(other[1])
+        )
+
+    def get(self, dataset_config: dict) -> Dataset:
+        """
+        Get the dataset of a task
+
+        Parameters
+        ----------
+        dataset_config : dict
+            the config of the dataset (i.e. `task["dataset"]`)
+
+        Returns
+        -------
+        Dataset:
+            the dataset; its handler is shared with the previous datasets of the same group if possible
+        """
+        # avoid recursive import
+        from . import Dataset  # pylint: disable=C0415
+        from .handler import DataHandler, DataHandlerLP  # pylint: disable=C0415
+
+        key = self._get_key(dataset_config)
+        if key is None:
+            return init_instance_by_config(dataset_config, accept_types=Dataset)
+        h_conf = dataset_config["kwargs"]["handler"]
+        h_kwargs = h_conf.get("kwargs", {})
+        rng = self._get_range(h_kwargs)
+        fit_kwargs = {k: h_kwargs[k] for k in self.HANDLER_FIT_KEYS if k in h_kwargs}
+        if key not in self._cache or not self._covers(self._cache[key][1], rng):
+            rng = self._union_range(self._time_range.get(key), rng)
+            h_kwargs = {**h_kwargs, **dict(zip(self.HANDLER_TIME_KEYS, rng))}
+            handler = init_instance_by_config({**h_conf, "kwargs": h_kwargs}, accept_types=DataHandler)
+            self._cache[key] = (handler, rng, fit_kwargs)
+        else:
+            handler, rng, prev_fit_kwargs = self._cache[key]
+            if fit_kwargs != prev_fit_kwargs and isinstance(handler, DataHandlerLP):
+                if any(hasattr(p, "fit_start_time") for p in handler.get_all_processors()):
+                    handler.config(processor_kwargs=fit_kwargs)
+                    handler.refit()
+                self._cache[key] = (handler, rng, fit_kwargs)
+        return init_instance_by_config(
+            {**dataset_config, "kwargs": {**dataset_config["kwargs"], "handler": handler}}, accept_types=Dataset
+        )
@@ -9,13 +9,27 @@ import numpy as np
 import pandas as pd
 
 from typing import Union, List, Type
-from scipy.stats import percentileofscore
 from .base import Expression, ExpressionOps, Feature, PFeature
 from ..log import get_module_logger
 from ..utils import get_callable_kwargs
 
 try:
-    from ._libs.rolling import rolling_slope, rolling_rsquare, rolling_resi
+    from ._libs.rolling import (
+        rolling_slope,
+        rolling_rsquare,
+        rolling_resi,
+        rolling_skew,
+        rolling_kurt,
+        rolling_quantile,
+        rolling_median,
+        rolling_mad,
+        rolling_rank,
+        rolling_idxmax,
+        rolling_idxmin,
+        rolling_wma,
+        rolling_corr,
+        rolling_cov,
+    )
     from ._libs.expanding import expanding_slope, expanding_rsquare, expanding_resi
 except ImportError:
     print(
@@ -33,6 +47,27 @@ except ValueError:
 np.seterr(invalid="ignore")
 
 
+def _apply_by_column(func, panel: pd.DataFrame, *args) -> pd.DataFrame:
+    """apply a 1-D rolling kernel (e.g. `rolling_slope`) to each instrument of a panel"""
+    values = np.empty(panel.shape, dtype=np.float64)
+    for i in range(panel.shape[1]):
+        values[:, i] = func(panel.iloc[:, i].values, *args)
+    return pd.DataFrame(values, index=panel.index, columns=panel.columns)
+
+
+def _apply_pair_by_column(func, panel_left: pd.DataFrame, panel_right: pd.DataFrame, *args) -> pd.DataFrame:
+    """apply a 1-D pair rolling kernel (e.g. `rolling_corr`) to each instrument of two panels"""
+    values = np.empty(panel_left.shape, dtype=np.float64)
+    for i in range(panel_left.shape[1]):
+        values[:, i] = func(panel_left.iloc[:, i].values, panel_right.iloc[:, i].values, *args)
+    return pd.DataFrame(values, index=panel_left.index, columns=panel_left.columns)
+
+
+def _kernel_window(N: int, length: int) -> int:
+    """the window of the rolling kernels; `N == 0` (expanding) is a window covering all the data"""
+    return N if N != 0 else max(length, 1)
+
+
 #################### Element-Wise Operator ####################
 class ElemOperator(ExpressionOps):
     """Element-wise Operator
@@ -118,6 +153,10 @@ class NpElemOperator(ElemOperator):
         series = self.feature.load(instrument, start_index, end_index, *args)
         return getattr(np, self.func)(series)
 
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        panel = self.feature.load_panel(instruments, start_index, end_index, freq, cache)
+        return getattr(np, self.func)(panel)
+
 
 class Abs(NpElemOperator):
     """Feature Absolute Value
@@ -163,6 +202,10 @@ class Sign(NpElemOperator):
         series = series.astype(np.float32)
         return getattr(np, self.func)(series)
 
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        panel = self.feature.load_panel(instruments, start_index, end_index, freq, cache)
+        return getattr(np, self.func)(panel.astype(np.float32))
+
 
 class Log(NpElemOperator):
     """Feature Log
@@ -334,6 +377,17 @@ class NpPairOperator(PairOperator):
                 get_module_logger("ops").debug(warning_info)
         return res
 
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        if isinstance(self.feature_left, (Expression,)):
+            panel_left = self.feature_left.load_panel(instruments, start_index, end_index, freq, cache)
+        else:
+            panel_left = self.feature_left  # numeric value
+        if isinstance(self.feature_right, (Expression,)):
+            panel_right = self.feature_right.load_panel(instruments, start_index, end_index, freq, cache)
+        else:
+            panel_right = self.feature_right
+        return getattr(np, self.func)(panel_left, panel_right)
+
 
 class Power(NpPairOperator):
     """Power Operator
@@ -670,6 +724,20 @@ class If(ExpressionOps):
         series = pd.Series(np.where(series_cond, series_left, series_right), index=series_cond.index)
         return series
 
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        panel_cond = self.condition.load_panel(instruments, start_index, end_index, freq, cache)
+        if isinstance(self.feature_left, (Expression,)):
+            panel_left = self.feature_left.load_panel(instruments, start_index, end_index, freq, cache)
+        else:
+            panel_left = self.feature_left
+        if isinstance(self.feature_right, (Expression,)):
+            panel_right = self.feature_right.load_panel(instruments, start_index, end_index, freq, cache)
+        else:
+            panel_right = self.feature_right
+        return pd.DataFrame(
+            np.where(panel_cond, panel_left, panel_right), index=panel_cond.index, columns=panel_cond.columns
+        )
+
     def get_longest_back_rolling(self):
         if isinstance(self.feature_left, (Expression,)):
             left_br = self.feature_left.get_longest_back_rolling()
@@ -754,6 +822,18 @@ class Rolling(ExpressionOps):
         # series[isnull] = np.nan
         return series
 
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        # NOTE: the rows before the first data of an instrument are NaN in the panel.
+        # They are skipped by pandas rolling (`min_periods=1`), so the result is the same as the per-instrument one.
+        panel = self.feature.load_panel(instruments, start_index, end_index, freq, cache)
+        if isinstance(self.N, int) and self.N == 0:
+            panel = getattr(panel.expanding(min_periods=1), self.func)()
+        elif isinstance(self.N, float) and 0 < self.N < 1:
+            panel = panel.ewm(alpha=self.N, min_periods=1).mean()
+        else:
+            panel = getattr(panel.rolling(self.N, min_periods=1), self.func)()
+        return panel
+
     def get_longest_back_rolling(self):
         if self.N == 0:
             return np.inf
@@ -808,6 +888,12 @@ class Ref(Rolling):
             series = series.shift(self.N)  # copy
         return series
 
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        if self.N == 0:
+            # the first value of each instrument depends on its own data range
+            return super(Rolling, self)._load_panel_internal(instruments, start_index, end_index, freq, cache)
+        return self.feature.load_panel(instruments, start_index, end_index, freq, cache).shift(self.N)
+
     def get_longest_back_rolling(self):
         if self.N == 0:
             return np.inf
@@ -925,6 +1011,14 @@ class Skew(Rolling):
             raise ValueError("The rolling window size of Skewness operation should >= 3")
         super(Skew, self).__init__(feature, N, "skew")
 
+    def _load_internal(self, instrument, start_index, end_index, *args):
+        series = self.feature.load(instrument, start_index, end_index, *args)
+        return pd.Series(rolling_skew(series.values, _kernel_window(self.N, len(series))), index=series.index)
+
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        panel = self.feature.load_panel(instruments, start_index, end_index, freq, cache)
+        return _apply_by_column(rolling_skew, panel, _kernel_window(self.N, len(panel)))
+
 
 class Kurt(Rolling):
     """Rolling Kurtosis
@@ -947,6 +1041,14 @@ class Kurt(Rolling):
             raise ValueError("The rolling window size of Kurtosis operation should >= 5")
         super(Kurt, self).__init__(feature, N, "kurt")
 
+    def _load_internal(self, instrument, start_index, end_index, *args):
+        series = self.feature.load(instrument, start_index, end_index, *args)
+        return pd.Series(rolling_kurt(series.values, _kernel_window(self.N, len(series))), index=series.index)
+
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        panel = self.feature.load_panel(instruments, start_index, end_index, freq, cache)
+        return _apply_by_column(rolling_kurt, panel, _kernel_window(self.N, len(panel)))
+
 
 class Max(Rolling):
     """Rolling Max
@@ -989,11 +1091,8 @@ class IdxMax(Rolling):
 
     def _load_internal(self, instrument, start_index, end_index, *args):
         series = self.feature.load(instrument, start_index, end_index, *args)
-        if self.N == 0:
-            series = series.expanding(min_periods=1).apply(lambda x: x.argmax() + 1, raw=True)
-        else:
-            series = series.rolling(self.N, min_periods=1).apply(lambda x: x.argmax() + 1, raw=True)
-        return series
+        # the same as `x.argmax() + 1` of each window
+        return pd.Series(rolling_idxmax(series.values, _kernel_window(self.N, len(series))), index=series.index)
 
 
 class Min(Rolling):
@@ -1037,11 +1136,8 @@ class IdxMin(Rolling):
 
     def _load_internal(self, instrument, start_index, end_index, *args):
         series = self.feature.load(instrument, start_index, end_index, *args)
-        if self.N == 0:
-            series = series.expanding(min_periods=1).apply(lambda x: x.argmin() + 1, raw=True)
-        else:
-            series = series.rolling(self.N, min_periods=1).apply(lambda x: x.argmin() + 1, raw=True)
-        return series
+        # the same as `x.argmin() + 1` of each window
+        return pd.Series(rolling_idxmin(series.values, _kernel_window(self.N, len(series))), index=series.index)
 
 
 class Quantile(Rolling):
@@ -1069,11 +1165,12 @@ class Quantile(Rolling):
 
     def _load_internal(self, instrument, start_index, end_index, *args):
         series = self.feature.load(instrument, start_index, end_index, *args)
-        if self.N == 0:
-            series = series.expanding(min_periods=1).quantile(self.qscore)
-        else:
-            series = series.rolling(self.N, min_periods=1).quantile(self.qscore)
-        return series
+        window = _kernel_window(self.N, len(series))
+        return pd.Series(rolling_quantile(series.values, window, self.qscore), index=series.index)
+
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        panel = self.feature.load_panel(instruments, start_index, end_index, freq, cache)
+        return _apply_by_column(rolling_quantile, panel, _kernel_window(self.N, len(panel)), self.qscore)
 
 
 class Med(Rolling):
@@ -1095,6 +1192,18 @@ class Med(Rolling):
     def __init__(self, feature, N):
         super(Med, self).__init__(feature, N, "median")
 
+    def _load_internal(self, instrument, start_index, end_index, *args):
+        if isinstance(self.N, float) and 0 < self.N < 1:
+            return super(Med, self)._load_internal(instrument, start_index, end_index, *args)
+        series = self.feature.load(instrument, start_index, end_index, *args)
+        return pd.Series(rolling_median(series.values, _kernel_window(self.N, len(series))), index=series.index)
+
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        if isinstance(self.N, float) and 0 < self.N < 1:
+            return super(Med, self)._load_panel_internal(instruments, start_index, end_index, freq, cache)
+        panel = self.feature.load_panel(instruments, start_index, end_index, freq, cache)
+        return _apply_by_column(rolling_median, panel, _kernel_window(self.N, len(panel)))
+
 
 class Mad(Rolling):
     """Rolling Mean Absolute Deviation
@@ -1117,17 +1226,11 @@ class Mad(Rolling):
 
     def _load_internal(self, instrument, start_index, end_index, *args):
         series = self.feature.load(instrument, start_index, end_index, *args)
-        # TODO: implement in Cython
-
-        def mad(x):
-            x1 = x[~np.isnan(x)]
-            return np.mean(np.abs(x1 - x1.mean()))
+        return pd.Series(rolling_mad(series.values, _kernel_window(self.N, len(series))), index=series.index)
 
-        if self.N == 0:
-            series = series.expanding(min_periods=1).apply(mad, raw=True)
-        else:
-            series = series.rolling(self.N, min_periods=1).apply(mad, raw=True)
-        return series
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        panel = self.feature.load_panel(instruments, start_index, end_index, freq, cache)
+        return _apply_by_column(rolling_mad, panel, _kernel_window(self.N, len(panel)))
 
 
 class Rank(Rolling):
@@ -1149,23 +1252,14 @@ class Rank(Rolling):
     def __init__(self, feature, N):
         super(Rank, self).__init__(feature, N, "rank")
 
-    # for compatiblity of python 3.7, which doesn't support pandas 1.4.0+ which implements Rolling.rank
     def _load_internal(self, instrument, start_index, end_index, *args):
         series = self.feature.load(instrument, start_index, end_index, *args)
+        # the same as `rolling(N).rank(pct=True)` of pandas
+        return pd.Series(rolling_rank(series.values, _kernel_window(self.N, len(series))), index=series.index)
 
-        rolling_or_expending = series.expanding(min_periods=1) if self.N == 0 else series.rolling(self.N, min_periods=1)
-        if hasattr(rolling_or_expending, "rank"):
-            return rolling_or_expending.rank(pct=True)
-
-        def rank(x):
-            if np.isnan(x[-1]):
-                return np.nan
-            x1 = x[~np.isnan(x)]
-            if x1.shape[0] == 0:
-                return np.nan
-            return percentileofscore(x1, x1[-1]) / 100
-
-        return rolling_or_expending.apply(rank, raw=True)
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        panel = self.feature.load_panel(instruments, start_index, end_index, freq, cache)
+        return _apply_by_column(rolling_rank, panel, _kernel_window(self.N, len(panel)))
 
 
 class Count(Rolling):
@@ -1215,6 +1309,12 @@ class Delta(Rolling):
             series = series - series.shift(self.N)
         return series
 
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        if self.N == 0:
+            return super(Rolling, self)._load_panel_internal(instruments, start_index, end_index, freq, cache)
+        panel = self.feature.load_panel(instruments, start_index, end_index, freq, cache)
+        return panel - panel.shift(self.N)
+
 
 # TODO:
 # support pair-wise rolling like `Slope(A, B, N)`
@@ -1253,6 +1353,13 @@ class Slope(Rolling):
             series = pd.Series(rolling_slope(series.values, self.N), index=series.index)
         return series
 
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        if self.N == 0:
+            return super(Rolling, self)._load_panel_internal(instruments, start_index, end_index, freq, cache)
+        return _apply_by_column(
+            rolling_slope, self.feature.load_panel(instruments, start_index, end_index, freq, cache), self.N
+        )
+
 
 class Rsquare(Rolling):
     """Rolling R-value Square
@@ -1282,6 +1389,13 @@ class Rsquare(Rolling):
             series.loc[np.isclose(_series.rolling(self.N, min_periods=1).std(), 0, atol=2e-05)] = np.nan
         return series
 
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        if self.N == 0:
+            return super(Rolling, self)._load_panel_internal(instruments, start_index, end_index, freq, cache)
+        _panel = self.feature.load_panel(instruments, start_index, end_index, freq, cache)
+        panel = _apply_by_column(rolling_rsquare, _panel, self.N)
+        return panel.mask(np.isclose(_panel.rolling(self.N, min_periods=1).std(), 0, atol=2e-05))
+
 
 class Resi(Rolling):
     """Rolling Regression Residuals
@@ -1310,6 +1424,13 @@ class Resi(Rolling):
             series = pd.Series(rolling_resi(series.values, self.N), index=series.index)
         return series
 
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        if self.N == 0:
+            return super(Rolling, self)._load_panel_internal(instruments, start_index, end_index, freq, cache)
+        return _apply_by_column(
+            rolling_resi, self.feature.load_panel(instruments, start_index, end_index, freq, cache), self.N
+        )
+
 
 class WMA(Rolling):
     """Rolling WMA
@@ -1332,18 +1453,8 @@ class WMA(Rolling):
 
     def _load_internal(self, instrument, start_index, end_index, *args):
         series = self.feature.load(instrument, start_index, end_index, *args)
-        # TODO: implement in Cython
-
-        def weighted_mean(x):
-            w = np.arange(len(x)) + 1
-            w = w / w.sum()
-            return np.nanmean(w * x)
-
-        if self.N == 0:
-            series = series.expanding(min_periods=1).apply(weighted_mean, raw=True)
-        else:
-            series = series.rolling(self.N, min_periods=1).apply(weighted_mean, raw=True)
-        return series
+        # the same as `np.nanmean(w * x)` of each window, where `w` is the normalized linear weights
+        return pd.Series(rolling_wma(series.values, _kernel_window(self.N, len(series))), index=series.index)
 
 
 class EMA(Rolling):
@@ -1382,6 +1493,14 @@ class EMA(Rolling):
             series = series.ewm(span=self.N, min_periods=1).mean()
         return series
 
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        if self.N == 0:
+            return super(Rolling, self)._load_panel_internal(instruments, start_index, end_index, freq, cache)
+        panel = self.feature.load_panel(instruments, start_index, end_index, freq, cache)
+        if 0 < self.N < 1:
+            return panel.ewm(alpha=self.N, min_periods=1).mean()
+        return panel.ewm(span=self.N, min_periods=1).mean()
+
 
 #################### Pair-Wise Rolling ####################
 class PairRolling(ExpressionOps):
@@ -1432,6 +1551,34 @@ class PairRolling(ExpressionOps):
             series = getattr(series_left.rolling(self.N, min_periods=1), self.func)(series_right)
         return series
 
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        if not (isinstance(self.feature_left, Expression) and isinstance(self.feature_right, Expression)):
+            return super(PairRolling, self)._load_panel_internal(instruments, start_index, end_index, freq, cache)
+        panel_left = self.feature_left.load_panel(instruments, start_index, end_index, freq, cache)
+        panel_right = self.feature_right.load_panel(instruments, start_index, end_index, freq, cache)
+        # the columns with the same instrument are paired (i.e. `pairwise=False`)
+        if self.N == 0:
+            return getattr(panel_left.expanding(min_periods=1), self.func)(panel_right, pairwise=False)
+        return getattr(panel_left.rolling(self.N, min_periods=1), self.func)(panel_right, pairwise=False)
+
+    def _load_with_kernel(self, kernel, instrument, start_index, end_index, *args):
+        """calculate with a compiled pair rolling kernel (e.g. `rolling_corr`) if both inputs are expressions"""
+        if not (isinstance(self.feature_left, Expression) and isinstance(self.feature_right, Expression)):
+            return PairRolling._load_internal(self, instrument, start_index, end_index, *args)
+        series_left = self.feature_left.load(instrument, start_index, end_index, *args)
+        series_right = self.feature_right.load(instrument, start_index, end_index, *args)
+        # the same as pandas, the series are aligned by the index
+        series_left, series_right = series_left.align(series_right)
+        window = _kernel_window(self.N, len(series_left))
+        return pd.Series(kernel(series_left.values, series_right.values, window), index=series_left.index)
+
+    def _load_panel_with_kernel(self, kernel, instruments, start_index, end_index, freq, cache):
+        if not (isinstance(self.feature_left, Expression) and isinstance(self.feature_right, Expression)):
+            return super(PairRolling, self)._load_panel_internal(instruments, start_index, end_index, freq, cache)
+        panel_left = self.feature_left.load_panel(instruments, start_index, end_index, freq, cache)
+        panel_right = self.feature_right.load_panel(instruments, start_index, end_index, freq, cache)
+        return _apply_pair_by_column(kernel, panel_left, panel_right, _kernel_window(self.N, len(panel_left)))
+
     def get_longest_back_rolling(self):
         if self.N == 0:
             return np.inf
@@ -1486,7 +1633,7 @@ class Corr(PairRolling):
         super(Corr, self).__init__(feature_left, feature_right, N, "corr")
 
     def _load_internal(self, instrument, start_index, end_index, *args):
-        res: pd.Series = super(Corr, self)._load_internal(instrument, start_index, end_index, *args)
+        res: pd.Series = self._load_with_kernel(rolling_corr, instrument, start_index, end_index, *args)
 
         # NOTE: Load uses MemCache, so calling load again will not cause performance degradation
         series_left = self.feature_left.load(instrument, start_index, end_index, *args)
@@ -1497,6 +1644,15 @@ class Corr(PairRolling):
         ] = np.nan
         return res
 
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        res = self._load_panel_with_kernel(rolling_corr, instruments, start_index, end_index, freq, cache)
+        panel_left = self.feature_left.load_panel(instruments, start_index, end_index, freq, cache)
+        panel_right = self.feature_right.load_panel(instruments, start_index, end_index, freq, cache)
+        return res.mask(
+            np.isclose(panel_left.rolling(self.N, min_periods=1).std(), 0, atol=2e-05)
+            | np.isclose(panel_right.rolling(self.N, min_periods=1).std(), 0, atol=2e-05)
+        )
+
 
 class Cov(PairRolling):
     """Rolling Covariance
@@ -1519,6 +1675,12 @@ class Cov(PairRolling):
     def __init__(self, feature_left, feature_right, N):
         super(Cov, self).__init__(feature_left, feature_right, N, "cov")
 
+    def _load_internal(self, instrument, start_index, end_index, *args):
+        return self._load_with_kernel(rolling_cov, instrument, start_index, end_index, *args)
+
+    def _load_panel_internal(self, instruments, start_index, end_index, freq, cache):
+        return self._load_panel_with_kernel(rolling_cov, instruments, start_index, end_index, freq, cache)
+
 
 #################### Operator which only support data with time index ####################
 # Convention
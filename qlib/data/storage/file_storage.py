@@ -2,7 +2,9 @@
 # Licensed under the MIT License.
 
 import struct
+import threading
 from pathlib import Path
+from collections import OrderedDict
 from typing import Iterable, Union, Dict, Mapping, Tuple, List
 
 import numpy as np
@@ -377,3 +379,284 @@ class FileFeatureStorage(FileStorageMixin, FeatureStorage):
     def __len__(self) -> int:
         self.check()
         return self.uri.stat().st_size // 4 - 1
+
+
+class MmapFeatureStorage(FileFeatureStorage):
+    """FeatureStorage that serves reads from memory-mapped `.bin` files
+
+    The file layout is identical to `FileFeatureStorage`; only the read path differs:
+
+        - every `.bin` file is mapped once and the handle is kept in a bounded LRU pool shared by all instances
+        - the header (start index) and the length are read once when the file is mapped
+        - slices are returned as zero-copy (read-only) views on the mapped file
+
+    The pool is only invalidated by writes through this class (or `MmapFeatureStorage.clear_pool`).
+    If the `.bin` files are updated by another process, call `MmapFeatureStorage.clear_pool` before reading.
+
+    `pool_size` is the maximum number of files in the shared pool. As the pool is shared, the largest `pool_size`
+    requested by the instances is used, so an instance with a small `pool_size` never evicts the files mapped for
+    the others.
+
+    Usage:
+
+        .. code-block:: python
+
+            qlib.init(
+                provider_uri="~/.qlib/qlib_data/cn_data",
+                feature_provider={
+                    "class": "LocalFeatureProvider",
+                    "kwargs": {
+                        "backend": {
+                            "class": "MmapFeatureStorage",
+                            "module_path": "qlib.data.storage.file_storage",
+                            "kwargs": {"pool_size": 4096},
+                        }
+                    },
+                },
+            )
+    """
+
+    # the maximum number of files that are mapped at the same time; every mapping holds a file descriptor
+    POOL_SIZE = 1024
+
+    # uri -> (start_index, np.memmap of the data part); `None` is used for missing/empty files
+    _pool = OrderedDict()
+    # the limit of the shared pool
+    _pool_size = POOL_SIZE
+    _freq_cache = {}
+    _lock = threading.Lock()
+
+    def __init__(
+        self, instrument: str, field: str, freq: str, provider_uri: dict = None, pool_size: int = None, **kwargs
+    ):
+        super(MmapFeatureStorage, self).__init__(instrument, field, freq, provider_uri=provider_uri, **kwargs)
+        if pool_size is not None:
+            with self._lock:
+                MmapFeatureStorage._pool_size = max(MmapFeatureStorage._pool_size, int(pool_size))
+
+    @property
+    def support_freq(self) -> List[str]:
+        # `FileStorageMixin.support_freq` lists the calendar directory on every new storage object
+        # The providers create a new storage object for each query, so the result is shared at class level
+        key = tuple(sorted(self.provider_uri.items()))
+        freq_l = self._freq_cache.get(key)
+        if freq_l is None:
+            freq_l = super(MmapFeatureStorage, self).support_freq
+            self._freq_cache[key] = freq_l
+        return freq_l
+
+    @classmethod
+    def clear_pool(cls):
+        """release all the mapped files"""
+        with cls._lock:
+            cls._pool.clear()
+            cls._freq_cache.clear()
+
+    def _invalidate(self):
+        with self._lock:
+            self._pool.pop(str(self.uri), None)
+
+    def _get_mmap(self) -> Union[Tuple[int, np.memmap], None]:
+        key = str(self.uri)
+        with self._lock:
+            if key in self._pool:
+                self._pool.move_to_end(key)
+                return self._pool[key]
+
+        if not self.uri.exists() or self.uri.stat().st_size < 4:
+            # NOTE: missing files are not cached, so that the data can be dumped later
+            return None
+        mm = np.memmap(self.uri, dtype="<f", mode="r")
+        item = (int(mm[0]), mm[1:])
+
+        with self._lock:
+            self._pool[key] = item
+            while len(self._pool) > MmapFeatureStorage._pool_size:
+                self._pool.popitem(last=False)
+        return item
+
+    def clear(self):
+        self._invalidate()
+        super(MmapFeatureStorage, self).clear()
+
+    def write(self, data_array: Union[List, np.ndarray], index: int = None) -> None:
+        self._invalidate()
+        super(MmapFeatureStorage, self).write(data_array, index)
+        self._invalidate()
+
+    @property
+    def start_index(self) -> Union[int, None]:
+        item = self._get_mmap()
+        return None if item is None else item[0]
+
+    @property
+    def end_index(self) -> Union[int, None]:
+        item = self._get_mmap()
+        return None if item is None else item[0] + len(item[1]) - 1
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Tuple[int, float], pd.Series]:
+        item = self._get_mmap()
+        if item is None:
+            if isinstance(i, int):
+                return None, None
+            elif isinstance(i, slice):
+                return pd.Series(dtype=np.float32)
+            else:
+                raise TypeError(f"type(i) = {type(i)}")
+
+        storage_start_index, data = item
+        storage_end_index = storage_start_index + len(data) - 1
+        if isinstance(i, int):
+            if storage_start_index > i:
+                raise IndexError(f"{i}: start index is {storage_start_index}")
+            return i, float(data[i - storage_start_index])
+        elif isinstance(i, slice):
+            start_index = storage_start_index if i.start is None else i.start
+            end_index = storage_end_index if i.stop is None else i.stop - 1
+            si = max(start_index, storage_start_index)
+            if si > end_index:
+                return pd.Series(dtype=np.float32)
+            values = data[si - storage_start_index : end_index - storage_start_index + 1]
+            # `np.asarray` drops the memmap subclass but keeps sharing the mapped buffer
+            return pd.Series(np.asarray(values), index=pd.RangeIndex(si, si + len(values)), copy=False)
+        else:
+            raise TypeError(f"type(i) = {type(i)}")
+
+    def __len__(self) -> int:
+        item = self._get_mmap()
+        if item is None:
+            self.check()
+            return 0
+        return len(item[1])
+
+
+class BundleFeatureStorage(MmapFeatureStorage):
+    """FeatureStorage based on the columnar bundle format
+
+    All the raw fields of an instrument are packed into a single file `features/<instrument>/<freq>.bundle`,
+    so one mapping serves every `$field` of an expression.
+
+    File layout (little endian)
+
+        .. code-block::
+
+            header:
+                magic           4 bytes, b"QBDL"
+                version         uint32
+                start_index     uint32, the calendar index of the first row
+                n_rows          uint32
+                stride          uint32, the length of each field row (padded so that every row is 64-byte aligned)
+                n_fields        uint32
+                data_offset     uint32, the position of the matrix (aligned to 64 bytes)
+                field names     utf-8, separated by "\\n"
+            data:
+                float32 matrix with shape (n_fields, stride); the first `n_rows` values of each row are valid
+
+    Fields that are not in the bundle fall back to the `<field>.<freq>.bin` files, so the two layouts can be mixed.
+    The bundle files are generated by `scripts/dump_bin.py dump_bundle`; writing through the storage is not supported.
+    Like the mapped files, the missing bundles are remembered until `MmapFeatureStorage.clear_pool` is called.
+    """
+
+    MAGIC = b"QBDL"
+    VERSION = 1
+    ALIGNMENT = 64
+    HEADER_FMT = "<4sIIIIII"
+
+    def __init__(
+        self, instrument: str, field: str, freq: str, provider_uri: dict = None, pool_size: int = None, **kwargs
+    ):
+        super(BundleFeatureStorage, self).__init__(
+            instrument, field, freq, provider_uri=provider_uri, pool_size=pool_size, **kwargs
+        )
+        self.bundle_file_name = f"{instrument.lower()}/{freq.lower()}.bundle"
+
+    @property
+    def bundle_uri(self) -> Path:
+        return self.uri.parent.parent.joinpath(self.bundle_file_name)
+
+    @classmethod
+    def write_bundle(cls, path: Union[str, Path], fields: List[str], data: np.ndarray, start_index: int) -> None:
+        """write a bundle file
+
+        Parameters
+        ----------
+        path : Union[str, Path]
+            the path of the bundle file
+        fields : List[str]
+            the names of the fields; the i-th field is `data[i]`
+        data : np.ndarray
+            array with shape (len(fields), n_rows)
+        start_index : int
+            the calendar index of the first row
+        """
+        data = np.asarray(data, dtype="<f").reshape(len(fields), -1)
+        n_fields, n_rows = data.shape
+        step = cls.ALIGNMENT // 4
+        stride = max((n_rows + step - 1) // step * step, step)
+        names = "\n".join(f.lower() for f in fields).encode("utf-8")
+        data_offset = struct.calcsize(cls.HEADER_FMT) + len(names)
+        data_offset = (data_offset + cls.ALIGNMENT - 1) // cls.ALIGNMENT * cls.ALIGNMENT
+
+        matrix = np.full((n_fields, stride), np.nan, dtype="<f")
+        matrix[:, :n_rows] = data
+        path = Path(path)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        with tmp_path.open("wb") as fp:
+            fp.write(
+                struct.pack(cls.HEADER_FMT, cls.MAGIC, cls.VERSION, start_index, n_rows, stride, n_fields, data_offset)
+            )
+            fp.write(names)
+            fp.write(b"\0" * (data_offset - fp.tell()))
+            matrix.tofile(fp)
+        tmp_path.replace(path)
+
+    @classmethod
+    def read_bundle(cls, path: Union[str, Path]) -> Tuple[int, Dict[str, int], int, np.memmap]:
+        """map a bundle file
+
+        Returns
+        -------
+        Tuple[int, Dict[str, int], int, np.memmap]
+            start_index, field -> row, n_rows and the mapped (n_fields, stride) matrix
+        """
+        with open(path, "rb") as fp:
+            header = fp.read(struct.calcsize(cls.HEADER_FMT))
+            magic, version, start_index, n_rows, stride, n_fields, data_offset = struct.unpack(cls.HEADER_FMT, header)
+            if magic != cls.MAGIC:
+                raise ValueError(f"{path} is not a bundle file")
+            if version != cls.VERSION:
+                raise ValueError(f"unsupported bundle version {version}: {path}")
+            names = fp.read(data_offset - len(header)).rstrip(b"\0").decode("utf-8")
+        fields = {name: i for i, name in enumerate(names.split("\n"))} if n_fields > 0 else {}
+        matrix = np.memmap(path, dtype="<f", mode="r", offset=data_offset, shape=(n_fields, stride))
+        return start_index, fields, n_rows, matrix
+
+    def _get_bundle(self):
+        key = str(self.bundle_uri)
+        with self._lock:
+            if key in self._pool:
+                self._pool.move_to_end(key)
+                return self._pool[key]
+        # NOTE: unlike the `.bin` files, the missing bundles are cached (as `None`), because the fields which fall
+        # back to the `.bin` files look for the bundle on every access; the bundles are not written by the storage
+        item = self.read_bundle(self.bundle_uri) if self.bundle_uri.exists() else None
+        with self._lock:
+            self._pool[key] = item
+            while len(self._pool) > MmapFeatureStorage._pool_size:
+                self._pool.popitem(last=False)
+        return item
+
+    def _get_mmap(self) -> Union[Tuple[int, np.memmap], None]:
+        bundle = self._get_bundle()
+        if bundle is not None:
+            start_index, fields, n_rows, matrix = bundle
+            row = fields.get(self.field.lower())
+            if row is not None:
+                return start_index, matrix[row, :n_rows]
+        return super(BundleFeatureStorage, self)._get_mmap()
+
+    def clear(self):
+        raise NotImplementedError(f"{self.__class__.__name__} is read-only, please use `scripts/dump_bin.py`")
+
+    def write(self, data_array: Union[List, np.ndarray], index: int = None) -> None:
+        raise NotImplementedError(f"{self.__class__.__name__} is read-only, please use `scripts/dump_bin.py`")
@@ -5,11 +5,13 @@ from .base import RiskModel
 from .poet import POETCovEstimator
 from .shrink import ShrinkCovEstimator
 from .structured import StructuredCovEstimator
-
+from .store import RiskModelStore, RiskModelStoreWriter
 
 __all__ = [
     "RiskModel",
     "POETCovEstimator",
     "ShrinkCovEstimator",
     "StructuredCovEstimator",
+    "RiskModelStore",
+    "RiskModelStoreWriter",
 ]
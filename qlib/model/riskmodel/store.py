@@ -0,0 +1,211 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+class RiskModelStore:
+    """Risk Model Store
+
+    The risk model data of all the dates packed into memory-mapped arrays, so the data of a date can be read without
+    copying or parsing any file.
+
+    Layout of the store:
+
+    .. code-block:: text
+
+        ├── /path/to/riskmodel
+        ├──── meta.json          # the dates, the instruments, the offsets of the dates and the blacklists
+        ├──── factor_exp.bin     # <instruments of all dates, factors>
+        ├──── factor_cov.bin     # <dates, factors, factors>
+        ├──── specific_risk.bin  # <instruments of all dates>
+        ├──── instrument.bin     # <instruments of all dates>, the indices of the instruments
+
+    The instruments of the i-th date are the rows in `offsets[i]:offsets[i + 1]`.
+    A store is created by `RiskModelStoreWriter`.
+    """
+
+    META_NAME = "meta.json"
+    FACTOR_EXP_NAME = "factor_exp.bin"
+    FACTOR_COV_NAME = "factor_cov.bin"
+    SPECIFIC_RISK_NAME = "specific_risk.bin"
+    INSTRUMENT_NAME = "instrument.bin"
+    INSTRUMENT_DTYPE = np.int32
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Args:
+            path (str or Path): the directory of the store.
+        """
+        self.path = Path(path)
+        with (self.path / self.META_NAME).open() as f:
+            meta = json.load(f)
+        self.dtype = np.dtype(meta["dtype"])
+        self.num_factors = meta["num_factors"]
+        self.dates = pd.DatetimeIndex(meta["dates"])
+        self.instruments = np.asarray(meta["instruments"], dtype=object)
+        self.offsets = np.asarray(meta["offsets"], dtype=np.int64)
+        self.blacklists = meta["blacklists"]
+        self._date_idx = {date: i for i, date in enumerate(self.dates)}
+
+        total = self.offsets[-1]
+        self.factor_exp = self._memmap(self.FACTOR_EXP_NAME, self.dtype, (total, self.num_factors))
+        self.factor_cov = self._memmap(self.FACTOR_COV_NAME, self.dtype, (len(self.dates), *[self.num_factors] * 2))
+        self.specific_risk = self._memmap(self.SPECIFIC_RISK_NAME, self.dtype, (total,))
+        self.instrument = self._memmap(self.INSTRUMENT_NAME, self.INSTRUMENT_DTYPE, (total,))
+
+    def _memmap(self, name: str, dtype: np.dtype, shape: Tuple[int, ...]) -> np.ndarray:
+        if np.prod(shape) == 0:
+            # an empty file can't be mapped
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self.path / name, dtype=dtype, mode="r", shape=shape)
+
+    @classmethod
+    def exists(cls, path: Union[str, Path]) -> bool:
+        """whether there is a store in `path`"""
+        return (Path(path) / cls.META_NAME).exists()
+
+    def __contains__(self, date) -> bool:
+        return pd.Timestamp(date).normalize() in self._date_idx
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def get(self, date) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, List[str], List[str]]]:
+        """
+        Args:
+            date: the date of the risk model data.
+
+        Returns:
+            tuple or None: (factor_exp, factor_cov, specific_risk, universe, blacklist); the arrays are read-only views
+                of the store. None is returned if there is no data of `date`.
+        """
+        i = self._date_idx.get(pd.Timestamp(date).normalize())
+        if i is None:
+            return None
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return (
+            np.asarray(self.factor_exp[start:end]),
+            np.asarray(self.factor_cov[i]),
+            np.asarray(self.specific_risk[start:end]),
+            self.instruments[self.instrument[start:end]].tolist(),
+            list(self.blacklists[i]),
+        )
+
+
+class RiskModelStoreWriter:
+    """Risk Model Store Writer
+
+    Append the risk model data date by date to a `RiskModelStore`.
+    The data is written to the disk when it is added, and the store can be read after the writer is closed.
+
+    Example:
+
+    .. code-block:: python
+
+        with RiskModelStoreWriter("./riskdata") as writer:
+            for date in dates:
+                F, cov_b, var_u = riskmodel.predict(ret, is_price=False, return_decomposed_components=True)
+                writer.add(date, pd.DataFrame(F, index=codes), cov_b, pd.Series(np.sqrt(var_u), index=codes))
+    """
+
+    def __init__(self, path: Union[str, Path], dtype: Union[str, np.dtype] = "float64"):
+        """
+        Args:
+            path (str or Path): the directory of the store.
+            dtype (str or np.dtype): the dtype of the risk model data.
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dtype = np.dtype(dtype)
+        self.num_factors = None
+        self.dates: List[pd.Timestamp] = []
+        self.offsets = [0]
+        self.blacklists: List[List[str]] = []
+        self.instruments: Dict[str, int] = {}
+        self._files = {
+            name: (self.path / name).open("wb")
+            for name in [
+                RiskModelStore.FACTOR_EXP_NAME,
+                RiskModelStore.FACTOR_COV_NAME,
+                RiskModelStore.SPECIFIC_RISK_NAME,
+                RiskModelStore.INSTRUMENT_NAME,
+            ]
+        }
+        # the meta of the previous store is removed, so an incomplete store can't be read
+        (self.path / RiskModelStore.META_NAME).unlink(missing_ok=True)
+
+    def add(
+        self,
+        date,
+        factor_exp: pd.DataFrame,
+        factor_cov: Union[pd.DataFrame, np.ndarray],
+        specific_risk: pd.Series,
+        blacklist: Optional[Sequence[str]] = None,
+    ) -> None:
+        """
+        Args:
+            date: the date of the risk model data, the dates should be added in ascending order.
+            factor_exp (pd.DataFrame): factor exposure indexed by instruments.
+            factor_cov (pd.DataFrame or np.ndarray): factor covariance.
+            specific_risk (pd.Series): specific risk (volatility) indexed by instruments.
+            blacklist (Sequence[str]): the instruments to be sold.
+        """
+        date = pd.Timestamp(date).normalize()
+        if len(self.dates) > 0 and date <= self.dates[-1]:
+            raise ValueError(f"the dates should be added in ascending order: {date} after {self.dates[-1]}")
+        num_factors = factor_exp.shape[1]
+        if self.num_factors is None:
+            self.num_factors = num_factors
+        elif num_factors != self.num_factors:
+            raise ValueError(f"the number of factors is changed from {self.num_factors} to {num_factors} at {date}")
+        factor_cov = np.asarray(factor_cov, dtype=self.dtype)
+        if factor_cov.shape != (num_factors, num_factors):
+            raise ValueError(f"the shape of factor_cov {factor_cov.shape} doesn't match {num_factors} factors")
+
+        if isinstance(specific_risk, pd.DataFrame):
+            specific_risk = specific_risk.iloc[:, 0]
+        if not factor_exp.index.equals(specific_risk.index):
+            # NOTE: for stocks missing specific_risk, we always assume it has the highest volatility
+            specific_risk = specific_risk.reindex(factor_exp.index, fill_value=specific_risk.max())
+        instrument = np.array(
+            [self.instruments.setdefault(inst, len(self.instruments)) for inst in factor_exp.index],
+            dtype=RiskModelStore.INSTRUMENT_DTYPE,
+        )
+
+        self._files[RiskModelStore.FACTOR_EXP_NAME].write(factor_exp.to_numpy(dtype=self.dtype).tobytes())
+        self._files[RiskModelStore.FACTOR_COV_NAME].write(factor_cov.tobytes())
+        self._files[RiskModelStore.SPECIFIC_RISK_NAME].write(specific_risk.to_numpy(dtype=self.dtype).tobytes())
+        self._files[RiskModelStore.INSTRUMENT_NAME].write(instrument.tobytes())
+        self.dates.append(date)
+        self.offsets.append(self.offsets[-1] + len(instrument))
+        self.blacklists.append([] if blacklist is None else list(blacklist))
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+        meta = {
+            "dtype": self.dtype.str,
+            "num_factors": 0 if self.num_factors is None else self.num_factors,
+            "dates": [date.strftime("%Y-%m-%d") for date in self.dates],
+            "instruments": list(self.instruments),
+            "offsets": self.offsets,
+            "blacklists": self.blacklists,
+        }
+        with (self.path / RiskModelStore.META_NAME).open("w") as f:
+            json.dump(meta, f)
+
+    def __enter__(self) -> "RiskModelStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            for f in self._files.values():
+                f.close()
@@ -11,6 +11,8 @@ In ``DelayTrainer``, the first step is only to save some necessary info to model
 ``Qlib`` offer two kinds of Trainer, ``TrainerR`` is the simplest way and ``TrainerRM`` is based on TaskManager to help manager tasks lifecycle automatically.
 """
 
+import concurrent.futures
+import os
 import socket
 from typing import Callable, List, Optional
 
@@ -18,6 +20,7 @@ from tqdm.auto import tqdm
 
 from qlib.config import C
 from qlib.data.dataset import Dataset
+from qlib.data.dataset.utils import DatasetReuse
 from qlib.data.dataset.weight import Reweighter
 from qlib.log import get_module_logger
 from qlib.model.base import Model
@@ -27,7 +30,7 @@ from qlib.utils import (
     flatten_dict,
     init_instance_by_config,
 )
-from qlib.utils.paral import call_in_subproc
+from qlib.utils.paral import call_in_subproc, dumps_to_arena, loads_from_arena
 from qlib.workflow import R
 from qlib.workflow.recorder import Recorder
 from qlib.workflow.task.manage import TaskManager, run_task
@@ -39,11 +42,14 @@ def _log_task_info(task_config: dict):
     R.set_tags(**{"hostname": socket.gethostname()})
 
 
-def _exe_task(task_config: dict):
+def _exe_task(task_config: dict, dataset_reuse: Optional[DatasetReuse] = None):
     rec = R.get_recorder()
     # model & dataset initialization
     model: Model = init_instance_by_config(task_config["model"], accept_types=Model)
-    dataset: Dataset = init_instance_by_config(task_config["dataset"], accept_types=Dataset)
+    if dataset_reuse is None:
+        dataset: Dataset = init_instance_by_config(task_config["dataset"], accept_types=Dataset)
+    else:
+        dataset: Dataset = dataset_reuse.get(task_config["dataset"])
     reweighter: Reweighter = task_config.get("reweighter", None)
     # model training
     auto_filter_kwargs(model.fit)(dataset, reweighter=reweighter)
@@ -105,7 +111,9 @@ def end_task_train(rec: Recorder, experiment_name: str) -> Recorder:
     return rec
 
 
-def task_train(task_config: dict, experiment_name: str, recorder_name: str = None) -> Recorder:
+def task_train(
+    task_config: dict, experiment_name: str, recorder_name: str = None, dataset_reuse: Optional[DatasetReuse] = None
+) -> Recorder:
     """
     Task based training, will be divided into two steps.
 
@@ -117,6 +125,8 @@ def task_train(task_config: dict, experiment_name: str, recorder_name: str = Non
         The name of experiment
     recorder_name: str
         The name of recorder
+    dataset_reuse: DatasetReuse
+        Reuse the handler loaded by the previous tasks if it is not None.
 
     Returns
     ----------
@@ -124,7 +134,7 @@ def task_train(task_config: dict, experiment_name: str, recorder_name: str = Non
     """
     with R.start(experiment_name=experiment_name, recorder_name=recorder_name):
         _log_task_info(task_config)
-        _exe_task(task_config)
+        _exe_task(task_config, dataset_reuse=dataset_reuse)
         return R.get_recorder()
 
 
@@ -225,6 +235,7 @@ class TrainerR(Trainer):
         train_func: Callable = task_train,
         call_in_subproc: bool = False,
         default_rec_name: Optional[str] = None,
+        reuse_dataset: bool = False,
     ):
         """
         Init TrainerR.
@@ -233,12 +244,16 @@ class TrainerR(Trainer):
             experiment_name (str, optional): the default name of experiment.
             train_func (Callable, optional): default training method. Defaults to `task_train`.
             call_in_subproc (bool): call the process in subprocess to force memory release
+            reuse_dataset (bool): share the loaded and processed handler among the tasks which differ only in time
+                ranges (e.g. the rolling tasks), please refer to `DatasetReuse`. `train_func` must accept the
+                `dataset_reuse` argument like `task_train`. It takes no effect when `call_in_subproc` is True.
         """
         super().__init__()
         self.experiment_name = experiment_name
         self.default_rec_name = default_rec_name
         self.train_func = train_func
         self._call_in_subproc = call_in_subproc
+        self.reuse_dataset = reuse_dataset
 
     def train(
         self, tasks: list, train_func: Optional[Callable] = None, experiment_name: Optional[str] = None, **kwargs
@@ -263,6 +278,8 @@ class TrainerR(Trainer):
             train_func = self.train_func
         if experiment_name is None:
             experiment_name = self.experiment_name
+        if self.reuse_dataset:
+            kwargs.setdefault("dataset_reuse", DatasetReuse(tasks))
         recs = []
         for task in tqdm(tasks, desc="train tasks"):
             if self._call_in_subproc:
@@ -290,6 +307,135 @@ class TrainerR(Trainer):
         return models
 
 
+# the state shared by the tasks trained in a worker process of `ParallelTrainerR`
+_TRAIN_STATE: dict = {}
+
+# the environment variables limiting the threads of the numerical libraries (e.g. LightGBM, numpy)
+THREAD_ENV_VARS = ["OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS"]
+
+
+def _init_train_worker(qlib_config, n_threads: Optional[int], arena_name: str, data: bytes):
+    C.register_from_C(qlib_config)
+    if n_threads is not None:
+        # the libraries loaded later read the variables
+        for var in THREAD_ENV_VARS:
+            os.environ[var] = str(n_threads)
+        try:
+            # the libraries loaded before forking the worker have to be limited at runtime
+            from threadpoolctl import threadpool_limits  # pylint: disable=C0415
+
+            threadpool_limits(n_threads)
+        except ImportError:
+            pass
+    # the models may change the data of the tasks in place (e.g. `fillna(inplace=True)` on the prepared frames)
+    _TRAIN_STATE.update(loads_from_arena(data, arena_name, writable=True))
+    # the uri may be changed temporarily (e.g. `R.uri_context`) in the main process
+    R.set_uri(_TRAIN_STATE["uri"])
+
+
+def _train_in_worker(idx: int) -> Recorder:
+    state = _TRAIN_STATE
+    return state["train_func"](
+        state["tasks"][idx], state["experiment_name"], recorder_name=state["recorder_name"], **state["kwargs"]
+    )
+
+
+class ParallelTrainerR(TrainerR):
+    """
+    A TrainerR training the tasks in a pool of processes.
+
+    The tasks should be independent of each other, e.g. the tasks generated by `RollingGen`.
+    The tasks are handed over to the workers by shared memory only once (please refer to `dumps_to_arena`), so the
+    data in them (e.g. a DataHandler instance shared by the rolling tasks) is neither pickled per task nor copied per
+    worker. Each worker maps the data copy-on-write, so the tasks may still change it in place, and only the pages
+    written are copied. The recorders are returned in the order of the tasks.
+    """
+
+    def __init__(
+        self,
+        experiment_name: Optional[str] = None,
+        train_func: Callable = task_train,
+        n_jobs: Optional[int] = None,
+        n_threads: Optional[int] = 1,
+        default_rec_name: Optional[str] = None,
+        reuse_dataset: bool = False,
+    ):
+        """
+        Init ParallelTrainerR.
+
+        Args:
+            experiment_name (str, optional): the default name of experiment.
+            train_func (Callable, optional): default training method. Defaults to `task_train`. It must be picklable.
+            n_jobs (int, optional): the number of the worker processes, `C.kernels` by default. The tasks are trained
+                in the current process if it is 1.
+            n_threads (int, optional): the number of threads of the numerical libraries (e.g. `OMP_NUM_THREADS` for
+                LightGBM) in each worker. None for not limiting them.
+            reuse_dataset (bool): share the loaded and processed handler among the tasks trained in the same worker,
+                please refer to `TrainerR`.
+        """
+        super().__init__(experiment_name, train_func, default_rec_name=default_rec_name, reuse_dataset=reuse_dataset)
+        self.n_jobs = n_jobs
+        self.n_threads = n_threads
+
+    def train(
+        self, tasks: list, train_func: Optional[Callable] = None, experiment_name: Optional[str] = None, **kwargs
+    ) -> List[Recorder]:
+        """
+        Given a list of `tasks` and return a list of trained Recorder. The order can be guaranteed.
+
+        Args:
+            tasks (list): a list of definitions based on `task` dict
+            train_func (Callable): the training method which needs at least `tasks` and `experiment_name`. None for the default training method.
+            experiment_name (str): the experiment name, None for use default name.
+            kwargs: the params for train_func.
+
+        Returns:
+            List[Recorder]: a list of Recorders
+        """
+        if isinstance(tasks, dict):
+            tasks = [tasks]
+        n_jobs = C.kernels if self.n_jobs is None else self.n_jobs
+        n_jobs = min(n_jobs, len(tasks))
+        if n_jobs <= 1:
+            return super().train(tasks, train_func=train_func, experiment_name=experiment_name, **kwargs)
+        if train_func is None:
+            train_func = self.train_func
+        if experiment_name is None:
+            experiment_name = self.experiment_name
+        # create the experiment in advance, otherwise the workers may create it at the same time
+        experiment_name = R.get_exp(experiment_name=experiment_name).name
+        if self.reuse_dataset:
+            # each worker fills its own copy
+            kwargs.setdefault("dataset_reuse", DatasetReuse(tasks))
+
+        arena, data = dumps_to_arena(
+            {
+                "tasks": tasks,
+                "train_func": train_func,
+                "experiment_name": experiment_name,
+                "recorder_name": self.default_rec_name,
+                "uri": R.get_uri(),
+                "kwargs": kwargs,
+            },
+            dump_all=True,
+        )
+        get_module_logger("ParallelTrainerR").info(
+            f"training {len(tasks)} tasks by {n_jobs} workers; {arena.size} bytes of the tasks are shared"
+        )
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=n_jobs, initializer=_init_train_worker, initargs=(C, self.n_threads, arena.name, data)
+            ) as executor:
+                recs = list(
+                    tqdm(executor.map(_train_in_worker, range(len(tasks))), total=len(tasks), desc="train tasks")
+                )
+        finally:
+            arena.unlink()
+        for rec in recs:
+            rec.set_tags(**{self.STATUS_KEY: self.STATUS_BEGIN})
+        return recs
+
+
 class DelayTrainerR(TrainerR):
     """
     A delayed implementation based on TrainerR, which means `train` method may only do some preparation and `end_train` method can do the real model fitting.
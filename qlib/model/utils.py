@@ -1,7 +1,7 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-from torch.utils.data import Dataset
+from torch.utils.data import BatchSampler, DataLoader, Dataset, RandomSampler, SequentialSampler
 
 
 class ConcatDataset(Dataset):
@@ -24,3 +24,19 @@ class IndexSampler:
 
     def __len__(self):
         return len(self.sampler)
+
+
+class BatchDataLoader(DataLoader):
+    """
+    A DataLoader which fetches a whole batch from the dataset at once.
+
+    The indices of a batch are generated by a `BatchSampler` and passed to the dataset together, so the dataset must
+    support indexing by a list of int indices (e.g. `TSDataSampler.get_batch`, or `ConcatDataset` of them and arrays).
+    It yields the same batches as `DataLoader(dataset, batch_size, shuffle, drop_last=drop_last)`.
+    """
+
+    def __init__(self, dataset, batch_size: int = 1, shuffle: bool = False, drop_last: bool = False, **kwargs):
+        sampler = RandomSampler(dataset) if shuffle else SequentialSampler(dataset)
+        super().__init__(
+            dataset, sampler=BatchSampler(sampler, batch_size, drop_last=drop_last), batch_size=None, **kwargs
+        )
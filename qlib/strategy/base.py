@@ -6,6 +6,8 @@ from abc import ABCMeta, abstractmethod
 from typing import Any, Generator, Optional, TYPE_CHECKING, Union
 
 if TYPE_CHECKING:
+    import numpy as np
+
     from qlib.backtest.exchange import Exchange
     from qlib.backtest.position import BasePosition
     from qlib.backtest.executor import BaseExecutor
@@ -145,6 +147,28 @@ class BaseStrategy:
         """
         raise NotImplementedError("generate_trade_decision is not implemented!")
 
+    def generate_trade_schedule(self) -> Optional[np.ndarray]:
+        """
+        Generate the trading schedule of the whole outer trade decision at once.
+
+        It is only for the strategies whose decisions are fully determined by the outer trade decision (e.g. TWAP).
+        `NestedExecutor` with `fast_schedule` will follow the schedule instead of calling `generate_trade_decision` in
+        each step. In each step, the order of each outer order (except the suspended stocks) trades the amount
+        expected by the schedule minus the dealt amount, rounded by the trade unit and clipped by the remaining amount.
+        The remaining amount is traded in the last scheduled step.
+
+        It is called after `reset` with the outer trade decision.
+
+        Returns
+        -------
+        Optional[np.ndarray]:
+            None if the strategy makes decisions step by step (default).
+            Otherwise, the array with shape (<the steps of `self.trade_calendar`>,
+            <the orders of `self.outer_trade_decision`>): the expected cumulative dealt amount of each order after
+            each step. The rows of the steps without trading are NaN.
+        """
+        return None
+
     # helper methods: not necessary but for convenience
     def get_data_cal_avail_range(self, rtype: str = "full") -> Tuple[int, int]:
         """
@@ -517,6 +517,9 @@ class IndexData(metaclass=index_data_ops_creator):
         else:
             return self.data.all()
 
+    def any(self):
+        return self.data.any()
+
     @property
     def empty(self):
         return len(self.data) == 0
@@ -1,20 +1,29 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
+import copyreg
+import io
+import mmap
+import os
+import pickle
+import sys
 import threading
 from functools import partial
+from multiprocessing.shared_memory import SharedMemory
 from threading import Thread
-from typing import Callable, Text, Union
+from typing import Callable, Text, Tuple, Union
 
 import joblib
 from joblib import Parallel, delayed
 from joblib._parallel_backends import MultiprocessingBackend
+import numpy as np
 import pandas as pd
 
 from queue import Empty, Queue
 import concurrent
 
-from qlib.config import C, QlibConfig
+from qlib.config import C, PROTOCOL_VERSION, QlibConfig
+from qlib.utils.serial import Serializable
 
 
 class ParallelExt(Parallel):
@@ -30,6 +39,141 @@ class ParallelExt(Parallel):
                 self._backend_kwargs["maxtasksperchild"] = maxtasksperchild  # pylint: disable=E1101
 
 
+class SharedArena(SharedMemory):
+    """A block of shared memory to hand over large arrays between processes without pickling.
+
+    The parent process creates the arena and the workers attach to it by `name`.
+
+    .. note::
+
+        The arrays returned by `get_array` keep the memory mapped, so they are still valid after the arena is
+        closed and unlinked; the memory is released when the last of them is freed.
+    """
+
+    def __init__(self, name=None, create=False, size=0):
+        if not create and sys.version_info >= (3, 13):
+            # the arena is owned by its creator; it should not be cleaned up when the workers exit
+            super().__init__(name=name, create=create, size=size, track=False)
+        else:
+            super().__init__(name=name, create=create, size=size)
+        self._private_buf = None
+
+    def get_array(self, shape, dtype, offset: int = 0, copy_on_write: bool = False) -> np.ndarray:
+        """get an array over the arena starting from `offset` bytes
+
+        If `copy_on_write`, the array is private to the current process: the pages written are copied, so the other
+        processes never see the changes. The array is copied as a whole on the platforms that can't map the arena
+        privately (e.g. Windows).
+        """
+        count = int(np.prod(shape))
+        if not copy_on_write:
+            return np.frombuffer(self.buf, dtype=dtype, count=count, offset=offset).reshape(shape)
+        if self._private_buf is None and os.name == "posix":
+            # NOTE: `SharedMemory` maps the arena with MAP_SHARED, a second private mapping is required
+            self._private_buf = mmap.mmap(self._fd, self.size, access=mmap.ACCESS_COPY)
+        if self._private_buf is None:
+            return np.frombuffer(self.buf, dtype=dtype, count=count, offset=offset).reshape(shape).copy()
+        return np.frombuffer(self._private_buf, dtype=dtype, count=count, offset=offset).reshape(shape)
+
+    def __del__(self):
+        try:
+            self.close()
+        except BufferError:
+            # the arrays over the arena are still in use
+            pass
+
+
+class _ArenaPickler(pickle.Pickler):
+    """Pickler leaving the large arrays out of the pickle, they are collected to be copied into a `SharedArena`"""
+
+    def __init__(self, file, min_nbytes: int, dump_all: bool = False):
+        super().__init__(file, protocol=PROTOCOL_VERSION)
+        self.min_nbytes = min_nbytes
+        self.dump_all = dump_all
+        self.arrays = []
+
+    def persistent_id(self, obj):
+        if type(obj) is not np.ndarray or obj.dtype.hasobject or obj.nbytes < self.min_nbytes:
+            return None
+        transpose = not obj.flags.c_contiguous and obj.flags.f_contiguous
+        self.arrays.append(obj.T if transpose else np.ascontiguousarray(obj))
+        return len(self.arrays) - 1, transpose
+
+    def reducer_override(self, obj):
+        if self.dump_all and isinstance(obj, Serializable) and type(obj).__getstate__ is Serializable.__getstate__:
+            # keep the attributes dropped by `Serializable` by default (e.g. the data of a DataHandler)
+            return copyreg.__newobj__, (type(obj),), obj.__dict__
+        return NotImplemented
+
+
+class _ArenaUnpickler(pickle.Unpickler):
+    def __init__(self, file, arena: SharedArena, layout: list, writable: bool = False):
+        super().__init__(file)
+        self.arena = arena
+        self.layout = layout
+        self.writable = writable
+
+    def persistent_load(self, pid):
+        idx, transpose = pid
+        offset, shape, dtype = self.layout[idx]
+        arr = self.arena.get_array(shape, dtype, offset, copy_on_write=self.writable)
+        if not self.writable:
+            # the arrays are shared by all the processes, writing them by mistake would affect the others
+            arr.flags.writeable = False
+        return arr.T if transpose else arr
+
+
+def dumps_to_arena(obj, min_nbytes: int = 1 << 16, dump_all: bool = False) -> Tuple[SharedArena, bytes]:
+    """Pickle `obj` with its large arrays copied into a `SharedArena`, so the processes loading it share the arrays.
+
+    Parameters
+    ----------
+    obj :
+        the object to pickle
+    min_nbytes : int
+        the arrays smaller than it are pickled as usual
+    dump_all : bool
+        pickle all the attributes of the `Serializable` objects in `obj` regardless of their `dump_all`, e.g. to hand
+        over a DataHandler with its data
+
+    Returns
+    -------
+    Tuple[SharedArena, bytes]:
+        the arena, which must be kept (and unlinked finally) by the caller, and the pickle to be passed to
+        `loads_from_arena`
+    """
+    buf = io.BytesIO()
+    pickler = _ArenaPickler(buf, min_nbytes, dump_all=dump_all)
+    pickler.dump(obj)
+    layout, size = [], 0
+    for arr in pickler.arrays:
+        layout.append((size, arr.shape, arr.dtype))
+        size += -(-arr.nbytes // 64) * 64  # keep the arrays aligned
+    arena = SharedArena(create=True, size=max(size, 1))
+    for (offset, shape, dtype), arr in zip(layout, pickler.arrays):
+        arena.get_array(shape, dtype, offset)[...] = arr
+    return arena, pickle.dumps((buf.getvalue(), layout), protocol=PROTOCOL_VERSION)
+
+
+def loads_from_arena(data: bytes, arena_name: str, writable: bool = False):
+    """Load the object pickled by `dumps_to_arena`
+
+    Parameters
+    ----------
+    data : bytes
+        the pickle returned by `dumps_to_arena`
+    arena_name : str
+        the name of the arena returned by `dumps_to_arena`
+    writable : bool
+        the large arrays are read-only views over the arena by default. If True, they are copy-on-write views
+        instead (please refer to `SharedArena.get_array`), so the object can be changed in place (e.g.
+        `df.fillna(0, inplace=True)`) without affecting the other processes.
+    """
+    payload, layout = pickle.loads(data)
+    arena = SharedArena(name=arena_name)
+    return _ArenaUnpickler(io.BytesIO(payload), arena, layout, writable=writable).load()
+
+
 def datetime_groupby_apply(
     df, apply_func: Union[Callable, Text], axis=0, level="datetime", resample_rule="ME", n_jobs=-1
 ):
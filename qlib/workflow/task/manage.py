@@ -6,6 +6,8 @@ TaskManager can fetch unused tasks automatically and manage the lifecycle of a s
 These features can run tasks concurrently and ensure every task will be used only once.
 Task Manager will store all tasks in `MongoDB <https://www.mongodb.com/>`_.
 Users **MUST** finished the configuration of `MongoDB <https://www.mongodb.com/>`_ when using this module.
+The tasks can also be stored in a local `SQLite <https://www.sqlite.org/>`_ database without a MongoDB server, please
+refer to `qlib.workflow.task.sqlite`.
 
 A task in TaskManager consists of 3 parts
 - tasks description: the desc will define the task
@@ -16,7 +18,7 @@ import concurrent
 import pickle
 import time
 from contextlib import contextmanager
-from typing import Callable, List
+from typing import Callable, List, Union
 
 import fire
 import pymongo
@@ -26,7 +28,8 @@ from pymongo.errors import InvalidDocument
 from qlib import auto_init, get_module_logger
 from tqdm.cli import tqdm
 
-from .utils import get_mongodb
+from .sqlite import SQLiteTaskPool
+from .utils import get_task_db
 from ...config import C
 
 
@@ -90,9 +93,9 @@ class TaskManager:
         Parameters
         ----------
         task_pool: str
-            the name of Collection in MongoDB
+            the name of Collection in MongoDB (or table in SQLite)
         """
-        self.task_pool: pymongo.collection.Collection = getattr(get_mongodb(), task_pool)
+        self.task_pool: Union[pymongo.collection.Collection, SQLiteTaskPool] = get_task_db()[task_pool]
         self.logger = get_module_logger(self.__class__.__name__)
         self.logger.info(f"task_pool:{task_pool}")
 
@@ -104,7 +107,7 @@ class TaskManager:
         Returns:
             list
         """
-        return get_mongodb().list_collection_names()
+        return get_task_db().list_collection_names()
 
     def _encode_task(self, task):
         for prefix in self.ENCODE_FIELDS_PREFIX:
@@ -405,6 +408,9 @@ class TaskManager:
         """
         query = query.copy()
         query = self._decode_query(query)
+        if isinstance(self.task_pool, SQLiteTaskPool):
+            # count without loading the tasks
+            return self.task_pool.count_by_status(query)
         tasks = self.query(query=query, decode=False)
         status_stat = {}
         for t in tasks:
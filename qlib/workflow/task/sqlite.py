@@ -0,0 +1,315 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+"""
+A task pool backend based on `SQLite <https://www.sqlite.org/>`_.
+
+It implements the subset of the `pymongo` Collection API used by `TaskManager`, so the tasks can be managed by the
+processes on one machine (or a shared filesystem which supports file locks) without a MongoDB server.
+It is used when the `task_url` of `C["mongo"]` starts with `sqlite:///`.
+
+.. code-block:: python
+
+    qlib.init(..., mongo={
+        "task_url": "sqlite:///path/to/tasks.db",  # the path of the SQLite database file
+        "task_db_name": "rolling_db",  # not used by SQLite
+    })
+
+Each task pool is a table, and a task (document) is stored as a row
+
+.. code-block:: text
+
+    _id       TEXT PRIMARY KEY  # the ObjectId string
+    status    TEXT
+    priority  INTEGER
+    filter    TEXT              # the canonical JSON of `task["filter"]`, for querying
+    doc       BLOB              # the other fields of the task, pickled
+
+The query supports `$eq`, `$ne`, `$in` and `$nin` on `_id`, `status`, `priority` and `filter` (including the dotted
+fields of `filter` like `filter.model.class`).
+"""
+
+import json
+import os
+import pickle
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+from bson.objectid import ObjectId
+from pymongo import DESCENDING
+from pymongo.results import DeleteResult, InsertOneResult, UpdateResult
+
+from ...config import C
+
+
+def _dumps_json(obj) -> str:
+    # the same separators as the JSON returned by SQLite, so the nested fields can be compared with `json_extract`
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class SQLiteTaskPool:
+    """
+    A task pool (Collection in MongoDB) stored in a table of an SQLite database.
+    """
+
+    COLUMNS = ("_id", "status", "priority")
+    FILTER_KEY = "filter"
+
+    def __init__(self, db_path: Union[str, Path], name: str, timeout: float = 60.0):
+        """
+        Parameters
+        ----------
+        db_path : Union[str, Path]
+            the path of the SQLite database file
+        name : str
+            the name of the task pool
+        timeout : float
+            the seconds to wait for the lock of the database
+        """
+        self.db_path = Path(db_path)
+        self.name = name
+        self.timeout = timeout
+        self._table = '"{}"'.format(name.replace('"', '""'))
+        self._conn_pid = None
+        self._conn = None
+        with self._transaction() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self._table} "
+                "(_id TEXT PRIMARY KEY, status TEXT, priority INTEGER, filter TEXT, doc BLOB)"
+            )
+            index = '"{}"'.format(f"{name}_status_priority".replace('"', '""'))
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {self._table} (status, priority DESC)")
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # a connection can't be shared by the processes, so every process opens its own one
+        if self._conn is None or self._conn_pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self.conn
+        if conn.in_transaction:
+            # nested in an outer transaction
+            yield conn
+            return
+        # take the write lock at the beginning, so the read-modify-write in the transaction is atomic
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _encode(self, doc: dict) -> dict:
+        row = {k: doc.get(k) for k in self.COLUMNS}
+        row["_id"] = str(row["_id"])
+        row["filter"] = _dumps_json(doc[self.FILTER_KEY]) if self.FILTER_KEY in doc else None
+        row["doc"] = pickle.dumps(
+            {k: v for k, v in doc.items() if k not in self.COLUMNS}, protocol=C.dump_protocol_version
+        )
+        return row
+
+    def _decode(self, row: tuple) -> dict:
+        _id, status, priority, doc = row
+        doc = pickle.loads(doc)
+        doc.update({"_id": ObjectId(_id), "status": status})
+        if priority is not None:
+            doc["priority"] = priority
+        return doc
+
+    def _where(self, query: dict) -> Tuple[str, list]:
+        """convert the MongoDB query to the SQL condition and its parameters"""
+        conditions, params = [], []
+        for key, value in query.items():
+            # the SQL of the field and its parameters
+            if key in self.COLUMNS:
+                field, field_params = key, []
+            elif key == self.FILTER_KEY:
+                field, field_params = "filter", []
+            elif key.startswith(f"{self.FILTER_KEY}."):
+                field, field_params = "json_extract(filter, ?)", ["$" + key[len(self.FILTER_KEY) :]]
+            else:
+                raise NotImplementedError(f"The query of `{key}` is not supported by {self.__class__.__name__}")
+
+            def _encode_value(v):
+                if key == "_id":
+                    return str(v)
+                if key.startswith(self.FILTER_KEY) and (key == self.FILTER_KEY or isinstance(v, (dict, list))):
+                    return _dumps_json(v)
+                return v
+
+            is_op = isinstance(value, dict) and len(value) > 0 and all(k.startswith("$") for k in value)
+            if not is_op:
+                value = {"$eq": value}
+            for op, v in value.items():
+                if op in ("$in", "$nin"):
+                    not_ = "NOT " if op == "$nin" else ""
+                    conditions.append(f"{field} {not_}IN ({', '.join('?' * len(v))})")
+                    params.extend([*field_params, *map(_encode_value, v)])
+                elif op == "$eq" and v is None:
+                    conditions.append(f"{field} IS NULL")
+                    params.extend(field_params)
+                elif op in ("$eq", "$ne"):
+                    conditions.append(f"{field} {'=' if op == '$eq' else 'IS NOT'} ?")
+                    params.extend([*field_params, _encode_value(v)])
+                else:
+                    raise NotImplementedError(f"The operator `{op}` is not supported by {self.__class__.__name__}")
+        return (" AND ".join(conditions) if conditions else "1"), params
+
+    @staticmethod
+    def _order_by(sort: Optional[List[Tuple[str, int]]]) -> str:
+        # the earlier inserted document comes first if the sort keys are the same
+        return ", ".join([*(f"{k} {'DESC' if d == DESCENDING else 'ASC'}" for k, d in (sort or [])), "rowid"])
+
+    def _split_update(self, update: dict) -> Tuple[dict, dict]:
+        if update.keys() != {"$set"}:
+            raise NotImplementedError(f"Only `$set` is supported by {self.__class__.__name__}")
+        col_set = {k: v for k, v in update["$set"].items() if k in self.COLUMNS}
+        doc_set = {k: v for k, v in update["$set"].items() if k not in self.COLUMNS}
+        if "_id" in col_set:
+            raise ValueError("`_id` can't be updated")
+        return col_set, doc_set
+
+    def insert_one(self, document: dict) -> InsertOneResult:
+        document.setdefault("_id", ObjectId())
+        row = self._encode(document)
+        with self._transaction() as conn:
+            conn.execute(
+                f"INSERT INTO {self._table} (_id, status, priority, filter, doc) VALUES (?, ?, ?, ?, ?)",
+                [row[k] for k in ["_id", "status", "priority", "filter", "doc"]],
+            )
+        return InsertOneResult(document["_id"], acknowledged=True)
+
+    def find(self, filter: Optional[dict] = None, sort: Optional[List[Tuple[str, int]]] = None) -> List[dict]:
+        where, params = self._where(filter or {})
+        order = self._order_by(sort)
+        cursor = self.conn.execute(
+            f"SELECT _id, status, priority, doc FROM {self._table} WHERE {where} ORDER BY {order}", params
+        )
+        return [self._decode(row) for row in cursor.fetchall()]
+
+    def find_one(self, filter: Optional[dict] = None, sort: Optional[List[Tuple[str, int]]] = None) -> Optional[dict]:
+        docs = self.find(filter, sort=sort)
+        return docs[0] if len(docs) > 0 else None
+
+    def find_one_and_update(
+        self, filter: dict, update: dict, sort: Optional[List[Tuple[str, int]]] = None
+    ) -> Optional[dict]:
+        """
+        Find a document and update it atomically.
+        The highest priority document is found first if `sort=[("priority", DESCENDING)]` (`NULL` is the lowest), then
+        the earliest inserted one.
+
+        .. note::
+
+            Unlike MongoDB, the document after the update is returned.
+        """
+        col_set, doc_set = self._split_update(update)
+        if len(doc_set) > 0:
+            with self._transaction():
+                doc = self.find_one(filter, sort=sort)
+                if doc is not None:
+                    self.update_one({"_id": doc["_id"]}, update)
+                    doc.update(update["$set"])
+            return doc
+
+        where, params = self._where(filter)
+        order = self._order_by(sort)
+        assignments = ", ".join(f"{k} = ?" for k in col_set)
+        with self._transaction() as conn:
+            row = conn.execute(
+                f"UPDATE {self._table} SET {assignments} WHERE _id = "
+                f"(SELECT _id FROM {self._table} WHERE {where} ORDER BY {order} LIMIT 1) "
+                "RETURNING _id, status, priority, doc",
+                [*col_set.values(), *params],
+            ).fetchone()
+        return None if row is None else self._decode(row)
+
+    def _update(self, filter: dict, update: dict, many: bool) -> UpdateResult:
+        col_set, doc_set = self._split_update(update)
+        where, params = self._where(filter)
+        limit = "" if many else " LIMIT 1"
+        with self._transaction() as conn:
+            rows = conn.execute(
+                f"SELECT _id, doc FROM {self._table} WHERE {where} ORDER BY rowid{limit}", params
+            ).fetchall()
+            for _id, doc in rows:
+                values = list(col_set.values())
+                assignments = [f"{k} = ?" for k in col_set]
+                if len(doc_set) > 0:
+                    doc = pickle.loads(doc)
+                    doc.update(doc_set)
+                    assignments.append("doc = ?")
+                    values.append(pickle.dumps(doc, protocol=C.dump_protocol_version))
+                    if self.FILTER_KEY in doc_set:
+                        assignments.append("filter = ?")
+                        values.append(_dumps_json(doc_set[self.FILTER_KEY]))
+                conn.execute(f"UPDATE {self._table} SET {', '.join(assignments)} WHERE _id = ?", [*values, _id])
+        return UpdateResult({"n": len(rows), "nModified": len(rows)}, acknowledged=True)
+
+    def update_one(self, filter: dict, update: dict) -> UpdateResult:
+        return self._update(filter, update, many=False)
+
+    def update_many(self, filter: dict, update: dict) -> UpdateResult:
+        return self._update(filter, update, many=True)
+
+    def replace_one(self, filter: dict, replacement: dict) -> UpdateResult:
+        where, params = self._where(filter)
+        with self._transaction() as conn:
+            row = conn.execute(f"SELECT _id FROM {self._table} WHERE {where} ORDER BY rowid LIMIT 1", params).fetchone()
+            if row is not None:
+                new_row = self._encode({**replacement, "_id": row[0]})
+                conn.execute(
+                    f"UPDATE {self._table} SET status = ?, priority = ?, filter = ?, doc = ? WHERE _id = ?",
+                    [new_row[k] for k in ["status", "priority", "filter", "doc", "_id"]],
+                )
+        n = 0 if row is None else 1
+        return UpdateResult({"n": n, "nModified": n}, acknowledged=True)
+
+    def delete_many(self, filter: dict) -> DeleteResult:
+        where, params = self._where(filter)
+        with self._transaction() as conn:
+            n = conn.execute(f"DELETE FROM {self._table} WHERE {where}", params).rowcount
+        return DeleteResult({"n": n}, acknowledged=True)
+
+    def count_by_status(self, filter: Optional[dict] = None) -> dict:
+        """count the documents in every status without decoding them"""
+        where, params = self._where(filter or {})
+        cursor = self.conn.execute(f"SELECT status, COUNT(*) FROM {self._table} WHERE {where} GROUP BY status", params)
+        return dict(cursor.fetchall())
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.db_path}, {self.name})"
+
+
+class SQLiteTaskDB:
+    """
+    An SQLite database of task pools. It works like the `pymongo` Database for `TaskManager`.
+    """
+
+    URL_PREFIX = "sqlite:///"
+
+    def __init__(self, db_path: Union[str, Path]):
+        self.db_path = Path(db_path)
+
+    @classmethod
+    def from_url(cls, url: str) -> "SQLiteTaskDB":
+        """`sqlite:///relative/path.db` or `sqlite:////absolute/path.db`"""
+        return cls(url[len(cls.URL_PREFIX) :])
+
+    def __getitem__(self, name: str) -> SQLiteTaskPool:
+        return SQLiteTaskPool(self.db_path, name)
+
+    def list_collection_names(self) -> List[str]:
+        if not self.db_path.exists():
+            return []
+        with sqlite3.connect(self.db_path) as conn:
+            return [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
@@ -15,6 +15,7 @@ from qlib.config import C
 from qlib.log import get_module_logger
 from pymongo import MongoClient
 from pymongo.database import Database
+from .sqlite import SQLiteTaskDB
 from typing import Union
 from pathlib import Path
 
@@ -57,6 +58,33 @@ def get_mongodb() -> Database:
     return client.get_database(name=cfg["task_db_name"])
 
 
+def get_task_db():
+    """
+    Get the database of the task pools for `TaskManager`.
+
+    It is an SQLite database (please refer to `qlib.workflow.task.sqlite`) if the `task_url` of `C["mongo"]` starts
+    with `sqlite:///`, otherwise the database in MongoDB (please refer to `get_mongodb`).
+
+    .. code-block:: python
+
+        C["mongo"] = {
+            "task_url" : "sqlite:////path/to/tasks.db",
+            "task_db_name" : "rolling_db"  # not used by SQLite
+        }
+
+    Returns:
+        Union[SQLiteTaskDB, Database]: the database instance
+    """
+    try:
+        cfg = C["mongo"]
+    except KeyError:
+        get_module_logger("task").error("Please configure `C['mongo']` before using TaskManager")
+        raise
+    if cfg["task_url"].startswith(SQLiteTaskDB.URL_PREFIX):
+        return SQLiteTaskDB.from_url(cfg["task_url"])
+    return get_mongodb()
+
+
 def list_recorders(experiment, rec_filter_func=None):
     """
     List all recorders which can pass the filter in an experiment.
@@ -15,6 +15,7 @@ import pandas as pd
 from tqdm import tqdm
 from loguru import logger
 from qlib.utils import fname_to_code, code_to_fname
+from qlib.data.storage.file_storage import BundleFeatureStorage
 
 
 class DumpDataBase:
@@ -356,6 +357,36 @@ class DumpDataFix(DumpDataAll):
         self._dump_features()
 
 
+class DumpDataBundle(DumpDataAll):
+    """Dump all the fields of an instrument into one columnar bundle file: `features/<instrument>/<freq>.bundle`
+
+    The bundle is read by `qlib.data.storage.file_storage.BundleFeatureStorage`.
+    """
+
+    BUNDLE_FILE_SUFFIX = ".bundle"
+
+    def _data_to_bin(self, df: pd.DataFrame, calendar_list: List[pd.Timestamp], features_dir: Path):
+        if df.empty:
+            logger.warning(f"{features_dir.name} data is None or empty")
+            return
+        if not calendar_list:
+            logger.warning("calendar_list is empty")
+            return
+        # align index
+        _df = self.data_merge_calendar(df, calendar_list)
+        if _df.empty:
+            logger.warning(f"{features_dir.name} data is not in calendars")
+            return
+        date_index = self.get_datetime_index(_df, calendar_list)
+        fields = sorted(filter(lambda x: x in _df.columns, self.get_dump_fields(_df.columns)))
+        BundleFeatureStorage.write_bundle(
+            features_dir.joinpath(f"{self.freq}{self.BUNDLE_FILE_SUFFIX}"),
+            fields,
+            _df[fields].values.T,
+            date_index,
+        )
+
+
 class DumpDataUpdate(DumpDataBase):
     def __init__(
         self,
@@ -502,4 +533,11 @@ class DumpDataUpdate(DumpDataBase):
 
 
 if __name__ == "__main__":
-    fire.Fire({"dump_all": DumpDataAll, "dump_fix": DumpDataFix, "dump_update": DumpDataUpdate})
+    fire.Fire(
+        {
+            "dump_all": DumpDataAll,
+            "dump_fix": DumpDataFix,
+            "dump_update": DumpDataUpdate,
+            "dump_bundle": DumpDataBundle,
+        }
+    )
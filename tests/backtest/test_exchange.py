@@ -0,0 +1,103 @@
+import copy
+import unittest
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from qlib.backtest.decision import Order, OrderDir
+from qlib.backtest.exchange import Exchange
+from qlib.backtest.high_performance_ds import CubeQuote, NumpyQuote
+from qlib.backtest.position import Position
+from qlib.data import D
+from qlib.tests import TestAutoData
+
+
+class TestDealOrders(TestAutoData):
+    """Dealing the orders in batch should give the same results as dealing them one by one"""
+
+    START_TIME, END_TIME = pd.Timestamp("2020-01-02"), pd.Timestamp("2020-01-10")
+
+    def make_orders(self, exchange, date, seed):
+        rng = np.random.RandomState(seed)
+        codes = D.list_instruments(D.instruments("csi300"), self.START_TIME, self.END_TIME, as_list=True)
+        codes = list(rng.permutation(codes)) + ["NOT_EXISTS"]
+        position = {}
+        orders = []
+        for i, code in enumerate(codes):
+            price = exchange.get_close(code, date, date) if code in exchange.quote.get_all_stock() else None
+            amount = 1e6 / price if price is not None and not np.isnan(price) else 1000.0
+            if i % 2 == 0:
+                position[code] = {"amount": amount, "price": price or 1.0}
+                orders.append(Order(code, amount * rng.choice([0.3, 1.0]), OrderDir.SELL, date, date))
+            else:
+                orders.append(Order(code, amount * rng.rand(), OrderDir.BUY, date, date))
+        # the sells go first as `SimulatorExecutor` does
+        orders.sort(key=lambda order: -order.direction)
+        return Position(cash=3e7, position_dict=position), orders
+
+    def test_deal_orders(self):
+        for quote_cls in [NumpyQuote, CubeQuote]:
+            exchange = Exchange(
+                start_time=self.START_TIME,
+                end_time=self.END_TIME,
+                codes="csi300",
+                deal_price="close",
+                limit_threshold=0.095,
+                volume_threshold={"all": ("current", "0.02 * $volume"), "buy": ("cum", "0.01 * $volume")},
+                impact_cost=0.1,
+                quote_cls=quote_cls,
+            )
+            for seed, date in enumerate(D.calendar(self.START_TIME, self.END_TIME)):
+                position, orders = self.make_orders(exchange, date, seed)
+                batch_position, batch_orders = copy.deepcopy(position), copy.deepcopy(orders)
+
+                dealt_order_amount = defaultdict(float)
+                expected = []
+                for order in orders:
+                    expected.append(
+                        exchange.deal_order(order, position=position, dealt_order_amount=dealt_order_amount)
+                    )
+                    dealt_order_amount[order.stock_id] += order.deal_amount
+                batch_dealt_order_amount = defaultdict(float)
+                actual = exchange.deal_orders(
+                    batch_orders, position=batch_position, dealt_order_amount=batch_dealt_order_amount
+                )
+
+                self.assertEqual(actual, expected)
+                self.assertEqual(
+                    [(o.deal_amount, o.factor) for o in batch_orders], [(o.deal_amount, o.factor) for o in orders]
+                )
+                self.assertEqual(batch_dealt_order_amount, dealt_order_amount)
+                self.assertEqual(batch_position.position, position.position)
+                # some orders are partially dealt
+                self.assertTrue(any(0 < o.deal_amount < o.amount for o in orders))
+
+    def test_is_tradable(self):
+        codes = D.list_instruments(D.instruments("csi300"), self.START_TIME, self.END_TIME, as_list=True)
+        codes = codes + ["NOT_EXISTS"]
+        calendar = D.calendar(self.START_TIME, self.END_TIME)
+        for quote_cls in [NumpyQuote, CubeQuote]:
+            exchange = Exchange(
+                start_time=self.START_TIME,
+                end_time=self.END_TIME,
+                codes="csi300",
+                deal_price="close",
+                limit_threshold=0.095,
+                quote_cls=quote_cls,
+            )
+            # the single days, the ranges of multiple days and the range without any trading day
+            ranges = [(date, date) for date in calendar] + [(calendar[i], calendar[i + 2]) for i in range(3)]
+            ranges.append((pd.Timestamp("2020-01-04"), pd.Timestamp("2020-01-05")))
+            for start_time, end_time in ranges:
+                expected = [exchange.check_stock_suspended(code, start_time, end_time) for code in codes]
+                self.assertEqual(list(exchange.is_suspended(codes, start_time, end_time)), expected)
+                for direction in [None, OrderDir.BUY, OrderDir.SELL]:
+                    expected = [exchange.is_stock_tradable(code, start_time, end_time, direction) for code in codes]
+                    self.assertEqual(list(exchange.is_tradable(codes, start_time, end_time, direction)), expected)
+            self.assertFalse(exchange.is_tradable(codes, self.START_TIME, self.END_TIME).all())
+            self.assertTrue(exchange.is_tradable(codes, self.START_TIME, self.END_TIME).any())
+
+
+if __name__ == "__main__":
+    unittest.main()
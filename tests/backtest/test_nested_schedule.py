@@ -0,0 +1,79 @@
+import copy
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from qlib.backtest import backtest
+from qlib.data import D
+from qlib.tests import TestAutoData
+
+
+class TestNestedSchedule(TestAutoData):
+    """Following the schedule of the inner strategy should give the same results as running the inner steps"""
+
+    def test_twap(self):
+        start_time, end_time = "2020-01-02", "2020-03-31"
+        codes = D.list_instruments(D.instruments("csi300"), start_time, end_time, as_list=True)
+        rng = np.random.RandomState(0)
+        orders = []
+        for i, week in enumerate(D.calendar(start_time, end_time, freq="week")):
+            for code in rng.choice(codes, 40, replace=False):
+                direction = "buy" if i % 2 == 0 or rng.rand() < 0.3 else "sell"
+                orders.append([week, code, float(rng.randint(1, 80) * 137), direction])
+        strategy_config = {
+            "class": "FileOrderStrategy",
+            "module_path": "qlib.contrib.strategy.rule_strategy",
+            "kwargs": {"file": pd.DataFrame(orders, columns=["datetime", "instrument", "amount", "direction"])},
+        }
+        executor_config = {
+            "class": "NestedExecutor",
+            "module_path": "qlib.backtest.executor",
+            "kwargs": {
+                "time_per_step": "week",
+                "generate_portfolio_metrics": True,
+                "inner_executor": {
+                    "class": "SimulatorExecutor",
+                    "module_path": "qlib.backtest.executor",
+                    "kwargs": {"time_per_step": "day"},
+                },
+                "inner_strategy": {"class": "TWAPStrategy", "module_path": "qlib.contrib.strategy.rule_strategy"},
+            },
+        }
+        results = []
+        for fast_schedule in [False, True]:
+            executor_config["kwargs"]["fast_schedule"] = fast_schedule
+            results.append(
+                backtest(
+                    start_time=start_time,
+                    end_time=end_time,
+                    strategy=copy.deepcopy(strategy_config),
+                    executor=copy.deepcopy(executor_config),
+                    account=1e8,
+                    benchmark=None,
+                    exchange_kwargs={
+                        "freq": "day",
+                        "codes": codes,
+                        "deal_price": "close",
+                        "limit_threshold": 0.095,
+                        "trade_unit": 100,
+                        "volume_threshold": {"all": ("current", "0.001 * $volume")},
+                    },
+                )
+            )
+        (portfolio_metric_dict, indicator_dict), (fast_portfolio_metric_dict, fast_indicator_dict) = results
+        report, positions = portfolio_metric_dict["1week"]
+        fast_report, fast_positions = fast_portfolio_metric_dict["1week"]
+        pd.testing.assert_frame_equal(fast_report, report)
+        pd.testing.assert_frame_equal(fast_indicator_dict["1week"][0], indicator_dict["1week"][0])
+        self.assertEqual(fast_positions.keys(), positions.keys())
+        for date, position in positions.items():
+            self.assertEqual(
+                fast_positions[date].get_stock_amount_dict(), position.get_stock_amount_dict(), msg=str(date)
+            )
+        # some orders are partially dealt
+        self.assertTrue((indicator_dict["1week"][0]["ffr"] < 1).any())
+
+
+if __name__ == "__main__":
+    unittest.main()
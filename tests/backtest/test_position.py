@@ -0,0 +1,145 @@
+import copy
+import pickle
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from qlib.backtest import backtest
+from qlib.backtest.decision import Order, OrderDir
+from qlib.backtest.position import ArrayPosition, Position
+from qlib.data import D
+from qlib.tests import TestAutoData
+
+
+class TestArrayPosition(unittest.TestCase):
+    """ArrayPosition should behave the same as Position"""
+
+    CODES = [f"SH60{i:04d}" for i in range(20)]
+
+    def assert_same(self, expected: Position, actual: ArrayPosition) -> None:
+        self.assertEqual(set(actual.get_stock_list()), set(expected.get_stock_list()))
+        self.assertEqual(actual.get_cash(include_settle=True), expected.get_cash(include_settle=True))
+        self.assertAlmostEqual(actual.calculate_value(), expected.calculate_value(), places=6)
+        self.assertEqual(actual.get_stock_amount_dict(), expected.get_stock_amount_dict())
+        for only_stock in [True, False]:
+            expected_weight = expected.get_stock_weight_dict(only_stock=only_stock)
+            actual_weight = actual.get_stock_weight_dict(only_stock=only_stock)
+            self.assertEqual(actual_weight.keys(), expected_weight.keys())
+            for code, weight in expected_weight.items():
+                self.assertAlmostEqual(actual_weight[code], weight, places=10)
+        for code in self.CODES:
+            self.assertEqual(actual.check_stock(code), expected.check_stock(code))
+            self.assertEqual(actual.get_stock_amount(code), expected.get_stock_amount(code))
+            if expected.check_stock(code):
+                self.assertEqual(actual.get_stock_price(code), expected.get_stock_price(code))
+                self.assertEqual(actual.get_stock_count(code, "day"), expected.get_stock_count(code, "day"))
+                if "weight" in expected.position[code]:
+                    self.assertAlmostEqual(actual.get_stock_weight(code), expected.get_stock_weight(code), places=10)
+        self.assertEqual(actual.position.keys(), expected.position.keys())
+
+    def test_random_operations(self):
+        rng = np.random.RandomState(0)
+        position_dict = {code: {"amount": 1000.0, "price": 10.0} for code in self.CODES[:5]}
+        expected = Position(cash=1e6, position_dict=position_dict)
+        actual = ArrayPosition(cash=1e6, position_dict=position_dict)
+        self.assert_same(expected, actual)
+        snapshots = []
+        for step in range(50):
+            settle = step % 3 == 0
+            if settle:
+                expected.settle_start(Position.ST_CASH)
+                actual.settle_start(ArrayPosition.ST_CASH)
+            for code in rng.choice(self.CODES, 5, replace=False):
+                price = rng.uniform(5, 15)
+                held = expected.get_stock_amount(code)
+                if held > 0 and rng.rand() < 0.5:
+                    amount = held if rng.rand() < 0.5 else held * rng.rand()
+                    order = Order(code, amount, OrderDir.SELL, pd.Timestamp("2020-01-01"), pd.Timestamp("2020-01-01"))
+                else:
+                    order = Order(code, 100.0, OrderDir.BUY, pd.Timestamp("2020-01-01"), pd.Timestamp("2020-01-01"))
+                for position in [expected, actual]:
+                    position.update_order(order, order.amount * price, 5.0, price)
+            for code in expected.get_stock_list():
+                price = expected.get_stock_price(code) * rng.uniform(0.9, 1.1)
+                expected.update_stock_price(code, price)
+                actual.update_stock_price(code, price)
+            if settle:
+                expected.settle_commit()
+                actual.settle_commit()
+            for position in [expected, actual]:
+                position.add_count_all(bar="day")
+                position.update_account_value(position.calculate_value())
+                position.update_weight_all()
+            self.assert_same(expected, actual)
+            snapshots.append((copy.deepcopy(expected), copy.deepcopy(actual)))
+            # the temporary copies must not affect the original positions
+            temp = copy.deepcopy(actual)
+            temp.update_order(
+                Order("SZ000001", 100.0, OrderDir.BUY, pd.Timestamp("2020-01-01"), pd.Timestamp("2020-01-01")),
+                1000.0,
+                5.0,
+                10.0,
+            )
+            self.assertFalse(actual.check_stock("SZ000001"))
+
+        for expected, actual in snapshots:
+            self.assert_same(expected, actual)
+            self.assert_same(expected, pickle.loads(pickle.dumps(actual)))
+            self.assertAlmostEqual(
+                actual.position["now_account_value"], expected.position["now_account_value"], places=6
+            )
+
+    def test_missing_price(self):
+        actual = ArrayPosition(cash=1e6, position_dict={"SH600000": 1000})
+        self.assertIsNone(actual.get_stock_price("SH600000"))
+        self.assertNotIn("now_account_value", actual.position)
+        # the cash related keys are written back
+        actual.position["now_account_value"] = 1.0
+        self.assertEqual(actual.position["now_account_value"], 1.0)
+        with self.assertRaises(KeyError):
+            actual.get_stock_price("SH600001")
+
+
+class TestArrayPositionBacktest(TestAutoData):
+    def test_backtest(self):
+        strategy_config = {
+            "class": "TopkDropoutStrategy",
+            "module_path": "qlib.contrib.strategy.signal_strategy",
+            "kwargs": {"signal": "<PRED>", "topk": 30, "n_drop": 5},
+        }
+        start_time, end_time = "2020-01-02", "2020-03-31"
+        codes = D.list_instruments(D.instruments("csi300"), start_time, end_time, as_list=True)
+        index = pd.MultiIndex.from_product(
+            [pd.date_range(start_time, end_time), codes], names=["datetime", "instrument"]
+        )
+        strategy_config["kwargs"]["signal"] = pd.Series(np.random.RandomState(0).rand(len(index)), index=index)
+        results = {}
+        for pos_type in ["Position", "ArrayPosition"]:
+            portfolio_metric_dict, _ = backtest(
+                start_time=start_time,
+                end_time=end_time,
+                strategy=copy.deepcopy(strategy_config),
+                executor={
+                    "class": "SimulatorExecutor",
+                    "module_path": "qlib.backtest.executor",
+                    "kwargs": {"time_per_step": "day", "generate_portfolio_metrics": True},
+                },
+                account=1e8,
+                benchmark=None,
+                exchange_kwargs={"freq": "day", "codes": codes, "deal_price": "close"},
+                pos_type=pos_type,
+            )
+            results[pos_type] = portfolio_metric_dict["1day"]
+        report, positions = results["Position"]
+        array_report, array_positions = results["ArrayPosition"]
+        pd.testing.assert_frame_equal(array_report, report)
+        self.assertEqual(array_positions.keys(), positions.keys())
+        for date, position in positions.items():
+            self.assertEqual(
+                array_positions[date].get_stock_amount_dict(), position.get_stock_amount_dict(), msg=str(date)
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from qlib.backtest.high_performance_ds import CubeQuote, NumpyQuote
+from qlib.utils.index_data import SingleData
+
+
+class TestCubeQuote(unittest.TestCase):
+    """CubeQuote should give the same results as NumpyQuote"""
+
+    METHODS = [None, "sum", "mean", "last", "all", "any", "ts_data_last"]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        rng = np.random.RandomState(0)
+        times = pd.date_range("2021-01-04 09:31", periods=120, freq="min")
+        insts = [f"SH60{i:04d}" for i in range(8)]
+        index = pd.MultiIndex.from_product([insts, times], names=["instrument", "datetime"])
+        quote_df = pd.DataFrame(
+            {
+                "$close": rng.rand(len(index)).astype(np.float32) * 10,
+                "$volume": rng.randint(0, 1000, len(index)).astype(np.float32),
+                "limit_buy": rng.rand(len(index)) < 0.3,
+            },
+            index=index,
+        )
+        quote_df.loc[rng.rand(len(index)) < 0.2, "$close"] = np.nan
+        quote_df.loc["SH600001", "$close"] = np.nan
+        # the stocks without data at some time
+        quote_df = quote_df[
+            (rng.rand(len(index)) > 0.1) | (quote_df.index.get_level_values("instrument") == "SH600002")
+        ]
+        quote_df = quote_df.drop(index=times[30:60], level="datetime").drop(index="SH600003", level="instrument")
+        cls.quote_df = quote_df
+        cls.times = times
+        cls.insts = insts
+        cls.numpy_quote = NumpyQuote(quote_df, "1min")
+        cls.cube_quote = CubeQuote(quote_df, "1min")
+
+    def assert_same(self, expected, actual, msg):
+        if isinstance(expected, SingleData):
+            self.assertIsInstance(actual, SingleData, msg)
+            self.assertEqual(list(expected.index), list(actual.index), msg)
+            np.testing.assert_allclose(actual.data, expected.data, err_msg=msg)
+        elif expected is None:
+            self.assertIsNone(actual, msg)
+        else:
+            np.testing.assert_allclose(actual, expected, rtol=1e-10, err_msg=msg)
+
+    def test_get_data(self):
+        self.assertEqual(set(self.numpy_quote.get_all_stock()), set(self.cube_quote.get_all_stock()))
+        rng = np.random.RandomState(1)
+        for _ in range(500):
+            stock_id = self.insts[rng.randint(len(self.insts))]
+            start, length = rng.randint(len(self.times)), rng.randint(0, 40)
+            start_time = self.times[start]
+            end_time = start_time + pd.Timedelta(minutes=length) - pd.Timedelta(seconds=1)
+            for field in ["$close", "$volume", "limit_buy"]:
+                for method in self.METHODS:
+                    msg = f"{stock_id} {start_time} {end_time} {field} {method}"
+                    self.numpy_quote.get_data.cache_clear()
+                    expected = self.numpy_quote.get_data(stock_id, start_time, end_time, field, method)
+                    actual = self.cube_quote.get_data(stock_id, start_time, end_time, field, method)
+                    self.assert_same(expected, actual, msg)
+
+    def test_get_data_batch(self):
+        rng = np.random.RandomState(2)
+        stock_ids = self.insts + ["NOT_EXISTS"]
+        for _ in range(100):
+            start, length = rng.randint(len(self.times)), rng.randint(0, 40)
+            start_time = self.times[start]
+            end_time = start_time + pd.Timedelta(minutes=length) - pd.Timedelta(seconds=1)
+            for field in ["$close", "$volume", "limit_buy"]:
+                for method in self.METHODS[1:]:
+                    msg = f"{start_time} {end_time} {field} {method}"
+                    expected = self.numpy_quote.get_data_batch(stock_ids, start_time, end_time, field, method)
+                    actual = self.cube_quote.get_data_batch(stock_ids, start_time, end_time, field, method)
+                    np.testing.assert_allclose(actual, expected, rtol=1e-10, err_msg=msg)
+
+    def test_float32(self):
+        quote = CubeQuote(self.quote_df, "1min", dtype=np.float32, agg_cache_size=2)
+        self.assertEqual(quote.cube.dtype, np.float32)
+        stock_ids = self.insts + ["NOT_EXISTS"]
+        for field in ["$close", "$volume", "limit_buy"]:
+            for method in self.METHODS[1:]:
+                expected = self.numpy_quote.get_data_batch(stock_ids, self.times[10], self.times[80], field, method)
+                actual = quote.get_data_batch(stock_ids, self.times[10], self.times[80], field, method)
+                np.testing.assert_allclose(actual, expected, rtol=1e-6, err_msg=f"{field} {method}")
+                # the prefix arrays are dropped when there are too many
+                self.assertLessEqual(len(quote._agg_cache), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
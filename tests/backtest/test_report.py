@@ -0,0 +1,129 @@
+import copy
+import gc
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from qlib.backtest import backtest
+from qlib.backtest.report import ColumnarRecorder, Indicator
+from qlib.data import D
+from qlib.tests import TestAutoData
+
+
+class TestColumnarRecorder(unittest.TestCase):
+    """ColumnarRecorder should give the same dataframe as the one built from the dicts of the steps"""
+
+    def make_steps(self, n):
+        rng = np.random.RandomState(0)
+        steps = []
+        for i, time in enumerate(pd.date_range("2020-01-01", periods=n)):
+            values = {
+                "float": rng.rand(),
+                "float32": np.float32(rng.rand()),
+                "int": int(rng.randint(100)),
+                "bool": bool(rng.rand() < 0.5),
+                "str": f"s{i}",
+                "none": None,
+                # int -> float -> object
+                "mixed": i if i < n // 3 else (float(i) if i < 2 * n // 3 else str(i)),
+            }
+            if i % 7 == 3:
+                values["int"] = None
+            if i % 11 == 5:
+                del values["float"]
+            if i >= n // 2:
+                values["late"] = i
+            steps.append((time, values))
+        return steps
+
+    def expected_dataframe(self, steps):
+        # the latest step is overwritten by the step of the same time
+        records = {}
+        for time, values in steps:
+            records[time] = values
+        return pd.DataFrame(list(records.values()), index=list(records))
+
+    def test_to_dataframe(self):
+        steps = self.make_steps(300)
+        steps.insert(100, (steps[99][0], dict(steps[99][1], float=1.0, int=None)))
+        expected = self.expected_dataframe(steps)
+        recorder = ColumnarRecorder(["float", "float32", "int", "bool", "str", "none", "mixed"])
+        for time, values in steps:
+            recorder.append(time, values)
+        self.assertEqual(len(recorder), len(expected))
+        self.assertEqual(recorder.get_latest("late"), steps[-1][1]["late"])
+        pd.testing.assert_frame_equal(recorder.to_dataframe(), expected)
+
+        with tempfile.TemporaryDirectory() as flush_dir:
+            recorder = ColumnarRecorder(flush_dir=flush_dir, flush_size=37)
+            for time, values in steps:
+                recorder.append(time, values)
+            pd.testing.assert_frame_equal(recorder.to_dataframe(), expected, check_dtype=False)
+            self.assertEqual(recorder.to_dataframe()["float"].dtype, np.float64)
+            # the flushed rows are removed with the recorder
+            records_dir = recorder.flush_dir
+            self.assertGreater(len(list(records_dir.iterdir())), 0)
+            del recorder
+            gc.collect()
+            self.assertFalse(records_dir.exists())
+
+    def test_empty(self):
+        recorder = ColumnarRecorder(["a", "b"])
+        self.assertEqual(len(recorder), 0)
+        self.assertEqual(list(recorder.to_dataframe().columns), ["a", "b"])
+
+
+class TestReportFlush(TestAutoData):
+    def test_backtest(self):
+        start_time, end_time = "2020-01-02", "2020-03-31"
+        codes = D.list_instruments(D.instruments("csi300"), start_time, end_time, as_list=True)
+        index = pd.MultiIndex.from_product(
+            [pd.date_range(start_time, end_time), codes], names=["datetime", "instrument"]
+        )
+        strategy_config = {
+            "class": "TopkDropoutStrategy",
+            "module_path": "qlib.contrib.strategy.signal_strategy",
+            "kwargs": {
+                "signal": pd.Series(np.random.RandomState(0).rand(len(index)), index=index),
+                "topk": 30,
+                "n_drop": 5,
+            },
+        }
+        kwargs = dict(
+            start_time=start_time,
+            end_time=end_time,
+            executor={
+                "class": "SimulatorExecutor",
+                "module_path": "qlib.backtest.executor",
+                "kwargs": {"time_per_step": "day", "generate_portfolio_metrics": True},
+            },
+            account=1e8,
+            benchmark=None,
+            exchange_kwargs={"freq": "day", "codes": codes, "deal_price": "close"},
+        )
+        portfolio_metric_dict, indicator_dict = backtest(strategy=copy.deepcopy(strategy_config), **kwargs)
+        with tempfile.TemporaryDirectory() as flush_dir, patch.object(Indicator, "ORDER_FLUSH_SIZE", 7):
+            flushed_portfolio_metric_dict, flushed_indicator_dict = backtest(
+                strategy=copy.deepcopy(strategy_config), report_flush_dir=flush_dir, **kwargs
+            )
+            pd.testing.assert_frame_equal(flushed_portfolio_metric_dict["1day"][0], portfolio_metric_dict["1day"][0])
+            pd.testing.assert_frame_equal(flushed_indicator_dict["1day"][0], indicator_dict["1day"][0])
+            # the order indicators are flushed too
+            order_indicators = flushed_indicator_dict["1day"][1].order_indicator_records
+            self.assertGreater(len(order_indicators._chunks), 0)
+            expected_his = indicator_dict["1day"][1].order_indicator_his
+            flushed_his = flushed_indicator_dict["1day"][1].order_indicator_his
+            self.assertEqual(list(flushed_his), list(expected_his))
+            for time, order_indicator in expected_his.items():
+                self.assertEqual(list(flushed_his[time].data), list(order_indicator.data))
+                for metric in order_indicator.data:
+                    expected, flushed = order_indicator.get_index_data(metric), flushed_his[time].get_index_data(metric)
+                    self.assertEqual(flushed.index.tolist(), expected.index.tolist())
+                    np.testing.assert_array_equal(flushed.data, expected.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
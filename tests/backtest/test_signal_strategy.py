@@ -0,0 +1,71 @@
+import copy
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from qlib.backtest import backtest
+from qlib.backtest.high_performance_ds import CubeQuote
+from qlib.data import D
+from qlib.tests import TestAutoData
+
+
+class TestTopkDropoutPrecompute(TestAutoData):
+    """TopkDropoutStrategy should make the same decisions with and without precomputing the ranking"""
+
+    def test_precompute(self):
+        start_time, end_time = "2020-01-02", "2020-04-30"
+        codes = D.list_instruments(D.instruments("csi300"), start_time, end_time, as_list=True)
+        rng = np.random.RandomState(0)
+        index = pd.MultiIndex.from_product(
+            [pd.date_range(start_time, end_time), codes], names=["datetime", "instrument"]
+        )
+        signal = pd.Series(rng.rand(len(index)), index=index)
+        # the stocks with NaN scores and the stocks out of the signal
+        signal[rng.rand(len(signal)) < 0.05] = np.nan
+        signal = signal[rng.rand(len(signal)) > 0.1]
+        for kwargs in [
+            {},
+            {"only_tradable": True, "method_sell": "random"},
+            {"only_tradable": True, "topk": 5, "n_drop": 10, "hold_thresh": 3, "forbid_all_trade_at_limit": False},
+        ]:
+            results = []
+            for precompute in [False, True]:
+                strategy_kwargs = {"signal": signal, "topk": 30, "n_drop": 5, "precompute": precompute, **kwargs}
+                np.random.seed(0)
+                portfolio_metric_dict, _ = backtest(
+                    start_time=start_time,
+                    end_time=end_time,
+                    strategy={
+                        "class": "TopkDropoutStrategy",
+                        "module_path": "qlib.contrib.strategy.signal_strategy",
+                        "kwargs": strategy_kwargs,
+                    },
+                    executor={
+                        "class": "SimulatorExecutor",
+                        "module_path": "qlib.backtest.executor",
+                        "kwargs": {"time_per_step": "day", "generate_portfolio_metrics": True},
+                    },
+                    account=1e8,
+                    benchmark=None,
+                    exchange_kwargs={
+                        "freq": "day",
+                        "codes": codes,
+                        "deal_price": "close",
+                        "limit_threshold": 0.095,
+                        "quote_cls": CubeQuote,
+                    },
+                )
+                results.append(portfolio_metric_dict["1day"])
+            (report, positions), (precomputed_report, precomputed_positions) = results
+            pd.testing.assert_frame_equal(precomputed_report, report, obj=str(kwargs))
+            for date, position in positions.items():
+                self.assertEqual(
+                    precomputed_positions[date].get_stock_amount_dict(),
+                    position.get_stock_amount_dict(),
+                    msg=f"{kwargs} {date}",
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import copy
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from qlib.backtest import backtest, backtest_sweep
+from qlib.backtest.high_performance_ds import CubeQuote
+from qlib.data import D
+from qlib.tests import TestAutoData
+
+
+class TestBacktestSweep(TestAutoData):
+    START_TIME, END_TIME = "2020-01-02", "2020-03-31"
+
+    def test_sweep(self):
+        codes = D.list_instruments(D.instruments("csi300"), self.START_TIME, self.END_TIME, as_list=True)
+        index = pd.MultiIndex.from_product(
+            [D.calendar(self.START_TIME, self.END_TIME), codes], names=["datetime", "instrument"]
+        )
+        signal = pd.Series(np.random.RandomState(0).rand(len(index)), index=index)
+        configs = [
+            {
+                "strategy": {
+                    "class": "TopkDropoutStrategy",
+                    "module_path": "qlib.contrib.strategy.signal_strategy",
+                    "kwargs": {"signal": signal, "topk": topk, "n_drop": n_drop},
+                }
+            }
+            for topk, n_drop in [(10, 2), (20, 5)]
+        ]
+        configs[1]["account"] = {"cash": 1e7}
+        kwargs = {
+            "executor": {
+                "class": "SimulatorExecutor",
+                "module_path": "qlib.backtest.executor",
+                "kwargs": {"time_per_step": "day", "generate_portfolio_metrics": True},
+            },
+            "benchmark": None,
+            "account": 1e8,
+        }
+        exchange_kwargs = {"codes": codes, "deal_price": "close", "limit_threshold": 0.095}
+        expected = []
+        for config in configs:
+            portfolio_dict, indicator_dict = backtest(
+                self.START_TIME, self.END_TIME, exchange_kwargs=exchange_kwargs, **{**kwargs, **copy.deepcopy(config)}
+            )
+            expected.append((portfolio_dict["1day"][0], indicator_dict["1day"][0]))
+
+        for n_jobs, quote_cls in [(1, None), (2, CubeQuote)]:
+            sweep_exchange_kwargs = {**exchange_kwargs, "quote_cls": quote_cls} if quote_cls else exchange_kwargs
+            portfolio_df, indicator_df = backtest_sweep(
+                self.START_TIME, self.END_TIME, configs, exchange_kwargs=sweep_exchange_kwargs, n_jobs=n_jobs, **kwargs
+            )
+            self.assertEqual(list(portfolio_df.index.names), ["run", "freq", "datetime"])
+            for run, (report, indicator) in enumerate(expected):
+                pd.testing.assert_frame_equal(portfolio_df.loc[(run, "1day")], report)
+                pd.testing.assert_frame_equal(indicator_df.loc[(run, "1day")], indicator)
+        # the account of the configs is not consumed by the runs
+        self.assertEqual(configs[1]["account"], {"cash": 1e7})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,10 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
+import gc
+import os
+import pickle
+import tempfile
 import unittest
 import pytest
 import sys
@@ -146,6 +150,74 @@ class TestTSDataSampler(unittest.TestCase):
         self.assertEqual(dataset[0][1], dataset[1][0])
         self.assertEqual(dataset[0][2], dataset[1][1])
 
+    def test_get_batch(self):
+        """
+        `get_batch` should return the same data as indexing the samples one by one
+        """
+        rng = np.random.RandomState(0)
+        index = pd.MultiIndex.from_product(
+            [pd.date_range("2000-01-01", periods=20), [f"{i:06d}" for i in range(8)]], names=["datetime", "instrument"]
+        )
+        # some instruments are missing on some dates
+        index = index[rng.rand(len(index)) < 0.7]
+        test_df = pd.DataFrame(rng.randn(len(index), 3), index=index, columns=["f0", "f1", "label"])
+        flt_data = pd.Series(rng.rand(len(index)) < 0.8, index=index)
+        for fillna_type in ["none", "ffill", "ffill+bfill"]:
+            dataset = TSDataSampler(
+                test_df.copy(), "2000-01-05", "2000-01-20", step_len=6, fillna_type=fillna_type, flt_data=flt_data
+            )
+            indices = rng.randint(0, len(dataset), size=50)
+            expected = np.stack([dataset[i] for i in indices])
+            np.testing.assert_array_equal(dataset.get_batch(indices), expected)
+            np.testing.assert_array_equal(dataset[list(indices)], expected)
+            out = np.empty_like(expected)
+            self.assertIs(dataset.get_batch(indices, out=out), out)
+            np.testing.assert_array_equal(out, expected)
+        with self.assertRaises(KeyError):
+            dataset.get_batch([0, len(dataset)])
+
+    def test_mmap(self):
+        """
+        The sampler spilled to memory-mapped files should return the same data, and be pickled without the data
+        """
+        rng = np.random.RandomState(0)
+        index = pd.MultiIndex.from_product(
+            [pd.date_range("2000-01-01", periods=50), [f"{i:06d}" for i in range(20)]], names=["datetime", "instrument"]
+        )
+        index = index[rng.rand(len(index)) < 0.7]
+        test_df = pd.DataFrame(rng.randn(len(index), 5), index=index)
+        dataset = TSDataSampler(test_df.copy(), "2000-01-10", "2000-02-10", step_len=5, fillna_type="ffill")
+        with tempfile.TemporaryDirectory() as mmap_dir:
+            mmap_dataset = TSDataSampler(
+                test_df.copy(), "2000-01-10", "2000-02-10", step_len=5, fillna_type="ffill", mmap_dir=mmap_dir
+            )
+            self.assertIsInstance(mmap_dataset.data_arr, np.memmap)
+            self.assertFalse(mmap_dataset.data_arr.flags.writeable)
+            dumped = pickle.dumps(mmap_dataset)
+            self.assertLess(len(dumped), len(pickle.dumps(dataset)) - dataset.data_arr.nbytes)
+            loaded = pickle.loads(dumped)
+            # the index is not pickled, it is rebuilt from the mapped codes
+            self.assertNotIn("data_index", loaded.__dict__)
+            self.assertNotIn("idx_df", dataset.__dict__)
+            indices = rng.randint(0, len(dataset), size=50)
+            for ds in [mmap_dataset, loaded]:
+                self.assertEqual(len(ds), len(dataset))
+                pd.testing.assert_index_equal(ds.get_index(), dataset.get_index())
+                pd.testing.assert_frame_equal(ds.idx_df, dataset.idx_df)
+                np.testing.assert_array_equal(ds["2000-01-20", "000003"], dataset["2000-01-20", "000003"])
+                for i in indices[:10]:
+                    np.testing.assert_array_equal(ds[i], dataset[i])
+                    self.assertTrue(ds[i].flags.writeable)
+                np.testing.assert_array_equal(ds.get_batch(indices), dataset.get_batch(indices))
+
+            # the files are removed with the sampler which creates them
+            del loaded
+            gc.collect()
+            self.assertEqual(len(os.listdir(mmap_dir)), 1)
+            del mmap_dataset, ds
+            gc.collect()
+            self.assertEqual(os.listdir(mmap_dir), [])
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=10)
@@ -0,0 +1,83 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import unittest
+
+import pandas as pd
+import pytest
+
+from qlib.data.dataset.handler import DataHandlerLP
+from qlib.data.dataset.utils import DatasetReuse
+from qlib.tests import TestAutoData
+from qlib.utils import init_instance_by_config
+from qlib.workflow.task.gen import RollingGen, task_generator
+
+
+class TestDatasetReuse(TestAutoData):
+    def get_tasks(self):
+        task = {
+            "dataset": {
+                "class": "DatasetH",
+                "module_path": "qlib.data.dataset",
+                "kwargs": {
+                    "handler": {
+                        "class": "Alpha158",
+                        "module_path": "qlib.contrib.data.handler",
+                        "kwargs": {
+                            "instruments": "csi300",
+                            "start_time": "2019-01-01",
+                            "end_time": "2019-11-30",
+                            "fit_start_time": "2019-01-01",
+                            "fit_end_time": "2019-06-30",
+                            "infer_processors": [
+                                {"class": "RobustZScoreNorm", "kwargs": {"fields_group": "feature"}},
+                                {"class": "Fillna", "kwargs": {"fields_group": "feature"}},
+                            ],
+                        },
+                    },
+                    "segments": {
+                        "train": ("2019-01-01", "2019-06-30"),
+                        "valid": ("2019-07-01", "2019-09-30"),
+                        "test": ("2019-10-01", "2019-11-30"),
+                    },
+                },
+            },
+        }
+        tasks = task_generator(task, RollingGen(step=20, rtype=RollingGen.ROLL_SD))
+        # the processors of the last task are fitted in a different time range
+        tasks[-1]["dataset"]["kwargs"]["handler"]["kwargs"]["fit_end_time"] = "2019-07-31"
+        return tasks
+
+    @pytest.mark.slow
+    def test_dataset_reuse(self):
+        tasks = self.get_tasks()
+        self.assertGreater(len(tasks), 2)
+        dataset_reuse = DatasetReuse(tasks)
+        datasets = []
+        for i, task in enumerate(tasks):
+            ds = dataset_reuse.get(task["dataset"])
+            self.assertEqual(ds.segments, task["dataset"]["kwargs"]["segments"])
+            if i in (0, len(tasks) - 1):
+                # the processors of the last task are fitted again
+                expected_ds = init_instance_by_config(task["dataset"])
+                for seg in ["train", "test"]:
+                    for data_key in [DataHandlerLP.DK_I, DataHandlerLP.DK_L]:
+                        pd.testing.assert_frame_equal(
+                            ds.prepare(seg, data_key=data_key), expected_ds.prepare(seg, data_key=data_key)
+                        )
+            datasets.append(ds)
+
+        # the handler is loaded only once over the time range covering all the tasks
+        handler = datasets[0].handler
+        self.assertTrue(all(ds.handler is handler for ds in datasets))
+        self.assertEqual(handler.end_time, tasks[-1]["dataset"]["kwargs"]["handler"]["kwargs"]["end_time"])
+        self.assertEqual(handler.infer_processors[0].fit_end_time, "2019-07-31")
+
+        # the dataset with a handler instance is not reused
+        dataset_config = {**tasks[0]["dataset"], "kwargs": {**tasks[0]["dataset"]["kwargs"], "handler": handler}}
+        self.assertIsNone(dataset_reuse._get_key(dataset_config))
+        self.assertIs(dataset_reuse.get(dataset_config).handler, handler)
+
+
+if __name__ == "__main__":
+    unittest.main()
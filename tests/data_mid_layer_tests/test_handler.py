@@ -2,9 +2,13 @@ import os
 import pickle
 import shutil
 import unittest
+
+import pandas as pd
+
 from qlib.tests import TestAutoData
 from qlib.data import D
 from qlib.data.dataset.handler import DataHandlerLP
+from qlib.data.dataset.utils import is_copy_on_write_enabled
 
 
 class HandlerTests(TestAutoData):
@@ -32,6 +36,72 @@ class HandlerTests(TestAutoData):
         self.assertTrue("_data" not in dh_d.data_loader.__dict__.keys())
         os.remove(fname)
 
+    def test_fetch_iter(self):
+        fit_kwargs = {"fit_start_time": "2010-01-01", "fit_end_time": "2010-12-31"}
+        handler_config = {
+            "instruments": "csi300",
+            "start_time": "2010-01-01",
+            "end_time": "2011-12-31",
+            "data_loader": {
+                "class": "QlibDataLoader",
+                "kwargs": {
+                    "config": {
+                        "feature": ["$close / Ref($close, 1) - 1", "Mean($volume, 5)", "Std($close, 10)"],
+                        "label": ["Ref($close, -2) / Ref($close, -1) - 1"],
+                    },
+                },
+            },
+            "infer_processors": [
+                {"class": "ZScoreNorm", "kwargs": {"fields_group": "feature", **fit_kwargs}},
+                {"class": "MinMaxNorm", "kwargs": {"fields_group": "feature", **fit_kwargs}},
+                {"class": "RobustZScoreNorm", "kwargs": {"fields_group": "feature", **fit_kwargs}},
+                {"class": "Fillna", "kwargs": {"fields_group": "feature"}},
+            ],
+            "learn_processors": ["DropnaLabel", {"class": "CSRankNorm", "kwargs": {"fields_group": "label"}}],
+        }
+        dh = DataHandlerLP(**handler_config)
+        dh_stream = DataHandlerLP(**handler_config, init_data=False)
+        for data_key in [DataHandlerLP.DK_I, DataHandlerLP.DK_L]:
+            selector = slice("2010-06-01", "2011-06-30")
+            expected = dh.fetch(selector, data_key=data_key)
+            chunks = list(dh_stream.fetch_iter(selector, data_key=data_key, chunk_size=60))
+            self.assertGreater(len(chunks), 1)
+            pd.testing.assert_frame_equal(pd.concat(chunks), expected, rtol=1e-4, atol=1e-5)
+            # the loaded data is simply split into chunks
+            pd.testing.assert_frame_equal(pd.concat(dh.fetch_iter(selector, data_key=data_key)), expected)
+
+    def test_copy_on_write(self):
+        handler_config = {
+            "instruments": ["SH600000", "SH600004", "SH600009", "SH600010"],
+            "start_time": "2010-01-01",
+            "end_time": "2010-12-31",
+            "data_loader": {
+                "class": "QlibDataLoader",
+                "kwargs": {
+                    "config": {
+                        "feature": ["$close / Ref($close, 1) - 1", "Mean($volume, 5)", "Std($close, 10)"],
+                        "label": ["Ref($close, -2) / Ref($close, -1) - 1"],
+                    },
+                },
+            },
+            # only the label is modified by the processors
+            "infer_processors": [{"class": "Fillna", "kwargs": {"fields_group": "label"}}],
+            "learn_processors": [{"class": "CSRankNorm", "kwargs": {"fields_group": "label"}}],
+        }
+        dh = DataHandlerLP(**handler_config)
+        dh_copy = DataHandlerLP(**handler_config, copy_on_write=False)
+        for data_key in [DataHandlerLP.DK_R, DataHandlerLP.DK_I, DataHandlerLP.DK_L]:
+            pd.testing.assert_frame_equal(dh.fetch(data_key=data_key), dh_copy.fetch(data_key=data_key))
+        report, report_copy = dh.memory_report(), dh_copy.memory_report()
+        if is_copy_on_write_enabled():
+            # the features are shared with the raw data
+            for data_key in [DataHandlerLP.DK_I, DataHandlerLP.DK_L]:
+                self.assertLess(report.loc[data_key, "own_nbytes"], report.loc[data_key, "nbytes"] / 2)
+            self.assertLess(report.loc["total", "nbytes"], report_copy.loc["total", "nbytes"])
+        self.assertEqual(report_copy.loc["total", "nbytes"], report_copy["own_nbytes"].iloc[:-1].sum())
+        # the raw data is not modified by the processors
+        self.assertFalse(dh.fetch(col_set="label", data_key=DataHandlerLP.DK_R).equals(dh.fetch(col_set="label")))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -3,9 +3,11 @@
 
 import unittest
 import numpy as np
+import pandas as pd
 from qlib.data import D
 from qlib.tests import TestAutoData
-from qlib.data.dataset.processor import MinMaxNorm, ZScoreNorm, CSZScoreNorm, CSZFillna
+from qlib.data.dataset.processor import MinMaxNorm, ZScoreNorm, CSZScoreNorm, CSZFillna, CSRankNorm, RobustZScoreNorm
+from qlib.utils.data import robust_zscore, zscore
 
 
 class TestProcessor(TestAutoData):
@@ -70,6 +72,67 @@ class TestProcessor(TestAutoData):
         # taking the 2nd group of data from the original data, to calculate and compare.
         assert (df[2:4] == ((origin_df[2:4] - origin_df[2:4].mean()).div(origin_df[2:4].std()))).all().all()
 
+    def test_RobustZScoreNorm_mixed_dtype(self):
+        index = pd.MultiIndex.from_product(
+            [pd.date_range("2020-01-01", periods=10), ["SH600000", "SH600001"]], names=["datetime", "instrument"]
+        )
+        df = pd.DataFrame(
+            {("feature", "a"): np.arange(20, dtype=np.float32), ("feature", "b"): np.arange(20.0) ** 2}, index=index
+        )
+        proc = RobustZScoreNorm(fit_start_time="2020-01-01", fit_end_time="2020-01-05", fields_group="feature")
+        proc.fit(df)
+        X = df.values.astype(np.float64)
+        expected = np.clip((X - proc.mean_train) / proc.std_train, -3, 3)
+        np.testing.assert_allclose(proc(df.copy()).values, expected, rtol=1e-6)
+
+    def test_RobustZScoreNorm_fit_chunks(self):
+        index = pd.MultiIndex.from_product(
+            [pd.date_range("2020-01-01", periods=30), ["SH600000", "SH600001", "SH600004"]],
+            names=["datetime", "instrument"],
+        )
+        values = np.random.RandomState(0).randn(len(index), 3).astype(np.float32)
+        values[::7, 1] = np.nan
+        df = pd.DataFrame(values, index=index, columns=pd.MultiIndex.from_product([["feature"], ["a", "b", "c"]]))
+        kwargs = {"fit_start_time": "2020-01-03", "fit_end_time": "2020-01-25", "fields_group": "feature"}
+        expected = RobustZScoreNorm(**kwargs)
+        expected.fit(df)
+        proc = RobustZScoreNorm(**kwargs)
+        # the columns are read from the spilled file one by one
+        proc.BLOCK_BYTES = 1
+        proc.fit_chunks(df.loc[dates] for dates in np.array_split(df.index.levels[0], 4))
+        np.testing.assert_array_equal(proc.mean_train, expected.mean_train)
+        np.testing.assert_array_equal(proc.std_train, expected.std_train)
+        with self.assertRaises(ValueError):
+            RobustZScoreNorm(**kwargs).fit_chunks([])
+
+    def test_cross_sectional_vectorized(self):
+        """The vectorized cross sectional processors should be the same as the `groupby` implementations"""
+        fields = ["$close / Ref($close, 1) - 1", "Sign($close - Ref($close, 1))", "Ref($close, 30) / $close"]
+        origin_df = D.features(D.instruments(market="csi300"), fields, start_time="2010-01-01", end_time="2010-12-31")
+        origin_df.columns = pd.MultiIndex.from_tuples([("feature", "ret"), ("feature", "vol"), ("label", "close")])
+
+        def groupby_apply(df, func):
+            return df.groupby("datetime", group_keys=False).apply(func)
+
+        expected = {
+            "zscore": groupby_apply(origin_df, zscore),
+            "robust": groupby_apply(origin_df, robust_zscore),
+            "rank": (origin_df.groupby("datetime", group_keys=False).rank(pct=True) - 0.5) * 3.46,
+            "fillna": groupby_apply(origin_df, lambda x: x.fillna(x.mean())),
+        }
+        # the fast path should not depend on the order of the rows
+        for df in [origin_df, origin_df.sample(frac=1, random_state=0)]:
+            for name, proc in [
+                ("zscore", CSZScoreNorm()),
+                ("robust", CSZScoreNorm(method="robust")),
+                ("rank", CSRankNorm()),
+                ("fillna", CSZFillna()),
+            ]:
+                res = proc(df.copy())
+                pd.testing.assert_frame_equal(
+                    res.loc[df.index], expected[name].loc[df.index], rtol=1e-4, atol=1e-4, obj=name
+                )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from qlib.config import C
+from qlib.data import D, LocalExpressionCache
+from qlib.data.data import ExpressionD
+from qlib.tests import TestAutoData
+
+
+class TestLocalExpressionCache(TestAutoData):
+    FIELDS = ["Mean($close, 5) / $close", "Corr($close, Log($volume + 1), 10)", "$close"]
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = LocalExpressionCache(ExpressionD._provider, cache_dir=self.cache_dir)
+
+    def tearDown(self):
+        LocalExpressionCache._pool.clear()
+        shutil.rmtree(self.cache_dir)
+
+    def segments(self):
+        return sorted(Path(self.cache_dir).rglob("*.seg"))
+
+    def check_same(self, inst="SH600000", start_time="2010-01-01", end_time="2010-12-31"):
+        data = self.cache.expressions(inst, self.FIELDS, start_time, end_time, "day")
+        for field in self.FIELDS:
+            expected = ExpressionD.expression(inst, field, start_time, end_time, "day")
+            pd.testing.assert_series_equal(data[field], expected, check_names=False, check_index_type=False)
+
+    def test_cache(self):
+        self.check_same()
+        # the expressions of an instrument are appended to a single segment; the raw feature is not cached
+        segments = self.segments()
+        self.assertEqual(len(segments), 1)
+        size = segments[0].stat().st_size
+        self.assertEqual(len(LocalExpressionCache.read_segment(segments[0]).records), 2)
+        # the segment is reused by the other time ranges
+        self.check_same(start_time="2011-03-01", end_time="2011-06-30")
+        self.assertEqual(self.segments(), segments)
+        self.assertEqual(segments[0].stat().st_size, size)
+        series = self.cache.expression("SH600000", self.FIELDS[0], "2010-01-01", "2010-01-31", "day")
+        self.assertEqual(len(series), len(D.calendar("2010-01-01", "2010-01-31")))
+
+    def test_invalidate(self):
+        self.check_same()
+        (path,) = self.segments()
+        size = path.stat().st_size
+        feature_path = Path(C.dpm.get_data_uri("day")).joinpath("features", "sh600000", "volume.day.bin")
+        stat = feature_path.stat()
+        try:
+            os.utime(feature_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            self.check_same()
+        finally:
+            os.utime(feature_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        # only the expression depending on `$volume` gets a new data version, which is appended to the segment
+        segment = LocalExpressionCache.read_segment(path)
+        self.assertEqual(len(segment.records), 3)
+        self.assertGreater(path.stat().st_size, size)
+        self.assertEqual(len(segment.newest), 2)
+
+    def test_stale_writer(self):
+        self.check_same()
+        (path,) = self.segments()
+        segment = LocalExpressionCache.read_segment(path)
+        records = dict(segment.records)
+        # a slow writer appends the records calculated with the older data
+        stale = [
+            (expression_hash, b"stale000", data_time - 1, pd.Series([1.0, 2.0], index=[0, 1]))
+            for (expression_hash, _), (data_time, *_) in records.items()
+        ]
+        LocalExpressionCache.append_records(path, stale)
+        LocalExpressionCache.compact(LocalExpressionCache.read_segment(path))
+        # only the versions older than the newest ones are removed
+        self.assertEqual(set(LocalExpressionCache.read_segment(path).records), set(records))
+        self.check_same()
+
+    def test_broken_record(self):
+        self.check_same()
+        (path,) = self.segments()
+        (expression_hash, _), (data_time, *_) = next(iter(LocalExpressionCache.read_segment(path).records.items()))
+        record = (expression_hash, b"newer000", data_time + 1, pd.Series([1.0, 2.0, 3.0], index=[5, 6, 7]))
+        # a failed write leaves a truncated record in the middle of the segment
+        with path.open("ab") as f:
+            f.write(LocalExpressionCache._pack_record(*record)[:-20])
+        LocalExpressionCache.append_records(path, [record])
+        LocalExpressionCache._pool.clear()
+        segment = LocalExpressionCache.read_segment(path)
+        # the broken record is skipped and the records after it are still read
+        self.assertEqual(segment.size, path.stat().st_size)
+        self.assertEqual(len(segment.records), 3)
+        start_index, data = segment.get(expression_hash, b"newer000")
+        self.assertEqual(start_index, 5)
+        self.assertEqual(data.tolist(), [1.0, 2.0, 3.0])
+
+    def test_broken_tail(self):
+        self.check_same()
+        (path,) = self.segments()
+        size = path.stat().st_size
+        with path.open("ab") as f:
+            f.write(LocalExpressionCache.RECORD_MAGIC + b"\0" * 40)
+        LocalExpressionCache._pool.clear()
+        # the record being written is skipped
+        self.assertEqual(LocalExpressionCache.read_segment(path).size, size)
+        self.check_same()
+        # the broken record left by a killed writer is removed
+        os.utime(path, (0, 0))
+        self.assertEqual(LocalExpressionCache.read_segment(path).size, size)
+        self.assertEqual(path.stat().st_size, size)
+
+    def test_evict(self):
+        for inst in ["SH600000", "SH600004", "SH600009"]:
+            self.check_same(inst)
+        size = sum(p.stat().st_size for p in self.segments())
+        self.cache.size_limit = size // 2
+        self.cache.evict("day")
+        self.assertLessEqual(sum(p.stat().st_size for p in self.segments()), size * 0.4)
+        self.check_same("SH600009")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from qlib.config import C
+from qlib.data import D
+from qlib.data.data import Cal, DatasetProvider
+from qlib.data.inst_processor import InstProcessor
+from qlib.tests import TestAutoData
+from qlib.utils.paral import dumps_to_arena, loads_from_arena
+
+
+class AddColumn(InstProcessor):
+    def __call__(self, df: pd.DataFrame, instrument, *args, **kwargs):
+        return df.assign(extra=1.0)
+
+
+class TestSharedMemoryTransport(TestAutoData):
+    FIELDS = ["$close", "Mean($close, 5) / $close", " $close", "Ref($volume, 1)"]
+
+    def features(self, transport, instruments, **kwargs):
+        joblib_result_transport, kernels = C.joblib_result_transport, C.kernels
+        C.joblib_result_transport, C.kernels = transport, 2
+        try:
+            return D.features(instruments, self.FIELDS, "2010-01-01", "2010-12-31", **kwargs)
+        finally:
+            C.joblib_result_transport, C.kernels = joblib_result_transport, kernels
+
+    def check_same(self, instruments, **kwargs):
+        df = self.features("shm", instruments, **kwargs)
+        pd.testing.assert_frame_equal(self.features("pickle", instruments, **kwargs), df)
+        return df
+
+    def test_transport(self):
+        df = self.check_same(D.instruments("csi300"))
+        self.assertGreater(len(df), 0)
+        spans = {
+            "SH600000": [(pd.Timestamp("2010-01-01"), pd.Timestamp("2010-03-01"))],
+            "SH600110": [(pd.Timestamp("2010-02-01"), pd.Timestamp("2010-03-01"))],
+        }
+        self.check_same(spans)
+        self.assertEqual(len(self.check_same(["NOT_EXISTS", "SH600000"])), len(self.check_same(["SH600000"])))
+        self.assertEqual(len(self.check_same(["NOT_EXISTS"])), 0)
+
+    def test_slot_rows(self):
+        # the slots are sized by the calendar days in the spans of the instruments
+        it = [
+            ("SH600000", None),
+            ("SH600110", [(pd.Timestamp("2010-02-01"), pd.Timestamp("2010-03-01"))]),
+            ("SH600111", [(pd.Timestamp("2009-12-01"), pd.Timestamp("2010-01-31"))]),
+        ]
+        slot_rows = DatasetProvider._get_slot_rows(it, "2010-01-01", "2010-12-31", "day")
+        expected = [
+            len(Cal.calendar("2010-01-01", "2010-12-31")),
+            len(Cal.calendar("2010-02-01", "2010-03-01")),
+            len(Cal.calendar("2010-01-01", "2010-01-31")),
+        ]
+        self.assertEqual(list(slot_rows), expected)
+
+    def test_invalid_transport(self):
+        with self.assertRaises(ValueError):
+            self.features("pipe", ["SH600000", "SH600110"])
+
+    def test_fallback(self):
+        # the data changed by the processors does not fit the arena
+        df = self.check_same(["SH600000", "SH600110"], inst_processors=[AddColumn()])
+        self.assertEqual(list(df.columns), [str(f) for f in self.FIELDS])
+
+
+class TestArenaPickle(unittest.TestCase):
+    def test_roundtrip(self):
+        index = pd.MultiIndex.from_product([["SH600000", "SH600001"], pd.date_range("2020-01-01", periods=10000)])
+        obj = {
+            "df": pd.DataFrame({"a": np.arange(len(index), dtype=np.float32), "b": np.arange(len(index)) % 2 == 0}),
+            "series": pd.Series(np.random.rand(len(index)), index=index),
+            "fortran": np.asfortranarray(np.random.rand(100, 200)),
+            "small": np.arange(3),
+        }
+        arena, data = dumps_to_arena(obj, min_nbytes=1024)
+        try:
+            self.assertGreater(arena.size, obj["fortran"].nbytes)
+            loaded = loads_from_arena(data, arena.name)
+        finally:
+            arena.unlink()
+        pd.testing.assert_frame_equal(loaded["df"], obj["df"])
+        pd.testing.assert_series_equal(loaded["series"], obj["series"])
+        np.testing.assert_array_equal(loaded["fortran"], obj["fortran"])
+        np.testing.assert_array_equal(loaded["small"], obj["small"])
+        # the shared arrays are read-only
+        self.assertFalse(loaded["fortran"].flags.writeable)
+        self.assertTrue(loaded["small"].flags.writeable)
+
+    def test_writable(self):
+        df = pd.DataFrame(np.random.rand(10000, 4))
+        df.iloc[0, 0] = np.nan
+        arena, data = dumps_to_arena({"df": df}, min_nbytes=1024)
+        try:
+            loaded = loads_from_arena(data, arena.name, writable=True)["df"]
+            loaded.fillna(0, inplace=True)
+            loaded.iloc[1, 1] = -1.0
+            self.assertEqual(loaded.iloc[0, 0], 0)
+            self.assertEqual(loaded.iloc[1, 1], -1.0)
+            # the changes are private, the other processes still load the original data
+            pd.testing.assert_frame_equal(loads_from_arena(data, arena.name)["df"], df)
+        finally:
+            arena.unlink()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from qlib.config import C
+from qlib.workflow.task.manage import TaskManager, run_task
+
+
+def _square(task_def):
+    return task_def["x"] ** 2
+
+
+def _run_tasks(mongo_conf):
+    C["mongo"] = mongo_conf
+    fetched = []
+    tm = TaskManager("pool")
+    for task in tm.task_fetcher_iter():
+        fetched.append(task["def"]["x"])
+        tm.commit_task_res(task, _square(task["def"]))
+    return fetched
+
+
+class TestSQLiteTaskPool(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.old_mongo = C["mongo"]
+        C["mongo"] = {"task_url": f"sqlite:///{Path(self.tmp_dir.name) / 'tasks.db'}", "task_db_name": "test"}
+
+    def tearDown(self):
+        C["mongo"] = self.old_mongo
+        self.tmp_dir.cleanup()
+
+    def test_task_manager(self):
+        tm = TaskManager("pool")
+        tasks = [{"model": {"class": "M", "kwargs": {"x": i}}, "x": i} for i in range(10)]
+        _id_list = tm.create_task(tasks)
+        # the existing tasks are not created again
+        self.assertEqual(tm.create_task(tasks), _id_list)
+        self.assertEqual(tm.task_stat(), {TaskManager.STATUS_WAITING: 10})
+        self.assertEqual(TaskManager.list(), ["pool"])
+
+        # the task with the highest priority is fetched first
+        tm.prioritize(tm.re_query(_id_list[5]), 2)
+        tm.prioritize(tm.re_query(_id_list[3]), 1)
+        self.assertEqual([tm.fetch_task()["def"]["x"] for _ in range(3)], [5, 3, 0])
+        self.assertEqual(tm.task_stat({"_id": {"$in": _id_list[:5]}}), {"running": 2, "waiting": 3})
+
+        # the failed task is returned
+        with self.assertRaises(ValueError):
+            with tm.safe_fetch_task() as task:
+                raise ValueError("failed")
+        self.assertEqual(tm.re_query(task["_id"])["status"], TaskManager.STATUS_WAITING)
+
+        self.assertEqual([t["def"]["x"] for t in tm.query({"filter.model.kwargs.x": 7})], [7])
+        query = {"_id": {"$in": _id_list[6:]}}
+        run_task(_square, "pool", query=query)
+        self.assertEqual([tm.re_query(_id)["res"] for _id in _id_list[6:]], [36, 49, 64, 81])
+        tm.reset_waiting()
+        self.assertEqual(tm.task_stat(), {"waiting": 6, "done": 4})
+        tm.remove(query)
+        self.assertEqual(tm.task_stat(), {"waiting": 6})
+
+    def test_parallel_fetch(self):
+        tm = TaskManager("pool")
+        _id_list = tm.create_task([{"x": i} for i in range(100)])
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(_run_tasks, C["mongo"]) for _ in range(4)]
+            fetched = sum((f.result() for f in futures), [])
+        # every task is fetched exactly once
+        self.assertEqual(sorted(fetched), list(range(100)))
+        self.assertEqual(tm.task_stat(), {TaskManager.STATUS_DONE: 100})
+        self.assertEqual([tm.re_query(_id)["res"] for _id in _id_list], [i**2 for i in range(100)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+import pandas as pd
+
+from qlib.data.data import DatasetProvider, ExpressionD
+from qlib.tests import TestAutoData
+
+
+class TestExpressionDAG(TestAutoData):
+    FIELDS = [
+        "Mean($close, 20) / $close",
+        "Ref(Mean($close, 20), 1) / $close",
+        "($close - $open) / $open",
+        "Corr($close, Log($volume + 1), 10)",
+        "EMA($close, 10)",
+        "Delta($close, 3)",
+    ]
+
+    def test_compile(self):
+        dag = ExpressionD.compile(self.FIELDS)
+        self.assertEqual(dag.n_nodes, 23)
+        # $close: 8 nodes -> 1; Mean($close,20): 2 -> 1; $open: 2 -> 1
+        self.assertEqual(dag.n_eliminated, 9)
+        self.assertIs(ExpressionD.compile(self.FIELDS), dag)
+
+        mean, ref = DatasetProvider.parse_fields(self.FIELDS[:2])
+        self.assertIs(mean.feature_left, ref.feature_left.feature)
+        self.assertIs(mean.feature_right, ref.feature_right)
+        self.assertTrue(dag.is_range_invariant(dag.roots[self.FIELDS[0]]))
+        self.assertFalse(dag.is_range_invariant(dag.roots[self.FIELDS[4]]))
+
+    def test_dag_cache_size(self):
+        ExpressionD.dag_cache.clear()
+        dag = ExpressionD.compile(self.FIELDS)
+        for i in range(ExpressionD.DAG_CACHE_SIZE + 5):
+            ExpressionD.compile([f"Ref($close, {i + 1})"])
+        # the least recently used DAGs are dropped
+        self.assertEqual(len(ExpressionD.dag_cache), ExpressionD.DAG_CACHE_SIZE)
+        self.assertIsNot(ExpressionD.compile(self.FIELDS), dag)
+
+    def test_expressions(self):
+        for inst in ["SH600000", "SH600110"]:
+            data = ExpressionD.expressions(inst, self.FIELDS, "2010-01-01", "2010-12-31")
+            for field in self.FIELDS:
+                series = ExpressionD.expression(inst, field, "2010-01-01", "2010-12-31")
+                # NOTE: the first value of `Delta` is NaN when it is loaded alone, because its window is not
+                # extended enough; it gets the history when it is loaded with the other fields.
+                pd.testing.assert_series_equal(series.iloc[1:], data[field].iloc[1:], check_names=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
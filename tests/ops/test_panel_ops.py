@@ -0,0 +1,65 @@
+import unittest
+
+import pandas as pd
+
+from qlib.contrib.data.loader import Alpha158DL
+from qlib.data import D
+from qlib.data.data import LocalDatasetProvider
+from qlib.tests import TestAutoData
+
+
+class TestPanelEvaluation(TestAutoData):
+    FIELDS = [
+        "$close",
+        "Ref($close, 1)",
+        "Ref($close, -2) / $close - 1",
+        "Mean($close, 5)",
+        "Std($volume, 10)",
+        "Skew($close, 10)",
+        "Rank($close, 10)",
+        "Quantile($close, 10, 0.8)",
+        "Slope($close, 10)",
+        "Rsquare($close, 10)",
+        "Resi($close, 10)",
+        "Corr($close, Log($volume + 1), 10)",
+        "Cov($close, $volume, 10)",
+        "EMA($close, 10)",
+        "Delta($close, 3)",
+        "If($close > $open, $close, $open)",
+        "Sign($close - $open)",
+        # the operators below fall back to per-instrument evaluation
+        "IdxMax($close, 5)",
+        "Mad($close, 10)",
+        "Ref($close, 0)",
+        "ChangeInstrument('SH000300', $close)",
+    ]
+
+    def check_same(self, instruments, fields, start_time="2010-01-01", end_time="2010-12-31"):
+        df = LocalDatasetProvider().dataset(instruments, fields, start_time, end_time)
+        df_panel = LocalDatasetProvider(panel=True).dataset(instruments, fields, start_time, end_time)
+        pd.testing.assert_frame_equal(df, df_panel)
+        return df_panel
+
+    def test_ops(self):
+        df = self.check_same(D.instruments("csi300"), self.FIELDS)
+        self.assertGreater(len(df), 0)
+
+    def test_alpha158(self):
+        fields, _ = Alpha158DL.get_feature_config()
+        self.check_same(D.instruments("csi300"), fields)
+
+    def test_instruments(self):
+        # list of instruments and instruments with spans
+        self.check_same(["SH600000", "SH600110", "NOT_EXISTS"], self.FIELDS[:5])
+        spans = {
+            "SH600000": [(pd.Timestamp("2010-01-01"), pd.Timestamp("2010-03-01"))],
+            "SH600110": [
+                (pd.Timestamp("2010-02-01"), pd.Timestamp("2010-03-01")),
+                (pd.Timestamp("2010-06-01"), pd.Timestamp("2011-03-01")),
+            ],
+        }
+        self.check_same(spans, self.FIELDS[:5])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from qlib.data._libs.rolling import (
+    rolling_corr,
+    rolling_cov,
+    rolling_idxmax,
+    rolling_idxmin,
+    rolling_kurt,
+    rolling_mad,
+    rolling_median,
+    rolling_quantile,
+    rolling_rank,
+    rolling_skew,
+    rolling_wma,
+)
+
+
+def _skew(x):
+    return pd.Series(x).skew()
+
+
+def _kurt(x):
+    x1 = x[~np.isnan(x)]
+    # the uniform windows get -3 in `pandas.Series.rolling(N).kurt()`
+    if len(x1) >= 4 and x1.min() == x1.max():
+        return -3.0
+    return pd.Series(x1).kurt()
+
+
+def _mad(x):
+    x1 = x[~np.isnan(x)]
+    return np.mean(np.abs(x1 - x1.mean()))
+
+
+def _wma(x):
+    w = np.arange(len(x)) + 1
+    w = w / w.sum()
+    return np.nanmean(w * x)
+
+
+class TestRollingKernels(unittest.TestCase):
+    """The compiled kernels should give the same results as the pandas implementations of the operators"""
+
+    WINDOWS = [1, 2, 3, 5, 10, 30, 1000]
+
+    @staticmethod
+    def make_data(n, seed):
+        rng = np.random.RandomState(seed)
+        x = rng.randn(n).cumsum() + 50
+        x[rng.rand(n) < 0.1] = np.nan
+        x[20:30] = 50.0  # uniform values
+        x[40:50] = np.nan
+        x[60:70] = np.round(x[60:70])  # ties
+        return x
+
+    def iter_data(self):
+        for n in [0, 1, 5, 300]:
+            for window in self.WINDOWS:
+                yield n, window, self.make_data(n, 0), self.make_data(n, 1)
+
+    def assert_same(self, actual, expected, msg, rtol=1e-6):
+        np.testing.assert_allclose(actual, expected, rtol=rtol, atol=1e-8, err_msg=msg)
+
+    def test_moments(self):
+        # NOTE: the windows are applied one by one, because `pandas.Series.rolling(N).skew()` keeps returning NaN
+        # after a window without enough data in some versions of pandas.
+        for n, window, x, _ in self.iter_data():
+            rolling = pd.Series(x).rolling(window, min_periods=1)
+            if window >= 3:
+                self.assert_same(rolling_skew(x, window), rolling.apply(_skew, raw=True).values, f"skew {n} {window}")
+            if window >= 4:
+                # the fourth moment loses more precision
+                expected = rolling.apply(_kurt, raw=True).values
+                self.assert_same(rolling_kurt(x, window), expected, f"kurt {n} {window}", rtol=1e-4)
+
+        # a long series trending over orders of magnitude (e.g. the minute `$amount`); it is compared with the
+        # two-pass moments of each window because the pandas results lose precision on it
+        rng = np.random.RandomState(0)
+        x = np.geomspace(1e3, 1e9, 60000) * (1 + 0.01 * rng.randn(60000))
+        x[rng.rand(60000) < 0.05] = np.nan
+        for window in [5, 20, 60]:
+            windows = sliding_window_view(np.hstack([np.full(window - 1, np.nan), x]), window)
+            count = (~np.isnan(windows)).sum(axis=1)
+            dev = windows - np.nanmean(windows, axis=1, keepdims=True)
+            m2, m3, m4 = (np.nanmean(dev**k, axis=1) for k in [2, 3, 4])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                skew = np.sqrt(count * (count - 1)) / (count - 2) * m3 / m2**1.5
+                kurt = ((count**2 - 1) * m4 / m2**2 - 3 * (count - 1) ** 2) / ((count - 2) * (count - 3))
+            self.assert_same(rolling_skew(x, window), np.where(count >= 3, skew, np.nan), f"trend skew {window}")
+            self.assert_same(rolling_kurt(x, window), np.where(count >= 4, kurt, np.nan), f"trend kurt {window}")
+
+    def test_order_statistics(self):
+        for n, window, x, _ in self.iter_data():
+            rolling = pd.Series(x).rolling(window, min_periods=1)
+            for qscore in [0, 0.2, 0.5, 0.8, 1]:
+                expected = rolling.quantile(qscore).values
+                self.assert_same(rolling_quantile(x, window, qscore), expected, f"quantile {n} {window} {qscore}")
+            self.assert_same(rolling_median(x, window), rolling.median().values, f"median {n} {window}")
+            self.assert_same(rolling_rank(x, window), rolling.rank(pct=True).values, f"rank {n} {window}")
+            self.assert_same(rolling_mad(x, window), rolling.apply(_mad, raw=True).values, f"mad {n} {window}")
+
+    def test_index(self):
+        for n, window, x, _ in self.iter_data():
+            rolling = pd.Series(x).rolling(window, min_periods=1)
+            expected = rolling.apply(lambda v: v.argmax() + 1, raw=True).values
+            self.assert_same(rolling_idxmax(x, window), expected, f"idxmax {n} {window}")
+            expected = rolling.apply(lambda v: v.argmin() + 1, raw=True).values
+            self.assert_same(rolling_idxmin(x, window), expected, f"idxmin {n} {window}")
+            self.assert_same(rolling_wma(x, window), rolling.apply(_wma, raw=True).values, f"wma {n} {window}")
+
+    def test_pair(self):
+        for n, window, x, y in self.iter_data():
+            rolling = pd.Series(x).rolling(window, min_periods=1)
+            self.assert_same(rolling_cov(x, y, window), rolling.cov(pd.Series(y)).values, f"cov {n} {window}")
+            # the correlation of the uniform windows is undefined (`Corr` masks them)
+            valid = ~(
+                np.isclose(rolling.std().values, 0) | np.isclose(pd.Series(y).rolling(window, min_periods=1).std(), 0)
+            )
+            expected = rolling.corr(pd.Series(y)).values
+            self.assert_same(rolling_corr(x, y, window)[valid], expected[valid], f"corr {n} {window}")
+
+    def test_float32(self):
+        x = self.make_data(300, 0).astype(np.float32)
+        expected = pd.Series(x.astype(np.float64)).rolling(10, min_periods=1).median().values
+        self.assert_same(rolling_median(x, 10), expected, "median float32")
+
+
+if __name__ == "__main__":
+    unittest.main()
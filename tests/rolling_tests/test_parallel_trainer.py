@@ -0,0 +1,99 @@
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+import pytest
+
+from qlib.contrib.data.handler import Alpha158
+from qlib.contrib.model.linear import LinearModel
+from qlib.data.dataset.handler import DataHandlerLP
+from qlib.model.trainer import ParallelTrainerR, TrainerR
+from qlib.tests import TestAutoData
+from qlib.workflow import R
+from qlib.workflow.task.gen import RollingGen, task_generator
+
+
+class InplaceLinearModel(LinearModel):
+    """A model filling the learning data of the handler in place before fitting"""
+
+    def fit(self, dataset, reweighter=None):
+        df = dataset.handler._get_df_by_key(DataHandlerLP.DK_L)
+        df.fillna(0, inplace=True)
+        df.iloc[0, 0] = 0.0
+        return super().fit(dataset, reweighter=reweighter)
+
+
+class TestParallelTrainer(TestAutoData):
+    def setUp(self):
+        self.uri = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.uri, ignore_errors=True)
+
+    def get_tasks(self):
+        # the rolling tasks share one handler instance, its data is loaded only once
+        handler = Alpha158(
+            instruments="csi300",
+            start_time="2019-01-01",
+            end_time="2020-06-30",
+            fit_start_time="2019-01-01",
+            fit_end_time="2019-06-30",
+        )
+        task = {
+            "model": {
+                "class": "LinearModel",
+                "module_path": "qlib.contrib.model.linear",
+                "kwargs": {"estimator": "ols"},
+            },
+            "dataset": {
+                "class": "DatasetH",
+                "module_path": "qlib.data.dataset",
+                "kwargs": {
+                    "handler": handler,
+                    "segments": {
+                        "train": ("2019-01-01", "2019-06-30"),
+                        "valid": ("2019-07-01", "2019-09-30"),
+                        "test": ("2019-10-01", "2019-11-30"),
+                    },
+                },
+            },
+            "record": ["qlib.workflow.record_temp.SignalRecord"],
+        }
+        tasks = task_generator(task, RollingGen(step=20, rtype=RollingGen.ROLL_SD))
+        for t in tasks:
+            # the tasks only differ in segments
+            t["dataset"]["kwargs"]["handler"] = handler
+        return tasks
+
+    @pytest.mark.slow
+    def test_parallel_trainer(self):
+        tasks = self.get_tasks()
+        self.assertGreater(len(tasks), 2)
+        with R.uri_context(uri=self.uri):
+            recs = ParallelTrainerR(experiment_name="parallel_trainer", n_jobs=2)(tasks)
+            expected_recs = TrainerR(experiment_name="serial_trainer")(tasks)
+            self.assertEqual(len(recs), len(tasks))
+            for task, rec, expected_rec in zip(tasks, recs, expected_recs):
+                # the recorders are in the order of the tasks
+                self.assertEqual(
+                    rec.load_object("task")["dataset"]["kwargs"]["segments"], task["dataset"]["kwargs"]["segments"]
+                )
+                self.assertEqual(rec.list_tags()[TrainerR.STATUS_KEY], TrainerR.STATUS_END)
+                pd.testing.assert_frame_equal(rec.load_object("pred.pkl"), expected_rec.load_object("pred.pkl"))
+
+    @pytest.mark.slow
+    def test_inplace_model(self):
+        tasks = self.get_tasks()[:2]
+        for t in tasks:
+            t["model"] = {"class": "InplaceLinearModel", "module_path": __name__, "kwargs": {"estimator": "ols"}}
+        with R.uri_context(uri=self.uri):
+            recs = ParallelTrainerR(experiment_name="parallel_trainer", n_jobs=2)(tasks)
+            self.assertEqual(len(recs), len(tasks))
+            for rec in recs:
+                self.assertEqual(rec.list_tags()[TrainerR.STATUS_KEY], TrainerR.STATUS_END)
+                self.assertGreater(len(rec.load_object("pred.pkl")), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import qlib
+from qlib.data.storage.file_storage import BundleFeatureStorage, FileFeatureStorage, MmapFeatureStorage
+
+
+class FeatureStorageMixin:
+    """the data shared by the tests of the mapped storages"""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.provider_uri = Path(tempfile.mkdtemp())
+        cls.provider_uri.joinpath("calendars").mkdir()
+        pd.Series(pd.bdate_range("2020-01-01", periods=100).strftime("%Y-%m-%d")).to_csv(
+            cls.provider_uri.joinpath("calendars", "day.txt"), index=False, header=False
+        )
+        feature_dir = cls.provider_uri.joinpath("features", "sh600000")
+        feature_dir.mkdir(parents=True)
+        values = np.random.RandomState(0).rand(80)
+        values[[3, 40]] = np.nan
+        np.hstack([10, values]).astype("<f").tofile(feature_dir.joinpath("close.day.bin"))
+        np.hstack([10, values * 2]).astype("<f").tofile(feature_dir.joinpath("open.day.bin"))
+        np.hstack([12, values[2:] * 3]).astype("<f").tofile(feature_dir.joinpath("vwap.day.bin"))
+        BundleFeatureStorage.write_bundle(
+            feature_dir.joinpath("day.bundle"), ["close", "open"], np.vstack([values, values * 2]), 10
+        )
+        qlib.init(provider_uri=str(cls.provider_uri))
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        MmapFeatureStorage.clear_pool()
+        shutil.rmtree(cls.provider_uri, ignore_errors=True)
+
+    def check_consistency(self, storage, field, slices):
+        file_s = FileFeatureStorage("sh600000", field, "day", provider_uri=self.provider_uri)
+        self.assertEqual(file_s.start_index, storage.start_index)
+        self.assertEqual(file_s.end_index, storage.end_index)
+        for s in slices:
+            pd.testing.assert_series_equal(file_s[s], storage[s], check_index_type=False)
+
+
+class TestMmapFeatureStorage(FeatureStorageMixin, unittest.TestCase):
+    def test_consistency(self):
+        file_s = FileFeatureStorage("sh600000", "close", "day", provider_uri=self.provider_uri)
+        mmap_s = MmapFeatureStorage("sh600000", "close", "day", provider_uri=self.provider_uri)
+        self.assertEqual(len(file_s), len(mmap_s))
+        self.assertEqual(file_s[20], mmap_s[20])
+        slices = [slice(None), slice(0, 15), slice(12, 30), slice(85, 120), slice(95, 100), slice(0, 5)]
+        self.check_consistency(mmap_s, "close", slices)
+
+    def test_zero_copy(self):
+        mmap_s = MmapFeatureStorage("sh600000", "close", "day", provider_uri=self.provider_uri)
+        self.assertTrue(np.shares_memory(mmap_s[10:30].values, mmap_s[20:40].values))
+
+    def test_missing_and_write(self):
+        missing = MmapFeatureStorage("sh600001", "close", "day", provider_uri=self.provider_uri)
+        self.assertIsNone(missing.start_index)
+        self.assertTrue(missing[:].empty)
+
+        mmap_s = MmapFeatureStorage("sh600000", "high", "day", provider_uri=self.provider_uri)
+        mmap_s.write(np.arange(5), index=2)
+        self.assertEqual(mmap_s.end_index, 6)
+        # the mapped handle must be refreshed after writing
+        mmap_s.write(np.arange(3), index=8)
+        self.assertEqual(mmap_s.end_index, 10)
+        self.assertTrue(np.isnan(mmap_s[7][1]))
+
+    def test_pool_size(self):
+        MmapFeatureStorage.clear_pool()
+        pool_size = MmapFeatureStorage._pool_size
+        try:
+            MmapFeatureStorage._pool_size = 1
+            for f in ["close", "vwap"]:
+                MmapFeatureStorage("sh600000", f, "day", provider_uri=self.provider_uri)[:]
+            self.assertEqual(len(MmapFeatureStorage._pool), 1)
+            # the limit is shared; a smaller `pool_size` does not evict the files mapped for the others
+            MmapFeatureStorage("sh600000", "close", "day", provider_uri=self.provider_uri, pool_size=2)[:]
+            MmapFeatureStorage("sh600000", "vwap", "day", provider_uri=self.provider_uri, pool_size=1)[:]
+            self.assertEqual(len(MmapFeatureStorage._pool), 2)
+            self.assertEqual(MmapFeatureStorage._pool_size, 2)
+            self.assertEqual(MmapFeatureStorage.POOL_SIZE, 1024)
+        finally:
+            MmapFeatureStorage._pool_size = pool_size
+
+
+class TestBundleFeatureStorage(FeatureStorageMixin, unittest.TestCase):
+    def test_consistency(self):
+        for field in ["close", "open", "vwap"]:
+            bundle_s = BundleFeatureStorage("sh600000", field, "day", provider_uri=self.provider_uri)
+            self.check_consistency(bundle_s, field, [slice(None), slice(0, 15), slice(12, 30), slice(85, 120)])
+
+    def test_zero_copy(self):
+        close = BundleFeatureStorage("sh600000", "close", "day", provider_uri=self.provider_uri)[:]
+        open_ = BundleFeatureStorage("sh600000", "open", "day", provider_uri=self.provider_uri)[:]
+        # all the fields are rows of the same mapped matrix
+        stride = BundleFeatureStorage.read_bundle(self.provider_uri.joinpath("features", "sh600000", "day.bundle"))[
+            3
+        ].shape[1]
+        self.assertEqual(open_.values.ctypes.data - close.values.ctypes.data, 4 * stride)
+
+    def test_missing_and_write(self):
+        missing = BundleFeatureStorage("sh600001", "close", "day", provider_uri=self.provider_uri)
+        self.assertTrue(missing[:].empty)
+        # the missing bundle is looked up only once
+        self.assertIn(str(missing.bundle_uri), MmapFeatureStorage._pool)
+        self.assertIsNone(MmapFeatureStorage._pool[str(missing.bundle_uri)])
+        self.assertTrue(BundleFeatureStorage("sh600000", "high", "day", provider_uri=self.provider_uri)[:].empty)
+        with self.assertRaises(NotImplementedError):
+            BundleFeatureStorage("sh600000", "close", "day", provider_uri=self.provider_uri).write([1.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import unittest
+
+import numpy as np
+
+from qlib.contrib.strategy.optimizer import EnhancedIndexingOptimizer
+from qlib.contrib.strategy.optimizer.enhanced_indexing import _project_capped_simplex
+
+
+class TestEnhancedIndexingOptimizer(unittest.TestCase):
+    NUM_FACTORS = 10
+    SOLVER_KWARGS = {"solver": "CLARABEL"}
+
+    def make_problems(self, num=10):
+        rng = np.random.RandomState(0)
+        problems = []
+        for _ in range(num):
+            n = 200 + rng.randint(-10, 10)
+            A = rng.randn(self.NUM_FACTORS, self.NUM_FACTORS) * 0.1
+            wb, w0 = rng.rand(n), rng.rand(n) * (rng.rand(n) < 0.5)
+            problems.append(
+                dict(
+                    r=rng.randn(n),
+                    F=rng.randn(n, self.NUM_FACTORS),
+                    cov_b=A @ A.T,
+                    var_u=rng.rand(n) * 0.01,
+                    w0=w0 / w0.sum(),
+                    wb=wb / wb.sum(),
+                    mfh=rng.rand(n) < 0.05,
+                    mfs=rng.rand(n) < 0.05,
+                )
+            )
+        return problems
+
+    def test_parametrize(self):
+        problems = self.make_problems()
+        for kwargs in [{}, {"f_dev": 0.5}, {"delta": None}]:
+            optimizer = EnhancedIndexingOptimizer(solver_kwargs=self.SOLVER_KWARGS, **kwargs)
+            param_optimizer = EnhancedIndexingOptimizer(solver_kwargs=self.SOLVER_KWARGS, parametrize=True, **kwargs)
+            for problem in problems:
+                np.testing.assert_allclose(param_optimizer(**problem), optimizer(**problem), atol=1e-4, err_msg=kwargs)
+            # the problems are reused for the universes of different sizes
+            self.assertLessEqual(len(param_optimizer._problems), 2 * 2)
+            self.assertTrue(all(problem.prob.is_dpp() for problem in param_optimizer._problems.values()))
+
+    def test_pgd(self):
+        optimizer = EnhancedIndexingOptimizer(solver_kwargs=self.SOLVER_KWARGS, delta=None, epsilon=0)
+        pgd_optimizer = EnhancedIndexingOptimizer(method="pgd", delta=None, epsilon=0)
+        for problem in self.make_problems():
+            np.testing.assert_allclose(pgd_optimizer(**problem), optimizer(**problem), atol=1e-5)
+        with self.assertRaises(AssertionError):
+            EnhancedIndexingOptimizer(method="pgd", delta=0.2)
+
+    def test_pgd_fallback(self):
+        problem = self.make_problems(1)[0]
+        # the solver fails on every trial
+        solver_kwargs = {**self.SOLVER_KWARGS, "max_iter": 1}
+        optimizer = EnhancedIndexingOptimizer(solver_kwargs=solver_kwargs, epsilon=0)
+        np.testing.assert_array_equal(optimizer(**problem), problem["w0"])
+        fallback_optimizer = EnhancedIndexingOptimizer(solver_kwargs=solver_kwargs, epsilon=0, pgd_fallback=True)
+        expected = EnhancedIndexingOptimizer(method="pgd", delta=None, epsilon=0)(**problem)
+        np.testing.assert_allclose(fallback_optimizer(**problem), expected)
+        # the current holding is kept if the projected gradient descent doesn't converge
+        fallback_optimizer.pgd_kwargs = {"max_iter": 1}
+        np.testing.assert_array_equal(fallback_optimizer(**problem), problem["w0"])
+
+    def test_project_capped_simplex(self):
+        rng = np.random.RandomState(1)
+        for _ in range(100):
+            n = rng.randint(1, 50)
+            lb = rng.rand(n) * 0.5 / n
+            ub = lb + rng.rand(n) * 3 / n
+            # some weights are fixed
+            fixed = rng.rand(n) < 0.2
+            ub[fixed] = lb[fixed]
+            if lb.sum() > 1 or ub.sum() < 1:
+                continue
+            y = rng.randn(n)
+            w = _project_capped_simplex(y, lb, ub)
+            self.assertAlmostEqual(w.sum(), 1)
+            self.assertTrue((w >= lb).all() and (w <= ub).all())
+            # the projection is the closest point of the feasible set
+            for _ in range(10):
+                other = _project_capped_simplex(rng.randn(n), lb, ub)
+                self.assertLessEqual(np.sum((w - y) ** 2), np.sum((other - y) ** 2) + 1e-12)
+
+
+if __name__ == "__main__":
+    unittest.main()
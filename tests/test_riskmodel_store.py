@@ -0,0 +1,90 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from qlib.contrib.strategy import EnhancedIndexingStrategy
+from qlib.model.riskmodel import RiskModelStore, RiskModelStoreWriter
+
+
+class TestRiskModelStore(unittest.TestCase):
+    NUM_FACTORS = 5
+
+    def make_risk_data(self):
+        rng = np.random.RandomState(0)
+        codes = [f"SH60{i:04d}" for i in range(50)]
+        risk_data = []
+        for date in pd.date_range("2020-01-01", periods=10, freq="B"):
+            universe = sorted(rng.choice(codes, rng.randint(20, 40), replace=False))
+            factor_exp = pd.DataFrame(rng.randn(len(universe), self.NUM_FACTORS), index=universe)
+            factor_cov = pd.DataFrame(np.cov(rng.randn(self.NUM_FACTORS, 100)))
+            # some stocks are missing specific risk
+            specific_risk = pd.Series(rng.rand(len(universe)), index=universe).iloc[2:]
+            blacklist = list(rng.choice(universe, 2, replace=False)) if date.day % 2 == 0 else []
+            risk_data.append((date, factor_exp, factor_cov, specific_risk, blacklist))
+        return risk_data
+
+    def make_strategy(self, riskmodel_root, **kwargs):
+        return EnhancedIndexingStrategy(riskmodel_root=riskmodel_root, signal=pd.Series(dtype=float), **kwargs)
+
+    def test_store(self):
+        risk_data = self.make_risk_data()
+        with tempfile.TemporaryDirectory() as file_root, tempfile.TemporaryDirectory() as store_root:
+            with RiskModelStoreWriter(store_root) as writer:
+                for date, factor_exp, factor_cov, specific_risk, blacklist in risk_data:
+                    root = os.path.join(file_root, date.strftime("%Y%m%d"))
+                    os.makedirs(root)
+                    factor_exp.to_pickle(os.path.join(root, "factor_exp.pkl"))
+                    factor_cov.to_pickle(os.path.join(root, "factor_cov.pkl"))
+                    specific_risk.to_pickle(os.path.join(root, "specific_risk.pkl"))
+                    if len(blacklist) > 0:
+                        pd.Series(0, index=blacklist).to_pickle(os.path.join(root, "blacklist.pkl"))
+                    writer.add(date, factor_exp, factor_cov, specific_risk, blacklist)
+
+            store = RiskModelStore(store_root)
+            self.assertEqual(len(store), len(risk_data))
+            self.assertIsNone(store.get("2019-12-31"))
+
+            file_strategy = self.make_strategy(file_root)
+            store_strategy = self.make_strategy(store_root, riskdata_cache_size=3)
+            for date, *_ in risk_data + [(pd.Timestamp("2019-12-31"),)]:
+                expected = file_strategy.get_risk_data(date)
+                actual = store_strategy.get_risk_data(date)
+                if expected is None:
+                    self.assertIsNone(actual)
+                    continue
+                for expected_array, actual_array in zip(expected[:3], actual[:3]):
+                    np.testing.assert_array_equal(actual_array, expected_array)
+                self.assertEqual(actual[3:], expected[3:])
+                self.assertFalse(actual[0].flags.writeable)
+            self.assertEqual(len(store_strategy._riskdata_cache), 3)
+
+    def test_invalid_data(self):
+        date, factor_exp, factor_cov, specific_risk, _ = self.make_risk_data()[0]
+        with tempfile.TemporaryDirectory() as store_root:
+            writer = RiskModelStoreWriter(store_root)
+            writer.add(date, factor_exp, factor_cov, specific_risk)
+            with self.assertRaises(ValueError):
+                writer.add(date, factor_exp, factor_cov, specific_risk)
+            with self.assertRaises(ValueError):
+                writer.add(date + pd.Timedelta(days=1), factor_exp.iloc[:, 1:], factor_cov, specific_risk)
+            # the store is not readable before the writer is closed
+            self.assertFalse(RiskModelStore.exists(store_root))
+            writer.close()
+            self.assertEqual(len(RiskModelStore(store_root)), 1)
+
+    def test_empty(self):
+        with tempfile.TemporaryDirectory() as store_root:
+            RiskModelStoreWriter(store_root).close()
+            store = RiskModelStore(store_root)
+            self.assertEqual(len(store), 0)
+            self.assertIsNone(store.get("2020-01-01"))
+
+
+if __name__ == "__main__":
+    unittest.main()